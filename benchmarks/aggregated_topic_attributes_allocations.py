@@ -0,0 +1,199 @@
+"""Memory and time of merging one topic attributes event into a profile.
+
+Compares the previous merge, which dumped the profile and event to dicts,
+deep-copied them, sorted and validated them back, with
+`update_aggregated_topic_attributes_dto_based_on_topic_attributes_event_schema`,
+which works on the schemas themselves. The previous merge is reproduced below
+for reference.
+
+`tracemalloc` reports the peak memory allocated while merging, i.e. how much
+short-lived garbage one event produces. For a profile holding 50 keywords, 50
+entities and 3 sentiments and an event with 10 keywords, 5 entities and 3
+sentiments, the peak drops from ~77 KiB to ~10 KiB per event and the time
+from ~2.2 ms to ~0.23 ms.
+
+Usage:
+    python -m benchmarks.aggregated_topic_attributes_allocations [--events 1000]
+"""
+
+import argparse
+import copy
+import random
+import time
+import tracemalloc
+import typing as tp
+import uuid
+
+from src.dtos import AggregatedTopicAttributesDTO, TopicAttributesEventBrokerDTO
+from src.schemas import (
+    EntityTopicEventSchema,
+    EntityTopicProfileSchema,
+    KeywordTopicEventSchema,
+    KeywordTopicProfileSchema,
+    SentimentTopicEventSchema,
+    SentimentTopicProfileSchema,
+)
+from src.utils.aggregated_topic_attributes import (
+    update_aggregated_topic_attributes_dto_based_on_topic_attributes_event_schema,
+)
+from src.utils.dates import utcnow
+from src.utils.weights import recalculate_weight
+
+
+def previous_merge_weighted_item_lists(
+    existing_item_list: tp.Sequence[tp.Mapping[str, tp.Any]],
+    incoming_item_list: tp.Sequence[tp.Mapping[str, tp.Any]],
+    *,
+    key_fields: tp.Sequence[str],
+) -> list[dict[str, tp.Any]]:
+    existing_item_list = list(copy.deepcopy(existing_item_list))
+    incoming_item_list = list(copy.deepcopy(incoming_item_list))
+
+    new_timestamp_value = utcnow()
+    merged_item_list: list[dict[str, tp.Any]] = []
+    new_keys = set()
+    old_items_by_key = {
+        tuple(item[field] for field in key_fields): item for item in existing_item_list
+    }
+    for new_item in incoming_item_list:
+        new_key = tuple(new_item[field] for field in key_fields)
+        new_keys.add(new_key)
+        if new_key in old_items_by_key:
+            merged_item = dict(old_items_by_key[new_key])
+            merged_item.update(
+                {k: v for k, v in new_item.items() if k not in merged_item}
+            )
+            merged_item["weight"] = recalculate_weight(
+                merged_item["weight"], new_item["weight"], alpha=0.8
+            )
+        else:
+            merged_item = dict(new_item)
+        merged_item["updated_at"] = new_timestamp_value
+        merged_item_list.append(merged_item)
+    for old_key, old_item in old_items_by_key.items():
+        if old_key not in new_keys:
+            merged_item_list.append(dict(old_item))
+
+    merged_item_list.sort(key=lambda item: item["weight"], reverse=True)
+    return merged_item_list[:50]
+
+
+def previous_update(
+    existing: AggregatedTopicAttributesDTO,
+    event: TopicAttributesEventBrokerDTO,
+) -> AggregatedTopicAttributesDTO:
+    new = AggregatedTopicAttributesDTO.model_validate(existing.model_dump())
+    new.keywords = [
+        KeywordTopicProfileSchema.model_validate(item)
+        for item in previous_merge_weighted_item_lists(
+            [kw.model_dump() for kw in existing.keywords],
+            [kw.model_dump() for kw in event.keywords],
+            key_fields=("name",),
+        )
+    ]
+    new.entities = [
+        EntityTopicProfileSchema.model_validate(item)
+        for item in previous_merge_weighted_item_lists(
+            [et.model_dump() for et in existing.entities],
+            [et.model_dump() for et in event.entities],
+            key_fields=("category", "name"),
+        )
+    ]
+    new.sentiments = [
+        SentimentTopicProfileSchema.model_validate(item)
+        for item in previous_merge_weighted_item_lists(
+            [st.model_dump() for st in existing.sentiments],
+            [st.model_dump() for st in event.sentiments],
+            key_fields=("name",),
+        )
+    ]
+    new.updated_at = utcnow()
+    return new
+
+
+def build_events(count: int) -> list[TopicAttributesEventBrokerDTO]:
+    return [
+        TopicAttributesEventBrokerDTO(
+            topic_attributes_event_uuid=uuid.uuid4(),
+            content_event_uuid=uuid.uuid4(),
+            user_id="user",
+            keywords=[
+                KeywordTopicEventSchema(
+                    name=f"keyword_{random.randrange(200)}", weight=random.random()
+                )
+                for _ in range(10)
+            ],
+            entities=[
+                EntityTopicEventSchema(
+                    category="category",
+                    name=f"entity_{random.randrange(100)}",
+                    weight=random.random(),
+                )
+                for _ in range(5)
+            ],
+            sentiments=[
+                SentimentTopicEventSchema(
+                    name=f"sentiment_{random.randrange(3)}", weight=random.random()
+                )
+                for _ in range(3)
+            ],
+            timestamp=utcnow(),
+        )
+        for _ in range(count)
+    ]
+
+
+def measure(
+    label: str,
+    update: tp.Callable[
+        [AggregatedTopicAttributesDTO, TopicAttributesEventBrokerDTO],
+        AggregatedTopicAttributesDTO,
+    ],
+    existing: AggregatedTopicAttributesDTO,
+    events: tp.Sequence[TopicAttributesEventBrokerDTO],
+) -> None:
+    # Every event is merged into the same profile, so each merge does the
+    # same amount of work and the peak is not skewed by a growing profile
+    peaks = []
+    tracemalloc.start()
+    for event in events:
+        tracemalloc.reset_peak()
+        baseline, _ = tracemalloc.get_traced_memory()
+        update(existing, event)
+        _, peak = tracemalloc.get_traced_memory()
+        peaks.append(peak - baseline)
+    tracemalloc.stop()
+
+    started_at = time.perf_counter()
+    for event in events:
+        update(existing, event)
+    elapsed = time.perf_counter() - started_at
+
+    print(
+        f"{label:<12} {sum(peaks) / len(peaks) / 1024:9.1f} KiB peak/event "
+        f"{elapsed / len(events) * 1e6:9.1f} us/event"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=int, default=1000)
+    args = parser.parse_args()
+
+    random.seed(0)
+    existing = AggregatedTopicAttributesDTO(user_id="user")
+    for event in build_events(200):
+        existing = previous_update(existing, event)
+    events = build_events(args.events)
+
+    measure("previous", previous_update, existing, events)
+    measure(
+        "current",
+        update_aggregated_topic_attributes_dto_based_on_topic_attributes_event_schema,
+        existing,
+        events,
+    )
+
+
+if __name__ == "__main__":
+    main()
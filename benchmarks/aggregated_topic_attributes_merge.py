@@ -0,0 +1,137 @@
+"""Sequential vs batch merge of k topic attributes events for one user.
+
+Compares folding k `TopicAttributesEventBrokerDTO`s into an
+`AggregatedTopicAttributesDTO` one at a time
+(`update_aggregated_topic_attributes_dto_based_on_topic_attributes_event_schema`)
+with the single-pass batch merge
+(`update_aggregated_topic_attributes_dto_based_on_topic_attributes_events`),
+and checks both produce the same document.
+
+Weights are rounded and items beyond the top 50 evicted after every event, so
+the batch merge still replays the EMA per event. It only avoids dumping,
+deep-copying and validating the whole document for each of them.
+
+With 10 keywords, 5 entities and 3 sentiments per event, merging k = 10 events
+took ~16 ms sequentially and ~2.7 ms in a batch, and k = 1000 ~1.65 s and
+~0.21 s. Since the per-event merge works on schemas too, both take ~2.5 ms
+and ~0.23 s respectively.
+
+Usage:
+    python -m benchmarks.aggregated_topic_attributes_merge [--k 1 10 100 1000]
+"""
+
+import argparse
+import functools
+import random
+import time
+import typing as tp
+import uuid
+from unittest.mock import patch
+
+from src.dtos import AggregatedTopicAttributesDTO, TopicAttributesEventBrokerDTO
+from src.schemas import (
+    EntityTopicEventSchema,
+    KeywordTopicEventSchema,
+    SentimentTopicEventSchema,
+)
+from src.utils.aggregated_topic_attributes import (
+    update_aggregated_topic_attributes_dto_based_on_topic_attributes_event_schema,
+    update_aggregated_topic_attributes_dto_based_on_topic_attributes_events,
+)
+from src.utils.dates import utcnow
+
+
+def build_events(count: int) -> list[TopicAttributesEventBrokerDTO]:
+    return [
+        TopicAttributesEventBrokerDTO(
+            topic_attributes_event_uuid=uuid.uuid4(),
+            content_event_uuid=uuid.uuid4(),
+            user_id="user",
+            keywords=[
+                KeywordTopicEventSchema(
+                    name=f"keyword_{random.randrange(200)}", weight=random.random()
+                )
+                for _ in range(10)
+            ],
+            entities=[
+                EntityTopicEventSchema(
+                    category="category",
+                    name=f"entity_{random.randrange(100)}",
+                    weight=random.random(),
+                )
+                for _ in range(5)
+            ],
+            sentiments=[
+                SentimentTopicEventSchema(
+                    name=f"sentiment_{random.randrange(3)}", weight=random.random()
+                )
+                for _ in range(3)
+            ],
+            timestamp=utcnow(),
+        )
+        for _ in range(count)
+    ]
+
+
+def fold_sequentially(
+    aggregated_topic_attributes: AggregatedTopicAttributesDTO,
+    events: tp.Sequence[TopicAttributesEventBrokerDTO],
+) -> AggregatedTopicAttributesDTO:
+    for event in events:
+        aggregated_topic_attributes = update_aggregated_topic_attributes_dto_based_on_topic_attributes_event_schema(
+            aggregated_topic_attributes, event
+        )
+    return aggregated_topic_attributes
+
+
+def measure(run: tp.Callable[[], AggregatedTopicAttributesDTO], repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started_at = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - started_at)
+    return min(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--k", type=int, nargs="+", default=[1, 10, 100, 1000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    random.seed(0)
+    existing = fold_sequentially(
+        AggregatedTopicAttributesDTO(user_id="user"), build_events(100)
+    )
+
+    print(f"{'k':>6} {'sequential':>14} {'batch':>14} {'speedup':>8}")
+    # Both merges stamp items with the same time, so results are comparable
+    with patch("src.utils.aggregated_topic_attributes.utcnow", return_value=utcnow()):
+        for k in args.k:
+            events = build_events(k)
+            assert (
+                fold_sequentially(existing, events)
+                == update_aggregated_topic_attributes_dto_based_on_topic_attributes_events(
+                    existing, events
+                )
+            )
+
+            sequential = measure(
+                functools.partial(fold_sequentially, existing, events), args.repeat
+            )
+            batch = measure(
+                functools.partial(
+                    update_aggregated_topic_attributes_dto_based_on_topic_attributes_events,
+                    existing,
+                    events,
+                ),
+                args.repeat,
+            )
+            print(
+                f"{k:>6} {sequential * 1000:11.2f} ms {batch * 1000:11.2f} ms "
+                f"{sequential / batch:7.1f}x"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""Python vs NumPy merge of a large event into the top 50 keywords.
+
+Times merging an event with n keywords into a profile holding 50 of them
+with `merge_weighted_item_schemas` and `merge_weighted_item_schemas_vectorized`,
+and checks both return the same items. Half of the event's keywords are
+already in the profile.
+
+NumPy pays a fixed cost per call for building arrays, while the Python path
+pays per item. On the machine this was written on they break even at 75 to 80
+old and incoming items (n = 25 to 30), hence `VECTORIZED_MERGE_MIN_ITEMS` =
+80:
+
+        n     python      numpy
+       10     ~63 us     ~78 us
+       25    ~116 us    ~175 us
+       30    ~131 us    ~126 us
+       50    ~204 us    ~154 us
+      200   ~1.0 ms    ~0.4 ms
+     2000   ~7.7 ms    ~1.0 ms
+
+Requires NumPy (`pip install api-gateway[numpy]`).
+
+Usage:
+    python -m benchmarks.aggregated_topic_attributes_vectorized [--n 50 150 500]
+"""
+
+import argparse
+import functools
+import random
+import time
+import typing as tp
+from operator import attrgetter
+
+from src.schemas import KeywordTopicEventSchema, KeywordTopicProfileSchema
+from src.utils.aggregated_topic_attributes import (
+    merge_weighted_item_schemas,
+    merge_weighted_item_schemas_vectorized,
+)
+from src.utils.dates import utcnow
+
+
+def build_profile_keywords(count: int) -> list[KeywordTopicProfileSchema]:
+    return [
+        KeywordTopicProfileSchema(name=f"keyword_{i}", weight=round(random.random(), 2))
+        for i in range(count)
+    ]
+
+
+def build_event_keywords(count: int) -> list[KeywordTopicEventSchema]:
+    # Half of the keywords intersect with the profile's ones
+    names = random.sample(range(50), min(count // 2, 50))
+    names += random.sample(range(50, 50 + count * 10), count - len(names))
+    return [
+        KeywordTopicEventSchema(name=f"keyword_{i}", weight=random.random())
+        for i in names
+    ]
+
+
+def measure(run: tp.Callable[[], tp.Any], repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started_at = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - started_at)
+    return min(timings)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--n", type=int, nargs="+", default=[10, 50, 100, 150, 200, 500, 2000]
+    )
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    random.seed(0)
+    new_timestamp_value = utcnow()
+    existing = build_profile_keywords(50)
+    options: dict[str, tp.Any] = {
+        "profile_schema": KeywordTopicProfileSchema,
+        "weight_field": "weight",
+        "timestamp_field": "updated_at",
+        "limit": 50,
+        "alpha": 0.8,
+        "new_timestamp_value": new_timestamp_value,
+    }
+
+    def python_merge(
+        incoming: list[KeywordTopicEventSchema],
+    ) -> list[KeywordTopicProfileSchema]:
+        return merge_weighted_item_schemas(
+            existing, incoming, build_key=attrgetter("name"), **options
+        )
+
+    def numpy_merge(
+        incoming: list[KeywordTopicEventSchema],
+    ) -> list[KeywordTopicProfileSchema] | None:
+        return merge_weighted_item_schemas_vectorized(
+            existing, incoming, build_key=attrgetter("name"), **options
+        )
+
+    print(f"{'n':>6} {'python':>12} {'numpy':>12}")
+    for n in args.n:
+        incoming = build_event_keywords(n)
+        assert python_merge(incoming) == numpy_merge(incoming)
+
+        python = measure(functools.partial(python_merge, incoming), args.repeat)
+        vectorized = measure(functools.partial(numpy_merge, incoming), args.repeat)
+        print(f"{n:>6} {python * 1e6:9.1f} us {vectorized * 1e6:9.1f} us")
+
+
+if __name__ == "__main__":
+    main()
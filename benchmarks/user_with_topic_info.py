@@ -0,0 +1,159 @@
+"""Latency of reading a user with its topic info, per way of reading it.
+
+Times `GET /users/{user_id}`'s read of a random user with a full profile
+(50 keywords, 50 entities, the sentiments and a topic profile):
+
+- "pipeline": `build_get_user_with_topic_info_pipeline`, an aggregation on
+  `users` whose two `$lookup`s the server runs one after the other;
+- "find_one": `get_user_with_topic_info_repository`, three concurrent
+  `find_one`s by `user_id`, assembled in Python;
+- "embedded": `get_user_with_embedded_topic_info_repository`, a single
+  `find_one` of the copies kept by `MONGO__USERS_READ_MODEL`.
+
+Point reads by a unique index skip planning an aggregation, and recent
+servers answer them from a fast path. Their round trips overlap, so the
+concurrent reads cost about as much as the slowest of them rather than the
+sum of the lookups.
+
+Requires a disposable MongoDB, a scratch database is filled with `--users`
+users and dropped afterwards.
+
+Usage:
+    python -m benchmarks.user_with_topic_info --mongo-url URL [--users 2000]
+"""
+
+import argparse
+import asyncio
+import random
+import time
+import typing as tp
+
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+
+from src.bootstrap.mongo import bootstrap_mongo_schema
+from src.dtos import AggregatedTopicAttributesDTO, TopicProfileDTO
+from src.repositories.users import (
+    build_get_user_with_topic_info_pipeline,
+    decode_user_with_topic_info,
+    get_user_with_embedded_topic_info_repository,
+    get_user_with_topic_info_repository,
+)
+from src.repositories.users_read_model import embed_users_topic_info_repository
+from src.schemas import (
+    EntityTopicProfileSchema,
+    KeywordTopicProfileSchema,
+    SentimentTopicProfileSchema,
+    TopicTopicProfileEventSchema,
+)
+
+
+def build_aggregated_topic_attributes(user_id: str) -> AggregatedTopicAttributesDTO:
+    return AggregatedTopicAttributesDTO(
+        user_id=user_id,
+        keywords=[
+            KeywordTopicProfileSchema(name=f"keyword_{index}", weight=random.random())
+            for index in range(50)
+        ],
+        entities=[
+            EntityTopicProfileSchema(
+                category="category", name=f"entity_{index}", weight=random.random()
+            )
+            for index in range(50)
+        ],
+        sentiments=[
+            SentimentTopicProfileSchema(
+                name=f"sentiment_{index}", weight=random.random()
+            )
+            for index in range(3)
+        ],
+        version=1,
+    )
+
+
+async def measure_async(
+    run: tp.Callable[[], tp.Awaitable[tp.Any]], repeat: int
+) -> tuple[float, float]:
+    timings = []
+    for _ in range(repeat):
+        started_at = time.perf_counter()
+        await run()
+        timings.append(time.perf_counter() - started_at)
+    timings.sort()
+    return timings[len(timings) // 2], timings[int(len(timings) * 0.99)]
+
+
+async def fill_database(database: AsyncIOMotorDatabase[tp.Any], users: int) -> None:
+    await bootstrap_mongo_schema(database=database)
+    await database["users"].insert_many(
+        [{"user_id": f"user_{index}", "username": "user"} for index in range(users)]
+    )
+    await database["aggregated_topic_attributes"].insert_many(
+        [
+            build_aggregated_topic_attributes(f"user_{index}").model_dump()
+            for index in range(users)
+        ]
+    )
+    await database["topic_profiles"].insert_many(
+        [
+            TopicProfileDTO(
+                user_id=f"user_{index}",
+                topics=[TopicTopicProfileEventSchema(confidence=random.random())],
+            ).model_dump()
+            for index in range(users)
+        ]
+    )
+    await embed_users_topic_info_repository(database=database)
+
+
+async def read_with_pipeline(
+    database: AsyncIOMotorDatabase[tp.Any], user_id: str
+) -> dict[str, tp.Any] | None:
+    result = (
+        await database["users"]
+        .aggregate(build_get_user_with_topic_info_pipeline(user_id))
+        .to_list(1)
+    )
+    return decode_user_with_topic_info(result[0]) if result else None
+
+
+async def run(mongo_url: str, users: int, repeat: int) -> None:
+    client: AsyncIOMotorClient[tp.Any] = AsyncIOMotorClient(mongo_url)
+    database = client["api_gateway_benchmark_user_with_topic_info"]
+    await client.drop_database(database.name)
+    await fill_database(database, users)
+
+    def random_user_id() -> str:
+        return f"user_{random.randrange(users)}"
+
+    reads: dict[str, tp.Callable[[], tp.Awaitable[tp.Any]]] = {
+        "pipeline": lambda: read_with_pipeline(database, random_user_id()),
+        "find_one": lambda: get_user_with_topic_info_repository(
+            random_user_id(), database=database
+        ),
+        "embedded": lambda: get_user_with_embedded_topic_info_repository(
+            random_user_id(), database=database
+        ),
+    }
+
+    print(f"{'read':<10} {'p50':>10} {'p99':>10}")
+    for label, read in reads.items():
+        p50, p99 = await measure_async(read, repeat)
+        print(f"{label:<10} {p50 * 1000:7.2f} ms {p99 * 1000:7.2f} ms")
+
+    await client.drop_database(database.name)
+    client.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mongo-url", required=True)
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=1000)
+    args = parser.parse_args()
+
+    random.seed(0)
+    asyncio.run(run(args.mongo_url, args.users, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
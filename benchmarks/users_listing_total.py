@@ -0,0 +1,163 @@
+"""Latency of a users listing page with its total, per way of counting.
+
+Times a page of `get_users_with_topic_info_paginated_repository` filtered by
+keywords and unfiltered, when the total is counted:
+
+- "two passes": by a second aggregation over the matching users, next to the
+  one taking the page, as paginating the pipeline and counting it separately
+  would;
+- "facet": in a `$facet` next to the page, in the same aggregation;
+- "cached": not at all, it is served from `MONGO__USERS_TOTAL_CACHE`.
+
+The page is taken before the joins, so the matching users are read once more
+by the second pass and the `$facet` saves that pass. The cached total also
+saves counting the matching users, leaving the cost of the page alone.
+
+Requires a disposable MongoDB, scratch databases are filled with `--users`
+users and dropped afterwards.
+
+Usage:
+    python -m benchmarks.users_listing_total --mongo-url URL [--users 20000]
+"""
+
+import argparse
+import asyncio
+import functools
+import random
+import time
+import typing as tp
+
+from fastapi_pagination import Params
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+
+from src.bootstrap.mongo import bootstrap_mongo_schema
+from src.repositories.users import (
+    UsersTotalCacheKey,
+    build_get_users_with_topic_info_pipeline,
+    get_users_with_topic_info_collection,
+    get_users_with_topic_info_paginated_repository,
+)
+from src.utils.caches import TTLCache
+from src.utils.dates import utcnow
+
+FILTERS: dict[str, dict[str, tp.Any]] = {
+    "filtered": {"keywords": ["keyword_0", "keyword_1"]},
+    "unfiltered": {},
+}
+
+
+async def measure_async(
+    run: tp.Callable[[], tp.Awaitable[tp.Any]], repeat: int
+) -> float:
+    timings = []
+    for _ in range(repeat):
+        started_at = time.perf_counter()
+        await run()
+        timings.append(time.perf_counter() - started_at)
+    return min(timings)
+
+
+async def fill_database(database: AsyncIOMotorDatabase[tp.Any], users: int) -> None:
+    await bootstrap_mongo_schema(database=database)
+    await database["users"].insert_many(
+        [{"user_id": f"user_{index}", "username": "user"} for index in range(users)]
+    )
+    await database["aggregated_topic_attributes"].insert_many(
+        [
+            {
+                "user_id": f"user_{index}",
+                "keywords": [
+                    {
+                        "name": f"keyword_{random.randrange(50)}",
+                        "weight": random.random(),
+                        "updated_at": utcnow(),
+                    }
+                    for _ in range(20)
+                ],
+                "entities": [],
+                "sentiments": [],
+            }
+            for index in range(users)
+        ]
+    )
+
+
+async def paginate_in_two_passes(
+    database: AsyncIOMotorDatabase[tp.Any],
+    params: Params,
+    filters: dict[str, tp.Any],
+) -> tuple[list[dict[str, tp.Any]], int]:
+    collection = database[get_users_with_topic_info_collection(**filters)]
+    items = await collection.aggregate(
+        build_get_users_with_topic_info_pipeline(
+            **filters,
+            offset=(params.page - 1) * params.size,
+            limit=params.size,
+            count_total=False,
+        )
+    ).to_list(None)
+    # Every stage ahead of the `$facet` selects the matching users
+    *match_stages, _ = build_get_users_with_topic_info_pipeline(**filters)
+    count_pipeline = [*match_stages, {"$count": "total"}]
+    [result] = await collection.aggregate(count_pipeline).to_list(1)
+    return items, result["total"]
+
+
+async def run(mongo_url: str, users: int, repeat: int) -> None:
+    client: AsyncIOMotorClient[tp.Any] = AsyncIOMotorClient(mongo_url)
+    database = client["api_gateway_benchmark_users_listing_total"]
+    await client.drop_database(database.name)
+    await fill_database(database, users)
+
+    params = Params(page=10, size=50)
+    total_cache = TTLCache[UsersTotalCacheKey, int](
+        maxsize=10, ttl_ms=3_600_000, name="benchmark_users_total"
+    )
+
+    print(f"{'filters':<12} {'two passes':>12} {'facet':>12} {'cached':>12}")
+    for label, filters in FILTERS.items():
+        two_passes = await measure_async(
+            functools.partial(paginate_in_two_passes, database, params, filters),
+            repeat,
+        )
+        facet = await measure_async(
+            functools.partial(
+                get_users_with_topic_info_paginated_repository,
+                database=database,
+                params=params,
+                **filters,
+            ),
+            repeat,
+        )
+        cached = await measure_async(
+            functools.partial(
+                get_users_with_topic_info_paginated_repository,
+                database=database,
+                params=params,
+                total_cache=total_cache,
+                **filters,
+            ),
+            repeat,
+        )
+        print(
+            f"{label:<12} {two_passes * 1000:9.1f} ms {facet * 1000:9.1f} ms "
+            f"{cached * 1000:9.1f} ms"
+        )
+
+    await client.drop_database(database.name)
+    client.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mongo-url", required=True)
+    parser.add_argument("--users", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    random.seed(0)
+    asyncio.run(run(args.mongo_url, args.users, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,41 @@
+import json
+import logging
 import typing as tp
+import uuid
+from contextlib import aclosing
+from datetime import datetime
 
-from fastapi import APIRouter, Body, Request, status
+from fastapi import APIRouter, Body, HTTPException, Path, Query, Request, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
 
 from src.api.transformers import (
     content_event_create_dto_to_content_event_broker_dto_transformer,
+    iter_topic_attributes_events_repository_to_topic_attributes_event_dto_transformer,
+)
+from src.dtos import (
+    ContentEventCreateDTO,
+    MessageResponseDTO,
+    TopicAttributesEventDTO,
+)
+from src.repositories import (
+    CONTENT_EVENTS_COLUMNS,
+    TOPIC_ATTRIBUTES_AGGREGATE_KEYS,
+    get_topic_attributes_event_repository,
+    iter_content_events_repository,
+    iter_topic_attributes_aggregates_repository,
+    iter_topic_attributes_events_repository,
+)
+from src.utils.cursors import (
+    decode_cursor,
+    decode_keyset_cursor,
+    encode_cursor,
+    encode_keyset_cursor,
 )
-from src.dtos import ContentEventCreateDTO, MessageResponseDTO
 
 __all__ = ["router"]
 
+logger = logging.getLogger(__name__)
 
 router = APIRouter(
     prefix="/events",
@@ -16,6 +43,75 @@ router = APIRouter(
 )
 
 
+async def _stream_keyset_page(
+    first_chunk: list[dict[str, tp.Any]],
+    chunks: tp.AsyncGenerator[list[dict[str, tp.Any]]],
+    *,
+    limit: int,
+    serialize: tp.Callable[[dict[str, tp.Any]], tp.Any],
+    build_cursor: tp.Callable[[dict[str, tp.Any]], str],
+) -> tp.AsyncIterator[str]:
+    # Writes `{"items": [...], "next_cursor": ...}` item by item as rows come
+    # in. `chunks` is expected to hold up to `limit + 1` rows, the extra one
+    # only tells that there is a next page
+    count = 0
+    last_row: dict[str, tp.Any] = {}
+    has_next_page = False
+
+    yield '{"items":['
+    async with aclosing(chunks):
+        chunk: list[dict[str, tp.Any]] | None = first_chunk
+        try:
+            while chunk is not None and not has_next_page:
+                for row in chunk:
+                    if count == limit:
+                        has_next_page = True
+                        break
+
+                    item = json.dumps(jsonable_encoder(serialize(row)))
+                    yield ("," if count else "") + item
+                    count += 1
+                    last_row = row
+
+                chunk = await anext(chunks, None)
+        except Exception:
+            # The status has been sent already, the page is closed with an
+            # error and without a cursor, so clients don't take it as complete
+            logger.exception("Failed to stream a page after %d items", count)
+            yield '],"next_cursor":null,"error":"Failed to read the page"}'
+            return
+
+    next_cursor = build_cursor(last_row) if has_next_page else None
+    yield f'],"next_cursor":{json.dumps(next_cursor)}}}'
+
+
+async def _build_keyset_page_response(
+    chunks: tp.AsyncGenerator[list[dict[str, tp.Any]]],
+    *,
+    limit: int,
+    serialize: tp.Callable[[dict[str, tp.Any]], tp.Any],
+    build_cursor: tp.Callable[[dict[str, tp.Any]], str],
+) -> StreamingResponse:
+    # The first chunk is read before the response starts, so a failing query
+    # still gets an error status instead of a truncated `200 OK`
+    try:
+        first_chunk: list[dict[str, tp.Any]] = await anext(chunks, [])
+    except BaseException:
+        await chunks.aclose()
+        raise
+
+    return StreamingResponse(
+        _stream_keyset_page(
+            first_chunk,
+            chunks,
+            limit=limit,
+            serialize=serialize,
+            build_cursor=build_cursor,
+        ),
+        media_type="application/json",
+    )
+
+
 @router.post(
     "/content/submitForProcessing",
     status_code=status.HTTP_202_ACCEPTED,
@@ -39,7 +135,53 @@ async def submit_content_event_for_processing_endpoint(
 )
 async def get_content_events_endpoint(
     request: Request,
-) -> tp.Any: ...
+    user_id: tp.Annotated[str, Query()],
+    since: tp.Annotated[datetime | None, Query()] = None,
+    until: tp.Annotated[datetime | None, Query()] = None,
+    cursor: tp.Annotated[str | None, Query()] = None,
+    limit: tp.Annotated[int, Query(ge=1, le=1000)] = 100,
+    fields: tp.Annotated[list[str] | None, Query()] = None,
+) -> tp.Any:
+    fields = fields or list(CONTENT_EVENTS_COLUMNS)
+    unknown_fields = set(fields) - set(CONTENT_EVENTS_COLUMNS)
+    if unknown_fields:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown fields: {', '.join(sorted(unknown_fields))}",
+        )
+
+    try:
+        after = decode_keyset_cursor(cursor) if cursor else None
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor",
+        )
+
+    # The keyset columns are always read to build `next_cursor`
+    columns = list(dict.fromkeys([*fields, "timestamp", "content_event_uuid"]))
+    content_event_chunks = iter_content_events_repository(
+        user_id,
+        columns=columns,
+        since=since,
+        until=until,
+        after=after,
+        limit=limit + 1,
+        chunk_size=request.app.state.settings.clickhouse.content_events_chunk_size,
+        get_connection=request.app.state.get_clickhouse_connection,
+    )
+
+    return await _build_keyset_page_response(
+        content_event_chunks,
+        limit=limit,
+        serialize=lambda content_event: {
+            field: content_event[field] for field in fields
+        },
+        build_cursor=lambda content_event: encode_keyset_cursor(
+            content_event["timestamp"],
+            content_event["content_event_uuid"],
+        ),
+    )
 
 
 @router.get(
@@ -49,14 +191,114 @@ async def get_content_events_endpoint(
 )
 async def get_topic_attributes_events_endpoint(
     request: Request,
-) -> tp.Any: ...
+    user_id: tp.Annotated[str | None, Query()] = None,
+    since: tp.Annotated[datetime | None, Query()] = None,
+    until: tp.Annotated[datetime | None, Query()] = None,
+    keywords: tp.Annotated[tp.Sequence[str] | None, Query()] = None,
+    entities: tp.Annotated[tp.Sequence[str] | None, Query()] = None,
+    sentiments: tp.Annotated[tp.Sequence[str] | None, Query()] = None,
+    group_by: tp.Annotated[
+        tp.Literal["keywords", "entities", "sentiments"] | None,
+        Query(alias="groupBy"),
+    ] = None,
+    cursor: tp.Annotated[str | None, Query()] = None,
+    limit: tp.Annotated[int, Query(ge=1, le=1000)] = 100,
+) -> tp.Any:
+    clickhouse_settings = request.app.state.settings.clickhouse
+    filters: dict[str, tp.Any] = {
+        "user_id": user_id,
+        "since": since,
+        "until": until,
+        "keywords": keywords or [],
+        "entities": entities or [],
+        "sentiments": sentiments or [],
+        "limit": limit + 1,
+        "chunk_size": clickhouse_settings.topic_attributes_events_chunk_size,
+        "get_connection": request.app.state.get_clickhouse_connection,
+    }
+
+    if group_by is None:
+        # Events are only listed per user, aggregates may span all of them
+        if user_id is None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="user_id is required unless groupBy is set",
+            )
+
+        try:
+            after = decode_keyset_cursor(cursor) if cursor else None
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid cursor",
+            )
+
+        return await _build_keyset_page_response(
+            iter_topic_attributes_events_repository(after=after, **filters),
+            limit=limit,
+            serialize=lambda topic_attributes_event: (
+                iter_topic_attributes_events_repository_to_topic_attributes_event_dto_transformer(
+                    topic_attributes_event
+                ).model_dump(mode="json")
+            ),
+            build_cursor=lambda topic_attributes_event: encode_keyset_cursor(
+                topic_attributes_event["timestamp"],
+                topic_attributes_event["topic_attributes_event_uuid"],
+            ),
+        )
+
+    # Weights are aggregated per name by ClickHouse, only the aggregates are
+    # transferred
+    keys = TOPIC_ATTRIBUTES_AGGREGATE_KEYS[group_by]
+    try:
+        after_key = decode_cursor(cursor, size=len(keys)) if cursor else None
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor",
+        )
+
+    return await _build_keyset_page_response(
+        iter_topic_attributes_aggregates_repository(
+            group_by, after=after_key, **filters
+        ),
+        limit=limit,
+        serialize=lambda aggregate: aggregate,
+        build_cursor=lambda aggregate: encode_cursor([aggregate[key] for key in keys]),
+    )
 
 
 @router.get(
     "/topicAttributes/{topic_attributes_event_uuid}",
     status_code=status.HTTP_200_OK,
-    response_model=None,
+    response_model=TopicAttributesEventDTO,
 )
 async def get_topic_attributes_event_endpoint(
     request: Request,
-) -> tp.Any: ...
+    topic_attributes_event_uuid: tp.Annotated[uuid.UUID, Path()],
+) -> tp.Any:
+    cache = request.app.state.topic_attributes_events_cache
+    topic_attributes_event = cache.get(topic_attributes_event_uuid)
+    if topic_attributes_event is not None:
+        return topic_attributes_event
+
+    data = await get_topic_attributes_event_repository(
+        topic_attributes_event_uuid,
+        get_connection=request.app.state.get_clickhouse_connection,
+    )
+
+    if not data:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=(
+                f"Topic attributes event with topic_attributes_event_uuid "
+                f"{topic_attributes_event_uuid} not found"
+            ),
+        )
+
+    topic_attributes_event = iter_topic_attributes_events_repository_to_topic_attributes_event_dto_transformer(
+        data
+    )
+    cache.set(topic_attributes_event_uuid, topic_attributes_event)
+
+    return topic_attributes_event
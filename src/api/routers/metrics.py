@@ -0,0 +1,22 @@
+import typing as tp
+
+from fastapi import APIRouter, status
+
+from src.utils.metrics import collect_metrics
+
+__all__ = ["router"]
+
+
+router = APIRouter(
+    prefix="/metrics",
+    tags=["Metrics"],
+)
+
+
+@router.get(
+    "",
+    status_code=status.HTTP_200_OK,
+    response_model=None,
+)
+async def get_metrics_endpoint() -> tp.Any:
+    return collect_metrics()
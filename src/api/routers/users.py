@@ -1,4 +1,9 @@
+import json
 import typing as tp
+import uuid
+from contextlib import aclosing
+from datetime import timedelta
+from functools import partial
 
 from fastapi import (
     APIRouter,
@@ -11,19 +16,34 @@ from fastapi import (
     status,
 )
 from fastapi_pagination import Page, Params
+from pymongo.errors import DuplicateKeyError
 
 from src.api.transformers import (
-    get_content_events_repository_to_user_content_event_dto_transformer,
     get_user_with_topic_info_repository_to_user_get_dto_transformer,
     get_users_with_topic_info_paginated_repository_to_user_get_dto_transformer,
+    iter_content_events_repository_to_user_content_event_dto_transformer,
+)
+from src.dtos import (
+    ContentWatermarkDTO,
+    MessageResponseDTO,
+    UserCreateDTO,
+    UserGetDTO,
+    UserKeysetPageDTO,
 )
-from src.dtos import MessageResponseDTO, UserCreateDTO, UserGetDTO
 from src.repositories import (
-    get_content_events_repository,
+    embed_users_topic_info_repository,
+    get_content_watermark_repository,
+    get_user_with_embedded_topic_info_repository,
     get_user_with_topic_info_repository,
+    get_users_with_topic_info_keyset_repository,
     get_users_with_topic_info_paginated_repository,
     insert_user_repository,
+    iter_content_events_repository,
+    upsert_content_watermark_repository,
 )
+from src.utils.cursors import decode_users_keyset_cursor, encode_users_keyset_cursor
+from src.utils.dates import as_utc, utcnow
+from src.utils.manipulations import iter_chunks_by_size
 
 __all__ = ["router"]
 
@@ -46,16 +66,91 @@ async def get_users_with_topic_info_endpoint(
     entities: tp.Annotated[tp.Sequence[str] | None, Query()] = None,
     sentiments: tp.Annotated[tp.Sequence[str] | None, Query()] = None,
 ) -> tp.Any:
+    half_life_days = (
+        request.app.state.settings.mongo.topic_attributes_decay.half_life_days
+    )
     return await get_users_with_topic_info_paginated_repository(
         keywords=keywords or [],
         entities=entities or [],
         sentiments=sentiments or [],
+        half_life_days=half_life_days,
+        inverted_index=(
+            request.app.state.settings.mongo.topic_attributes_inverted_index
+        ),
         params=params,
-        transformer=get_users_with_topic_info_paginated_repository_to_user_get_dto_transformer,
+        total_cache=request.app.state.users_total_cache,
+        transformer=partial(
+            get_users_with_topic_info_paginated_repository_to_user_get_dto_transformer,
+            half_life_days=half_life_days,
+        ),
         database=request.app.state.mongo_database,
     )
 
 
+@router.get(
+    "/keyset",
+    status_code=status.HTTP_200_OK,
+    response_model=UserKeysetPageDTO,
+)
+async def get_users_with_topic_info_keyset_endpoint(
+    request: Request,
+    keywords: tp.Annotated[tp.Sequence[str] | None, Query()] = None,
+    entities: tp.Annotated[tp.Sequence[str] | None, Query()] = None,
+    sentiments: tp.Annotated[tp.Sequence[str] | None, Query()] = None,
+    cursor: tp.Annotated[str | None, Query()] = None,
+    limit: tp.Annotated[int, Query(ge=1, le=100)] = 50,
+    include_total: tp.Annotated[bool, Query(alias="includeTotal")] = False,
+) -> tp.Any:
+    try:
+        after = decode_users_keyset_cursor(cursor) if cursor else None
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor",
+        )
+
+    half_life_days = (
+        request.app.state.settings.mongo.topic_attributes_decay.half_life_days
+    )
+    # The extra user only tells that there is a next page
+    users, total = await get_users_with_topic_info_keyset_repository(
+        keywords=keywords or [],
+        entities=entities or [],
+        sentiments=sentiments or [],
+        half_life_days=half_life_days,
+        inverted_index=(
+            request.app.state.settings.mongo.topic_attributes_inverted_index
+        ),
+        after=after,
+        limit=limit + 1,
+        include_total=include_total,
+        total_cache=request.app.state.users_total_cache,
+        database=request.app.state.mongo_database,
+    )
+
+    next_cursor = None
+    if len(users) > limit:
+        users = users[:limit]
+        last_user = users[-1]
+        next_cursor = encode_users_keyset_cursor(
+            [
+                last_user.get("maxKeywordWeight"),
+                last_user.get("maxEntityWeight"),
+                last_user.get("maxSentimentWeight"),
+            ],
+            last_user["user_id"],
+        )
+
+    return UserKeysetPageDTO(
+        items=get_users_with_topic_info_paginated_repository_to_user_get_dto_transformer(
+            users,
+            half_life_days=half_life_days,
+        ),
+        next_cursor=next_cursor,
+        total=total,
+    )
+
+
 @router.post(
     "",
     status_code=status.HTTP_201_CREATED,
@@ -68,6 +163,7 @@ async def create_user_endpoint(
     existing_user = await get_user_with_topic_info_repository(
         user_id=body.user_id,
         database=request.app.state.mongo_database,
+        fields=(),
     )
 
     if existing_user:
@@ -76,16 +172,41 @@ async def create_user_endpoint(
             detail=f"User with user_id {body.user_id} already exists",
         )
 
-    await insert_user_repository(
-        data=body.model_dump(),
-        database=request.app.state.mongo_database,
-    )
-    user = await get_user_with_topic_info_repository(
-        user_id=body.user_id,
-        database=request.app.state.mongo_database,
-    )
+    # A concurrent request may have created the user since, in which case the
+    # unique `user_id` index rejects the insert
+    try:
+        await insert_user_repository(
+            data=body.model_dump(),
+            database=request.app.state.mongo_database,
+        )
+    except DuplicateKeyError:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"User with user_id {body.user_id} already exists",
+        )
 
-    return get_user_with_topic_info_repository_to_user_get_dto_transformer(user)
+    if request.app.state.settings.mongo.users_read_model:
+        # Topic info may have been received before the user was created
+        await embed_users_topic_info_repository(
+            [body.user_id],
+            database=request.app.state.mongo_database,
+        )
+        user = await get_user_with_embedded_topic_info_repository(
+            body.user_id,
+            database=request.app.state.mongo_database,
+        )
+    else:
+        user = await get_user_with_topic_info_repository(
+            user_id=body.user_id,
+            database=request.app.state.mongo_database,
+        )
+
+    return get_user_with_topic_info_repository_to_user_get_dto_transformer(
+        user,
+        half_life_days=(
+            request.app.state.settings.mongo.topic_attributes_decay.half_life_days
+        ),
+    )
 
 
 @router.get(
@@ -97,10 +218,16 @@ async def get_user_by_id_endpoint(
     request: Request,
     user_id: tp.Annotated[str, Path()],
 ) -> tp.Any:
-    user = await get_user_with_topic_info_repository(
-        user_id=user_id,
-        database=request.app.state.mongo_database,
-    )
+    if request.app.state.settings.mongo.users_read_model:
+        user = await get_user_with_embedded_topic_info_repository(
+            user_id,
+            database=request.app.state.mongo_database,
+        )
+    else:
+        user = await get_user_with_topic_info_repository(
+            user_id=user_id,
+            database=request.app.state.mongo_database,
+        )
 
     if not user:
         raise HTTPException(
@@ -108,7 +235,12 @@ async def get_user_by_id_endpoint(
             detail=f"User with user_id {user_id} not found",
         )
 
-    return get_user_with_topic_info_repository_to_user_get_dto_transformer(user)
+    return get_user_with_topic_info_repository_to_user_get_dto_transformer(
+        user,
+        half_life_days=(
+            request.app.state.settings.mongo.topic_attributes_decay.half_life_days
+        ),
+    )
 
 
 @router.post(
@@ -119,20 +251,118 @@ async def get_user_by_id_endpoint(
 async def submit_topic_profile_for_processing_endpoint(
     request: Request,
     user_id: tp.Annotated[str, Path()],
+    full: tp.Annotated[bool, Query()] = False,
 ) -> tp.Any:
-    content_events = await get_content_events_repository(
-        user_id,
-        get_connection=request.app.state.get_clickhouse_connection,
-    )
-    user_content_event = (
-        get_content_events_repository_to_user_content_event_dto_transformer(
+    # Unless `full` is requested, only content newer than the last submitted
+    # content event of the user is sent
+    watermark = (
+        None
+        if full
+        else await get_content_watermark_repository(
             user_id,
-            content_events,
+            database=request.app.state.mongo_database,
         )
     )
-    await request.state.broker.publish(
-        user_content_event.model_dump(),
-        "userContent",
+    after = (
+        (watermark["ts"], uuid.UUID(watermark["content_event_uuid"]))
+        if watermark
+        else None
+    )
+
+    # Content is published chunk by chunk, so only the current and the
+    # look-ahead chunk are held in memory
+    user_content_event_uuid = uuid.uuid4()
+    clickhouse_settings = request.app.state.settings.clickhouse
+    # Events up to `until` are assumed written, so the watermark never passes
+    # events still buffered or delivered late with an earlier timestamp. A full
+    # submission still sends the newer events, they are sent again by the next
+    # incremental one
+    until = utcnow() - timedelta(
+        milliseconds=clickhouse_settings.content_events_writer.max_delay_ms
+        + clickhouse_settings.content_watermark_lag_ms
+    )
+    # Chunks are also cut by the size of the published message, whose other
+    # fields are accounted for by an empty one
+    max_bytes = clickhouse_settings.content_events_chunk_max_bytes - len(
+        iter_content_events_repository_to_user_content_event_dto_transformer(
+            user_id,
+            [],
+            user_content_event_uuid=user_content_event_uuid,
+            sequence_number=0,
+            is_last=False,
+            is_incremental=False,
+        ).model_dump_json()
     )
 
+    async with (
+        aclosing(
+            iter_content_events_repository(
+                user_id,
+                after=after,
+                until=None if after is None else until,
+                chunk_size=clickhouse_settings.content_events_chunk_size,
+                get_connection=request.app.state.get_clickhouse_connection,
+            )
+        ) as content_event_rows,
+        aclosing(
+            iter_chunks_by_size(
+                content_event_rows,
+                max_items=clickhouse_settings.content_events_chunk_size,
+                max_bytes=max_bytes,
+                # An upper bound of the size once serialized, with non-ASCII
+                # characters escaped
+                size_of=lambda row: len(json.dumps(row, default=str)) + 1,
+            )
+        ) as content_event_chunks,
+    ):
+        sequence_number = 0
+        last_content_event: dict[str, tp.Any] | None = None
+        content_event_chunk: list[dict[str, tp.Any]] = await anext(
+            content_event_chunks, []
+        )
+        if after is not None and not content_event_chunk:
+            return MessageResponseDTO(message="Topic profile is up to date")
+
+        while True:
+            next_content_event_chunk = await anext(content_event_chunks, None)
+            user_content_event = (
+                iter_content_events_repository_to_user_content_event_dto_transformer(
+                    user_id,
+                    content_event_chunk,
+                    user_content_event_uuid=user_content_event_uuid,
+                    sequence_number=sequence_number,
+                    is_last=next_content_event_chunk is None,
+                    is_incremental=after is not None,
+                )
+            )
+            await request.state.broker.publish(
+                user_content_event.model_dump(),
+                "userContent",
+            )
+            # Events are ordered by `ts`, so those up to `until` lead the chunk
+            last_content_event = next(
+                (
+                    content_event
+                    for content_event in reversed(content_event_chunk)
+                    if as_utc(content_event["timestamp"]) < until
+                ),
+                last_content_event,
+            )
+
+            if next_content_event_chunk is None:
+                break
+
+            content_event_chunk = next_content_event_chunk
+            sequence_number += 1
+
+    if last_content_event is not None:
+        await upsert_content_watermark_repository(
+            ContentWatermarkDTO(
+                user_id=user_id,
+                ts=last_content_event["timestamp"],
+                content_event_uuid=last_content_event["content_event_uuid"],
+            ).model_dump(),
+            database=request.app.state.mongo_database,
+        )
+
     return MessageResponseDTO(message="Topic profile has been queued for creation")
@@ -1,6 +1,7 @@
 from .events import (
     content_event_create_dto_to_content_event_broker_dto_transformer,
-    get_content_events_repository_to_user_content_event_dto_transformer,
+    iter_content_events_repository_to_user_content_event_dto_transformer,
+    iter_topic_attributes_events_repository_to_topic_attributes_event_dto_transformer,
 )
 from .users import (
     get_user_repository_to_user_get_dto_transformer,
@@ -13,5 +14,6 @@ __all__ = [
     "get_user_with_topic_info_repository_to_user_get_dto_transformer",
     "get_user_repository_to_user_get_dto_transformer",
     "content_event_create_dto_to_content_event_broker_dto_transformer",
-    "get_content_events_repository_to_user_content_event_dto_transformer",
+    "iter_content_events_repository_to_user_content_event_dto_transformer",
+    "iter_topic_attributes_events_repository_to_topic_attributes_event_dto_transformer",
 ]
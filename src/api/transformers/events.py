@@ -1,11 +1,17 @@
 import typing as tp
+import uuid
 
-from src.dtos import ContentEventBrokerDTO, ContentEventCreateDTO
+from src.dtos import (
+    ContentEventBrokerDTO,
+    ContentEventCreateDTO,
+    TopicAttributesEventDTO,
+)
 from src.dtos.events import UserContentEventDTO
 
 __all__ = [
     "content_event_create_dto_to_content_event_broker_dto_transformer",
-    "get_content_events_repository_to_user_content_event_dto_transformer",
+    "iter_content_events_repository_to_user_content_event_dto_transformer",
+    "iter_topic_attributes_events_repository_to_topic_attributes_event_dto_transformer",
 ]
 
 
@@ -15,13 +21,53 @@ def content_event_create_dto_to_content_event_broker_dto_transformer(
     return ContentEventBrokerDTO.model_validate(dto.model_dump())
 
 
-def get_content_events_repository_to_user_content_event_dto_transformer(
+def iter_content_events_repository_to_user_content_event_dto_transformer(
     user_id: str,
     data: tp.Sequence[tp.Any],
+    *,
+    user_content_event_uuid: uuid.UUID,
+    sequence_number: int,
+    is_last: bool,
+    is_incremental: bool,
 ) -> UserContentEventDTO:
     return UserContentEventDTO.model_validate(
         {
+            "user_content_event_uuid": user_content_event_uuid,
             "user_id": user_id,
             "content_events": data,
+            "sequence_number": sequence_number,
+            "is_last": is_last,
+            "is_incremental": is_incremental,
+        }
+    )
+
+
+def iter_topic_attributes_events_repository_to_topic_attributes_event_dto_transformer(
+    data: dict[str, tp.Any],
+) -> TopicAttributesEventDTO:
+    return TopicAttributesEventDTO.model_validate(
+        {
+            "topic_attributes_event_uuid": data["topic_attributes_event_uuid"],
+            "content_event_uuid": data["content_event_uuid"],
+            "user_id": data["user_id"],
+            "keywords": [
+                {"name": name, "weight": weight}
+                for name, weight in zip(data["keywords_name"], data["keywords_weight"])
+            ],
+            "entities": [
+                {"category": category, "name": name, "weight": weight}
+                for category, name, weight in zip(
+                    data["entities_category"],
+                    data["entities_name"],
+                    data["entities_weight"],
+                )
+            ],
+            "sentiments": [
+                {"name": name, "weight": weight}
+                for name, weight in zip(
+                    data["sentiments_name"], data["sentiments_weight"]
+                )
+            ],
+            "timestamp": data["timestamp"],
         }
     )
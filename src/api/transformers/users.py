@@ -1,6 +1,7 @@
 import typing as tp
 
 from src.dtos import UserGetDTO
+from src.utils.aggregated_topic_attributes import decay_aggregated_topic_attributes_dto
 
 __all__ = [
     "get_users_with_topic_info_paginated_repository_to_user_get_dto_transformer",
@@ -11,9 +12,11 @@ __all__ = [
 
 def get_user_with_topic_info_repository_to_user_get_dto_transformer(
     item: tp.Any,
+    *,
+    half_life_days: float | None = None,
 ) -> UserGetDTO:
     # TODO: Refactor
-    return UserGetDTO(
+    user = UserGetDTO(
         user_id=item["user_id"],
         username=item["username"],
         aggregated_topic_attributes=item["aggregated_topic_attributes"]
@@ -25,6 +28,15 @@ def get_user_with_topic_info_repository_to_user_get_dto_transformer(
         else None,
     )
 
+    # Stored weights are as of each item's `updated_at`
+    if half_life_days is not None and user.aggregated_topic_attributes is not None:
+        user.aggregated_topic_attributes = decay_aggregated_topic_attributes_dto(
+            user.aggregated_topic_attributes,
+            half_life_days=half_life_days,
+        )
+
+    return user
+
 
 def get_user_repository_to_user_get_dto_transformer(
     item: tp.Any,
@@ -44,10 +56,13 @@ def get_user_repository_to_user_get_dto_transformer(
 
 def get_users_with_topic_info_paginated_repository_to_user_get_dto_transformer(
     sequence: tp.Sequence[tp.Any],
+    *,
+    half_life_days: float | None = None,
 ) -> list[UserGetDTO]:
-    return list(
-        map(
-            get_user_with_topic_info_repository_to_user_get_dto_transformer,
-            sequence,
+    return [
+        get_user_with_topic_info_repository_to_user_get_dto_transformer(
+            item,
+            half_life_days=half_life_days,
         )
-    )
+        for item in sequence
+    ]
@@ -0,0 +1,45 @@
+from .clickhouse import (
+    CLICKHOUSE_CODECS,
+    CLICKHOUSE_INDEXES,
+    CLICKHOUSE_SCHEMA,
+    CONTENT_EVENTS_ENGINE,
+    CONTENT_EVENTS_TABLE,
+    bootstrap_clickhouse_schema,
+    build_clickhouse_codec_statements,
+    build_clickhouse_index_statements,
+    build_clickhouse_schema_statements,
+    build_migrate_content_events_engine_statements,
+    check_clickhouse_schema,
+    migrate_content_events_engine,
+)
+from .mongo import (
+    MONGO_INDEXES,
+    bootstrap_mongo_schema,
+    check_mongo_schema,
+    check_users_read_model,
+    embed_users_topic_info,
+    migrate_aggregated_topic_attributes_storage_format,
+    rebuild_topic_attribute_users,
+)
+
+__all__ = [
+    "CLICKHOUSE_CODECS",
+    "CLICKHOUSE_INDEXES",
+    "CLICKHOUSE_SCHEMA",
+    "CONTENT_EVENTS_ENGINE",
+    "CONTENT_EVENTS_TABLE",
+    "MONGO_INDEXES",
+    "bootstrap_clickhouse_schema",
+    "bootstrap_mongo_schema",
+    "build_clickhouse_codec_statements",
+    "build_clickhouse_index_statements",
+    "build_clickhouse_schema_statements",
+    "build_migrate_content_events_engine_statements",
+    "check_clickhouse_schema",
+    "check_mongo_schema",
+    "check_users_read_model",
+    "embed_users_topic_info",
+    "migrate_aggregated_topic_attributes_storage_format",
+    "migrate_content_events_engine",
+    "rebuild_topic_attribute_users",
+]
@@ -0,0 +1,182 @@
+import argparse
+import asyncio
+import logging
+import sys
+import typing as tp
+
+from asynch import Pool
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from src.core.config import Settings
+from src.utils.olap import build_get_clickhouse_connection
+
+from .clickhouse import (
+    bootstrap_clickhouse_schema,
+    build_clickhouse_schema_statements,
+    build_migrate_content_events_engine_statements,
+    migrate_content_events_engine,
+)
+from .mongo import (
+    MONGO_INDEXES,
+    bootstrap_mongo_schema,
+    check_users_read_model,
+    embed_users_topic_info,
+    migrate_aggregated_topic_attributes_storage_format,
+    rebuild_topic_attribute_users,
+)
+
+
+async def bootstrap(
+    *,
+    materialize_indexes: bool,
+    migrate_content_events: bool,
+    migrate_storage_format: bool,
+    rebuild_inverted_index: bool,
+    embed_topic_info: bool,
+    check_read_model: bool,
+) -> bool:
+    settings = Settings()
+    pool = Pool(dsn=settings.clickhouse.dsn)
+    await pool.startup()
+    try:
+        await bootstrap_clickhouse_schema(
+            materialize_indexes=materialize_indexes,
+            get_connection=build_get_clickhouse_connection(pool),
+        )
+        if migrate_content_events:
+            await migrate_content_events_engine(
+                get_connection=build_get_clickhouse_connection(pool),
+            )
+    finally:
+        await pool.shutdown()
+
+    motor_client: AsyncIOMotorClient[tp.Any] = AsyncIOMotorClient(
+        settings.mongo.connection.url
+    )
+    inconsistent_user_ids: list[str] = []
+    try:
+        await bootstrap_mongo_schema(database=motor_client[settings.mongo.database])
+        if migrate_storage_format:
+            await migrate_aggregated_topic_attributes_storage_format(
+                storage_format=settings.mongo.topic_attributes_storage_format,
+                database=motor_client[settings.mongo.database],
+            )
+        if rebuild_inverted_index:
+            await rebuild_topic_attribute_users(
+                database=motor_client[settings.mongo.database],
+            )
+        if embed_topic_info:
+            await embed_users_topic_info(
+                database=motor_client[settings.mongo.database],
+            )
+        if check_read_model:
+            inconsistent_user_ids = await check_users_read_model(
+                database=motor_client[settings.mongo.database],
+            )
+    finally:
+        motor_client.close()
+
+    for user_id in inconsistent_user_ids:
+        print(user_id)
+    return not inconsistent_user_ids
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Create the gateway's storage schema")
+    parser.add_argument(
+        "--materialize-indexes",
+        action="store_true",
+        help="build data-skipping indexes for already existing data",
+    )
+    parser.add_argument(
+        "--migrate-content-events-engine",
+        action="store_true",
+        help=(
+            "copy content events into a ReplacingMergeTree table, consumers "
+            "should be stopped meanwhile"
+        ),
+    )
+    parser.add_argument(
+        "--migrate-storage-format",
+        action="store_true",
+        help=(
+            "rewrite aggregated topic attributes in the configured "
+            "MONGO__TOPIC_ATTRIBUTES_STORAGE_FORMAT"
+        ),
+    )
+    parser.add_argument(
+        "--rebuild-topic-attribute-users",
+        action="store_true",
+        help=(
+            "index existing aggregated topic attributes for "
+            "MONGO__TOPIC_ATTRIBUTES_INVERTED_INDEX"
+        ),
+    )
+    parser.add_argument(
+        "--embed-users-topic-info",
+        action="store_true",
+        help=(
+            "embed existing topic profiles and aggregated topic attributes in "
+            "users for MONGO__USERS_READ_MODEL"
+        ),
+    )
+    parser.add_argument(
+        "--check-users-read-model",
+        action="store_true",
+        help=(
+            "print users whose embedded topic info differs from its source "
+            "collections and exit with 1 if any"
+        ),
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="print the statements instead of executing them",
+    )
+    args = parser.parse_args()
+
+    if args.dry_run:
+        for statement in build_clickhouse_schema_statements(
+            materialize_indexes=args.materialize_indexes
+        ):
+            print(f"{statement.strip()};")
+        if args.migrate_content_events_engine:
+            for statement in build_migrate_content_events_engine_statements():
+                print(f"{statement.strip()};")
+        for collection, keys, options in MONGO_INDEXES:
+            print(f"db.{collection}.createIndex({dict(keys)}, {options})")
+        if args.migrate_storage_format:
+            storage_format = Settings().mongo.topic_attributes_storage_format
+            print(
+                "db.aggregated_topic_attributes: rewrite documents in the "
+                f"{storage_format} storage format"
+            )
+        if args.rebuild_topic_attribute_users:
+            print(
+                "db.topic_attribute_users: index the aggregated topic "
+                "attributes of every user"
+            )
+        if args.embed_users_topic_info:
+            print(
+                "db.users: embed the topic profile and aggregated topic "
+                "attributes of every user"
+            )
+        return
+
+    logging.basicConfig(level=logging.INFO)
+    is_consistent = asyncio.run(
+        bootstrap(
+            materialize_indexes=args.materialize_indexes,
+            migrate_content_events=args.migrate_content_events_engine,
+            migrate_storage_format=args.migrate_storage_format,
+            rebuild_inverted_index=args.rebuild_topic_attribute_users,
+            embed_topic_info=args.embed_users_topic_info,
+            check_read_model=args.check_users_read_model,
+        )
+    )
+    if not is_consistent:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+import logging
+import typing as tp
+
+from src.utils.olap import GetClickhouseConnection
+
+__all__ = [
+    "CLICKHOUSE_CODECS",
+    "CLICKHOUSE_INDEXES",
+    "CLICKHOUSE_SCHEMA",
+    "CONTENT_EVENTS_ENGINE",
+    "CONTENT_EVENTS_TABLE",
+    "bootstrap_clickhouse_schema",
+    "build_clickhouse_codec_statements",
+    "build_clickhouse_index_statements",
+    "build_clickhouse_schema_statements",
+    "build_migrate_content_events_engine_statements",
+    "check_clickhouse_schema",
+    "get_content_events_engine",
+    "migrate_content_events_engine",
+]
+
+
+logger = logging.getLogger(__name__)
+
+CONTENT_EVENTS_ENGINE = "ReplacingMergeTree"
+
+CONTENT_EVENTS_TABLE = """
+    CREATE TABLE IF NOT EXISTS {table}
+    (
+        content_event_uuid UUID,
+        user_id String,
+        content String CODEC(ZSTD(3)),
+        ts DateTime CODEC(Delta, LZ4)
+    )
+    -- Redelivered events share the whole sorting key and are collapsed on
+    -- merge, reads use `FINAL` for the ones not merged yet
+    ENGINE = ReplacingMergeTree
+    PARTITION BY toYYYYMM(ts)
+    ORDER BY (user_id, ts, content_event_uuid)
+    """
+
+# Every read path filters by `user_id` first and orders by `ts`, so both lead
+# the sorting key, the UUID only breaks ties for keyset pagination
+CLICKHOUSE_SCHEMA = [
+    CONTENT_EVENTS_TABLE.format(table="content_events"),
+    """
+    CREATE TABLE IF NOT EXISTS topic_attributes_events
+    (
+        topic_attributes_event_uuid UUID,
+        content_event_uuid UUID,
+        user_id String,
+        sentiments Nested(name String, weight Float64),
+        keywords Nested(name String, weight Float64),
+        entities Nested(category String, name String, weight Float64),
+        ts DateTime CODEC(Delta, LZ4)
+    )
+    ENGINE = MergeTree
+    PARTITION BY toYYYYMM(ts)
+    ORDER BY (user_id, ts, topic_attributes_event_uuid)
+    """,
+]
+
+# Column codecs as `(table, column, type, codec)`, applied to tables created
+# before them when `system.columns` shows another codec, so newly written
+# parts pick them up. Sorting key columns such as `ts` are left out, their
+# codecs only come from `CREATE TABLE`
+CLICKHOUSE_CODECS = [
+    ("content_events", "content", "String", "CODEC(ZSTD(3))"),
+]
+
+# Data-skipping indexes as `(table, index name, definition)`, added separately
+# so tables created before them get them too
+CLICKHOUSE_INDEXES = [
+    (
+        "topic_attributes_events",
+        "topic_attributes_event_uuid_bloom_filter",
+        # Point lookups by UUID only read granules the filter can't rule out
+        "topic_attributes_event_uuid TYPE bloom_filter(0.01) GRANULARITY 1",
+    ),
+    # Name filters of `GET /events/topicAttributes` are `hasAny` on these
+    (
+        "topic_attributes_events",
+        "keywords_name_bloom_filter",
+        "keywords.name TYPE bloom_filter(0.01) GRANULARITY 4",
+    ),
+    (
+        "topic_attributes_events",
+        "entities_name_bloom_filter",
+        "entities.name TYPE bloom_filter(0.01) GRANULARITY 4",
+    ),
+    (
+        "topic_attributes_events",
+        "sentiments_name_bloom_filter",
+        "sentiments.name TYPE bloom_filter(0.01) GRANULARITY 4",
+    ),
+]
+
+
+def build_clickhouse_codec_statements(
+    column_codecs: tp.Mapping[tuple[str, str], str] | None = None,
+) -> list[str]:
+    # Without the current `(table, column) -> codec`, every codec is applied
+    return [
+        f"ALTER TABLE {table} MODIFY COLUMN {column} {type_} {codec}"
+        for table, column, type_, codec in CLICKHOUSE_CODECS
+        if column_codecs is None or column_codecs.get((table, column)) != codec
+    ]
+
+
+def build_clickhouse_index_statements(
+    *,
+    materialize_indexes: bool = False,
+) -> list[str]:
+    statements = []
+    for table, name, definition in CLICKHOUSE_INDEXES:
+        statements.append(
+            f"ALTER TABLE {table} ADD INDEX IF NOT EXISTS {name} {definition}"
+        )
+        # Indexes are only built for parts written after they were added,
+        # existing parts need a (heavy) mutation
+        if materialize_indexes:
+            statements.append(f"ALTER TABLE {table} MATERIALIZE INDEX {name}")
+
+    return statements
+
+
+def build_clickhouse_schema_statements(
+    *,
+    materialize_indexes: bool = False,
+) -> list[str]:
+    return [
+        *CLICKHOUSE_SCHEMA,
+        *build_clickhouse_codec_statements(),
+        *build_clickhouse_index_statements(materialize_indexes=materialize_indexes),
+    ]
+
+
+async def bootstrap_clickhouse_schema(
+    *,
+    materialize_indexes: bool = False,
+    get_connection: GetClickhouseConnection,
+) -> None:
+    async with get_connection() as connection, connection.cursor() as cursor:
+        for statement in CLICKHOUSE_SCHEMA:
+            await cursor.execute(statement)
+
+        await cursor.execute(
+            "SELECT table, name, compression_codec FROM system.columns "
+            "WHERE database = currentDatabase() AND table IN %(tables)s",
+            {"tables": tuple(sorted({table for table, *_ in CLICKHOUSE_CODECS}))},
+        )
+        column_codecs = {
+            (table, column): codec for table, column, codec in await cursor.fetchall()
+        }
+
+        for statement in [
+            *build_clickhouse_codec_statements(column_codecs),
+            *build_clickhouse_index_statements(materialize_indexes=materialize_indexes),
+        ]:
+            await cursor.execute(statement)
+
+    logger.info("ClickHouse schema is up to date")
+
+
+def build_migrate_content_events_engine_statements() -> list[str]:
+    # `CREATE TABLE IF NOT EXISTS` keeps `content_events` tables created before
+    # it became a `ReplacingMergeTree`, they are copied into a new table which
+    # then takes their place. Events written meanwhile are lost, consumers
+    # should be stopped first
+    return [
+        "DROP TABLE IF EXISTS content_events_replacing",
+        CONTENT_EVENTS_TABLE.format(table="content_events_replacing"),
+        (
+            "INSERT INTO content_events_replacing "
+            "SELECT content_event_uuid, user_id, content, ts FROM content_events"
+        ),
+        "EXCHANGE TABLES content_events AND content_events_replacing",
+        "DROP TABLE content_events_replacing",
+    ]
+
+
+async def get_content_events_engine(
+    *,
+    get_connection: GetClickhouseConnection,
+) -> str | None:
+    async with get_connection() as connection, connection.cursor() as cursor:
+        await cursor.execute(
+            "SELECT engine FROM system.tables "
+            "WHERE database = currentDatabase() AND name = 'content_events'"
+        )
+        row = await cursor.fetchone()
+
+    return row[0] if row else None
+
+
+async def migrate_content_events_engine(
+    *,
+    get_connection: GetClickhouseConnection,
+) -> None:
+    engine = await get_content_events_engine(get_connection=get_connection)
+    if engine == CONTENT_EVENTS_ENGINE:
+        logger.info("content_events already uses %s", CONTENT_EVENTS_ENGINE)
+        return
+
+    async with get_connection() as connection, connection.cursor() as cursor:
+        for statement in build_migrate_content_events_engine_statements():
+            await cursor.execute(statement)
+
+    logger.info("Migrated content_events from %s to %s", engine, CONTENT_EVENTS_ENGINE)
+
+
+async def check_clickhouse_schema(
+    *,
+    get_connection: GetClickhouseConnection,
+) -> None:
+    # Reads deduplicate content events with `FINAL`, which other engines
+    # reject
+    engine = await get_content_events_engine(get_connection=get_connection)
+    if engine != CONTENT_EVENTS_ENGINE:
+        raise RuntimeError(
+            f"content_events uses {engine} instead of {CONTENT_EVENTS_ENGINE}, "
+            "migrate it with `python -m src.bootstrap "
+            "--migrate-content-events-engine`"
+        )
@@ -0,0 +1,356 @@
+import logging
+import typing as tp
+
+import bson
+from motor.motor_asyncio import AsyncIOMotorCollection, AsyncIOMotorDatabase
+from pymongo import ReplaceOne
+from pymongo.errors import OperationFailure
+
+from src.dtos import AggregatedTopicAttributesDTO
+from src.repositories.aggregated_topic_attributes import (
+    DUPLICATE_KEY_ERROR_CODE,
+    AggregatedTopicAttributesStorageFormat,
+    decode_aggregated_topic_attributes_document,
+    encode_aggregated_topic_attributes_document,
+)
+from src.repositories.topic_attribute_users import (
+    update_topic_attribute_users_repository,
+)
+from src.repositories.users_read_model import (
+    USERS_READ_MODEL_FIELDS,
+    embed_users_topic_info_repository,
+)
+
+__all__ = [
+    "MONGO_INDEXES",
+    "bootstrap_mongo_schema",
+    "check_mongo_schema",
+    "check_users_read_model",
+    "embed_users_topic_info",
+    "find_duplicate_index_keys",
+    "migrate_aggregated_topic_attributes_storage_format",
+    "rebuild_topic_attribute_users",
+]
+
+
+logger = logging.getLogger(__name__)
+
+# Indexes as `(collection, keys, options)`
+MONGO_INDEXES: list[tuple[str, list[tuple[str, int]], dict[str, tp.Any]]] = [
+    # Users are read, and joined by every `$lookup`, by `user_id`
+    (
+        "users",
+        [("user_id", 1)],
+        {"name": "user_id_unique", "unique": True},
+    ),
+    # Versioned updates rely on a single document per user, so a concurrent
+    # first insert fails instead of creating a duplicate
+    (
+        "aggregated_topic_attributes",
+        [("user_id", 1)],
+        {"name": "user_id_unique", "unique": True},
+    ),
+    # Filtered users listings start by matching item names. Multikey indexes
+    # can't be compound over two arrays, so there is one per list. They also
+    # cover the "columnar" storage format, where names are an array too
+    (
+        "aggregated_topic_attributes",
+        [("keywords.name", 1)],
+        {"name": "keywords_name"},
+    ),
+    (
+        "aggregated_topic_attributes",
+        [("entities.name", 1)],
+        {"name": "entities_name"},
+    ),
+    (
+        "aggregated_topic_attributes",
+        [("sentiments.name", 1)],
+        {"name": "sentiments_name"},
+    ),
+    # Users listings filtered by a single list read the users of a name in
+    # weight order, ties broken by `user_id`, past the removed ones
+    (
+        "topic_attribute_users",
+        [
+            ("attribute_type", 1),
+            ("name", 1),
+            ("removed", 1),
+            ("weight", -1),
+            ("user_id", 1),
+        ],
+        {"name": "attribute_type_name_removed_weight"},
+    ),
+    # One document per item of a user, updated and flagged removed by its key
+    (
+        "topic_attribute_users",
+        [("user_id", 1), ("attribute_type", 1), ("name", 1), ("category", 1)],
+        {"name": "user_id_attribute_unique", "unique": True},
+    ),
+    (
+        "topic_profiles",
+        [("user_id", 1)],
+        {"name": "user_id_unique", "unique": True},
+    ),
+    (
+        "content_watermarks",
+        [("user_id", 1)],
+        {"name": "user_id_unique", "unique": True},
+    ),
+]
+
+
+async def find_duplicate_index_keys(
+    collection: AsyncIOMotorCollection[tp.Any],
+    keys: tp.Sequence[tuple[str, int]],
+    *,
+    limit: int = 10,
+) -> list[dict[str, tp.Any]]:
+    # Returns up to `limit` key values shared by several documents, which a
+    # unique index on `keys` can't be built over
+    duplicates = await collection.aggregate(
+        [
+            {
+                "$group": {
+                    "_id": {field.replace(".", "_"): f"${field}" for field, _ in keys},
+                    "count": {"$sum": 1},
+                }
+            },
+            {"$match": {"count": {"$gt": 1}}},
+            {"$limit": limit},
+        ],
+        allowDiskUse=True,
+    ).to_list(None)
+    return [duplicate["_id"] for duplicate in duplicates]
+
+
+async def bootstrap_mongo_schema(
+    *,
+    database: AsyncIOMotorDatabase[tp.Any],
+    strict: bool = True,
+) -> None:
+    # Unless `strict`, unique indexes over duplicate keys are logged and left
+    # out instead of failing, so the app still starts on such data
+    is_up_to_date = True
+    for collection, keys, options in MONGO_INDEXES:
+        try:
+            await database[collection].create_index(keys, **options)
+        except OperationFailure as exc:
+            if strict or exc.code != DUPLICATE_KEY_ERROR_CODE:
+                raise
+
+            is_up_to_date = False
+            logger.error(
+                "Index %s of %s is not built, documents share keys %s. Remove "
+                "the duplicates and run `python -m src.bootstrap`",
+                options["name"],
+                collection,
+                await find_duplicate_index_keys(database[collection], keys),
+            )
+
+    if is_up_to_date:
+        logger.info("MongoDB indexes are up to date")
+
+
+async def check_mongo_schema(
+    *,
+    database: AsyncIOMotorDatabase[tp.Any],
+) -> None:
+    # Versioned updates and the inverted index rely on unique indexes to
+    # reject a concurrent first insert, so running without one of them
+    # would silently create duplicate documents
+    missing_indexes = []
+    for collection, keys, options in MONGO_INDEXES:
+        if not options.get("unique"):
+            continue
+
+        index_information = await database[collection].index_information()
+        if not any(
+            index.get("unique")
+            and [(field, int(order)) for field, order in index["key"]] == keys
+            for index in index_information.values()
+        ):
+            missing_indexes.append(f"{collection}.{options['name']}")
+
+    if missing_indexes:
+        raise RuntimeError(
+            f"Unique indexes {', '.join(missing_indexes)} are missing, remove "
+            "duplicate keys and run `python -m src.bootstrap`"
+        )
+
+
+async def migrate_aggregated_topic_attributes_storage_format(
+    *,
+    storage_format: AggregatedTopicAttributesStorageFormat,
+    database: AsyncIOMotorDatabase[tp.Any],
+    batch_size: int = 500,
+) -> dict[str, int]:
+    # Rewrites documents stored in the other format, returns the number of
+    # rewritten and skipped documents and their BSON size before and after
+    collection = database["aggregated_topic_attributes"]
+    # `$type` matches the field itself only for "array", as for other types
+    # it also matches array elements
+    query: dict[str, tp.Any] = (
+        {"keywords": {"$type": "array"}}
+        if storage_format == "columnar"
+        else {"keywords": {"$exists": True, "$not": {"$type": "array"}}}
+    )
+    report = {"migrated": 0, "skipped": 0, "size_before": 0, "size_after": 0}
+
+    last_id = None
+    while True:
+        documents = (
+            await collection.find(
+                query if last_id is None else {**query, "_id": {"$gt": last_id}}
+            )
+            .sort("_id", 1)
+            .limit(batch_size)
+            .to_list(batch_size)
+        )
+        if not documents:
+            break
+        last_id = documents[-1]["_id"]
+
+        migrated_documents = [
+            encode_aggregated_topic_attributes_document(
+                decode_aggregated_topic_attributes_document(document),
+                storage_format=storage_format,
+            )
+            for document in documents
+        ]
+        # Documents updated meanwhile have a new version and have been
+        # written by the gateway already, so they are skipped
+        result = await collection.bulk_write(
+            [
+                ReplaceOne(
+                    {"_id": document["_id"], "version": document.get("version")},
+                    migrated_document,
+                )
+                for document, migrated_document in zip(documents, migrated_documents)
+            ],
+            ordered=False,
+        )
+
+        report["migrated"] += result.matched_count
+        report["skipped"] += len(documents) - result.matched_count
+        report["size_before"] += sum(
+            len(bson.encode(document)) for document in documents
+        )
+        report["size_after"] += sum(
+            len(bson.encode(document)) for document in migrated_documents
+        )
+
+    logger.info(
+        "Rewrote %d aggregated topic attributes documents in the %s format "
+        "(%d skipped), %d bytes before and %d bytes after",
+        report["migrated"],
+        storage_format,
+        report["skipped"],
+        report["size_before"],
+        report["size_after"],
+    )
+    return report
+
+
+async def rebuild_topic_attribute_users(
+    *,
+    database: AsyncIOMotorDatabase[tp.Any],
+    batch_size: int = 500,
+) -> int:
+    # Indexes every user's aggregated topic attributes in
+    # `topic_attribute_users` from scratch, returns the number of users
+    collection = database["aggregated_topic_attributes"]
+    users = 0
+
+    last_id = None
+    while True:
+        documents = (
+            await collection.find({} if last_id is None else {"_id": {"$gt": last_id}})
+            .sort("_id", 1)
+            .limit(batch_size)
+            .to_list(batch_size)
+        )
+        if not documents:
+            break
+        last_id = documents[-1]["_id"]
+
+        aggregated_topic_attributes = [
+            AggregatedTopicAttributesDTO.model_validate(
+                decode_aggregated_topic_attributes_document(document)
+            )
+            for document in documents
+        ]
+        await database["topic_attribute_users"].delete_many(
+            {"user_id": {"$in": [item.user_id for item in aggregated_topic_attributes]}}
+        )
+        await update_topic_attribute_users_repository(
+            [
+                (AggregatedTopicAttributesDTO(user_id=item.user_id), item)
+                for item in aggregated_topic_attributes
+            ],
+            database=database,
+        )
+        users += len(documents)
+
+    logger.info("Indexed aggregated topic attributes of %d users", users)
+    return users
+
+
+async def embed_users_topic_info(
+    *,
+    database: AsyncIOMotorDatabase[tp.Any],
+) -> None:
+    # Embeds the current topic profile and aggregated topic attributes in
+    # every user, copies embedded since by handlers are kept if newer
+    await embed_users_topic_info_repository(database=database)
+    logger.info("Embedded topic info in users")
+
+
+async def check_users_read_model(
+    *,
+    database: AsyncIOMotorDatabase[tp.Any],
+    batch_size: int = 500,
+) -> list[str]:
+    # Compares the topic info embedded in users with their source
+    # collections, returns `user_id`s of users whose copies differ
+    inconsistent_user_ids: list[str] = []
+
+    last_id = None
+    while True:
+        users = (
+            await database["users"]
+            .find(
+                {} if last_id is None else {"_id": {"$gt": last_id}},
+                {"user_id": 1, **dict.fromkeys(USERS_READ_MODEL_FIELDS, 1)},
+            )
+            .sort("_id", 1)
+            .limit(batch_size)
+            .to_list(batch_size)
+        )
+        if not users:
+            break
+        last_id = users[-1]["_id"]
+
+        user_ids = [user["user_id"] for user in users]
+        sources = {
+            field: {
+                document["user_id"]: document
+                async for document in database[collection].find(
+                    {"user_id": {"$in": user_ids}}, {"_id": 0}
+                )
+            }
+            for field, (collection, _) in USERS_READ_MODEL_FIELDS.items()
+        }
+        inconsistent_user_ids.extend(
+            user["user_id"]
+            for user in users
+            if any(
+                user.get(field) != sources[field].get(user["user_id"])
+                for field in USERS_READ_MODEL_FIELDS
+            )
+        )
+
+    logger.info(
+        "Found %d users with outdated embedded topic info", len(inconsistent_user_ids)
+    )
+    return inconsistent_user_ids
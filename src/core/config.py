@@ -1,9 +1,17 @@
 import typing as tp
 
-from pydantic import AnyUrl, BaseModel, model_validator
+from pydantic import AnyUrl, BaseModel, Field, model_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
-__all__ = ["Settings"]
+__all__ = [
+    "DecaySchema",
+    "KafkaBatchSchema",
+    "KafkaSchema",
+    "RetrySchema",
+    "Settings",
+    "TTLCacheSchema",
+    "WriteBehindSchema",
+]
 
 
 class URLSchema(BaseModel):
@@ -32,22 +40,152 @@ class URLSchema(BaseModel):
         return str(self._url)
 
 
+class RetrySchema(BaseModel):
+    max_attempts: int = 5
+    base_delay_ms: int = 10
+    max_delay_ms: int = 500
+
+
+class WriteBehindSchema(BaseModel):
+    enabled: bool = False
+    maxsize: int = 10000
+    # Streaming handlers flush every message or batch before its offsets are
+    # committed, so the periodic flush has no effect on them, in batch mode
+    # included. It only bounds the delay of events applied without a flush
+    flush_interval_ms: int = 1000
+
+
+class DecaySchema(BaseModel):
+    # Half-life of topic attribute weights by the age of their `updated_at`,
+    # applied when they are read. `None` disables decay
+    half_life_days: float | None = None
+    # Items decayed below it are dropped by the next merge of the user
+    prune_weight: float = 0.01
+
+
+class TTLCacheSchema(BaseModel):
+    # Disabled unless `ttl_ms` is positive
+    maxsize: int = 1000
+    ttl_ms: int = 0
+
+
 class MongoSchema(BaseModel):
     connection: URLSchema
     database: str
+    # Unique indexes over duplicate keys are logged at startup, which then
+    # fails as long as any unique index is missing
+    bootstrap_schema: bool = True
+    # Retries of versioned topic attributes updates on concurrent modification
+    topic_attributes_retry: RetrySchema = Field(default_factory=RetrySchema)
+    # "python" merges topic attributes in the gateway (read-modify-write),
+    # "pipeline" lets MongoDB merge them in a single atomic update
+    topic_attributes_merge_engine: tp.Literal["python", "pipeline"] = "python"
+    # Keeps aggregated topic attributes in memory and writes them periodically,
+    # only used with the "python" merge engine
+    topic_attributes_write_behind: WriteBehindSchema = Field(
+        default_factory=WriteBehindSchema
+    )
+    topic_attributes_decay: DecaySchema = Field(default_factory=DecaySchema)
+    # "subdocuments" stores topic attributes as subdocuments, "columnar" as
+    # parallel arrays per field with timestamps truncated to seconds, ~40%
+    # smaller. Documents are read in either format, existing ones are
+    # rewritten by `python -m src.bootstrap --migrate-storage-format`
+    topic_attributes_storage_format: tp.Literal["subdocuments", "columnar"] = (
+        "subdocuments"
+    )
+    # Also keeps `topic_attribute_users`, one document per keyword, entity and
+    # sentiment of every user, which users listings filtered by a single
+    # list read in weight order. Only maintained by the "python" merge
+    # engine, existing documents, or ones written before removed items were
+    # kept as tombstones, are indexed by
+    # `python -m src.bootstrap --rebuild-topic-attribute-users`
+    topic_attributes_inverted_index: bool = False
+    # Also embeds the latest topic profile and aggregated topic attributes
+    # in `users`, so a user is read with a single `find_one` instead of two
+    # `$lookup`s. Only maintained by the "python" merge engine, existing
+    # users are filled by `python -m src.bootstrap --embed-users-topic-info`
+    users_read_model: bool = False
+    # Totals of the users listing per set of filters, approximate for up to
+    # `ttl_ms` but saving a pass over all matching users per page
+    users_total_cache: TTLCacheSchema = Field(default_factory=TTLCacheSchema)
+
+    @model_validator(mode="after")
+    def validate_topic_attributes_storage_format(self) -> tp.Self:
+        if (
+            self.topic_attributes_merge_engine == "pipeline"
+            and self.topic_attributes_storage_format != "subdocuments"
+        ):
+            raise ValueError(
+                'The "pipeline" merge engine only supports the "subdocuments" '
+                "topic attributes storage format"
+            )
+
+        return self
+
+    @model_validator(mode="after")
+    def validate_topic_attributes_inverted_index(self) -> tp.Self:
+        if (
+            self.topic_attributes_merge_engine == "pipeline"
+            and self.topic_attributes_inverted_index
+        ):
+            raise ValueError(
+                'The "pipeline" merge engine does not maintain the topic '
+                "attributes inverted index"
+            )
+
+        return self
+
+    @model_validator(mode="after")
+    def validate_users_read_model(self) -> tp.Self:
+        if self.topic_attributes_merge_engine == "pipeline" and self.users_read_model:
+            raise ValueError(
+                'The "pipeline" merge engine does not maintain the users read model'
+            )
+
+        return self
+
+
+class BatchWriterSchema(BaseModel):
+    max_rows: int = 1000
+    max_delay_ms: int = 1000
+    max_buffered_rows: int = 10000
+    max_retry_delay_ms: int = 30000
 
 
 class ClickHouseSchema(BaseModel):
     connection: URLSchema
     database: str
+    content_events_writer: BatchWriterSchema = Field(default_factory=BatchWriterSchema)
+    content_events_chunk_size: int = 1000
+    # Kafka rejects messages over `message.max.bytes`, 1 MB by default
+    content_events_chunk_max_bytes: int = 900000
+    # Content submitted for processing stops this long before the events the
+    # writer may still buffer, events ingested even later are never submitted
+    content_watermark_lag_ms: int = 60000
+    content_events_dedup_cache_size: int = 100000
+    topic_attributes_events_chunk_size: int = 1000
+    topic_attributes_events_cache_size: int = 10000
+    bootstrap_schema: bool = True
 
     @property
     def dsn(self) -> str:
         return f"{self.connection.url}/{self.database}"
 
 
+class KafkaBatchSchema(BaseModel):
+    # Batch subscribers commit offsets only once events are written
+    enabled: bool = True
+    max_records: int = 500
+    timeout_ms: int = 1000
+
+
 class KafkaSchema(BaseModel):
     connection: URLSchema
+    # Prefix of the consumer groups of the `contentEvent` and OLTP
+    # `topicAttributes` subscribers, shared by both `batch` modes so switching
+    # keeps their committed offsets
+    group_id: str = "api-gateway"
+    batch: KafkaBatchSchema = Field(default_factory=KafkaBatchSchema)
 
     @property
     def bootstrap_servers(self) -> str:
@@ -1,24 +1,33 @@
-from .aggregated_topic_attributes import AggregatedTopicAttributesDTO
+from .aggregated_topic_attributes import (
+    AggregatedTopicAttributesDTO,
+    AggregatedTopicAttributesGetDTO,
+)
+from .content_watermarks import ContentWatermarkDTO
 from .events import (
     ContentEventBrokerDTO,
     ContentEventCreateDTO,
     TopicAttributesEventBrokerDTO,
+    TopicAttributesEventDTO,
     TopicProfileEventBrokerDTO,
     UserContentEventDTO,
 )
 from .responses import MessageResponseDTO
 from .topic_profiles import TopicProfileDTO
-from .users import UserCreateDTO, UserGetDTO
+from .users import UserCreateDTO, UserGetDTO, UserKeysetPageDTO
 
 __all__ = [
     "UserGetDTO",
     "UserCreateDTO",
+    "UserKeysetPageDTO",
     "ContentEventBrokerDTO",
     "ContentEventCreateDTO",
     "MessageResponseDTO",
     "AggregatedTopicAttributesDTO",
+    "AggregatedTopicAttributesGetDTO",
     "TopicAttributesEventBrokerDTO",
+    "TopicAttributesEventDTO",
     "TopicProfileEventBrokerDTO",
     "UserContentEventDTO",
     "TopicProfileDTO",
+    "ContentWatermarkDTO",
 ]
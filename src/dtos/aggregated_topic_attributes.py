@@ -9,12 +9,17 @@ from src.schemas import (
 )
 from src.utils.dates import utcnow
 
-__all__ = ["AggregatedTopicAttributesDTO"]
+__all__ = ["AggregatedTopicAttributesDTO", "AggregatedTopicAttributesGetDTO"]
 
 
-class AggregatedTopicAttributesDTO(BaseModel):
+class AggregatedTopicAttributesGetDTO(BaseModel):
     user_id: str
     keywords: list[KeywordTopicProfileSchema] = Field(default_factory=list)
     entities: list[EntityTopicProfileSchema] = Field(default_factory=list)
     sentiments: list[SentimentTopicProfileSchema] = Field(default_factory=list)
     updated_at: datetime = Field(default_factory=utcnow)
+
+
+class AggregatedTopicAttributesDTO(AggregatedTopicAttributesGetDTO):
+    # Incremented on every update, documents written before versioning have 0
+    version: int = 0
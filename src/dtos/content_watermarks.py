@@ -0,0 +1,19 @@
+import uuid
+from datetime import datetime
+
+from pydantic import BaseModel, Field, field_serializer
+
+from src.utils.dates import utcnow
+
+__all__ = ["ContentWatermarkDTO"]
+
+
+class ContentWatermarkDTO(BaseModel):
+    user_id: str
+    ts: datetime
+    content_event_uuid: uuid.UUID
+    updated_at: datetime = Field(default_factory=utcnow)
+
+    @field_serializer("content_event_uuid")
+    def serialize_content_event_uuid(self, value: uuid.UUID) -> str:
+        return str(value)
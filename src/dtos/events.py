@@ -16,6 +16,7 @@ __all__ = [
     "ContentEventDTO",
     "ContentEventBrokerDTO",
     "TopicAttributesEventBrokerDTO",
+    "TopicAttributesEventDTO",
     "TopicProfileEventBrokerDTO",
     "UserContentEventDTO",
 ]
@@ -50,6 +51,16 @@ class TopicAttributesEventBrokerDTO(BaseModel):
     timestamp: datetime
 
 
+class TopicAttributesEventDTO(BaseModel):
+    topic_attributes_event_uuid: uuid.UUID
+    content_event_uuid: uuid.UUID
+    user_id: str
+    keywords: list[KeywordTopicEventSchema]
+    entities: list[EntityTopicEventSchema]
+    sentiments: list[SentimentTopicEventSchema]
+    timestamp: datetime
+
+
 class TopicProfileEventBrokerDTO(BaseModel):
     topic_profile_event_uuid: uuid.UUID
     user_content_event_uuid: uuid.UUID
@@ -62,4 +73,11 @@ class UserContentEventDTO(BaseModel):
     user_content_event_uuid: uuid.UUID = Field(default_factory=uuid.uuid4)
     user_id: str
     content_events: list[ContentEventDTO]
+    # A user's content may be split into several messages sharing
+    # `user_content_event_uuid`, numbered from 0, the last one has `is_last`
+    sequence_number: int = 0
+    is_last: bool = True
+    # Incremental messages only carry content newer than the previous
+    # submission of the same user
+    is_incremental: bool = False
     timestamp: datetime = Field(default_factory=utcnow)
@@ -5,11 +5,12 @@ from pydantic import BaseModel, Field
 from src.utils.dates import utcnow
 
 from . import TopicProfileDTO
-from .aggregated_topic_attributes import AggregatedTopicAttributesDTO
+from .aggregated_topic_attributes import AggregatedTopicAttributesGetDTO
 
 __all__ = [
     "UserGetDTO",
     "UserCreateDTO",
+    "UserKeysetPageDTO",
 ]
 
 
@@ -22,10 +23,17 @@ class UserDTO:
 class UserGetDTO(BaseModel):
     user_id: str
     username: str
-    aggregated_topic_attributes: AggregatedTopicAttributesDTO | None = None
+    # Without `version`, which only serves concurrent updates
+    aggregated_topic_attributes: AggregatedTopicAttributesGetDTO | None = None
     topic_profile: TopicProfileDTO | None = None
 
 
 class UserCreateDTO(BaseModel):
     user_id: str
     username: str
+
+
+class UserKeysetPageDTO(BaseModel):
+    items: list[UserGetDTO]
+    next_cursor: str | None = None
+    total: int | None = None
@@ -1,4 +1,5 @@
 import typing as tp
+import uuid
 from contextlib import asynccontextmanager
 
 from asynch import Pool
@@ -8,8 +9,22 @@ from faststream.utils.context.repository import context
 from motor.motor_asyncio import AsyncIOMotorClient
 
 from src.api.routers import api_router
+from src.bootstrap import (
+    bootstrap_clickhouse_schema,
+    bootstrap_mongo_schema,
+    check_clickhouse_schema,
+    check_mongo_schema,
+)
 from src.core.config import Settings
-from src.streaming.routers import streaming_router
+from src.dtos import TopicAttributesEventDTO
+from src.repositories import (
+    AggregatedTopicAttributesWriteBehindCache,
+    ContentEventsBatchWriter,
+    UsersTotalCacheKey,
+)
+from src.streaming.routers import build_streaming_router
+from src.streaming.routers.content import mark_content_events_seen
+from src.utils.caches import LRUCache, TTLCache
 from src.utils.olap import build_get_clickhouse_connection
 
 settings = Settings()
@@ -25,13 +40,74 @@ async def lifespan(app: FastAPI) -> tp.AsyncIterator[None]:
         app.state.clickhouse_pool
     )
 
+    # `content_event_uuid`s of recently ingested content events
+    app.state.content_events_seen = LRUCache[uuid.UUID, bool](
+        maxsize=app.state.settings.clickhouse.content_events_dedup_cache_size,
+        name="content_events_seen",
+    )
+    content_events_writer_settings = app.state.settings.clickhouse.content_events_writer
+    app.state.content_events_writer = ContentEventsBatchWriter(
+        get_connection=app.state.get_clickhouse_connection,
+        max_rows=content_events_writer_settings.max_rows,
+        max_delay_ms=content_events_writer_settings.max_delay_ms,
+        max_buffered_rows=content_events_writer_settings.max_buffered_rows,
+        max_retry_delay_ms=content_events_writer_settings.max_retry_delay_ms,
+        on_flush=lambda rows: mark_content_events_seen(
+            (row[0] for row in rows), seen=app.state.content_events_seen
+        ),
+    )
+
+    write_behind_settings = app.state.settings.mongo.topic_attributes_write_behind
+    retry_settings = app.state.settings.mongo.topic_attributes_retry
+    decay_settings = app.state.settings.mongo.topic_attributes_decay
+    app.state.aggregated_topic_attributes_cache = (
+        AggregatedTopicAttributesWriteBehindCache(
+            database=app.state.mongo_database,
+            maxsize=write_behind_settings.maxsize,
+            flush_interval_ms=write_behind_settings.flush_interval_ms,
+            max_attempts=retry_settings.max_attempts,
+            base_delay_ms=retry_settings.base_delay_ms,
+            max_delay_ms=retry_settings.max_delay_ms,
+            half_life_days=decay_settings.half_life_days,
+            prune_weight=decay_settings.prune_weight,
+            storage_format=app.state.settings.mongo.topic_attributes_storage_format,
+            inverted_index=app.state.settings.mongo.topic_attributes_inverted_index,
+            users_read_model=app.state.settings.mongo.users_read_model,
+        )
+    )
+
+    # Topic attributes events are immutable, cached entries never go stale
+    app.state.topic_attributes_events_cache = LRUCache[
+        uuid.UUID, TopicAttributesEventDTO
+    ](
+        maxsize=app.state.settings.clickhouse.topic_attributes_events_cache_size,
+        name="topic_attributes_events",
+    )
+
+    users_total_cache_settings = app.state.settings.mongo.users_total_cache
+    app.state.users_total_cache = TTLCache[UsersTotalCacheKey, int](
+        maxsize=users_total_cache_settings.maxsize,
+        ttl_ms=users_total_cache_settings.ttl_ms,
+        name="users_total",
+    )
+
     # Necessary to provide faststream context with fastapi state
     context.set_global("state", app.state)
 
     await app.state.clickhouse_pool.startup()
+    if app.state.settings.clickhouse.bootstrap_schema:
+        await bootstrap_clickhouse_schema(
+            get_connection=app.state.get_clickhouse_connection,
+        )
+    await check_clickhouse_schema(get_connection=app.state.get_clickhouse_connection)
+    if app.state.settings.mongo.bootstrap_schema:
+        await bootstrap_mongo_schema(database=app.state.mongo_database, strict=False)
+    await check_mongo_schema(database=app.state.mongo_database)
 
     yield
 
+    await app.state.content_events_writer.close()
+    await app.state.aggregated_topic_attributes_cache.close()
     await app.state.clickhouse_pool.shutdown()
     app.state.motor_client.close()
 
@@ -44,7 +120,7 @@ faststream_router = KafkaRouter(settings.kafka.bootstrap_servers)
 app.include_router(api_router)
 app.include_router(faststream_router)
 
-faststream_router.include_router(streaming_router)
+faststream_router.include_router(build_streaming_router(settings.kafka))
 
 
 if __name__ == "__main__":
@@ -1,29 +1,85 @@
 from .aggregated_topic_attributes import (
+    AggregatedTopicAttributesStorageFormat,
+    AggregatedTopicAttributesWriteBehindCache,
+    build_decoded_weighted_items_expression,
+    bulk_merge_aggregated_topic_attributes_repository,
+    bulk_upsert_versioned_aggregated_topic_attributes_repository,
+    decode_aggregated_topic_attributes_document,
+    encode_aggregated_topic_attributes_document,
+    get_aggregated_topic_attributes_by_user_ids_repository,
     get_aggregated_topic_attributes_repository,
-    upsert_aggregated_topic_attributes_repository,
+    merge_aggregated_topic_attributes_repository,
+    set_users_aggregated_topic_attributes_repository,
+    upsert_versioned_aggregated_topic_attributes_repository,
+)
+from .content_watermarks import (
+    get_content_watermark_repository,
+    upsert_content_watermark_repository,
 )
 from .events import (
-    get_content_events_repository,
-    insert_content_event_repository,
+    CONTENT_EVENTS_COLUMNS,
+    TOPIC_ATTRIBUTES_AGGREGATE_KEYS,
+    ContentEventsBatchWriter,
+    get_topic_attributes_event_repository,
+    insert_content_events_repository,
     insert_topic_attributes_event_repository,
+    insert_topic_attributes_events_columnar_repository,
+    insert_topic_attributes_events_repository,
+    iter_content_events_repository,
+    iter_topic_attributes_aggregates_repository,
+    iter_topic_attributes_events_repository,
+)
+from .topic_attribute_users import update_topic_attribute_users_repository
+from .topic_profiles import (
+    set_users_topic_profile_repository,
+    upsert_topic_profile_repository,
 )
-from .topic_profiles import upsert_topic_profile_repository
 from .users import (
+    UsersTotalCacheKey,
     get_user_repository,
+    get_user_with_embedded_topic_info_repository,
     get_user_with_topic_info_repository,
+    get_users_with_topic_info_keyset_repository,
     get_users_with_topic_info_paginated_repository,
     insert_user_repository,
 )
+from .users_read_model import embed_users_topic_info_repository
 
 __all__ = [
     "get_users_with_topic_info_paginated_repository",
-    "insert_content_event_repository",
+    "get_users_with_topic_info_keyset_repository",
+    "UsersTotalCacheKey",
+    "insert_content_events_repository",
+    "CONTENT_EVENTS_COLUMNS",
+    "ContentEventsBatchWriter",
     "insert_topic_attributes_event_repository",
+    "insert_topic_attributes_events_repository",
+    "insert_topic_attributes_events_columnar_repository",
     "get_user_with_topic_info_repository",
+    "get_user_with_embedded_topic_info_repository",
     "get_user_repository",
     "insert_user_repository",
     "get_aggregated_topic_attributes_repository",
-    "upsert_aggregated_topic_attributes_repository",
-    "get_content_events_repository",
+    "get_aggregated_topic_attributes_by_user_ids_repository",
+    "merge_aggregated_topic_attributes_repository",
+    "bulk_merge_aggregated_topic_attributes_repository",
+    "upsert_versioned_aggregated_topic_attributes_repository",
+    "bulk_upsert_versioned_aggregated_topic_attributes_repository",
+    "set_users_aggregated_topic_attributes_repository",
+    "AggregatedTopicAttributesWriteBehindCache",
+    "AggregatedTopicAttributesStorageFormat",
+    "encode_aggregated_topic_attributes_document",
+    "decode_aggregated_topic_attributes_document",
+    "build_decoded_weighted_items_expression",
+    "iter_content_events_repository",
+    "TOPIC_ATTRIBUTES_AGGREGATE_KEYS",
+    "get_topic_attributes_event_repository",
+    "iter_topic_attributes_events_repository",
+    "iter_topic_attributes_aggregates_repository",
     "upsert_topic_profile_repository",
+    "set_users_topic_profile_repository",
+    "embed_users_topic_info_repository",
+    "update_topic_attribute_users_repository",
+    "get_content_watermark_repository",
+    "upsert_content_watermark_repository",
 ]
@@ -1,13 +1,164 @@
+import asyncio
+import calendar
+import logging
 import typing as tp
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import UTC, datetime
 
 from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+from src.dtos import AggregatedTopicAttributesDTO, TopicAttributesEventBrokerDTO
+from src.utils.aggregated_topic_attributes import (
+    update_aggregated_topic_attributes_dto_based_on_topic_attributes_events,
+)
+from src.utils.metrics import get_counter, get_summary
+from src.utils.retries import retry_with_backoff
+
+from .topic_attribute_users import update_topic_attribute_users_repository
 
 __all__ = [
+    "AggregatedTopicAttributesStorageFormat",
+    "AggregatedTopicAttributesWriteBehindCache",
+    "build_decoded_weighted_items_expression",
+    "bulk_merge_aggregated_topic_attributes_repository",
+    "bulk_upsert_versioned_aggregated_topic_attributes_repository",
+    "decode_aggregated_topic_attributes_document",
+    "encode_aggregated_topic_attributes_document",
+    "get_aggregated_topic_attributes_by_user_ids_repository",
     "get_aggregated_topic_attributes_repository",
-    "upsert_aggregated_topic_attributes_repository",
+    "merge_aggregated_topic_attributes_repository",
+    "set_users_aggregated_topic_attributes_repository",
+    "upsert_versioned_aggregated_topic_attributes_repository",
 ]
 
 
+logger = logging.getLogger(__name__)
+
+DUPLICATE_KEY_ERROR_CODE = 11000
+
+# "subdocuments" stores every keyword, entity and sentiment as a subdocument,
+# "columnar" stores each list as parallel arrays, one per field, with
+# timestamps as epoch seconds
+AggregatedTopicAttributesStorageFormat = tp.Literal["subdocuments", "columnar"]
+
+WEIGHTED_ITEM_LIST_FIELDS = ("keywords", "entities", "sentiments")
+TIMESTAMP_ITEM_FIELDS = ("updated_at",)
+
+
+def encode_columnar_weighted_items(
+    items: tp.Sequence[tp.Mapping[str, tp.Any]],
+) -> dict[str, list[tp.Any]]:
+    columns: dict[str, list[tp.Any]] = {}
+    for item in items:
+        for item_field, value in item.items():
+            if item_field in TIMESTAMP_ITEM_FIELDS:
+                # Naive datetimes, as read by motor, are in UTC
+                value = calendar.timegm(value.utctimetuple())
+            columns.setdefault(item_field, []).append(value)
+    return columns
+
+
+def decode_columnar_weighted_items(
+    columns: tp.Mapping[str, tp.Sequence[tp.Any]],
+) -> list[dict[str, tp.Any]]:
+    decoded_columns = dict(columns)
+    for item_field in TIMESTAMP_ITEM_FIELDS:
+        if item_field in decoded_columns:
+            # Items merged from the same event share their timestamp
+            datetimes = {
+                value: datetime.fromtimestamp(value, UTC)
+                for value in set(decoded_columns[item_field])
+            }
+            decoded_columns[item_field] = [
+                datetimes[value] for value in decoded_columns[item_field]
+            ]
+
+    return [
+        dict(zip(decoded_columns, values)) for values in zip(*decoded_columns.values())
+    ]
+
+
+def encode_aggregated_topic_attributes_document(
+    data: dict[str, tp.Any],
+    *,
+    storage_format: AggregatedTopicAttributesStorageFormat,
+) -> dict[str, tp.Any]:
+    if storage_format == "subdocuments":
+        return data
+
+    return {
+        key: encode_columnar_weighted_items(value)
+        if key in WEIGHTED_ITEM_LIST_FIELDS
+        else value
+        for key, value in data.items()
+    }
+
+
+def decode_aggregated_topic_attributes_document(
+    document: dict[str, tp.Any],
+) -> dict[str, tp.Any]:
+    # Accepts both storage formats, so a collection can be migrated while
+    # being read
+    if not any(
+        isinstance(document.get(key), dict) for key in WEIGHTED_ITEM_LIST_FIELDS
+    ):
+        return document
+
+    return {
+        key: decode_columnar_weighted_items(value)
+        if key in WEIGHTED_ITEM_LIST_FIELDS and isinstance(value, dict)
+        else value
+        for key, value in document.items()
+    }
+
+
+def build_decoded_weighted_items_expression(
+    items_expression: str,
+    *,
+    item_fields: tp.Sequence[str],
+) -> dict[str, tp.Any]:
+    # MongoDB aggregation expression equivalent to decoding one list of
+    # `decode_aggregated_topic_attributes_document` into `item_fields`, with
+    # `items_expression` like "$keywords"
+    def build_value_expression(item_field: str) -> tp.Any:
+        value = {"$arrayElemAt": [f"{items_expression}.{item_field}", "$$index"]}
+        if item_field in TIMESTAMP_ITEM_FIELDS:
+            return {"$toDate": {"$multiply": [value, 1000]}}
+        return value
+
+    return {
+        "$cond": [
+            {"$eq": [{"$type": items_expression}, "object"]},
+            {
+                "$map": {
+                    "input": {
+                        "$range": [
+                            0,
+                            {
+                                "$size": {
+                                    "$ifNull": [
+                                        f"{items_expression}.{item_fields[0]}",
+                                        [],
+                                    ]
+                                }
+                            },
+                        ]
+                    },
+                    "as": "index",
+                    "in": {
+                        item_field: build_value_expression(item_field)
+                        for item_field in item_fields
+                    },
+                }
+            },
+            items_expression,
+        ]
+    }
+
+
 async def get_aggregated_topic_attributes_repository(
     user_id: str,
     *,
@@ -17,19 +168,413 @@ async def get_aggregated_topic_attributes_repository(
         {"user_id": user_id}
     )
 
-    return document or None
+    return decode_aggregated_topic_attributes_document(document) if document else None
 
 
-async def upsert_aggregated_topic_attributes_repository(
+async def get_aggregated_topic_attributes_by_user_ids_repository(
+    user_ids: tp.Iterable[str],
+    *,
+    database: AsyncIOMotorDatabase[tp.Any],
+) -> dict[str, dict[str, tp.Any]]:
+    cursor = database["aggregated_topic_attributes"].find(
+        {"user_id": {"$in": list(user_ids)}}
+    )
+
+    return {
+        document["user_id"]: decode_aggregated_topic_attributes_document(document)
+        async for document in cursor
+    }
+
+
+async def upsert_versioned_aggregated_topic_attributes_repository(
     data: dict[str, tp.Any],
     *,
+    expected_version: int | None,
     database: AsyncIOMotorDatabase[tp.Any],
-) -> None:
+    storage_format: AggregatedTopicAttributesStorageFormat = "subdocuments",
+) -> bool:
+    # Writes `data` only if the stored document still has `expected_version`
+    # (`None` when there was no document), returns whether it was written
     if "user_id" not in data:
         raise ValueError("Missing user_id in data")
 
+    collection = database["aggregated_topic_attributes"]
+    document = encode_aggregated_topic_attributes_document(
+        {**data, "version": (expected_version or 0) + 1},
+        storage_format=storage_format,
+    )
+
+    if expected_version is None:
+        # A concurrent first insert is rejected by the unique `user_id` index
+        try:
+            await collection.insert_one(document)
+        except DuplicateKeyError:
+            return False
+        return True
+
+    result = await collection.update_one(
+        {
+            "user_id": data["user_id"],
+            # Documents written before versioning have no `version`
+            "version": expected_version or {"$in": [0, None]},
+        },
+        {"$set": document},
+    )
+    return bool(result.matched_count)
+
+
+async def bulk_upsert_versioned_aggregated_topic_attributes_repository(
+    data: tp.Sequence[tuple[dict[str, tp.Any], int | None]],
+    *,
+    database: AsyncIOMotorDatabase[tp.Any],
+    storage_format: AggregatedTopicAttributesStorageFormat = "subdocuments",
+) -> set[str]:
+    # Versioned counterpart of `upsert_versioned_aggregated_topic_attributes_repository`
+    # for `(data, expected_version)` pairs, returns `user_id`s of documents
+    # that have been modified concurrently
+    if any("user_id" not in item for item, _ in data):
+        raise ValueError("Missing user_id in data")
+
+    # A bulk write only reports how many filtered updates matched in total,
+    # so documents are written concurrently, each telling whether it matched
+    is_written = await asyncio.gather(
+        *(
+            upsert_versioned_aggregated_topic_attributes_repository(
+                item,
+                expected_version=expected_version,
+                database=database,
+                storage_format=storage_format,
+            )
+            for item, expected_version in data
+        )
+    )
+    return {
+        item["user_id"]
+        for (item, _), written in zip(data, is_written, strict=True)
+        if not written
+    }
+
+
+async def set_users_aggregated_topic_attributes_repository(
+    data: tp.Sequence[dict[str, tp.Any]],
+    *,
+    database: AsyncIOMotorDatabase[tp.Any],
+    storage_format: AggregatedTopicAttributesStorageFormat = "subdocuments",
+) -> None:
+    # Embeds written aggregated topic attributes in `users`. A late write of
+    # an older version doesn't override a newer one
+    if any("user_id" not in item for item in data):
+        raise ValueError("Missing user_id in data")
+
+    if not data:
+        return
+
+    await database["users"].bulk_write(
+        [
+            UpdateOne(
+                {
+                    "user_id": item["user_id"],
+                    "aggregated_topic_attributes.version": {
+                        "$not": {"$gte": item["version"]}
+                    },
+                },
+                {
+                    "$set": {
+                        "aggregated_topic_attributes": (
+                            encode_aggregated_topic_attributes_document(
+                                item, storage_format=storage_format
+                            )
+                        )
+                    }
+                },
+            )
+            for item in data
+        ],
+        ordered=False,
+    )
+
+
+async def merge_aggregated_topic_attributes_repository(
+    user_id: str,
+    pipeline: tp.Sequence[dict[str, tp.Any]],
+    *,
+    database: AsyncIOMotorDatabase[tp.Any],
+) -> None:
     await database["aggregated_topic_attributes"].update_one(
-        {"user_id": data["user_id"]},
-        {"$set": data},
+        {"user_id": user_id},
+        list(pipeline),
         upsert=True,
     )
+
+
+async def bulk_merge_aggregated_topic_attributes_repository(
+    pipelines: tp.Sequence[tuple[str, tp.Sequence[dict[str, tp.Any]]]],
+    *,
+    database: AsyncIOMotorDatabase[tp.Any],
+) -> None:
+    if not pipelines:
+        return
+
+    # Ordered, so updates of the same user are applied in event order
+    await database["aggregated_topic_attributes"].bulk_write(
+        [
+            UpdateOne(
+                {"user_id": user_id},
+                list(pipeline),
+                upsert=True,
+            )
+            for user_id, pipeline in pipelines
+        ],
+        ordered=True,
+    )
+
+
+@dataclass
+class _CachedAggregatedTopicAttributes:
+    aggregated_topic_attributes: AggregatedTopicAttributesDTO
+    # Version of the stored document, `None` if there is none
+    stored_version: int | None
+    # As of the stored document, the inverted index is updated with the
+    # difference to it
+    stored_aggregated_topic_attributes: AggregatedTopicAttributesDTO
+    # Events applied in memory but not written yet
+    pending_events: list[TopicAttributesEventBrokerDTO] = field(default_factory=list)
+
+
+class AggregatedTopicAttributesWriteBehindCache:
+    """Keeps recently touched users' aggregated topic attributes in memory.
+
+    Incoming events are merged into the cached documents, and dirty documents
+    are written with versioned updates on `flush`, or `flush_interval_ms`
+    milliseconds after they are applied otherwise, so writes scale with
+    distinct users rather than events.
+    Documents modified concurrently by another instance are read again and
+    the pending events replayed on top of them. At most `maxsize` users are
+    kept, clean ones are evicted least recently used first.
+    """
+
+    def __init__(
+        self,
+        *,
+        database: AsyncIOMotorDatabase[tp.Any],
+        maxsize: int = 10000,
+        flush_interval_ms: int = 1000,
+        max_attempts: int = 5,
+        base_delay_ms: int = 10,
+        max_delay_ms: int = 500,
+        half_life_days: float | None = None,
+        prune_weight: float = 0.0,
+        storage_format: AggregatedTopicAttributesStorageFormat = "subdocuments",
+        inverted_index: bool = False,
+        users_read_model: bool = False,
+    ) -> None:
+        self._database = database
+        self._maxsize = maxsize
+        self._flush_interval_ms = flush_interval_ms
+        self._max_attempts = max_attempts
+        self._base_delay_ms = base_delay_ms
+        self._max_delay_ms = max_delay_ms
+        self._half_life_days = half_life_days
+        self._prune_weight = prune_weight
+        self._storage_format = storage_format
+        self._inverted_index = inverted_index
+        self._users_read_model = users_read_model
+        self._entries: OrderedDict[str, _CachedAggregatedTopicAttributes] = (
+            OrderedDict()
+        )
+        self._lock = asyncio.Lock()
+        self._delayed_flush: asyncio.Task[None] | None = None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def dirty_user_ids(self) -> set[str]:
+        return {
+            user_id for user_id, entry in self._entries.items() if entry.pending_events
+        }
+
+    async def apply(
+        self,
+        incoming_topic_attributes_events: tp.Sequence[TopicAttributesEventBrokerDTO],
+    ) -> None:
+        async with self._lock:
+            await self._load(
+                {event.user_id for event in incoming_topic_attributes_events}
+                - set(self._entries)
+            )
+
+            incoming_topic_attributes_events_by_user_id: dict[
+                str, list[TopicAttributesEventBrokerDTO]
+            ] = {}
+            for incoming_topic_attributes_event in incoming_topic_attributes_events:
+                incoming_topic_attributes_events_by_user_id.setdefault(
+                    incoming_topic_attributes_event.user_id, []
+                ).append(incoming_topic_attributes_event)
+
+            for (
+                user_id,
+                user_events,
+            ) in incoming_topic_attributes_events_by_user_id.items():
+                entry = self._entries[user_id]
+                self._merge(entry, user_events)
+                entry.pending_events.extend(user_events)
+                self._entries.move_to_end(user_id)
+
+            get_counter("aggregated_topic_attributes.cached_events").inc(
+                len(incoming_topic_attributes_events)
+            )
+
+            if len(self._entries) > self._maxsize:
+                await self._flush_dirty()
+                while len(self._entries) > self._maxsize:
+                    self._entries.popitem(last=False)
+
+        if self.dirty_user_ids and self._delayed_flush is None:
+            self._delayed_flush = asyncio.create_task(self._flush_later())
+
+    async def flush(self) -> None:
+        if self._delayed_flush is not None:
+            self._delayed_flush.cancel()
+            self._delayed_flush = None
+
+        async with self._lock:
+            await self._flush_dirty()
+
+    async def close(self) -> None:
+        await self.flush()
+
+    async def _load(self, user_ids: set[str]) -> None:
+        if not user_ids:
+            return
+
+        documents = await get_aggregated_topic_attributes_by_user_ids_repository(
+            user_ids,
+            database=self._database,
+        )
+        for user_id in user_ids:
+            pending_events = (
+                self._entries[user_id].pending_events
+                if user_id in self._entries
+                else []
+            )
+            if user_id in documents:
+                aggregated_topic_attributes = (
+                    AggregatedTopicAttributesDTO.model_validate(documents[user_id])
+                )
+                stored_version: int | None = aggregated_topic_attributes.version
+            else:
+                aggregated_topic_attributes = AggregatedTopicAttributesDTO(
+                    user_id=user_id
+                )
+                stored_version = None
+
+            entry = _CachedAggregatedTopicAttributes(
+                aggregated_topic_attributes=aggregated_topic_attributes,
+                stored_version=stored_version,
+                stored_aggregated_topic_attributes=aggregated_topic_attributes,
+                pending_events=pending_events,
+            )
+            self._merge(entry, pending_events)
+            self._entries[user_id] = entry
+
+    def _merge(
+        self,
+        entry: _CachedAggregatedTopicAttributes,
+        incoming_topic_attributes_events: tp.Sequence[TopicAttributesEventBrokerDTO],
+    ) -> None:
+        entry.aggregated_topic_attributes = (
+            update_aggregated_topic_attributes_dto_based_on_topic_attributes_events(
+                entry.aggregated_topic_attributes,
+                incoming_topic_attributes_events,
+                half_life_days=self._half_life_days,
+                prune_weight=self._prune_weight,
+            )
+        )
+
+    async def _write_dirty(self) -> bool:
+        dirty_entries = {
+            user_id: entry
+            for user_id, entry in self._entries.items()
+            if entry.pending_events
+        }
+        if not dirty_entries:
+            return True
+
+        conflicted_user_ids = (
+            await bulk_upsert_versioned_aggregated_topic_attributes_repository(
+                [
+                    (
+                        entry.aggregated_topic_attributes.model_dump(),
+                        entry.stored_version,
+                    )
+                    for entry in dirty_entries.values()
+                ],
+                database=self._database,
+                storage_format=self._storage_format,
+            )
+        )
+
+        written_changes = []
+        for user_id, entry in dirty_entries.items():
+            if user_id in conflicted_user_ids:
+                continue
+            entry.stored_version = (entry.stored_version or 0) + 1
+            entry.aggregated_topic_attributes.version = entry.stored_version
+            written_changes.append(
+                (
+                    entry.stored_aggregated_topic_attributes,
+                    entry.aggregated_topic_attributes,
+                )
+            )
+            entry.stored_aggregated_topic_attributes = entry.aggregated_topic_attributes
+            get_summary("aggregated_topic_attributes.flush_coalesced_events").observe(
+                len(entry.pending_events)
+            )
+            entry.pending_events = []
+
+        if self._inverted_index:
+            await update_topic_attribute_users_repository(
+                written_changes, database=self._database
+            )
+        if self._users_read_model:
+            await set_users_aggregated_topic_attributes_repository(
+                [new.model_dump() for _, new in written_changes],
+                database=self._database,
+                storage_format=self._storage_format,
+            )
+
+        get_counter("aggregated_topic_attributes.updates").inc(len(dirty_entries))
+        get_counter("aggregated_topic_attributes.conflicts").inc(
+            len(conflicted_user_ids)
+        )
+
+        # Rebase the pending events of conflicted users on their current
+        # documents, they are written by the next attempt
+        await self._load(conflicted_user_ids)
+        return not conflicted_user_ids
+
+    async def _flush_dirty(self) -> None:
+        if not await retry_with_backoff(
+            self._write_dirty,
+            max_attempts=self._max_attempts,
+            base_delay_ms=self._base_delay_ms,
+            max_delay_ms=self._max_delay_ms,
+        ):
+            raise RuntimeError(
+                "Aggregated topic attributes of users "
+                f"{', '.join(sorted(self.dirty_user_ids))} have been modified "
+                f"concurrently {self._max_attempts} times in a row"
+            )
+
+    async def _flush_later(self) -> None:
+        await asyncio.sleep(self._flush_interval_ms / 1000)
+        # Detach before flushing so `flush` does not cancel this very task
+        self._delayed_flush = None
+        try:
+            await self.flush()
+        except Exception:
+            logger.exception(
+                "Failed to flush aggregated topic attributes of %d users",
+                len(self.dirty_user_ids),
+            )
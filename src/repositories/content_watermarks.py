@@ -0,0 +1,43 @@
+import typing as tp
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo.errors import DuplicateKeyError
+
+__all__ = [
+    "get_content_watermark_repository",
+    "upsert_content_watermark_repository",
+]
+
+
+async def get_content_watermark_repository(
+    user_id: str,
+    *,
+    database: AsyncIOMotorDatabase[tp.Any],
+) -> dict[str, tp.Any] | None:
+    document = await database["content_watermarks"].find_one({"user_id": user_id})
+
+    return document or None
+
+
+async def upsert_content_watermark_repository(
+    data: dict[str, tp.Any],
+    *,
+    database: AsyncIOMotorDatabase[tp.Any],
+) -> bool:
+    # Only moves the watermark forward, so a concurrent submission that has
+    # read less content doesn't move it back. Returns whether it was written
+    if "user_id" not in data:
+        raise ValueError("Missing user_id in data")
+
+    # A later watermark doesn't match the filter, so the upsert tries to
+    # insert another document and fails on the unique `user_id` index
+    try:
+        await database["content_watermarks"].update_one(
+            {"user_id": data["user_id"], "ts": {"$lte": data["ts"]}},
+            {"$set": data},
+            upsert=True,
+        )
+    except DuplicateKeyError:
+        return False
+
+    return True
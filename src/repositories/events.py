@@ -1,41 +1,246 @@
+import asyncio
+import logging
+import time
 import typing as tp
 import uuid
 from datetime import datetime
 
-from src.utils.olap import GetClickhouseConnection
+from asynch.cursors import DictCursor
+
+from src.dtos import TopicAttributesEventBrokerDTO
+from src.utils.metrics import get_counter, get_summary
+from src.utils.olap import GetClickhouseConnection, execute_columnar_insert
 
 __all__ = [
-    "insert_content_event_repository",
+    "CONTENT_EVENTS_COLUMNS",
+    "ContentEventsBatchWriter",
+    "insert_content_events_repository",
     "insert_topic_attributes_event_repository",
-    "get_content_events_repository",
+    "insert_topic_attributes_events_repository",
+    "insert_topic_attributes_events_columnar_repository",
+    "iter_content_events_repository",
+    "TOPIC_ATTRIBUTES_AGGREGATE_KEYS",
+    "iter_topic_attributes_events_repository",
+    "iter_topic_attributes_aggregates_repository",
 ]
 
 
-async def insert_content_event_repository(
-    content_event_uuid: uuid.UUID,
-    user_id: str,
-    content: str,
-    ts: datetime,
+logger = logging.getLogger(__name__)
+
+type ContentEventRow = tuple[uuid.UUID, str, str, datetime]
+type TopicAttributesEventRow = tuple[
+    uuid.UUID,
+    uuid.UUID,
+    str,
+    tp.Sequence[str],
+    tp.Sequence[float],
+    tp.Sequence[str],
+    tp.Sequence[float],
+    tp.Sequence[str],
+    tp.Sequence[str],
+    tp.Sequence[float],
+    datetime,
+]
+
+# Selectable columns of `content_events` by the name they are returned under
+CONTENT_EVENTS_COLUMNS = {
+    "content_event_uuid": "content_event_uuid",
+    "user_id": "user_id",
+    "content": "content",
+    "timestamp": "ts AS timestamp",
+}
+
+
+async def insert_content_events_repository(
+    rows: tp.Iterable[ContentEventRow],
     *,
     get_connection: GetClickhouseConnection,
 ) -> None:
-    async with get_connection() as connection:
-        async with connection.cursor() as cursor:
-            await cursor.execute(
-                """
-                INSERT INTO content_events
-                (content_event_uuid, user_id, content, ts)
-                VALUES
-                """,
-                [
-                    (
-                        str(content_event_uuid),
-                        user_id,
-                        content,
-                        str(ts),
-                    ),
-                ],
+    async with get_connection() as connection, connection.cursor() as cursor:
+        await cursor.execute(
+            """
+            INSERT INTO content_events
+            (content_event_uuid, user_id, content, ts)
+            VALUES
+            """,
+            [
+                (
+                    str(content_event_uuid),
+                    user_id,
+                    content,
+                    str(ts),
+                )
+                for content_event_uuid, user_id, content, ts in rows
+            ],
+        )
+
+
+class ContentEventsBatchWriter:
+    """Buffers content events in memory and writes them with one INSERT.
+
+    The buffer is flushed once it holds `max_rows` rows or `max_delay_ms`
+    milliseconds after the first row was buffered, whichever comes first.
+    Rows of a failed flush are put back in front of the buffer and retried
+    with exponential backoff up to `max_retry_delay_ms`. Meanwhile rows keep
+    being buffered up to `max_buffered_rows`, past which appends wait for a
+    flush to free space.
+    `on_flush` is called with every chunk of rows once it is written.
+    """
+
+    def __init__(
+        self,
+        *,
+        get_connection: GetClickhouseConnection,
+        max_rows: int = 1000,
+        max_delay_ms: int = 1000,
+        max_buffered_rows: int = 10000,
+        max_retry_delay_ms: int = 30000,
+        on_flush: tp.Callable[[tp.Sequence[ContentEventRow]], None] | None = None,
+    ) -> None:
+        self._get_connection = get_connection
+        self._max_rows = max_rows
+        self._max_delay_ms = max_delay_ms
+        self._max_buffered_rows = max_buffered_rows
+        self._max_retry_delay_ms = max_retry_delay_ms
+        self._on_flush = on_flush
+        self._rows: list[ContentEventRow] = []
+        self._lock = asyncio.Lock()
+        self._delayed_flush: asyncio.Task[None] | None = None
+        # Consecutive failed flushes, the retry of the last one is pending
+        self._failures = 0
+        # Cleared while the buffer is full
+        self._has_space = asyncio.Event()
+        self._has_space.set()
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    async def append(
+        self,
+        content_event_uuid: uuid.UUID,
+        user_id: str,
+        content: str,
+        ts: datetime,
+    ) -> None:
+        if len(self._rows) >= self._max_buffered_rows:
+            get_counter("content_events.buffer_full").inc()
+        # Holds the consumer back, leaving further events in Kafka, until a
+        # flush, retried with backoff while ClickHouse fails, frees space
+        while len(self._rows) >= self._max_buffered_rows:
+            self._has_space.clear()
+            self._schedule_flush()
+            await self._has_space.wait()
+
+        self._rows.append((content_event_uuid, user_id, content, ts))
+
+        # While ClickHouse fails, rows wait for the pending retry instead of
+        # flushing the growing buffer on every append
+        if self._failures == 0 and len(self._rows) >= self._max_rows:
+            try:
+                await self.flush()
+            except Exception:
+                logger.exception("Failed to flush %d content events", len(self._rows))
+        else:
+            self._schedule_flush()
+
+    async def flush(self) -> None:
+        if self._delayed_flush is not None:
+            self._delayed_flush.cancel()
+            self._delayed_flush = None
+
+        async with self._lock:
+            while self._rows:
+                rows = self._rows[: self._max_rows]
+                del self._rows[: self._max_rows]
+
+                started_at = time.perf_counter()
+                try:
+                    await insert_content_events_repository(
+                        rows,
+                        get_connection=self._get_connection,
+                    )
+                except Exception:
+                    self._rows[:0] = rows
+                    self._failures += 1
+                    get_counter("content_events.flush_failures").inc()
+                    self._schedule_flush()
+                    raise
+
+                self._failures = 0
+                if len(self._rows) < self._max_buffered_rows:
+                    self._has_space.set()
+                if self._on_flush is not None:
+                    self._on_flush(rows)
+                latency_ms = (time.perf_counter() - started_at) * 1000
+                get_summary("content_events.flush_rows").observe(len(rows))
+                get_summary("content_events.flush_latency_ms").observe(latency_ms)
+                logger.debug(
+                    "Flushed %d content events in %.1f ms", len(rows), latency_ms
+                )
+
+    async def close(self) -> None:
+        try:
+            await self.flush()
+        finally:
+            if self._delayed_flush is not None:
+                self._delayed_flush.cancel()
+                self._delayed_flush = None
+
+    def _schedule_flush(self) -> None:
+        if self._delayed_flush is not None:
+            return
+
+        delay_ms = self._max_delay_ms
+        if self._failures:
+            delay_ms = min(
+                self._max_retry_delay_ms, self._max_delay_ms * 2**self._failures
             )
+        self._delayed_flush = asyncio.create_task(self._flush_later(delay_ms))
+
+    async def _flush_later(self, delay_ms: int) -> None:
+        await asyncio.sleep(delay_ms / 1000)
+        # Detach before flushing so `flush` does not cancel this very task
+        self._delayed_flush = None
+        try:
+            await self.flush()
+        except Exception:
+            # `flush` has scheduled the next attempt
+            logger.exception("Failed to flush %d content events", len(self._rows))
+
+
+async def insert_topic_attributes_events_repository(
+    rows: tp.Iterable[TopicAttributesEventRow],
+    *,
+    get_connection: GetClickhouseConnection,
+) -> None:
+    async with get_connection() as connection, connection.cursor() as cursor:
+        await cursor.execute(
+            """
+            INSERT INTO topic_attributes_events
+                (topic_attributes_event_uuid, content_event_uuid, user_id,
+                 sentiments.name, sentiments.weight,
+                 keywords.name,   keywords.weight,
+                 entities.category, entities.name, entities.weight,
+                 ts)
+            VALUES
+            """,
+            [
+                (
+                    str(topic_attributes_event_uuid),
+                    str(content_event_uuid),
+                    user_id,
+                    *attributes,
+                    str(ts),
+                )
+                for (
+                    topic_attributes_event_uuid,
+                    content_event_uuid,
+                    user_id,
+                    *attributes,
+                    ts,
+                ) in rows
+            ],
+        )
 
 
 async def insert_topic_attributes_event_repository(
@@ -53,52 +258,335 @@ async def insert_topic_attributes_event_repository(
     *,
     get_connection: GetClickhouseConnection,
 ) -> None:
+    await insert_topic_attributes_events_repository(
+        [
+            (
+                topic_attributes_event_uuid,
+                content_event_uuid,
+                user_id,
+                sentiments_names,
+                sentiments_weights,
+                keywords_names,
+                keywords_weights,
+                entities_categories,
+                entities_names,
+                entities_weights,
+                ts,
+            ),
+        ],
+        get_connection=get_connection,
+    )
+
+
+async def insert_topic_attributes_events_columnar_repository(
+    events: tp.Sequence[TopicAttributesEventBrokerDTO],
+    *,
+    get_connection: GetClickhouseConnection,
+) -> None:
+    if not events:
+        return
+
+    # Nested columns are sent as `Array` columns: one list of values per row
+    topic_attributes_event_uuids: list[uuid.UUID] = []
+    content_event_uuids: list[uuid.UUID] = []
+    user_ids: list[str] = []
+    sentiments_names: list[list[str]] = []
+    sentiments_weights: list[list[float]] = []
+    keywords_names: list[list[str]] = []
+    keywords_weights: list[list[float]] = []
+    entities_categories: list[list[str]] = []
+    entities_names: list[list[str]] = []
+    entities_weights: list[list[float]] = []
+    timestamps: list[datetime] = []
+
+    for event in events:
+        topic_attributes_event_uuids.append(event.topic_attributes_event_uuid)
+        content_event_uuids.append(event.content_event_uuid)
+        user_ids.append(event.user_id)
+        sentiments_names.append([item.name for item in event.sentiments])
+        sentiments_weights.append([item.weight for item in event.sentiments])
+        keywords_names.append([item.name for item in event.keywords])
+        keywords_weights.append([item.weight for item in event.keywords])
+        entities_categories.append([item.category for item in event.entities])
+        entities_names.append([item.name for item in event.entities])
+        entities_weights.append([item.weight for item in event.entities])
+        timestamps.append(event.timestamp)
+
     async with get_connection() as connection:
-        async with connection.cursor() as cursor:
-            await cursor.execute(
-                """
-                INSERT INTO topic_attributes_events
-                    (topic_attributes_event_uuid, content_event_uuid, user_id,
-                     sentiments.name, sentiments.weight,
-                     keywords.name,   keywords.weight,
-                     entities.category, entities.name, entities.weight,
-                     ts)
-                VALUES
-                """,
-                [
-                    (
-                        str(topic_attributes_event_uuid),
-                        str(content_event_uuid),
-                        user_id,
-                        sentiments_names,
-                        sentiments_weights,
-                        keywords_names,
-                        keywords_weights,
-                        entities_categories,
-                        entities_names,
-                        entities_weights,
-                        str(ts),
-                    ),
-                ],
-            )
+        await execute_columnar_insert(
+            connection,
+            """
+            INSERT INTO topic_attributes_events
+                (topic_attributes_event_uuid, content_event_uuid, user_id,
+                 sentiments.name, sentiments.weight,
+                 keywords.name,   keywords.weight,
+                 entities.category, entities.name, entities.weight,
+                 ts)
+            VALUES
+            """,
+            (
+                topic_attributes_event_uuids,
+                content_event_uuids,
+                user_ids,
+                sentiments_names,
+                sentiments_weights,
+                keywords_names,
+                keywords_weights,
+                entities_categories,
+                entities_names,
+                entities_weights,
+                timestamps,
+            ),
+        )
 
 
-async def get_content_events_repository(
+async def iter_content_events_repository(
     user_id: str,
     *,
+    columns: tp.Sequence[str] | None = None,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    after: tuple[datetime, uuid.UUID] | None = None,
+    limit: int | None = None,
+    chunk_size: int,
     get_connection: GetClickhouseConnection,
-) -> list[tp.Any]:
-    async with get_connection() as connection:
-        async with connection.cursor() as cursor:
-            await cursor.execute(
-                """
-                SELECT *
-                FROM content_events
-                WHERE user_id = %(user_id)s
-                """,
-                {"user_id": user_id},
-            )
+) -> tp.AsyncGenerator[list[dict[str, tp.Any]]]:
+    columns = list(CONTENT_EVENTS_COLUMNS) if columns is None else columns
+    unknown_columns = set(columns) - set(CONTENT_EVENTS_COLUMNS)
+    if unknown_columns:
+        raise ValueError(f"Unknown columns: {', '.join(sorted(unknown_columns))}")
+
+    conditions = ["user_id = %(user_id)s"]
+    params: dict[str, tp.Any] = {"user_id": user_id}
+    if since is not None:
+        conditions.append("ts >= toDateTime(%(since)s)")
+        params["since"] = since
+    if until is not None:
+        conditions.append("ts < toDateTime(%(until)s)")
+        params["until"] = until
+    if after is not None:
+        # Keyset condition, served from the `ORDER BY` key whatever the depth
+        conditions.append(
+            "(ts, content_event_uuid) > "
+            "(toDateTime(%(after_ts)s), toUUID(%(after_content_event_uuid)s))"
+        )
+        params["after_ts"] = after[0]
+        params["after_content_event_uuid"] = str(after[1])
+
+    select = ", ".join(CONTENT_EVENTS_COLUMNS[column] for column in columns)
+    limit_clause = "" if limit is None else f"LIMIT {int(limit)}"
+
+    async with get_connection() as connection, connection.cursor(DictCursor) as cursor:
+        # Rows are pulled from the server block by block instead of being
+        # materialized on `execute`
+        cursor.set_stream_results(True, chunk_size)
+        await cursor.execute(
+            f"""
+            SELECT {select}
+            FROM content_events FINAL
+            WHERE {" AND ".join(conditions)}
+            ORDER BY ts, content_event_uuid
+            {limit_clause}
+            """,
+            params,
+        )
+
+        while rows := await cursor.fetchmany(chunk_size):
+            yield rows
+
+
+def _build_topic_attributes_events_conditions(
+    *,
+    user_id: str | None,
+    since: datetime | None,
+    until: datetime | None,
+    keywords: tp.Sequence[str],
+    entities: tp.Sequence[str],
+    sentiments: tp.Sequence[str],
+) -> tuple[list[str], dict[str, tp.Any]]:
+    conditions = []
+    params: dict[str, tp.Any] = {}
+    if user_id is not None:
+        conditions.append("user_id = %(user_id)s")
+        params["user_id"] = user_id
+    if since is not None:
+        conditions.append("ts >= toDateTime(%(since)s)")
+        params["since"] = since
+    if until is not None:
+        conditions.append("ts < toDateTime(%(until)s)")
+        params["until"] = until
+
+    # Name filters are evaluated by ClickHouse on the Nested columns, an event
+    # matches when any of its names is among the requested ones
+    for attribute, names in (
+        ("keywords", keywords),
+        ("entities", entities),
+        ("sentiments", sentiments),
+    ):
+        if names:
+            conditions.append(f"hasAny({attribute}.name, %({attribute})s)")
+            params[attribute] = list(names)
+
+    return conditions or ["1"], params
+
+
+# Nested columns are returned as parallel arrays under flat names
+TOPIC_ATTRIBUTES_EVENTS_SELECT = """
+    topic_attributes_event_uuid,
+    content_event_uuid,
+    user_id,
+    sentiments.name AS sentiments_name,
+    sentiments.weight AS sentiments_weight,
+    keywords.name AS keywords_name,
+    keywords.weight AS keywords_weight,
+    entities.category AS entities_category,
+    entities.name AS entities_name,
+    entities.weight AS entities_weight,
+    ts AS timestamp
+"""
+
+
+async def get_topic_attributes_event_repository(
+    topic_attributes_event_uuid: uuid.UUID,
+    *,
+    get_connection: GetClickhouseConnection,
+) -> dict[str, tp.Any] | None:
+    async with get_connection() as connection, connection.cursor(DictCursor) as cursor:
+        # Served by the `topic_attributes_event_uuid` bloom filter index
+        await cursor.execute(
+            f"""
+            SELECT {TOPIC_ATTRIBUTES_EVENTS_SELECT}
+            FROM topic_attributes_events
+            WHERE topic_attributes_event_uuid
+                = toUUID(%(topic_attributes_event_uuid)s)
+            LIMIT 1
+            """,
+            {"topic_attributes_event_uuid": str(topic_attributes_event_uuid)},
+        )
+
+        row: dict[str, tp.Any] | None = await cursor.fetchone()
+        return row
+
+
+async def iter_topic_attributes_events_repository(
+    *,
+    user_id: str,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    keywords: tp.Sequence[str] = (),
+    entities: tp.Sequence[str] = (),
+    sentiments: tp.Sequence[str] = (),
+    after: tuple[datetime, uuid.UUID] | None = None,
+    limit: int | None = None,
+    chunk_size: int,
+    get_connection: GetClickhouseConnection,
+) -> tp.AsyncGenerator[list[dict[str, tp.Any]]]:
+    # Events of a single user are read in the order of the sorting key
+    # `(user_id, ts, topic_attributes_event_uuid)`, listing every user's
+    # events would scan and sort the whole table
+    conditions, params = _build_topic_attributes_events_conditions(
+        user_id=user_id,
+        since=since,
+        until=until,
+        keywords=keywords,
+        entities=entities,
+        sentiments=sentiments,
+    )
+    if after is not None:
+        conditions.append(
+            "(ts, topic_attributes_event_uuid) > "
+            "(toDateTime(%(after_ts)s), toUUID(%(after_topic_attributes_event_uuid)s))"
+        )
+        params["after_ts"] = after[0]
+        params["after_topic_attributes_event_uuid"] = str(after[1])
+
+    limit_clause = "" if limit is None else f"LIMIT {int(limit)}"
+
+    async with get_connection() as connection, connection.cursor(DictCursor) as cursor:
+        cursor.set_stream_results(True, chunk_size)
+        await cursor.execute(
+            f"""
+            SELECT {TOPIC_ATTRIBUTES_EVENTS_SELECT}
+            FROM topic_attributes_events
+            WHERE {" AND ".join(conditions)}
+            ORDER BY ts, topic_attributes_event_uuid
+            {limit_clause}
+            """,
+            params,
+        )
+
+        while rows := await cursor.fetchmany(chunk_size):
+            yield rows
+
+
+# Columns an aggregate of `topic_attributes_events` is grouped by, per Nested
+# column
+TOPIC_ATTRIBUTES_AGGREGATE_KEYS = {
+    "keywords": ("name",),
+    "entities": ("category", "name"),
+    "sentiments": ("name",),
+}
+
+
+async def iter_topic_attributes_aggregates_repository(
+    group_by: str,
+    *,
+    user_id: str | None = None,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    keywords: tp.Sequence[str] = (),
+    entities: tp.Sequence[str] = (),
+    sentiments: tp.Sequence[str] = (),
+    after: tp.Sequence[str] | None = None,
+    limit: int | None = None,
+    chunk_size: int,
+    get_connection: GetClickhouseConnection,
+) -> tp.AsyncGenerator[list[dict[str, tp.Any]]]:
+    if group_by not in TOPIC_ATTRIBUTES_AGGREGATE_KEYS:
+        raise ValueError(f"Unknown group_by: {group_by}")
+
+    keys = TOPIC_ATTRIBUTES_AGGREGATE_KEYS[group_by]
+    conditions, params = _build_topic_attributes_events_conditions(
+        user_id=user_id,
+        since=since,
+        until=until,
+        keywords=keywords,
+        entities=entities,
+        sentiments=sentiments,
+    )
+    if after is not None:
+        if len(after) != len(keys):
+            raise ValueError("Cursor does not match group_by")
+        conditions.append(
+            f"({', '.join(keys)}) > ({', '.join(f'%(after_{key})s' for key in keys)})"
+        )
+        params.update({f"after_{key}": value for key, value in zip(keys, after)})
+
+    array_join = ", ".join(
+        [f"{group_by}.{key} AS {key}" for key in keys]
+        + [f"{group_by}.weight AS weight"]
+    )
+    limit_clause = "" if limit is None else f"LIMIT {int(limit)}"
 
-            rows = await cursor.fetchall()
+    async with get_connection() as connection, connection.cursor(DictCursor) as cursor:
+        cursor.set_stream_results(True, chunk_size)
+        await cursor.execute(
+            f"""
+            SELECT
+                {", ".join(keys)},
+                count() AS count,
+                sum(weight) AS weight_sum,
+                avg(weight) AS weight_avg,
+                max(weight) AS weight_max
+            FROM topic_attributes_events
+            ARRAY JOIN {array_join}
+            WHERE {" AND ".join(conditions)}
+            GROUP BY {", ".join(keys)}
+            ORDER BY {", ".join(keys)}
+            {limit_clause}
+            """,
+            params,
+        )
 
-            return list(rows)
+        while rows := await cursor.fetchmany(chunk_size):
+            yield rows
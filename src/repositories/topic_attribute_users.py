@@ -0,0 +1,101 @@
+import typing as tp
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import UpdateOne
+
+from src.dtos import AggregatedTopicAttributesDTO
+from src.utils.aggregated_topic_attributes import (
+    WEIGHTED_ITEM_KEY_FIELDS,
+    diff_aggregated_topic_attributes_dto,
+)
+
+__all__ = [
+    "update_topic_attribute_users_repository",
+]
+
+
+def build_topic_attribute_user_filter(
+    field: str,
+    item: tp.Mapping[str, tp.Any],
+    *,
+    user_id: str,
+) -> dict[str, tp.Any]:
+    return {
+        "attribute_type": field,
+        **{key_field: item[key_field] for key_field in WEIGHTED_ITEM_KEY_FIELDS[field]},
+        "user_id": user_id,
+    }
+
+
+def build_versioned_set_stage(
+    values: tp.Mapping[str, tp.Any],
+    *,
+    version: int,
+) -> dict[str, tp.Any]:
+    # Sets `values` unless the document holds the same or a newer version
+    return {
+        "$set": {
+            name: {
+                "$cond": [
+                    {"$lt": ["$version", version]},
+                    {"$literal": value},
+                    f"${name}",
+                ]
+            }
+            for name, value in {**values, "version": version}.items()
+        }
+    }
+
+
+async def update_topic_attribute_users_repository(
+    changes: tp.Sequence[
+        tuple[AggregatedTopicAttributesDTO, AggregatedTopicAttributesDTO]
+    ],
+    *,
+    database: AsyncIOMotorDatabase[tp.Any],
+) -> None:
+    # Applies `(old, new)` pairs of written aggregated topic attributes to
+    # `topic_attribute_users`, which holds one document per keyword, entity
+    # and sentiment of every user. Only items added, updated or removed by
+    # the merge are written. `new.version` is the written version, so a late
+    # write of an older version doesn't override a newer one.
+    #
+    # Removed items are kept as tombstones flagged `removed` with the version
+    # that removed them, so a late write of an older version doesn't bring
+    # them back. Listings only read documents not `removed`
+    operations: list[UpdateOne] = []
+    for old, new in changes:
+        changed_items, removed_items = diff_aggregated_topic_attributes_dto(old, new)
+        for field, item in changed_items:
+            data = item.model_dump()
+            operations.append(
+                UpdateOne(
+                    build_topic_attribute_user_filter(field, data, user_id=new.user_id),
+                    [
+                        build_versioned_set_stage(
+                            {
+                                "weight": data["weight"],
+                                "updated_at": data["updated_at"],
+                                "removed": False,
+                            },
+                            version=new.version,
+                        )
+                    ],
+                    upsert=True,
+                )
+            )
+        operations.extend(
+            UpdateOne(
+                build_topic_attribute_user_filter(
+                    field, item.model_dump(), user_id=new.user_id
+                ),
+                [build_versioned_set_stage({"removed": True}, version=new.version)],
+                upsert=True,
+            )
+            for field, item in removed_items
+        )
+
+    if not operations:
+        return
+
+    await database["topic_attribute_users"].bulk_write(operations, ordered=False)
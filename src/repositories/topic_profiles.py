@@ -3,6 +3,7 @@ import typing as tp
 from motor.motor_asyncio import AsyncIOMotorDatabase
 
 __all__ = [
+    "set_users_topic_profile_repository",
     "upsert_topic_profile_repository",
 ]
 
@@ -20,3 +21,27 @@ async def upsert_topic_profile_repository(
         {"$set": data},
         upsert=True,
     )
+
+
+async def set_users_topic_profile_repository(
+    data: dict[str, tp.Any],
+    *,
+    database: AsyncIOMotorDatabase[tp.Any],
+) -> None:
+    if "user_id" not in data:
+        raise ValueError("Missing user_id in data")
+    if "updated_at" not in data:
+        raise ValueError("Missing updated_at in data")
+
+    # Profiles of users not created yet are embedded on creation. A profile
+    # delivered out of order never replaces a newer one
+    await database["users"].update_one(
+        {
+            "user_id": data["user_id"],
+            "$or": [
+                {"topic_profile.updated_at": {"$lt": data["updated_at"]}},
+                {"topic_profile": {"$exists": False}},
+            ],
+        },
+        {"$set": {"topic_profile": data}},
+    )
@@ -1,40 +1,393 @@
+import asyncio
 import typing as tp
 
 from fastapi_pagination import Params
-from fastapi_pagination.ext.motor import apaginate_aggregate
+from fastapi_pagination.api import apply_items_transformer, create_page
 from fastapi_pagination.types import AsyncItemsTransformer
+from fastapi_pagination.utils import verify_params
 from motor.motor_asyncio import AsyncIOMotorDatabase
 
+from src.utils.aggregated_topic_attributes import build_decayed_weight_expression
+from src.utils.caches import TTLCache
+
+from .aggregated_topic_attributes import (
+    build_decoded_weighted_items_expression,
+    decode_aggregated_topic_attributes_document,
+)
+from .users_read_model import USERS_READ_MODEL_FIELDS
+
 __all__ = [
+    "UsersTotalCacheKey",
     "get_users_with_topic_info_paginated_repository",
+    "get_users_with_topic_info_keyset_repository",
     "get_user_with_topic_info_repository",
+    "get_user_with_embedded_topic_info_repository",
     "get_user_repository",
     "insert_user_repository",
 ]
 
+UsersTotalCacheKey = tuple[tuple[str, ...], tuple[str, ...], tuple[str, ...]]
+
+# Fields users are scored with by each list they are filtered by
+MAX_WEIGHT_FIELDS = {
+    "keywords": "maxKeywordWeight",
+    "entities": "maxEntityWeight",
+    "sentiments": "maxSentimentWeight",
+}
+
 
 def build_get_users_with_topic_info_pipeline(
     keywords: tp.Sequence[str] = (),
     entities: tp.Sequence[str] = (),
     sentiments: tp.Sequence[str] = (),
+    half_life_days: float | None = None,
+    offset: int = 0,
+    limit: int | None = None,
+    after: tuple[tp.Sequence[float | None], str] | None = None,
+    count_total: bool = True,
+    inverted_index: bool = False,
 ) -> list[dict[str, tp.Any]]:
+    # Returns a single document with the number of matching users in
+    # `metadata` and the requested page in `data`, or only the users of the
+    # page unless `count_total`. Filters run first, so only the users of the
+    # page are scored, joined and returned.
+    #
+    # `after` is the sort key of the last user of the previous page, i.e.
+    # the max keyword, entity and sentiment weights and the `user_id`. Users
+    # are then listed from past it rather than skipped, so every page costs
+    # the same.
+    #
+    # With `inverted_index`, listings filtered by a single list are read from
+    # `topic_attribute_users` in the order of its weight index instead
     keywords = list(keywords)
     entities = list(entities)
     sentiments = list(sentiments)
+    inverted_index_field = (
+        get_topic_attribute_users_field(keywords, entities, sentiments, half_life_days)
+        if inverted_index
+        else None
+    )
+
+    # Users are scored by weights decayed to the time of the query, if enabled
+    def build_weight_expression(item_expression: str) -> tp.Any:
+        if half_life_days is None:
+            return f"{item_expression}.weight"
+        return build_decayed_weight_expression(
+            item_expression,
+            weight_field="weight",
+            timestamp_field="updated_at",
+            half_life_days=half_life_days,
+        )
+
+    # Only the fields used for scoring are decoded from the columnar format
+    def build_items_expression(field: str) -> tp.Any:
+        return build_decoded_weighted_items_expression(
+            f"$aggregated_topic_attributes.{field}",
+            item_fields=("name", "weight", "updated_at"),
+        )
+
+    def build_max_weight_expression(
+        field: str, names: list[str], variable: str
+    ) -> dict[str, tp.Any]:
+        return {
+            "$max": {
+                "$map": {
+                    "input": {
+                        "$filter": {
+                            "input": build_items_expression(field),
+                            "as": variable,
+                            "cond": {"$in": [f"$${variable}.name", names]},
+                        }
+                    },
+                    "as": variable,
+                    "in": build_weight_expression(f"$${variable}"),
+                }
+            }
+        }
+
+    match_stage: dict[str, tp.Any] = {}
+    if keywords:
+        match_stage["keywords.name"] = {"$in": keywords}
+    if entities:
+        match_stage["entities.name"] = {"$in": entities}
+    if sentiments:
+        match_stage["sentiments.name"] = {"$in": sentiments}
 
     pipeline: list[dict[str, tp.Any]] = []
+    page_pipeline: list[dict[str, tp.Any]] = []
 
-    pipeline.append(
+    seek_stage = (
         {
-            "$lookup": {
-                "from": "aggregated_topic_attributes",
-                "localField": "user_id",
-                "foreignField": "user_id",
-                "as": "aggregated_topic_attributes",
-            }
+            "$match": {
+                "$expr": build_seek_expression(
+                    [
+                        "$maxKeywordWeight",
+                        "$maxEntityWeight",
+                        "$maxSentimentWeight",
+                    ],
+                    "$aggregated_topic_attributes.user_id",
+                    after,
+                )
+            },
         }
+        if after is not None
+        else None
     )
-    pipeline.append(
+
+    if inverted_index_field is not None:
+        names = {
+            "keywords": keywords,
+            "entities": entities,
+            "sentiments": sentiments,
+        }[inverted_index_field]
+        pipeline.append(
+            {
+                "$match": {
+                    "attribute_type": inverted_index_field,
+                    "name": {"$in": names},
+                    "removed": False,
+                },
+            }
+        )
+        # A user holding several of the names, or an entity name in several
+        # categories, is listed once by the max weight. Grouping reads all
+        # of them, a single keyword or sentiment is read in index order only
+        # up to the page
+        is_grouped = len(set(names)) > 1 or inverted_index_field == "entities"
+        if is_grouped:
+            pipeline.append(
+                {
+                    "$group": {"_id": "$user_id", "weight": {"$max": "$weight"}},
+                }
+            )
+            pipeline.append(
+                {
+                    "$project": {"_id": 0, "user_id": "$_id", "weight": 1},
+                }
+            )
+        if after is not None and not count_total:
+            # Past the previous pages in the index, a missing weight sorts
+            # after all of them
+            weight = after[0][list(MAX_WEIGHT_FIELDS).index(inverted_index_field)]
+            pipeline.append(
+                {
+                    "$match": {
+                        "$or": [
+                            {"weight": {"$lt": weight}},
+                            {"weight": weight, "user_id": {"$gt": after[1]}},
+                        ]
+                    },
+                }
+            )
+        pipeline.append(
+            {
+                "$sort": {"weight": -1, "user_id": 1},
+            }
+        )
+        pipeline.append(
+            {
+                "$lookup": {
+                    "from": "users",
+                    "localField": "user_id",
+                    "foreignField": "user_id",
+                    "pipeline": [{"$project": {"_id": 0, "user_id": 1}}],
+                    "as": "user",
+                }
+            }
+        )
+        pipeline.append(
+            {
+                "$match": {"user": {"$ne": []}},
+            }
+        )
+        # Shaped as scored users of `aggregated_topic_attributes`, the
+        # documents themselves are looked up for the page only
+        pipeline.append(
+            {
+                "$project": {
+                    "_id": 0,
+                    "aggregated_topic_attributes": {"user_id": "$user_id"},
+                    **{
+                        max_weight_field: (
+                            "$weight"
+                            if field == inverted_index_field
+                            else {"$literal": None}
+                        )
+                        for field, max_weight_field in MAX_WEIGHT_FIELDS.items()
+                    },
+                },
+            }
+        )
+
+        if seek_stage is not None and count_total:
+            page_pipeline.append(seek_stage)
+    elif match_stage:
+        # Runs on `aggregated_topic_attributes`, see
+        # `get_users_with_topic_info_collection`, so the filters use the name
+        # indexes
+        pipeline.append(
+            {
+                "$match": match_stage,
+            }
+        )
+        # Topic attributes of users that don't exist are not listed. Only the
+        # `user_id` is looked up, which the index covers
+        pipeline.append(
+            {
+                "$lookup": {
+                    "from": "users",
+                    "localField": "user_id",
+                    "foreignField": "user_id",
+                    "pipeline": [{"$project": {"_id": 0, "user_id": 1}}],
+                    "as": "user",
+                }
+            }
+        )
+        pipeline.append(
+            {
+                "$match": {"user": {"$ne": []}},
+            }
+        )
+        pipeline.append(
+            {
+                "$project": {"aggregated_topic_attributes": "$$ROOT"},
+            }
+        )
+
+        page_pipeline.append(
+            {
+                "$addFields": {
+                    "maxKeywordWeight": build_max_weight_expression(
+                        "keywords", keywords, "t"
+                    ),
+                    "maxEntityWeight": build_max_weight_expression(
+                        "entities", entities, "e"
+                    ),
+                    "maxSentimentWeight": build_max_weight_expression(
+                        "sentiments", sentiments, "s"
+                    ),
+                },
+            }
+        )
+        # Decayed weights are as of the time of the query, a user whose
+        # weights decayed faster than the others' may move across pages
+        if seek_stage is not None:
+            page_pipeline.append(seek_stage)
+        # Followed by `$limit`, so only the top `offset + limit` are kept
+        page_pipeline.append(
+            {
+                "$sort": {
+                    "maxKeywordWeight": -1,
+                    "maxEntityWeight": -1,
+                    "maxSentimentWeight": -1,
+                    # Ties are broken so that pages don't overlap
+                    "aggregated_topic_attributes.user_id": 1,
+                },
+            }
+        )
+    else:
+        # Unfiltered users all score the same, so they are listed in the
+        # order of the `user_id` index instead of being scored and sorted
+        pipeline.append(
+            {
+                "$sort": {"user_id": 1},
+            }
+        )
+        if after is not None:
+            # Unless the users are counted, the seek starts past the previous
+            # pages in the index rather than scanning them
+            (page_pipeline if count_total else pipeline).append(
+                {
+                    "$match": {"user_id": {"$gt": after[1]}},
+                }
+            )
+
+    if offset:
+        page_pipeline.append({"$skip": offset})
+    if limit is not None:
+        page_pipeline.append({"$limit": limit})
+
+    if inverted_index_field is not None:
+        # Users whose document is gone, i.e. stale entries, are dropped
+        page_pipeline.append(
+            {
+                "$lookup": {
+                    "from": "aggregated_topic_attributes",
+                    "localField": "aggregated_topic_attributes.user_id",
+                    "foreignField": "user_id",
+                    "as": "aggregated_topic_attributes",
+                }
+            }
+        )
+        page_pipeline.append(
+            {
+                "$unwind": {
+                    "path": "$aggregated_topic_attributes",
+                },
+            },
+        )
+
+    if match_stage:
+        page_pipeline.append(
+            {
+                "$lookup": {
+                    "from": "users",
+                    "localField": "aggregated_topic_attributes.user_id",
+                    "foreignField": "user_id",
+                    "as": "user",
+                }
+            }
+        )
+        page_pipeline.append(
+            {
+                "$unwind": {
+                    "path": "$user",
+                },
+            },
+        )
+        page_pipeline.append(
+            {
+                "$replaceWith": {
+                    "$mergeObjects": [
+                        "$user",
+                        {
+                            "aggregated_topic_attributes": (
+                                "$aggregated_topic_attributes"
+                            ),
+                            "maxKeywordWeight": "$maxKeywordWeight",
+                            "maxEntityWeight": "$maxEntityWeight",
+                            "maxSentimentWeight": "$maxSentimentWeight",
+                        },
+                    ]
+                },
+            }
+        )
+        page_pipeline.append(
+            {
+                "$unset": "aggregated_topic_attributes.user",
+            }
+        )
+    else:
+        page_pipeline.append(
+            {
+                "$lookup": {
+                    "from": "aggregated_topic_attributes",
+                    "localField": "user_id",
+                    "foreignField": "user_id",
+                    "as": "aggregated_topic_attributes",
+                }
+            }
+        )
+        page_pipeline.append(
+            {
+                "$unwind": {
+                    "path": "$aggregated_topic_attributes",
+                    "preserveNullAndEmptyArrays": True,
+                },
+            },
+        )
+
+    page_pipeline.append(
         {
             "$lookup": {
                 "from": "topic_profiles",
@@ -44,103 +397,157 @@ def build_get_users_with_topic_info_pipeline(
             }
         }
     )
-
-    pipeline.append(
+    page_pipeline.append(
         {
             "$unwind": {
-                "path": "$aggregated_topic_attributes",
+                "path": "$topic_profile",
                 "preserveNullAndEmptyArrays": True,
             },
         },
     )
 
+    if not count_total:
+        return [*pipeline, *page_pipeline]
+
     pipeline.append(
         {
-            "$unwind": {
-                "path": "$topic_profile",
-                "preserveNullAndEmptyArrays": True,
+            "$facet": {
+                "metadata": [{"$count": "total"}],
+                "data": page_pipeline,
             },
-        },
+        }
     )
 
-    match_stage: dict[str, tp.Any] = {}
-    if keywords:
-        match_stage["aggregated_topic_attributes.keywords.name"] = {"$in": keywords}
-    if entities:
-        match_stage["aggregated_topic_attributes.entities.name"] = {"$in": entities}
-    if sentiments:
-        match_stage["aggregated_topic_attributes.sentiments.name"] = {"$in": sentiments}
+    return pipeline
 
-    if match_stage:
-        pipeline.append(
-            {
-                "$match": match_stage,
-            }
-        )
 
-    pipeline.append(
-        {
-            "$addFields": {
-                "maxKeywordWeight": {
-                    "$max": {
-                        "$map": {
-                            "input": {
-                                "$filter": {
-                                    "input": "$aggregated_topic_attributes.keywords",
-                                    "as": "t",
-                                    "cond": {"$in": ["$$t.name", keywords]},
-                                }
-                            },
-                            "as": "t",
-                            "in": "$$t.weight",
-                        }
-                    }
-                },
-                "maxEntityWeight": {
-                    "$max": {
-                        "$map": {
-                            "input": {
-                                "$filter": {
-                                    "input": "$aggregated_topic_attributes.entities",
-                                    "as": "e",
-                                    "cond": {"$in": ["$$e.name", entities]},
-                                }
-                            },
-                            "as": "e",
-                            "in": "$$e.weight",
-                        }
-                    }
+def build_seek_expression(
+    weight_expressions: tp.Sequence[str],
+    user_id_expression: str,
+    after: tuple[tp.Sequence[float | None], str],
+) -> dict[str, tp.Any]:
+    # Matches the users sorted after `after` by the weights descending, then
+    # by `user_id`. Aggregation comparisons order `null` before numbers like
+    # `$sort` does, so users without a weight seek the same way
+    weights, user_id = after
+    expression: dict[str, tp.Any] = {"$gt": [user_id_expression, user_id]}
+    for weight_expression, weight in reversed(list(zip(weight_expressions, weights))):
+        expression = {
+            "$or": [
+                {"$lt": [weight_expression, weight]},
+                {
+                    "$and": [
+                        {"$eq": [weight_expression, weight]},
+                        expression,
+                    ]
                 },
-                "maxSentimentWeight": {
-                    "$max": {
-                        "$map": {
-                            "input": {
-                                "$filter": {
-                                    "input": "$aggregated_topic_attributes.sentiments",
-                                    "as": "s",
-                                    "cond": {"$in": ["$$s.name", sentiments]},
-                                }
-                            },
-                            "as": "s",
-                            "in": "$$s.weight",
-                        }
-                    },
-                },
-            },
+            ]
         }
+    return expression
+
+
+def decode_user_with_topic_info(item: dict[str, tp.Any]) -> dict[str, tp.Any]:
+    if not item.get("aggregated_topic_attributes"):
+        return item
+
+    return {
+        **item,
+        "aggregated_topic_attributes": decode_aggregated_topic_attributes_document(
+            item["aggregated_topic_attributes"]
+        ),
+    }
+
+
+def get_topic_attribute_users_field(
+    keywords: tp.Sequence[str] = (),
+    entities: tp.Sequence[str] = (),
+    sentiments: tp.Sequence[str] = (),
+    half_life_days: float | None = None,
+) -> str | None:
+    # List whose filter `topic_attribute_users` answers, if any. Its weights
+    # are as of each item's `updated_at`, so they are not in the order of
+    # decayed weights
+    fields = [
+        field
+        for field, names in zip(MAX_WEIGHT_FIELDS, (keywords, entities, sentiments))
+        if names
+    ]
+    if len(fields) != 1 or half_life_days is not None:
+        return None
+    return fields[0]
+
+
+def get_users_with_topic_info_collection(
+    keywords: tp.Sequence[str] = (),
+    entities: tp.Sequence[str] = (),
+    sentiments: tp.Sequence[str] = (),
+    half_life_days: float | None = None,
+    inverted_index: bool = False,
+) -> str:
+    # Collection `build_get_users_with_topic_info_pipeline` runs on
+    if inverted_index and get_topic_attribute_users_field(
+        keywords, entities, sentiments, half_life_days
+    ):
+        return "topic_attribute_users"
+    if keywords or entities or sentiments:
+        return "aggregated_topic_attributes"
+    return "users"
+
+
+def get_users_with_topic_info_total_cache_key(
+    keywords: tp.Sequence[str] = (),
+    entities: tp.Sequence[str] = (),
+    sentiments: tp.Sequence[str] = (),
+    half_life_days: float | None = None,
+    inverted_index: bool = False,
+) -> UsersTotalCacheKey:
+    # The number of matching users only depends on the set of filters
+    return (
+        tuple(sorted(set(keywords))),
+        tuple(sorted(set(entities))),
+        tuple(sorted(set(sentiments))),
     )
 
-    pipeline.append(
-        {
-            "$sort": {
-                "maxKeywordWeight": -1,
-                "maxEntityWeight": -1,
-                "maxSentimentWeight": -1,
-            },
-        }
+
+async def aggregate_users_with_topic_info(
+    *,
+    database: AsyncIOMotorDatabase[tp.Any],
+    include_total: bool,
+    total_cache: TTLCache[UsersTotalCacheKey, int] | None = None,
+    offset: int = 0,
+    limit: int | None = None,
+    after: tuple[tp.Sequence[float | None], str] | None = None,
+    **pipeline_kwargs: tp.Any,
+) -> tuple[list[dict[str, tp.Any]], int | None]:
+    # Runs the pipeline once, the total is counted next to the page in a
+    # `$facet` unless it is served from `total_cache`
+    collection = database[get_users_with_topic_info_collection(**pipeline_kwargs)]
+    total_cache_key = get_users_with_topic_info_total_cache_key(**pipeline_kwargs)
+    total = None
+    if include_total and total_cache is not None:
+        total = total_cache.get(total_cache_key)
+
+    count_total = include_total and total is None
+    cursor = collection.aggregate(
+        build_get_users_with_topic_info_pipeline(
+            **pipeline_kwargs,
+            offset=offset,
+            limit=limit,
+            after=after,
+            count_total=count_total,
+        )
     )
 
-    return pipeline
+    if not count_total:
+        items = await cursor.to_list(limit)
+        return [decode_user_with_topic_info(item) for item in items], total
+
+    [result] = await cursor.to_list(1)
+    total = result["metadata"][0]["total"] if result["metadata"] else 0
+    if total_cache is not None:
+        total_cache.set(total_cache_key, total)
+
+    return [decode_user_with_topic_info(item) for item in result["data"]], total
 
 
 async def get_users_with_topic_info_paginated_repository(
@@ -148,13 +555,48 @@ async def get_users_with_topic_info_paginated_repository(
     database: AsyncIOMotorDatabase[tp.Any],
     params: Params,
     transformer: AsyncItemsTransformer | None = None,
+    total_cache: TTLCache[UsersTotalCacheKey, int] | None = None,
     **pipeline_kwargs: tp.Any,
 ) -> tp.Any:
-    return await apaginate_aggregate(
-        database["users"],
-        build_get_users_with_topic_info_pipeline(**pipeline_kwargs),
-        params,
-        transformer=transformer,
+    # Paginates like `fastapi_pagination.ext.motor.apaginate_aggregate`, but
+    # the page is taken before the joins rather than at the end
+    params, raw_params = verify_params(params, "limit-offset")
+
+    items, total = await aggregate_users_with_topic_info(
+        database=database,
+        include_total=True,
+        total_cache=total_cache,
+        offset=raw_params.offset or 0,
+        limit=raw_params.limit,
+        **pipeline_kwargs,
+    )
+
+    return create_page(
+        await apply_items_transformer(items, transformer, async_=True),
+        total=total,
+        params=params,
+    )
+
+
+async def get_users_with_topic_info_keyset_repository(
+    *,
+    database: AsyncIOMotorDatabase[tp.Any],
+    limit: int,
+    after: tuple[tp.Sequence[float | None], str] | None = None,
+    include_total: bool = False,
+    total_cache: TTLCache[UsersTotalCacheKey, int] | None = None,
+    **pipeline_kwargs: tp.Any,
+) -> tuple[list[dict[str, tp.Any]], int | None]:
+    # Returns up to `limit` users sorted after `after` and, if
+    # `include_total`, the number of all matching users, which costs a pass
+    # over all of them unless served from `total_cache`
+    return await aggregate_users_with_topic_info(
+        database=database,
+        include_total=include_total,
+        total_cache=total_cache,
+        limit=limit,
+        after=after,
+        **pipeline_kwargs,
     )
 
 
@@ -209,13 +651,44 @@ def build_get_user_with_topic_info_pipeline(
 
 
 async def get_user_with_topic_info_repository(
+    user_id: str,
+    *,
+    database: AsyncIOMotorDatabase[tp.Any],
+    fields: tp.Collection[str] = tuple(USERS_READ_MODEL_FIELDS),
+) -> dict[str, tp.Any] | None:
+    # Reads the same document as `build_get_user_with_topic_info_pipeline`
+    # with concurrent `find_one`s by `user_id`, where the pipeline runs its
+    # `$lookup`s one after the other. Only the topic info in `fields` is read
+    user, *topic_info = await asyncio.gather(
+        # Copies embedded by the users read model are replaced by the sources
+        database["users"].find_one(
+            {"user_id": user_id}, dict.fromkeys(USERS_READ_MODEL_FIELDS, 0)
+        ),
+        *(
+            database[USERS_READ_MODEL_FIELDS[field][0]].find_one(
+                {"user_id": user_id}, {"_id": 0}
+            )
+            for field in fields
+        ),
+    )
+    if user is None:
+        return None
+
+    for field, document in zip(fields, topic_info):
+        if document is not None:
+            user[field] = document
+    return decode_user_with_topic_info(user)
+
+
+async def get_user_with_embedded_topic_info_repository(
+    user_id: str,
     *,
     database: AsyncIOMotorDatabase[tp.Any],
-    **pipeline_kwargs: tp.Any,
 ) -> dict[str, tp.Any] | None:
-    pipeline = build_get_user_with_topic_info_pipeline(**pipeline_kwargs)
-    result = await database["users"].aggregate(pipeline).to_list(1)
-    return result[0] if result else None
+    # Reads the same document as `get_user_with_topic_info_repository` from
+    # the copies embedded in `users`, with a single indexed `find_one`
+    result = await database["users"].find_one({"user_id": user_id})
+    return decode_user_with_topic_info(result) if result else None
 
 
 async def get_user_repository(
@@ -0,0 +1,95 @@
+import typing as tp
+
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+__all__ = [
+    "USERS_READ_MODEL_FIELDS",
+    "build_embed_users_topic_info_pipeline",
+    "embed_users_topic_info_repository",
+]
+
+
+# Fields embedded in `users` per source collection, with the field telling
+# which of two copies is the latest
+USERS_READ_MODEL_FIELDS = {
+    "aggregated_topic_attributes": ("aggregated_topic_attributes", "version"),
+    "topic_profile": ("topic_profiles", "updated_at"),
+}
+
+
+def build_embed_users_topic_info_pipeline(
+    user_ids: tp.Sequence[str] | None = None,
+) -> list[dict[str, tp.Any]]:
+    # Copies the current topic profile and aggregated topic attributes of
+    # `user_ids`, or of every user, onto their `users` documents
+    pipeline: list[dict[str, tp.Any]] = []
+
+    if user_ids is not None:
+        pipeline.append({"$match": {"user_id": {"$in": list(user_ids)}}})
+
+    for field, (collection, _) in USERS_READ_MODEL_FIELDS.items():
+        pipeline.append(
+            {
+                "$lookup": {
+                    "from": collection,
+                    "localField": "user_id",
+                    "foreignField": "user_id",
+                    "as": field,
+                }
+            }
+        )
+        pipeline.append(
+            {"$unwind": {"path": f"${field}", "preserveNullAndEmptyArrays": True}}
+        )
+
+    pipeline.append(
+        {"$project": {"user_id": 1, **dict.fromkeys(USERS_READ_MODEL_FIELDS, 1)}}
+    )
+    pipeline.append({"$unset": [f"{field}._id" for field in USERS_READ_MODEL_FIELDS]})
+    # Handlers may have embedded a newer copy since it was read, which is
+    # kept. Copies of the same version are replaced, e.g. to rewrite them in
+    # another storage format
+    pipeline.append(
+        {
+            "$merge": {
+                "into": "users",
+                "on": "user_id",
+                "whenMatched": [
+                    {
+                        "$set": {
+                            field: {
+                                "$cond": [
+                                    {
+                                        "$lte": [
+                                            f"${field}.{latest_field}",
+                                            f"$$new.{field}.{latest_field}",
+                                        ]
+                                    },
+                                    f"$$new.{field}",
+                                    f"${field}",
+                                ]
+                            }
+                            for field, (_, latest_field) in (
+                                USERS_READ_MODEL_FIELDS.items()
+                            )
+                        }
+                    }
+                ],
+                "whenNotMatched": "discard",
+            }
+        }
+    )
+
+    return pipeline
+
+
+async def embed_users_topic_info_repository(
+    user_ids: tp.Sequence[str] | None = None,
+    *,
+    database: AsyncIOMotorDatabase[tp.Any],
+) -> None:
+    await (
+        database["users"]
+        .aggregate(build_embed_users_topic_info_pipeline(user_ids))
+        .to_list(None)
+    )
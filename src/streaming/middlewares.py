@@ -0,0 +1,41 @@
+import typing as tp
+
+from aiokafka import ConsumerRecord, TopicPartition
+from faststream import BaseMiddleware
+from faststream.broker.message import StreamMessage
+from faststream.kafka.message import KafkaMessage
+
+__all__ = ["SeekBackBatchMiddleware", "seek_back_batch"]
+
+
+def seek_back_batch(message: KafkaMessage) -> None:
+    # Seeks every partition of the batch back to its first record. FastStream
+    # only seeks the partition of the batch's first record on nack
+    records = (
+        (message.raw_message,)
+        if isinstance(message.raw_message, ConsumerRecord)
+        else message.raw_message
+    )
+    offsets: dict[TopicPartition, int] = {}
+    for record in records:
+        partition = TopicPartition(record.topic, record.partition)
+        offsets[partition] = min(record.offset, offsets.get(partition, record.offset))
+
+    for partition, offset in offsets.items():
+        message.consumer.seek(partition=partition, offset=offset)
+
+
+class SeekBackBatchMiddleware(BaseMiddleware):
+    # A failed batch isn't committed, but the consumer has already fetched past
+    # it, so without seeking back the next committed batch would skip it
+    async def consume_scope(
+        self,
+        call_next: tp.Callable[[StreamMessage[tp.Any]], tp.Awaitable[tp.Any]],
+        msg: StreamMessage[tp.Any],
+    ) -> tp.Any:
+        try:
+            return await call_next(msg)
+        except Exception:
+            if isinstance(msg, KafkaMessage):
+                seek_back_batch(msg)
+            raise
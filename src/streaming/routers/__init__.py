@@ -1,12 +1,25 @@
 from faststream.kafka import KafkaRouter
 
-from .content import router as content_router
-from .topic_attributes import router as topic_attributes_router
+from src.core.config import KafkaSchema
+
+from .content import build_batch_router as build_content_batch_router
+from .content import build_router as build_content_router
+from .topic_attributes import build_batch_router as build_topic_attributes_batch_router
+from .topic_attributes import build_router as build_topic_attributes_router
 from .topic_profile import router as topic_profile_router
 
-__all__ = ["streaming_router"]
+__all__ = ["build_streaming_router"]
+
+
+def build_streaming_router(settings: KafkaSchema) -> KafkaRouter:
+    streaming_router = KafkaRouter()
+    streaming_router.include_router(topic_profile_router)
+
+    if settings.batch.enabled:
+        streaming_router.include_router(build_content_batch_router(settings))
+        streaming_router.include_router(build_topic_attributes_batch_router(settings))
+    else:
+        streaming_router.include_router(build_content_router(settings))
+        streaming_router.include_router(build_topic_attributes_router(settings))
 
-streaming_router = KafkaRouter()
-streaming_router.include_router(topic_profile_router)
-streaming_router.include_router(content_router)
-streaming_router.include_router(topic_attributes_router)
+    return streaming_router
@@ -1,25 +1,136 @@
+import typing as tp
+import uuid
+
 from faststream.kafka import KafkaRouter
 from faststream.kafka.fastapi import Context
 from starlette.datastructures import State
 
+from src.core.config import KafkaSchema
 from src.dtos import ContentEventBrokerDTO
-from src.repositories import insert_content_event_repository
+from src.repositories import insert_content_events_repository
+from src.streaming.middlewares import SeekBackBatchMiddleware
+from src.utils.caches import LRUCache
+from src.utils.metrics import get_counter
+
+__all__ = ["build_batch_router", "build_router", "mark_content_events_seen"]
 
-__all__ = ["router"]
 
+def drop_seen_content_events(
+    incoming_content_events: tp.Sequence[ContentEventBrokerDTO],
+    *,
+    seen: LRUCache[uuid.UUID, bool],
+) -> list[ContentEventBrokerDTO]:
+    # Redeliveries of recently ingested events are dropped before any I/O,
+    # older ones are collapsed by the `ReplacingMergeTree` table
+    unseen_content_events = []
+    unseen_content_event_uuids = set()
+    for incoming_content_event in incoming_content_events:
+        content_event_uuid = incoming_content_event.content_event_uuid
+        if (
+            content_event_uuid in unseen_content_event_uuids
+            or seen.get(content_event_uuid) is not None
+        ):
+            continue
 
-router = KafkaRouter()
+        unseen_content_events.append(incoming_content_event)
+        unseen_content_event_uuids.add(content_event_uuid)
+
+    get_counter("content_events.received").inc(len(incoming_content_events))
+    get_counter("content_events.duplicates").inc(
+        len(incoming_content_events) - len(unseen_content_events)
+    )
+    return unseen_content_events
+
+
+def mark_content_events_seen(
+    content_event_uuids: tp.Iterable[uuid.UUID],
+    *,
+    seen: LRUCache[uuid.UUID, bool],
+) -> None:
+    # Only marked once written, so events lost before that are not dropped on
+    # redelivery
+    for content_event_uuid in content_event_uuids:
+        seen.set(content_event_uuid, True)
 
 
-@router.subscriber("contentEvent")
 async def transmit_content_event_to_olap_handler(
     incoming_content_event: ContentEventBrokerDTO,
     state: State = Context("state"),
 ) -> None:
-    await insert_content_event_repository(
+    if not drop_seen_content_events(
+        [incoming_content_event], seen=state.content_events_seen
+    ):
+        return
+
+    await state.content_events_writer.append(
         content_event_uuid=incoming_content_event.content_event_uuid,
         user_id=incoming_content_event.user_id,
         content=incoming_content_event.content,
         ts=incoming_content_event.timestamp,
+    )
+
+
+async def transmit_content_events_batch_to_olap_handler(
+    incoming_content_events: list[ContentEventBrokerDTO],
+    state: State = Context("state"),
+) -> None:
+    unseen_content_events = drop_seen_content_events(
+        incoming_content_events, seen=state.content_events_seen
+    )
+    if not unseen_content_events:
+        return
+
+    await insert_content_events_repository(
+        [
+            (
+                incoming_content_event.content_event_uuid,
+                incoming_content_event.user_id,
+                incoming_content_event.content,
+                incoming_content_event.timestamp,
+            )
+            for incoming_content_event in unseen_content_events
+        ],
         get_connection=state.get_clickhouse_connection,
     )
+    mark_content_events_seen(
+        (
+            incoming_content_event.content_event_uuid
+            for incoming_content_event in unseen_content_events
+        ),
+        seen=state.content_events_seen,
+    )
+
+
+def build_group_id(settings: KafkaSchema) -> str:
+    return f"{settings.group_id}-content"
+
+
+def build_router(settings: KafkaSchema) -> KafkaRouter:
+    # Offsets are auto-committed while events may still wait in the
+    # `ContentEventsBatchWriter`, which marks them seen once written. Events
+    # buffered when the process dies are lost, the batch subscriber enabled
+    # by `KAFKA__BATCH__ENABLED` (the default) commits only after writing them
+    router = KafkaRouter()
+    router.subscriber("contentEvent", group_id=build_group_id(settings))(
+        transmit_content_event_to_olap_handler
+    )
+
+    return router
+
+
+def build_batch_router(settings: KafkaSchema) -> KafkaRouter:
+    # Offsets are committed once the whole batch has been written. A failed
+    # batch is nacked and consumed again from its first record of every
+    # partition, until it is written
+    batch_router = KafkaRouter(middlewares=[SeekBackBatchMiddleware])
+    batch_router.subscriber(
+        "contentEvent",
+        group_id=build_group_id(settings),
+        batch=True,
+        max_records=settings.batch.max_records,
+        batch_timeout_ms=settings.batch.timeout_ms,
+        auto_commit=False,
+        retry=True,
+    )(transmit_content_events_batch_to_olap_handler)
+
+    return batch_router
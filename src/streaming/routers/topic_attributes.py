@@ -1,59 +1,219 @@
+import typing as tp
+
 from faststream.kafka import KafkaRouter
 from faststream.kafka.fastapi import Context
 from starlette.datastructures import State
 
+from src.core.config import KafkaSchema
 from src.dtos import AggregatedTopicAttributesDTO, TopicAttributesEventBrokerDTO
 from src.repositories import (
+    bulk_merge_aggregated_topic_attributes_repository,
+    bulk_upsert_versioned_aggregated_topic_attributes_repository,
+    get_aggregated_topic_attributes_by_user_ids_repository,
     get_aggregated_topic_attributes_repository,
     insert_topic_attributes_event_repository,
-    upsert_aggregated_topic_attributes_repository,
+    insert_topic_attributes_events_columnar_repository,
+    merge_aggregated_topic_attributes_repository,
+    set_users_aggregated_topic_attributes_repository,
+    update_topic_attribute_users_repository,
+    upsert_versioned_aggregated_topic_attributes_repository,
 )
+from src.streaming.middlewares import SeekBackBatchMiddleware
 from src.utils.aggregated_topic_attributes import (
+    build_update_aggregated_topic_attributes_pipeline,
     update_aggregated_topic_attributes_dto_based_on_topic_attributes_event_schema,
+    update_aggregated_topic_attributes_dto_based_on_topic_attributes_events,
 )
 from src.utils.manipulations import split_attributes_from_items
+from src.utils.metrics import get_counter
+from src.utils.retries import retry_with_backoff
+
+__all__ = ["build_batch_router", "build_router"]
+
+
+async def apply_written_aggregated_topic_attributes(
+    written_changes: tp.Sequence[
+        tuple[AggregatedTopicAttributesDTO, AggregatedTopicAttributesDTO]
+    ],
+    *,
+    state: State,
+) -> None:
+    # Propagates `(old, written)` aggregated topic attributes to the copies
+    # derived from them
+    if not written_changes:
+        return
+
+    if state.settings.mongo.topic_attributes_inverted_index:
+        await update_topic_attribute_users_repository(
+            written_changes,
+            database=state.mongo_database,
+        )
+    if state.settings.mongo.users_read_model:
+        await set_users_aggregated_topic_attributes_repository(
+            [written.model_dump() for _, written in written_changes],
+            database=state.mongo_database,
+            storage_format=state.settings.mongo.topic_attributes_storage_format,
+        )
 
-__all__ = ["router"]
 
+async def upsert_aggregated_topic_attributes_with_conflict_metrics(
+    aggregated_topic_attributes: AggregatedTopicAttributesDTO,
+    *,
+    old_aggregated_topic_attributes: AggregatedTopicAttributesDTO,
+    expected_version: int | None,
+    state: State,
+) -> bool:
+    is_written = await upsert_versioned_aggregated_topic_attributes_repository(
+        aggregated_topic_attributes.model_dump(),
+        expected_version=expected_version,
+        database=state.mongo_database,
+        storage_format=state.settings.mongo.topic_attributes_storage_format,
+    )
 
-router = KafkaRouter()
+    get_counter("aggregated_topic_attributes.updates").inc()
+    if not is_written:
+        get_counter("aggregated_topic_attributes.conflicts").inc()
+        return False
+
+    written_aggregated_topic_attributes = aggregated_topic_attributes.model_copy(
+        update={"version": (expected_version or 0) + 1}
+    )
+    await apply_written_aggregated_topic_attributes(
+        [(old_aggregated_topic_attributes, written_aggregated_topic_attributes)],
+        state=state,
+    )
+    return True
+
+
+async def bulk_upsert_aggregated_topic_attributes_with_conflict_metrics(
+    changes: tp.Sequence[
+        tuple[AggregatedTopicAttributesDTO, AggregatedTopicAttributesDTO, int | None]
+    ],
+    *,
+    state: State,
+) -> set[str]:
+    # Writes `(old, new, expected_version)` changes, returns `user_id`s of
+    # documents that have been modified concurrently
+    conflicted_user_ids = (
+        await bulk_upsert_versioned_aggregated_topic_attributes_repository(
+            [
+                (aggregated_topic_attributes.model_dump(), expected_version)
+                for _, aggregated_topic_attributes, expected_version in changes
+            ],
+            database=state.mongo_database,
+            storage_format=state.settings.mongo.topic_attributes_storage_format,
+        )
+    )
+
+    get_counter("aggregated_topic_attributes.updates").inc(len(changes))
+    get_counter("aggregated_topic_attributes.conflicts").inc(len(conflicted_user_ids))
+
+    await apply_written_aggregated_topic_attributes(
+        [
+            (
+                old_aggregated_topic_attributes,
+                aggregated_topic_attributes.model_copy(
+                    update={"version": (expected_version or 0) + 1}
+                ),
+            )
+            for (
+                old_aggregated_topic_attributes,
+                aggregated_topic_attributes,
+                expected_version,
+            ) in changes
+            if aggregated_topic_attributes.user_id not in conflicted_user_ids
+        ],
+        state=state,
+    )
+    return conflicted_user_ids
+
+
+async def merge_with_retries(
+    merge: tp.Callable[[], tp.Awaitable[bool]],
+    *,
+    user_ids: tp.Iterable[str],
+    state: State,
+) -> None:
+    retry_settings = state.settings.mongo.topic_attributes_retry
+    if not await retry_with_backoff(
+        merge,
+        max_attempts=retry_settings.max_attempts,
+        base_delay_ms=retry_settings.base_delay_ms,
+        max_delay_ms=retry_settings.max_delay_ms,
+    ):
+        raise RuntimeError(
+            "Aggregated topic attributes of users "
+            f"{', '.join(sorted(user_ids))} have been modified concurrently "
+            f"{retry_settings.max_attempts} times in a row"
+        )
 
 
-@router.subscriber("topicAttributes")
 async def transmit_topic_event_to_oltp_handler(
     incoming_topic_attributes_event: TopicAttributesEventBrokerDTO,
     state: State = Context("state"),
 ) -> None:
-    existing_aggregated_topic_attributes = (
-        await get_aggregated_topic_attributes_repository(
-            user_id=incoming_topic_attributes_event.user_id,
+    decay_settings = state.settings.mongo.topic_attributes_decay
+    if state.settings.mongo.topic_attributes_merge_engine == "pipeline":
+        await merge_aggregated_topic_attributes_repository(
+            incoming_topic_attributes_event.user_id,
+            build_update_aggregated_topic_attributes_pipeline(
+                incoming_topic_attributes_event,
+                half_life_days=decay_settings.half_life_days,
+                prune_weight=decay_settings.prune_weight,
+            ),
             database=state.mongo_database,
         )
-    )
+        return
 
-    if not existing_aggregated_topic_attributes:
-        old_aggregated_topic_attributes = AggregatedTopicAttributesDTO(
-            user_id=incoming_topic_attributes_event.user_id
+    if state.settings.mongo.topic_attributes_write_behind.enabled:
+        # Flushed before returning, as the offset is auto-committed afterwards.
+        # The cache still spares reading the document on every event
+        await state.aggregated_topic_attributes_cache.apply(
+            [incoming_topic_attributes_event]
         )
-    else:
-        old_aggregated_topic_attributes = AggregatedTopicAttributesDTO.model_validate(
-            existing_aggregated_topic_attributes
+        await state.aggregated_topic_attributes_cache.flush()
+        return
+
+    user_id = incoming_topic_attributes_event.user_id
+
+    async def merge() -> bool:
+        existing_aggregated_topic_attributes = (
+            await get_aggregated_topic_attributes_repository(
+                user_id=user_id,
+                database=state.mongo_database,
+            )
         )
 
-    new_aggregated_topic_attributes = (
-        update_aggregated_topic_attributes_dto_based_on_topic_attributes_event_schema(
+        if not existing_aggregated_topic_attributes:
+            old_aggregated_topic_attributes = AggregatedTopicAttributesDTO(
+                user_id=user_id
+            )
+            expected_version = None
+        else:
+            old_aggregated_topic_attributes = (
+                AggregatedTopicAttributesDTO.model_validate(
+                    existing_aggregated_topic_attributes
+                )
+            )
+            expected_version = old_aggregated_topic_attributes.version
+
+        new_aggregated_topic_attributes = update_aggregated_topic_attributes_dto_based_on_topic_attributes_event_schema(
             old_aggregated_topic_attributes,
             incoming_topic_attributes_event,
+            half_life_days=decay_settings.half_life_days,
+            prune_weight=decay_settings.prune_weight,
         )
-    )
 
-    await upsert_aggregated_topic_attributes_repository(
-        new_aggregated_topic_attributes.model_dump(),
-        database=state.mongo_database,
-    )
+        return await upsert_aggregated_topic_attributes_with_conflict_metrics(
+            new_aggregated_topic_attributes,
+            old_aggregated_topic_attributes=old_aggregated_topic_attributes,
+            expected_version=expected_version,
+            state=state,
+        )
+
+    await merge_with_retries(merge, user_ids=[user_id], state=state)
 
 
-@router.subscriber("topicAttributes", group_id="A")
 async def transmit_topic_attributes_event_to_olap_handler(
     incoming_topic_attributes_event: TopicAttributesEventBrokerDTO,
     state: State = Context("state"),
@@ -88,3 +248,145 @@ async def transmit_topic_attributes_event_to_olap_handler(
         ts=incoming_topic_attributes_event.timestamp,
         get_connection=state.get_clickhouse_connection,
     )
+
+
+async def transmit_topic_events_batch_to_oltp_handler(
+    incoming_topic_attributes_events: list[TopicAttributesEventBrokerDTO],
+    state: State = Context("state"),
+) -> None:
+    decay_settings = state.settings.mongo.topic_attributes_decay
+    if state.settings.mongo.topic_attributes_merge_engine == "pipeline":
+        await bulk_merge_aggregated_topic_attributes_repository(
+            [
+                (
+                    incoming_topic_attributes_event.user_id,
+                    build_update_aggregated_topic_attributes_pipeline(
+                        incoming_topic_attributes_event,
+                        half_life_days=decay_settings.half_life_days,
+                        prune_weight=decay_settings.prune_weight,
+                    ),
+                )
+                for incoming_topic_attributes_event in incoming_topic_attributes_events
+            ],
+            database=state.mongo_database,
+        )
+        return
+
+    if state.settings.mongo.topic_attributes_write_behind.enabled:
+        # Flushed before returning, i.e. before the batch offsets are committed
+        await state.aggregated_topic_attributes_cache.apply(
+            incoming_topic_attributes_events
+        )
+        await state.aggregated_topic_attributes_cache.flush()
+        return
+
+    # Events are folded per user in order, users whose document has been
+    # modified concurrently are read and folded again on retry
+    pending_topic_attributes_events: dict[str, list[TopicAttributesEventBrokerDTO]] = {}
+    for incoming_topic_attributes_event in incoming_topic_attributes_events:
+        pending_topic_attributes_events.setdefault(
+            incoming_topic_attributes_event.user_id, []
+        ).append(incoming_topic_attributes_event)
+
+    async def merge() -> bool:
+        existing_aggregated_topic_attributes = (
+            await get_aggregated_topic_attributes_by_user_ids_repository(
+                set(pending_topic_attributes_events),
+                database=state.mongo_database,
+            )
+        )
+
+        changes = []
+        for user_id, topic_attributes_events in pending_topic_attributes_events.items():
+            existing = existing_aggregated_topic_attributes.get(user_id)
+            if existing is None:
+                old_aggregated_topic_attributes = AggregatedTopicAttributesDTO(
+                    user_id=user_id
+                )
+                expected_version = None
+            else:
+                old_aggregated_topic_attributes = (
+                    AggregatedTopicAttributesDTO.model_validate(existing)
+                )
+                expected_version = old_aggregated_topic_attributes.version
+
+            changes.append(
+                (
+                    old_aggregated_topic_attributes,
+                    update_aggregated_topic_attributes_dto_based_on_topic_attributes_events(
+                        old_aggregated_topic_attributes,
+                        topic_attributes_events,
+                        half_life_days=decay_settings.half_life_days,
+                        prune_weight=decay_settings.prune_weight,
+                    ),
+                    expected_version,
+                )
+            )
+
+        # Only conflicted users are read and folded again by the next attempt
+        conflicted_user_ids = (
+            await bulk_upsert_aggregated_topic_attributes_with_conflict_metrics(
+                changes, state=state
+            )
+        )
+        for user_id in set(pending_topic_attributes_events) - conflicted_user_ids:
+            del pending_topic_attributes_events[user_id]
+
+        return not pending_topic_attributes_events
+
+    await merge_with_retries(
+        merge, user_ids=pending_topic_attributes_events, state=state
+    )
+
+
+async def transmit_topic_attributes_events_batch_to_olap_handler(
+    incoming_topic_attributes_events: list[TopicAttributesEventBrokerDTO],
+    state: State = Context("state"),
+) -> None:
+    await insert_topic_attributes_events_columnar_repository(
+        incoming_topic_attributes_events,
+        get_connection=state.get_clickhouse_connection,
+    )
+
+
+def build_group_id(settings: KafkaSchema) -> str:
+    return f"{settings.group_id}-oltp"
+
+
+def build_router(settings: KafkaSchema) -> KafkaRouter:
+    router = KafkaRouter()
+    router.subscriber("topicAttributes", group_id=build_group_id(settings))(
+        transmit_topic_event_to_oltp_handler
+    )
+    router.subscriber("topicAttributes", group_id="A")(
+        transmit_topic_attributes_event_to_olap_handler
+    )
+
+    return router
+
+
+def build_batch_router(settings: KafkaSchema) -> KafkaRouter:
+    # Offsets are committed once the whole batch has been written. A failed
+    # batch is nacked and consumed again from its first record of every
+    # partition, until it is written
+    batch_router = KafkaRouter(middlewares=[SeekBackBatchMiddleware])
+    batch_router.subscriber(
+        "topicAttributes",
+        group_id=build_group_id(settings),
+        batch=True,
+        max_records=settings.batch.max_records,
+        batch_timeout_ms=settings.batch.timeout_ms,
+        auto_commit=False,
+        retry=True,
+    )(transmit_topic_events_batch_to_oltp_handler)
+    batch_router.subscriber(
+        "topicAttributes",
+        group_id="A",
+        batch=True,
+        max_records=settings.batch.max_records,
+        batch_timeout_ms=settings.batch.timeout_ms,
+        auto_commit=False,
+        retry=True,
+    )(transmit_topic_attributes_events_batch_to_olap_handler)
+
+    return batch_router
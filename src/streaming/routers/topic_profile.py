@@ -3,7 +3,10 @@ from faststream.kafka.fastapi import Context
 from starlette.datastructures import State
 
 from src.dtos import TopicProfileDTO, TopicProfileEventBrokerDTO
-from src.repositories import upsert_topic_profile_repository
+from src.repositories import (
+    set_users_topic_profile_repository,
+    upsert_topic_profile_repository,
+)
 
 __all__ = ["router"]
 
@@ -16,10 +19,18 @@ async def transmit_topic_profile_event_to_olap_handler(
     incoming_topic_profile_event: TopicProfileEventBrokerDTO,
     state: State = Context("state"),
 ) -> None:
+    topic_profile = TopicProfileDTO(
+        user_id=incoming_topic_profile_event.user_id,
+        topics=incoming_topic_profile_event.topics,
+        # Orders profiles by when they were produced rather than consumed
+        updated_at=incoming_topic_profile_event.timestamp,
+    ).model_dump()
     await upsert_topic_profile_repository(
-        TopicProfileDTO(
-            user_id=incoming_topic_profile_event.user_id,
-            topics=incoming_topic_profile_event.topics,
-        ).model_dump(),
+        topic_profile,
         database=state.mongo_database,
     )
+    if state.settings.mongo.users_read_model:
+        await set_users_topic_profile_repository(
+            topic_profile,
+            database=state.mongo_database,
+        )
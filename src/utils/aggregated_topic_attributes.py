@@ -1,7 +1,22 @@
-import copy
+import heapq
 import typing as tp
+from datetime import UTC, datetime
+from operator import attrgetter, itemgetter
 
-from src.dtos import AggregatedTopicAttributesDTO, TopicAttributesEventBrokerDTO
+from pydantic import BaseModel
+
+try:
+    import numpy as np
+
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
+
+from src.dtos import (
+    AggregatedTopicAttributesDTO,
+    AggregatedTopicAttributesGetDTO,
+    TopicAttributesEventBrokerDTO,
+)
 from src.schemas import (
     EntityTopicEventSchema,
     EntityTopicProfileSchema,
@@ -11,12 +26,34 @@ from src.schemas import (
     SentimentTopicProfileSchema,
 )
 from src.utils.dates import utcnow
-from src.utils.weights import recalculate_weight
+from src.utils.weights import decay_weight, recalculate_weight
 
 __all__ = [
+    "WEIGHTED_ITEM_KEY_FIELDS",
+    "build_decayed_weight_expression",
+    "build_update_aggregated_topic_attributes_pipeline",
+    "decay_aggregated_topic_attributes_dto",
+    "diff_aggregated_topic_attributes_dto",
+    "prune_aggregated_topic_attributes_dto",
     "update_aggregated_topic_attributes_dto_based_on_topic_attributes_event_schema",
+    "update_aggregated_topic_attributes_dto_based_on_topic_attributes_events",
 ]
 
+SECONDS_PER_DAY = 24 * 60 * 60
+
+# Smallest number of old and incoming items merged with NumPy, below it the
+# per-call overhead of NumPy outweighs the per-item overhead of Python. Both
+# break even at 75 to 80 items, see
+# `benchmarks/aggregated_topic_attributes_vectorized.py`
+VECTORIZED_MERGE_MIN_ITEMS = 80
+
+# Fields identifying an item of each weighted item list
+WEIGHTED_ITEM_KEY_FIELDS: dict[str, tuple[str, ...]] = {
+    "keywords": ("name",),
+    "entities": ("category", "name"),
+    "sentiments": ("name",),
+}
+
 
 def build_key_from_item_fields(
     key_fields: tp.Sequence[str],
@@ -35,47 +72,271 @@ def merge_weighted_item_lists(
     limit: int,
     alpha: float,
 ) -> list[dict[str, tp.Any]]:
-    existing_item_list = list(copy.deepcopy(existing_item_list))
-    incoming_item_list = list(copy.deepcopy(incoming_item_list))
+    return fold_weighted_item_lists(
+        existing_item_list,
+        [incoming_item_list],
+        key_fields=key_fields,
+        weight_field=weight_field,
+        timestamp_field=timestamp_field,
+        limit=limit,
+        alpha=alpha,
+    )
 
-    new_timestamp_value = utcnow()
-    merged_item_list: list[dict[str, tp.Any]] = []
-    new_keys: set[tuple[tp.Hashable, ...]] = set()
-    old_items_by_key = {
-        build_key_from_item_fields(key_fields, item): item
-        for item in existing_item_list
-    }
 
-    # Merge intersecting items or add a new one to `merged_item_list`
-    for new_item in incoming_item_list:
-        new_key = build_key_from_item_fields(key_fields, new_item)
-        new_keys.add(new_key)
-        if new_key in old_items_by_key:
-            old_item = old_items_by_key[new_key]
+def fold_weighted_item_lists(
+    existing_item_list: tp.Sequence[tp.Mapping[str, tp.Any]],
+    incoming_item_lists: tp.Iterable[tp.Sequence[tp.Mapping[str, tp.Any]]],
+    *,
+    key_fields: tp.Sequence[str],
+    weight_field: str,
+    timestamp_field: str,
+    limit: int,
+    alpha: float,
+    new_timestamp_value: datetime | None = None,
+) -> list[dict[str, tp.Any]]:
+    # Same result as merging `incoming_item_lists` one by one with
+    # `merge_weighted_item_lists`, without copying both lists on every merge.
+    # Weights are rounded and items beyond `limit` evicted after each list,
+    # so the merges cannot be collapsed into a closed-form EMA
+    new_timestamp_value = new_timestamp_value or utcnow()
+    merged_item_list = [dict(item) for item in existing_item_list]
 
-            merged_item = dict(old_item)
-            merged_item.update(
-                {k: v for k, v in new_item.items() if k not in merged_item}
-            )
-            merged_item[weight_field] = recalculate_weight(
-                merged_item[weight_field],
-                new_item[weight_field],
+    for incoming_item_list in incoming_item_lists:
+        old_items_by_key = {
+            build_key_from_item_fields(key_fields, item): item
+            for item in merged_item_list
+        }
+        new_keys: set[tuple[tp.Hashable, ...]] = set()
+        merged_item_list = []
+
+        for new_item in incoming_item_list:
+            new_key = build_key_from_item_fields(key_fields, new_item)
+            new_keys.add(new_key)
+            if new_key in old_items_by_key:
+                merged_item = dict(old_items_by_key[new_key])
+                for k, v in new_item.items():
+                    merged_item.setdefault(k, v)
+                merged_item[weight_field] = recalculate_weight(
+                    merged_item[weight_field],
+                    new_item[weight_field],
+                    alpha=alpha,
+                )
+            else:
+                merged_item = dict(new_item)
+            merged_item[timestamp_field] = new_timestamp_value
+            merged_item_list.append(merged_item)
+
+        merged_item_list.extend(
+            old_item
+            for old_key, old_item in old_items_by_key.items()
+            if old_key not in new_keys
+        )
+        # Same items and order as a stable descending sort cut to `limit`
+        merged_item_list = heapq.nlargest(
+            limit, merged_item_list, key=itemgetter(weight_field)
+        )
+
+    return merged_item_list
+
+
+def fold_weighted_item_schemas[ProfileSchemaT: BaseModel](
+    existing_items: tp.Sequence[ProfileSchemaT],
+    incoming_item_lists: tp.Iterable[tp.Sequence[BaseModel]],
+    *,
+    profile_schema: type[ProfileSchemaT],
+    key_fields: tp.Sequence[str],
+    weight_field: str,
+    timestamp_field: str,
+    limit: int,
+    alpha: float,
+    new_timestamp_value: datetime | None = None,
+) -> list[ProfileSchemaT]:
+    # `fold_weighted_item_lists` working on schemas. Items come from validated
+    # documents and events, so merged ones are built without validation and
+    # untouched ones are shared with `existing_items` instead of copied
+    new_timestamp_value = new_timestamp_value or utcnow()
+    build_key = attrgetter(*key_fields)
+    merged_items = list(existing_items)
+
+    for incoming_items in incoming_item_lists:
+        if HAS_NUMPY and (
+            len(merged_items) + len(incoming_items) >= VECTORIZED_MERGE_MIN_ITEMS
+        ):
+            vectorized_merged_items = merge_weighted_item_schemas_vectorized(
+                merged_items,
+                incoming_items,
+                profile_schema=profile_schema,
+                build_key=build_key,
+                weight_field=weight_field,
+                timestamp_field=timestamp_field,
+                limit=limit,
                 alpha=alpha,
+                new_timestamp_value=new_timestamp_value,
+            )
+            if vectorized_merged_items is not None:
+                merged_items = vectorized_merged_items
+                continue
+
+        merged_items = merge_weighted_item_schemas(
+            merged_items,
+            incoming_items,
+            profile_schema=profile_schema,
+            build_key=build_key,
+            weight_field=weight_field,
+            timestamp_field=timestamp_field,
+            limit=limit,
+            alpha=alpha,
+            new_timestamp_value=new_timestamp_value,
+        )
+
+    return merged_items
+
+
+def merge_weighted_item_schemas[ProfileSchemaT: BaseModel](
+    existing_items: tp.Sequence[ProfileSchemaT],
+    incoming_items: tp.Sequence[BaseModel],
+    *,
+    profile_schema: type[ProfileSchemaT],
+    build_key: tp.Callable[[BaseModel], tp.Hashable],
+    weight_field: str,
+    timestamp_field: str,
+    limit: int,
+    alpha: float,
+    new_timestamp_value: datetime,
+) -> list[ProfileSchemaT]:
+    # One `fold_weighted_item_schemas` step
+    old_items_by_key = {build_key(item): item for item in existing_items}
+    new_keys: set[tp.Hashable] = set()
+    merged_items: list[ProfileSchemaT] = []
+
+    for new_item in incoming_items:
+        new_key = build_key(new_item)
+        new_keys.add(new_key)
+        old_item = old_items_by_key.get(new_key)
+        if old_item is not None:
+            merged_item = old_item.model_copy(
+                update={
+                    weight_field: recalculate_weight(
+                        getattr(old_item, weight_field),
+                        getattr(new_item, weight_field),
+                        alpha=alpha,
+                    ),
+                    timestamp_field: new_timestamp_value,
+                }
             )
         else:
-            merged_item = dict(new_item)
-        merged_item[timestamp_field] = new_timestamp_value
-        merged_item_list.append(merged_item)
+            merged_item = profile_schema.model_construct(
+                **{**new_item.__dict__, timestamp_field: new_timestamp_value}
+            )
+        merged_items.append(merged_item)
+
+    merged_items.extend(
+        old_item
+        for old_key, old_item in old_items_by_key.items()
+        if old_key not in new_keys
+    )
+    return heapq.nlargest(limit, merged_items, key=attrgetter(weight_field))
 
-    # Add old non-intersecting items to `merged_item_list`
-    for old_key, old_item in old_items_by_key.items():
-        if old_key not in new_keys:
-            merged_item_list.append(dict(old_item))
 
-    merged_item_list.sort(key=lambda item: item[weight_field], reverse=True)
-    merged_item_list = merged_item_list[:limit]
+def merge_weighted_item_schemas_vectorized[ProfileSchemaT: BaseModel](
+    existing_items: tp.Sequence[ProfileSchemaT],
+    incoming_items: tp.Sequence[BaseModel],
+    *,
+    profile_schema: type[ProfileSchemaT],
+    build_key: tp.Callable[[BaseModel], tp.Hashable],
+    weight_field: str,
+    timestamp_field: str,
+    limit: int,
+    alpha: float,
+    new_timestamp_value: datetime,
+) -> list[ProfileSchemaT] | None:
+    # `merge_weighted_item_schemas` over NumPy arrays of weights, only
+    # the items that make it into the top `limit` are built. Returns `None`
+    # when keys repeat, the Python merge keeps duplicates in a way that is
+    # not worth reproducing here
+    old_positions_by_key = {
+        build_key(item): position for position, item in enumerate(existing_items)
+    }
+    new_keys = [build_key(item) for item in incoming_items]
+    if len(old_positions_by_key) != len(existing_items) or len(set(new_keys)) != len(
+        new_keys
+    ):
+        return None
 
-    return merged_item_list
+    old_weights = np.fromiter(
+        (getattr(item, weight_field) for item in existing_items),
+        dtype=np.float64,
+        count=len(existing_items),
+    )
+    new_weights = np.fromiter(
+        (getattr(item, weight_field) for item in incoming_items),
+        dtype=np.float64,
+        count=len(incoming_items),
+    )
+    old_positions = np.fromiter(
+        (old_positions_by_key.get(key, -1) for key in new_keys),
+        dtype=np.intp,
+        count=len(new_keys),
+    )
+
+    # Same operations as `recalculate_weight`, rounding stays in Python since
+    # `numpy.round` rounds differently
+    is_intersecting = old_positions >= 0
+    intersecting_old_positions = old_positions[is_intersecting]
+    new_weights[is_intersecting] = [
+        round(weight, 2)
+        for weight in (
+            alpha * old_weights[intersecting_old_positions]
+            + (1 - alpha) * new_weights[is_intersecting]
+        ).tolist()
+    ]
+
+    # Candidates in the order of the Python merge: incoming items, then old
+    # non-intersecting ones
+    is_old_kept = np.ones(len(existing_items), dtype=bool)
+    is_old_kept[intersecting_old_positions] = False
+    kept_old_positions = np.flatnonzero(is_old_kept)
+    weights = np.concatenate([new_weights, old_weights[kept_old_positions]])
+
+    # Top `limit` as a stable descending sort would pick them: everything
+    # above the `limit`-th largest weight plus the earliest of its ties
+    selected = np.arange(len(weights))
+    if len(weights) > limit:
+        threshold = np.partition(weights, len(weights) - limit)[len(weights) - limit]
+        above = np.flatnonzero(weights > threshold)
+        ties = np.flatnonzero(weights == threshold)[: limit - len(above)]
+        selected = np.sort(np.concatenate([above, ties]))
+    selected = selected[np.argsort(-weights[selected], kind="stable")]
+
+    merged_items: list[ProfileSchemaT] = []
+    weights_list = weights.tolist()
+    old_positions_list = old_positions.tolist()
+    kept_old_positions_list = kept_old_positions.tolist()
+    for candidate in selected.tolist():
+        if candidate >= len(incoming_items):
+            merged_items.append(
+                existing_items[kept_old_positions_list[candidate - len(incoming_items)]]
+            )
+        elif old_positions_list[candidate] >= 0:
+            merged_items.append(
+                existing_items[old_positions_list[candidate]].model_copy(
+                    update={
+                        weight_field: weights_list[candidate],
+                        timestamp_field: new_timestamp_value,
+                    }
+                )
+            )
+        else:
+            merged_items.append(
+                profile_schema.model_construct(
+                    **{
+                        **incoming_items[candidate].__dict__,
+                        timestamp_field: new_timestamp_value,
+                    }
+                )
+            )
+
+    return merged_items
 
 
 def merge_keywords(
@@ -127,14 +388,15 @@ def merge_keywords_schemas(
     existing_keywords: tp.Sequence[KeywordTopicProfileSchema],
     incoming_keywords: tp.Sequence[KeywordTopicEventSchema],
 ) -> list[KeywordTopicProfileSchema]:
-    return list(
-        map(
-            KeywordTopicProfileSchema.model_validate,
-            merge_keywords(
-                [kw.model_dump() for kw in existing_keywords],
-                [kw.model_dump() for kw in incoming_keywords],
-            ),
-        )
+    return fold_weighted_item_schemas(
+        existing_keywords,
+        [incoming_keywords],
+        profile_schema=KeywordTopicProfileSchema,
+        key_fields=("name",),
+        weight_field="weight",
+        timestamp_field="updated_at",
+        limit=50,
+        alpha=0.8,
     )
 
 
@@ -142,14 +404,15 @@ def merge_entities_schemas(
     existing_entities: tp.Sequence[EntityTopicProfileSchema],
     incoming_entities: tp.Sequence[EntityTopicEventSchema],
 ) -> list[EntityTopicProfileSchema]:
-    return list(
-        map(
-            EntityTopicProfileSchema.model_validate,
-            merge_entities(
-                [et.model_dump() for et in existing_entities],
-                [et.model_dump() for et in incoming_entities],
-            ),
-        )
+    return fold_weighted_item_schemas(
+        existing_entities,
+        [incoming_entities],
+        profile_schema=EntityTopicProfileSchema,
+        key_fields=("category", "name"),
+        weight_field="weight",
+        timestamp_field="updated_at",
+        limit=50,
+        alpha=0.8,
     )
 
 
@@ -157,40 +420,495 @@ def merge_sentiment_schemas(
     existing_sentiment: tp.Sequence[SentimentTopicProfileSchema],
     incoming_sentiment: tp.Sequence[SentimentTopicEventSchema],
 ) -> list[SentimentTopicProfileSchema]:
-    return list(
-        map(
-            SentimentTopicProfileSchema.model_validate,
-            merge_sentiment(
-                [st.model_dump() for st in existing_sentiment],
-                [st.model_dump() for st in incoming_sentiment],
-            ),
-        )
+    return fold_weighted_item_schemas(
+        existing_sentiment,
+        [incoming_sentiment],
+        profile_schema=SentimentTopicProfileSchema,
+        key_fields=("name",),
+        weight_field="weight",
+        timestamp_field="updated_at",
+        limit=50,
+        alpha=0.8,
     )
 
 
 def update_aggregated_topic_attributes_dto_based_on_topic_attributes_event_schema(
     existing_aggregated_topic_attributes: AggregatedTopicAttributesDTO,
     incoming_topic_attributes_event: TopicAttributesEventBrokerDTO,
+    *,
+    half_life_days: float | None = None,
+    prune_weight: float = 0.0,
+) -> AggregatedTopicAttributesDTO:
+    return update_aggregated_topic_attributes_dto_based_on_topic_attributes_events(
+        existing_aggregated_topic_attributes,
+        [incoming_topic_attributes_event],
+        half_life_days=half_life_days,
+        prune_weight=prune_weight,
+    )
+
+
+def update_aggregated_topic_attributes_dto_based_on_topic_attributes_events(
+    existing_aggregated_topic_attributes: AggregatedTopicAttributesDTO,
+    incoming_topic_attributes_events: tp.Sequence[TopicAttributesEventBrokerDTO],
+    *,
+    half_life_days: float | None = None,
+    prune_weight: float = 0.0,
 ) -> AggregatedTopicAttributesDTO:
+    # Equivalent to applying
+    # `update_aggregated_topic_attributes_dto_based_on_topic_attributes_event_schema`
+    # for each of `incoming_topic_attributes_events` in order. The returned
+    # DTO may share unchanged items with `existing_aggregated_topic_attributes`.
+    # With `half_life_days`, items decayed below `prune_weight` are dropped
+    # before merging
+    if not incoming_topic_attributes_events:
+        return existing_aggregated_topic_attributes.model_copy()
+
     new_timestamp_value = utcnow()
-    new_aggregated_topic_attributes_schema = (
-        AggregatedTopicAttributesDTO.model_validate(
-            existing_aggregated_topic_attributes.model_dump()
+    if half_life_days is not None:
+        existing_aggregated_topic_attributes = prune_aggregated_topic_attributes_dto(
+            existing_aggregated_topic_attributes,
+            half_life_days=half_life_days,
+            min_weight=prune_weight,
+            now=new_timestamp_value,
         )
+    return existing_aggregated_topic_attributes.model_copy(
+        update={
+            "keywords": fold_weighted_item_schemas(
+                existing_aggregated_topic_attributes.keywords,
+                [event.keywords for event in incoming_topic_attributes_events],
+                profile_schema=KeywordTopicProfileSchema,
+                key_fields=("name",),
+                weight_field="weight",
+                timestamp_field="updated_at",
+                limit=50,
+                alpha=0.8,
+                new_timestamp_value=new_timestamp_value,
+            ),
+            "entities": fold_weighted_item_schemas(
+                existing_aggregated_topic_attributes.entities,
+                [event.entities for event in incoming_topic_attributes_events],
+                profile_schema=EntityTopicProfileSchema,
+                key_fields=("category", "name"),
+                weight_field="weight",
+                timestamp_field="updated_at",
+                limit=50,
+                alpha=0.8,
+                new_timestamp_value=new_timestamp_value,
+            ),
+            "sentiments": fold_weighted_item_schemas(
+                existing_aggregated_topic_attributes.sentiments,
+                [event.sentiments for event in incoming_topic_attributes_events],
+                profile_schema=SentimentTopicProfileSchema,
+                key_fields=("name",),
+                weight_field="weight",
+                timestamp_field="updated_at",
+                limit=50,
+                alpha=0.8,
+                new_timestamp_value=new_timestamp_value,
+            ),
+            "updated_at": new_timestamp_value,
+        }
     )
 
-    new_aggregated_topic_attributes_schema.keywords = merge_keywords_schemas(
-        existing_aggregated_topic_attributes.keywords,
-        incoming_topic_attributes_event.keywords,
+
+def get_decayed_weight(
+    item: BaseModel,
+    *,
+    weight_field: str,
+    timestamp_field: str,
+    half_life_days: float,
+    now: datetime,
+) -> float:
+    timestamp_value: datetime = getattr(item, timestamp_field)
+    if timestamp_value.tzinfo is None:
+        # Documents read by motor carry naive UTC datetimes
+        timestamp_value = timestamp_value.replace(tzinfo=UTC)
+
+    return decay_weight(
+        getattr(item, weight_field),
+        age_seconds=(now - timestamp_value).total_seconds(),
+        half_life_seconds=half_life_days * SECONDS_PER_DAY,
     )
-    new_aggregated_topic_attributes_schema.entities = merge_entities_schemas(
-        existing_aggregated_topic_attributes.entities,
-        incoming_topic_attributes_event.entities,
+
+
+def decay_aggregated_topic_attributes_dto[
+    AggregatedTopicAttributesT: AggregatedTopicAttributesGetDTO
+](
+    aggregated_topic_attributes: AggregatedTopicAttributesT,
+    *,
+    half_life_days: float,
+    now: datetime | None = None,
+) -> AggregatedTopicAttributesT:
+    # Weights as of `now` rather than as of each item's `updated_at`, items
+    # are reordered by the decayed weight
+    now = now or utcnow()
+
+    def decay_items[ProfileSchemaT: BaseModel](
+        items: tp.Sequence[ProfileSchemaT],
+    ) -> list[ProfileSchemaT]:
+        decayed_items = [
+            item.model_copy(
+                update={
+                    "weight": get_decayed_weight(
+                        item,
+                        weight_field="weight",
+                        timestamp_field="updated_at",
+                        half_life_days=half_life_days,
+                        now=now,
+                    )
+                }
+            )
+            for item in items
+        ]
+        decayed_items.sort(key=attrgetter("weight"), reverse=True)
+        return decayed_items
+
+    return aggregated_topic_attributes.model_copy(
+        update={
+            "keywords": decay_items(aggregated_topic_attributes.keywords),
+            "entities": decay_items(aggregated_topic_attributes.entities),
+            "sentiments": decay_items(aggregated_topic_attributes.sentiments),
+        }
     )
-    new_aggregated_topic_attributes_schema.sentiments = merge_sentiment_schemas(
-        existing_aggregated_topic_attributes.sentiments,
-        incoming_topic_attributes_event.sentiments,
+
+
+def prune_aggregated_topic_attributes_dto(
+    aggregated_topic_attributes: AggregatedTopicAttributesDTO,
+    *,
+    half_life_days: float,
+    min_weight: float,
+    now: datetime | None = None,
+) -> AggregatedTopicAttributesDTO:
+    # Drops items decayed below `min_weight`, kept ones are left as stored
+    now = now or utcnow()
+
+    def prune_items[ProfileSchemaT: BaseModel](
+        items: tp.Sequence[ProfileSchemaT],
+    ) -> list[ProfileSchemaT]:
+        return [
+            item
+            for item in items
+            if get_decayed_weight(
+                item,
+                weight_field="weight",
+                timestamp_field="updated_at",
+                half_life_days=half_life_days,
+                now=now,
+            )
+            >= min_weight
+        ]
+
+    return aggregated_topic_attributes.model_copy(
+        update={
+            "keywords": prune_items(aggregated_topic_attributes.keywords),
+            "entities": prune_items(aggregated_topic_attributes.entities),
+            "sentiments": prune_items(aggregated_topic_attributes.sentiments),
+        }
     )
-    new_aggregated_topic_attributes_schema.updated_at = new_timestamp_value
 
-    return new_aggregated_topic_attributes_schema
+
+def diff_aggregated_topic_attributes_dto(
+    old_aggregated_topic_attributes: AggregatedTopicAttributesDTO,
+    new_aggregated_topic_attributes: AggregatedTopicAttributesDTO,
+) -> tuple[list[tuple[str, BaseModel]], list[tuple[str, BaseModel]]]:
+    # Returns the items added or updated by a merge and the items it evicted
+    # or pruned, as `(field, item)` pairs. Items left untouched by the merge
+    # are in neither
+    changed_items: list[tuple[str, BaseModel]] = []
+    removed_items: list[tuple[str, BaseModel]] = []
+    for field, key_fields in WEIGHTED_ITEM_KEY_FIELDS.items():
+        build_key = attrgetter(*key_fields)
+        old_items_by_key: dict[tp.Any, BaseModel] = {
+            build_key(item): item
+            for item in getattr(old_aggregated_topic_attributes, field)
+        }
+        for item in getattr(new_aggregated_topic_attributes, field):
+            if old_items_by_key.pop(build_key(item), None) != item:
+                changed_items.append((field, item))
+        removed_items.extend((field, item) for item in old_items_by_key.values())
+
+    return changed_items, removed_items
+
+
+def build_decayed_weight_expression(
+    item_expression: str,
+    *,
+    weight_field: str,
+    timestamp_field: str,
+    half_life_days: float,
+    now_expression: tp.Any = "$$NOW",
+) -> dict[str, tp.Any]:
+    # MongoDB aggregation expression equivalent to `get_decayed_weight`, with
+    # `item_expression` like "$$item"
+    return {
+        "$multiply": [
+            f"{item_expression}.{weight_field}",
+            {
+                "$pow": [
+                    0.5,
+                    {
+                        "$divide": [
+                            {
+                                "$max": [
+                                    {
+                                        "$subtract": [
+                                            now_expression,
+                                            f"{item_expression}.{timestamp_field}",
+                                        ]
+                                    },
+                                    0,
+                                ]
+                            },
+                            half_life_days * SECONDS_PER_DAY * 1000,
+                        ]
+                    },
+                ]
+            },
+        ]
+    }
+
+
+def build_prune_weighted_item_lists_expression(
+    existing_item_list_expression: tp.Any,
+    *,
+    weight_field: str,
+    timestamp_field: str,
+    half_life_days: float,
+    min_weight: float,
+    now_expression: tp.Any,
+) -> dict[str, tp.Any]:
+    # MongoDB aggregation expression equivalent to the pruning of
+    # `prune_aggregated_topic_attributes_dto`
+    return {
+        "$filter": {
+            "input": {"$ifNull": [existing_item_list_expression, []]},
+            "as": "item",
+            "cond": {
+                "$gte": [
+                    build_decayed_weight_expression(
+                        "$$item",
+                        weight_field=weight_field,
+                        timestamp_field=timestamp_field,
+                        half_life_days=half_life_days,
+                        now_expression=now_expression,
+                    ),
+                    min_weight,
+                ]
+            },
+        }
+    }
+
+
+def build_merge_weighted_item_lists_expression(
+    existing_item_list_expression: tp.Any,
+    incoming_item_list: tp.Sequence[tp.Mapping[str, tp.Any]],
+    *,
+    key_fields: tp.Sequence[str],
+    weight_field: str,
+    timestamp_field: str,
+    limit: int,
+    alpha: float,
+    new_timestamp_value: datetime,
+) -> dict[str, tp.Any]:
+    # MongoDB aggregation expression (>= 5.2) equivalent to
+    # `merge_weighted_item_lists`. Items are tagged with their position in the
+    # Python merge, so ties in weight keep the same order after sorting
+    incoming_keys = [
+        list(build_key_from_item_fields(key_fields, item))
+        for item in incoming_item_list
+    ]
+
+    merged_items = []
+    for index, (new_item, new_key) in enumerate(zip(incoming_item_list, incoming_keys)):
+        new_item_literal = {"$literal": dict(new_item)}
+        merged_items.append(
+            {
+                "$let": {
+                    "vars": {
+                        "old_item": {
+                            "$first": {
+                                "$filter": {
+                                    "input": "$$existing_items",
+                                    "as": "item",
+                                    "cond": {
+                                        "$eq": [
+                                            [f"$$item.{field}" for field in key_fields],
+                                            {"$literal": new_key},
+                                        ]
+                                    },
+                                }
+                            }
+                        }
+                    },
+                    "in": {
+                        "$cond": [
+                            {"$eq": [{"$type": "$$old_item"}, "missing"]},
+                            {
+                                "$mergeObjects": [
+                                    new_item_literal,
+                                    {
+                                        timestamp_field: new_timestamp_value,
+                                        "_position": index,
+                                    },
+                                ]
+                            },
+                            {
+                                "$mergeObjects": [
+                                    new_item_literal,
+                                    "$$old_item",
+                                    {
+                                        # Same operations as `recalculate_weight`
+                                        weight_field: {
+                                            "$round": [
+                                                {
+                                                    "$add": [
+                                                        {
+                                                            "$multiply": [
+                                                                alpha,
+                                                                f"$$old_item.{weight_field}",
+                                                            ]
+                                                        },
+                                                        (1 - alpha)
+                                                        * new_item[weight_field],
+                                                    ]
+                                                },
+                                                2,
+                                            ]
+                                        },
+                                        timestamp_field: new_timestamp_value,
+                                        "_position": index,
+                                    },
+                                ]
+                            },
+                        ]
+                    },
+                }
+            }
+        )
+
+    old_items = {
+        "$filter": {
+            "input": {
+                "$map": {
+                    "input": {"$range": [0, {"$size": "$$existing_items"}]},
+                    "as": "index",
+                    "in": {
+                        "$mergeObjects": [
+                            {"$arrayElemAt": ["$$existing_items", "$$index"]},
+                            {"_position": {"$add": [len(merged_items), "$$index"]}},
+                        ]
+                    },
+                }
+            },
+            "as": "item",
+            "cond": {
+                "$not": {
+                    "$in": [
+                        [f"$$item.{field}" for field in key_fields],
+                        {"$literal": incoming_keys},
+                    ]
+                }
+            },
+        }
+    }
+
+    return {
+        "$let": {
+            "vars": {
+                "existing_items": {"$ifNull": [existing_item_list_expression, []]}
+            },
+            "in": {
+                "$map": {
+                    "input": {
+                        "$slice": [
+                            {
+                                "$sortArray": {
+                                    "input": {
+                                        "$concatArrays": [merged_items, old_items]
+                                    },
+                                    "sortBy": {weight_field: -1, "_position": 1},
+                                }
+                            },
+                            limit,
+                        ]
+                    },
+                    "as": "item",
+                    "in": {"$unsetField": {"field": "_position", "input": "$$item"}},
+                }
+            },
+        }
+    }
+
+
+def build_update_aggregated_topic_attributes_pipeline(
+    incoming_topic_attributes_event: TopicAttributesEventBrokerDTO,
+    *,
+    new_timestamp_value: datetime | None = None,
+    half_life_days: float | None = None,
+    prune_weight: float = 0.0,
+) -> list[dict[str, tp.Any]]:
+    # A single update-with-aggregation-pipeline doing what
+    # `update_aggregated_topic_attributes_dto_based_on_topic_attributes_event_schema`
+    # does, applied atomically by the server
+    new_timestamp_value = new_timestamp_value or utcnow()
+
+    def existing_items(field: str) -> tp.Any:
+        if half_life_days is None:
+            return f"${field}"
+        return build_prune_weighted_item_lists_expression(
+            f"${field}",
+            weight_field="weight",
+            timestamp_field="updated_at",
+            half_life_days=half_life_days,
+            min_weight=prune_weight,
+            now_expression=new_timestamp_value,
+        )
+
+    return [
+        {
+            "$set": {
+                "user_id": {"$literal": incoming_topic_attributes_event.user_id},
+                "keywords": build_merge_weighted_item_lists_expression(
+                    existing_items("keywords"),
+                    [
+                        kw.model_dump()
+                        for kw in incoming_topic_attributes_event.keywords
+                    ],
+                    key_fields=("name",),
+                    weight_field="weight",
+                    timestamp_field="updated_at",
+                    limit=50,
+                    alpha=0.8,
+                    new_timestamp_value=new_timestamp_value,
+                ),
+                "entities": build_merge_weighted_item_lists_expression(
+                    existing_items("entities"),
+                    [
+                        et.model_dump()
+                        for et in incoming_topic_attributes_event.entities
+                    ],
+                    key_fields=("category", "name"),
+                    weight_field="weight",
+                    timestamp_field="updated_at",
+                    limit=50,
+                    alpha=0.8,
+                    new_timestamp_value=new_timestamp_value,
+                ),
+                "sentiments": build_merge_weighted_item_lists_expression(
+                    existing_items("sentiments"),
+                    [
+                        st.model_dump()
+                        for st in incoming_topic_attributes_event.sentiments
+                    ],
+                    key_fields=("name",),
+                    weight_field="weight",
+                    timestamp_field="updated_at",
+                    limit=50,
+                    alpha=0.8,
+                    new_timestamp_value=new_timestamp_value,
+                ),
+                "updated_at": new_timestamp_value,
+                "version": {"$add": [{"$ifNull": ["$version", 0]}, 1]},
+            }
+        }
+    ]
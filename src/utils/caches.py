@@ -0,0 +1,78 @@
+import time
+import typing as tp
+from collections import OrderedDict
+
+from src.utils.metrics import get_counter
+
+__all__ = ["LRUCache", "TTLCache"]
+
+
+class LRUCache[K, V]:
+    def __init__(self, *, maxsize: int, name: str) -> None:
+        self.maxsize = maxsize
+        self._entries: OrderedDict[K, V] = OrderedDict()
+        self._hits = get_counter(f"{name}.cache_hits")
+        self._misses = get_counter(f"{name}.cache_misses")
+
+    def get(self, key: K) -> V | None:
+        try:
+            value = self._entries[key]
+        except KeyError:
+            self._misses.inc()
+            return None
+
+        self._entries.move_to_end(key)
+        self._hits.inc()
+        return value
+
+    def set(self, key: K, value: V) -> None:
+        if self.maxsize <= 0:
+            return
+
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class TTLCache[K, V]:
+    # Entries expire `ttl_ms` after being set, the oldest ones are evicted
+    # first once `maxsize` is reached
+    def __init__(self, *, maxsize: int, ttl_ms: int, name: str) -> None:
+        self.maxsize = maxsize
+        self.ttl_ms = ttl_ms
+        self._entries: OrderedDict[K, tuple[float, V]] = OrderedDict()
+        self._hits = get_counter(f"{name}.cache_hits")
+        self._misses = get_counter(f"{name}.cache_misses")
+
+    def get(self, key: K) -> V | None:
+        entry = self._entries.get(key)
+        if entry is None or entry[0] <= time.monotonic():
+            self._entries.pop(key, None)
+            self._misses.inc()
+            return None
+
+        self._hits.inc()
+        return entry[1]
+
+    def set(self, key: K, value: V) -> None:
+        if self.maxsize <= 0 or self.ttl_ms <= 0:
+            return
+
+        self._entries.pop(key, None)
+        self._entries[key] = (time.monotonic() + self.ttl_ms / 1000, value)
+        if len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def __contains__(self, key: object) -> bool:
+        entry = self._entries.get(tp.cast(K, key))
+        return entry is not None and entry[0] > time.monotonic()
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,72 @@
+import base64
+import binascii
+import json
+import math
+import typing as tp
+import uuid
+from datetime import datetime
+
+__all__ = [
+    "decode_cursor",
+    "decode_keyset_cursor",
+    "decode_users_keyset_cursor",
+    "encode_cursor",
+    "encode_keyset_cursor",
+    "encode_users_keyset_cursor",
+]
+
+
+def encode_cursor(values: tp.Sequence[str]) -> str:
+    payload = json.dumps(list(values))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, *, size: int) -> list[str]:
+    try:
+        payload = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(payload)
+    except (binascii.Error, UnicodeDecodeError, ValueError) as exc:
+        raise ValueError("Invalid cursor") from exc
+
+    if (
+        not isinstance(values, list)
+        or len(values) != size
+        or not all(isinstance(value, str) for value in values)
+    ):
+        raise ValueError("Invalid cursor")
+
+    return values
+
+
+def encode_keyset_cursor(ts: datetime, uuid_: uuid.UUID) -> str:
+    return encode_cursor([ts.isoformat(), str(uuid_)])
+
+
+def decode_keyset_cursor(cursor: str) -> tuple[datetime, uuid.UUID]:
+    ts, uuid_ = decode_cursor(cursor, size=2)
+    try:
+        return datetime.fromisoformat(ts), uuid.UUID(uuid_)
+    except ValueError as exc:
+        raise ValueError("Invalid cursor") from exc
+
+
+def encode_users_keyset_cursor(weights: tp.Sequence[float | None], user_id: str) -> str:
+    # `repr` round-trips floats exactly, a missing weight is encoded as ""
+    return encode_cursor(
+        [*("" if weight is None else repr(weight) for weight in weights), user_id]
+    )
+
+
+def decode_users_keyset_cursor(
+    cursor: str, *, size: int = 3
+) -> tuple[list[float | None], str]:
+    *values, user_id = decode_cursor(cursor, size=size + 1)
+    try:
+        weights = [float(value) if value else None for value in values]
+    except ValueError as exc:
+        raise ValueError("Invalid cursor") from exc
+
+    if not all(weight is None or math.isfinite(weight) for weight in weights):
+        raise ValueError("Invalid cursor")
+
+    return weights, user_id
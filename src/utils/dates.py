@@ -1,7 +1,13 @@
-from datetime import datetime, timezone
+from datetime import UTC, datetime, timezone
 
-__all__ = ["utcnow"]
+__all__ = ["as_utc", "utcnow"]
 
 
 def utcnow() -> datetime:
     return datetime.now(timezone.utc)
+
+
+def as_utc(value: datetime) -> datetime:
+    # Naive datetimes, as read from ClickHouse `DateTime` columns and by motor,
+    # are in UTC
+    return value.replace(tzinfo=UTC) if value.tzinfo is None else value
@@ -1,7 +1,7 @@
 import typing as tp
 from operator import attrgetter
 
-__all__ = ["split_attributes_from_items"]
+__all__ = ["iter_chunks_by_size", "split_attributes_from_items"]
 
 
 def split_attributes_from_items(
@@ -9,3 +9,30 @@ def split_attributes_from_items(
     *attrs: str,
 ) -> list[list[tp.Any]]:
     return [list(map(attrgetter(attr), items)) for attr in attrs]
+
+
+async def iter_chunks_by_size[T](
+    chunks: tp.AsyncIterable[tp.Sequence[T]],
+    *,
+    max_items: int,
+    max_bytes: int,
+    size_of: tp.Callable[[T], int],
+) -> tp.AsyncGenerator[list[T]]:
+    # Regroups `chunks` so each holds at most `max_items` items whose sizes add
+    # up to at most `max_bytes`, a larger item makes a chunk of its own
+    chunk: list[T] = []
+    chunk_bytes = 0
+    async for items in chunks:
+        for item in items:
+            item_bytes = size_of(item)
+            if chunk and (
+                len(chunk) >= max_items or chunk_bytes + item_bytes > max_bytes
+            ):
+                yield chunk
+                chunk, chunk_bytes = [], 0
+
+            chunk.append(item)
+            chunk_bytes += item_bytes
+
+    if chunk:
+        yield chunk
@@ -0,0 +1,64 @@
+import typing as tp
+from dataclasses import dataclass
+
+__all__ = [
+    "Counter",
+    "Summary",
+    "collect_metrics",
+    "get_counter",
+    "get_summary",
+]
+
+
+@dataclass
+class Counter:
+    value: int = 0
+
+    def inc(self, amount: int = 1) -> None:
+        self.value += amount
+
+
+@dataclass
+class Summary:
+    count: int = 0
+    total: float = 0.0
+    max: float = 0.0
+    last: float = 0.0
+
+    def observe(self, value: float) -> None:
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+        self.last = value
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+
+_counters: dict[str, Counter] = {}
+_summaries: dict[str, Summary] = {}
+
+
+def get_counter(name: str) -> Counter:
+    return _counters.setdefault(name, Counter())
+
+
+def get_summary(name: str) -> Summary:
+    return _summaries.setdefault(name, Summary())
+
+
+def collect_metrics() -> dict[str, tp.Any]:
+    return {
+        "counters": {name: counter.value for name, counter in _counters.items()},
+        "summaries": {
+            name: {
+                "count": summary.count,
+                "total": summary.total,
+                "mean": summary.mean,
+                "max": summary.max,
+                "last": summary.last,
+            }
+            for name, summary in _summaries.items()
+        },
+    }
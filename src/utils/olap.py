@@ -1,4 +1,5 @@
 import functools
+import inspect
 import typing as tp
 from contextlib import asynccontextmanager
 
@@ -6,6 +7,7 @@ from asynch import Connection, Pool
 
 __all__ = [
     "build_get_clickhouse_connection",
+    "execute_columnar_insert",
     "get_clickhouse_connection_from_pool",
     "GetClickhouseConnection",
 ]
@@ -28,3 +30,35 @@ def build_get_clickhouse_connection(
     pool: Pool,
 ) -> GetClickhouseConnection:
     return functools.partial(get_clickhouse_connection_from_pool, pool)
+
+
+def _has_columnar_execute(protocol_connection: tp.Any) -> bool:
+    execute = getattr(protocol_connection, "execute", None)
+    return execute is not None and ("columnar" in inspect.signature(execute).parameters)
+
+
+async def execute_columnar_insert(
+    connection: Connection,
+    query: str,
+    columns: tp.Sequence[tp.Sequence[tp.Any]],
+) -> int:
+    """Inserts `columns`, one sequence of values per column of `query`.
+
+    `asynch` cursors do not expose the driver's columnar mode, so the insert
+    goes through the private `Connection._connection.execute(..., columnar=True)`
+    of `asynch` 0.3.x, which `asynch` is pinned to. Should a release drop it,
+    the columns are transposed and inserted as rows through a public cursor,
+    and `tests/utils/test_olap.py` fails on the installed version.
+    """
+    protocol_connection: tp.Any = getattr(connection, "_connection", None)
+    if not _has_columnar_execute(protocol_connection):
+        async with connection.cursor() as cursor:
+            inserted_rows: int = await cursor.execute(query, list(zip(*columns)))
+            return inserted_rows
+
+    inserted_rows = await protocol_connection.execute(
+        query,
+        list(columns),
+        columnar=True,
+    )
+    return inserted_rows
@@ -0,0 +1,27 @@
+import asyncio
+import random
+import typing as tp
+
+__all__ = ["retry_with_backoff"]
+
+
+async def retry_with_backoff(
+    operation: tp.Callable[[], tp.Awaitable[bool]],
+    *,
+    max_attempts: int,
+    base_delay_ms: int,
+    max_delay_ms: int,
+) -> bool:
+    # Runs `operation` until it reports success, sleeping with exponential
+    # backoff and full jitter in between. Returns whether it has succeeded
+    for attempt in range(max_attempts):
+        if await operation():
+            return True
+
+        if attempt + 1 == max_attempts:
+            break
+
+        delay_ms = min(max_delay_ms, base_delay_ms * 2**attempt)
+        await asyncio.sleep(random.uniform(0, delay_ms) / 1000)
+
+    return False
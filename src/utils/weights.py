@@ -1,4 +1,6 @@
-__all__ = ["recalculate_weight"]
+import math
+
+__all__ = ["decay_weight", "recalculate_weight"]
 
 
 def recalculate_weight(
@@ -10,3 +12,13 @@ def recalculate_weight(
 ) -> float:
     result = alpha * old_weight + (1 - alpha) * new_weight
     return round(result, precision)
+
+
+def decay_weight(
+    weight: float,
+    *,
+    age_seconds: float,
+    half_life_seconds: float,
+) -> float:
+    # Halves every `half_life_seconds`, timestamps in the future don't grow it
+    return weight * math.pow(0.5, max(age_seconds, 0.0) / half_life_seconds)
@@ -1,26 +1,35 @@
 import typing as tp
-from unittest.mock import AsyncMock
+import uuid
+from datetime import UTC, datetime, timedelta
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
-from fastapi import FastAPI, Request, status
+from fastapi import APIRouter, FastAPI, Request, status
 from fastapi.testclient import TestClient
 from starlette.responses import Response
 
 from src.api.routers.events import router
-from src.dtos import ContentEventBrokerDTO, ContentEventCreateDTO, MessageResponseDTO
+from src.dtos import (
+    ContentEventBrokerDTO,
+    ContentEventCreateDTO,
+    MessageResponseDTO,
+    TopicAttributesEventDTO,
+)
+from src.utils.caches import LRUCache
+from src.utils.cursors import (
+    decode_cursor,
+    decode_keyset_cursor,
+    encode_cursor,
+    encode_keyset_cursor,
+)
 
 
-class TestCreateContentEventEndpoint:
-    @pytest.fixture
-    def app(self) -> FastAPI:
-        app = FastAPI()
-        app.include_router(router)
-        return app
+@pytest.fixture
+def api_router() -> APIRouter:
+    return router
 
-    @pytest.fixture
-    def client(self, app: FastAPI) -> TestClient:
-        return TestClient(app)
 
+class TestCreateContentEventEndpoint:
     @pytest.fixture
     def mock_broker(self) -> AsyncMock:
         return AsyncMock()
@@ -88,3 +97,584 @@ class TestCreateContentEventEndpoint:
         assert any("user_id" in error["loc"] for error in response_data["detail"])
 
         mock_broker.publish.assert_not_called()
+
+
+class TestGetContentEventsEndpoint:
+    @pytest.fixture
+    def app(self, app: FastAPI) -> FastAPI:
+        app.state.settings = MagicMock()
+        app.state.settings.clickhouse.content_events_chunk_size = 2
+        app.state.get_clickhouse_connection = MagicMock()
+        return app
+
+    @staticmethod
+    def build_content_events(count: int) -> list[dict[str, tp.Any]]:
+        started_at = datetime(2023, 1, 1, tzinfo=UTC)
+        return [
+            {
+                "content_event_uuid": uuid.uuid4(),
+                "user_id": "test_user_id",
+                "content": f"Content {index}",
+                "timestamp": started_at + timedelta(minutes=index),
+            }
+            for index in range(count)
+        ]
+
+    @staticmethod
+    def build_chunks_iterator(
+        rows: list[dict[str, tp.Any]], chunk_size: int = 2
+    ) -> tp.AsyncGenerator[list[dict[str, tp.Any]]]:
+        async def iter_chunks() -> tp.AsyncGenerator[list[dict[str, tp.Any]]]:
+            for index in range(0, len(rows), chunk_size):
+                yield rows[index : index + chunk_size]
+
+        return iter_chunks()
+
+    @patch("src.api.routers.events.iter_content_events_repository")
+    def test_get_content_events_endpoint_first_page(
+        self,
+        mock_iter_content_events: MagicMock,
+        client: TestClient,
+        app: FastAPI,
+    ) -> None:
+        # Arrange
+        content_events = self.build_content_events(4)
+        mock_iter_content_events.return_value = self.build_chunks_iterator(
+            content_events
+        )
+
+        # Act
+        response = client.get(
+            "/events/content",
+            params={"user_id": "test_user_id", "limit": 3},
+        )
+
+        # Assert
+        assert response.status_code == status.HTTP_200_OK
+        mock_iter_content_events.assert_called_once_with(
+            "test_user_id",
+            columns=["content_event_uuid", "user_id", "content", "timestamp"],
+            since=None,
+            until=None,
+            after=None,
+            limit=4,
+            chunk_size=2,
+            get_connection=app.state.get_clickhouse_connection,
+        )
+
+        response_data = response.json()
+        assert [item["content"] for item in response_data["items"]] == [
+            "Content 0",
+            "Content 1",
+            "Content 2",
+        ]
+        assert decode_keyset_cursor(response_data["next_cursor"]) == (
+            content_events[2]["timestamp"],
+            content_events[2]["content_event_uuid"],
+        )
+
+    @patch("src.api.routers.events.iter_content_events_repository")
+    def test_get_content_events_endpoint_last_page(
+        self,
+        mock_iter_content_events: MagicMock,
+        client: TestClient,
+    ) -> None:
+        # Arrange
+        content_events = self.build_content_events(2)
+        mock_iter_content_events.return_value = self.build_chunks_iterator(
+            content_events
+        )
+        cursor = encode_keyset_cursor(datetime(2022, 12, 31, tzinfo=UTC), uuid.uuid4())
+
+        # Act
+        response = client.get(
+            "/events/content",
+            params={"user_id": "test_user_id", "limit": 3, "cursor": cursor},
+        )
+
+        # Assert
+        assert response.status_code == status.HTTP_200_OK
+        assert mock_iter_content_events.call_args.kwargs["after"] == (
+            decode_keyset_cursor(cursor)
+        )
+        response_data = response.json()
+        assert len(response_data["items"]) == 2
+        assert response_data["next_cursor"] is None
+
+    @patch("src.api.routers.events.iter_content_events_repository")
+    def test_get_content_events_endpoint_fields(
+        self,
+        mock_iter_content_events: MagicMock,
+        client: TestClient,
+    ) -> None:
+        # Arrange
+        mock_iter_content_events.return_value = self.build_chunks_iterator(
+            self.build_content_events(1)
+        )
+
+        # Act
+        response = client.get(
+            "/events/content",
+            params={"user_id": "test_user_id", "fields": ["content"]},
+        )
+
+        # Assert
+        assert response.status_code == status.HTTP_200_OK
+        assert mock_iter_content_events.call_args.kwargs["columns"] == [
+            "content",
+            "timestamp",
+            "content_event_uuid",
+        ]
+        assert response.json() == {
+            "items": [{"content": "Content 0"}],
+            "next_cursor": None,
+        }
+
+    @patch("src.api.routers.events.iter_content_events_repository")
+    def test_get_content_events_endpoint_unknown_fields(
+        self,
+        mock_iter_content_events: MagicMock,
+        client: TestClient,
+    ) -> None:
+        # Act
+        response = client.get(
+            "/events/content",
+            params={"user_id": "test_user_id", "fields": ["secret"]},
+        )
+
+        # Assert
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert response.json() == {"detail": "Unknown fields: secret"}
+        mock_iter_content_events.assert_not_called()
+
+    @patch("src.api.routers.events.iter_content_events_repository")
+    def test_get_content_events_endpoint_invalid_cursor(
+        self,
+        mock_iter_content_events: MagicMock,
+        client: TestClient,
+    ) -> None:
+        # Act
+        response = client.get(
+            "/events/content",
+            params={"user_id": "test_user_id", "cursor": "not a cursor"},
+        )
+
+        # Assert
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert response.json() == {"detail": "Invalid cursor"}
+        mock_iter_content_events.assert_not_called()
+
+    @patch("src.api.routers.events.iter_content_events_repository")
+    def test_get_content_events_endpoint_fails_before_streaming(
+        self,
+        mock_iter_content_events: MagicMock,
+        app: FastAPI,
+    ) -> None:
+        # Arrange
+        async def iter_chunks() -> tp.AsyncGenerator[list[dict[str, tp.Any]]]:
+            raise RuntimeError("ClickHouse is unavailable")
+            yield []
+
+        mock_iter_content_events.return_value = iter_chunks()
+        client = TestClient(app, raise_server_exceptions=False)
+
+        # Act
+        response = client.get("/events/content", params={"user_id": "test_user_id"})
+
+        # Assert
+        # The first chunk is read before any byte of the body is sent
+        assert response.status_code == status.HTTP_500_INTERNAL_SERVER_ERROR
+
+    @patch("src.api.routers.events.iter_content_events_repository")
+    def test_get_content_events_endpoint_fails_while_streaming(
+        self,
+        mock_iter_content_events: MagicMock,
+        client: TestClient,
+    ) -> None:
+        # Arrange
+        content_events = self.build_content_events(2)
+
+        async def iter_chunks() -> tp.AsyncGenerator[list[dict[str, tp.Any]]]:
+            yield content_events
+            raise RuntimeError("Connection reset")
+
+        mock_iter_content_events.return_value = iter_chunks()
+
+        # Act
+        response = client.get(
+            "/events/content", params={"user_id": "test_user_id", "limit": 3}
+        )
+
+        # Assert
+        # The page stays well-formed JSON, ending with an error instead of a cursor
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json() == {
+            "items": [
+                {
+                    "content_event_uuid": str(content_event["content_event_uuid"]),
+                    "user_id": "test_user_id",
+                    "content": content_event["content"],
+                    "timestamp": content_event["timestamp"].isoformat(),
+                }
+                for content_event in content_events
+            ],
+            "next_cursor": None,
+            "error": "Failed to read the page",
+        }
+
+
+class TestGetTopicAttributesEventsEndpoint:
+    @pytest.fixture
+    def app(self, app: FastAPI) -> FastAPI:
+        app.state.settings = MagicMock()
+        app.state.settings.clickhouse.topic_attributes_events_chunk_size = 2
+        app.state.get_clickhouse_connection = MagicMock()
+        return app
+
+    @staticmethod
+    def build_topic_attributes_events(count: int) -> list[dict[str, tp.Any]]:
+        started_at = datetime(2023, 1, 1, tzinfo=UTC)
+        return [
+            {
+                "topic_attributes_event_uuid": uuid.uuid4(),
+                "content_event_uuid": uuid.uuid4(),
+                "user_id": "test_user_id",
+                "sentiments_name": ["positive"],
+                "sentiments_weight": [0.9],
+                "keywords_name": ["python", "clickhouse"],
+                "keywords_weight": [0.5, 0.25],
+                "entities_category": ["ORG"],
+                "entities_name": ["ITMO"],
+                "entities_weight": [1.0],
+                "timestamp": started_at + timedelta(minutes=index),
+            }
+            for index in range(count)
+        ]
+
+    @staticmethod
+    def build_chunks_iterator(
+        rows: list[dict[str, tp.Any]],
+    ) -> tp.AsyncGenerator[list[dict[str, tp.Any]]]:
+        async def iter_chunks() -> tp.AsyncGenerator[list[dict[str, tp.Any]]]:
+            if rows:
+                yield rows
+
+        return iter_chunks()
+
+    @staticmethod
+    def build_failing_chunks_iterator(
+        rows: list[dict[str, tp.Any]],
+    ) -> tp.AsyncGenerator[list[dict[str, tp.Any]]]:
+        async def iter_chunks() -> tp.AsyncGenerator[list[dict[str, tp.Any]]]:
+            if rows:
+                yield rows
+            raise RuntimeError("ClickHouse is unavailable")
+
+        return iter_chunks()
+
+    @patch("src.api.routers.events.iter_topic_attributes_events_repository")
+    def test_get_topic_attributes_events_endpoint_events(
+        self,
+        mock_iter_topic_attributes_events: MagicMock,
+        client: TestClient,
+        app: FastAPI,
+    ) -> None:
+        # Arrange
+        topic_attributes_events = self.build_topic_attributes_events(3)
+        mock_iter_topic_attributes_events.return_value = self.build_chunks_iterator(
+            topic_attributes_events
+        )
+
+        # Act
+        response = client.get(
+            "/events/topicAttributes",
+            params={"user_id": "test_user_id", "keywords": ["python"], "limit": 2},
+        )
+
+        # Assert
+        assert response.status_code == status.HTTP_200_OK
+        mock_iter_topic_attributes_events.assert_called_once_with(
+            after=None,
+            user_id="test_user_id",
+            since=None,
+            until=None,
+            keywords=["python"],
+            entities=[],
+            sentiments=[],
+            limit=3,
+            chunk_size=2,
+            get_connection=app.state.get_clickhouse_connection,
+        )
+
+        response_data = response.json()
+        assert len(response_data["items"]) == 2
+        assert response_data["items"][0]["keywords"] == [
+            {"name": "python", "weight": 0.5},
+            {"name": "clickhouse", "weight": 0.25},
+        ]
+        assert response_data["items"][0]["entities"] == [
+            {"category": "ORG", "name": "ITMO", "weight": 1.0}
+        ]
+        assert decode_keyset_cursor(response_data["next_cursor"]) == (
+            topic_attributes_events[1]["timestamp"],
+            topic_attributes_events[1]["topic_attributes_event_uuid"],
+        )
+
+    @patch("src.api.routers.events.iter_topic_attributes_events_repository")
+    def test_get_topic_attributes_events_endpoint_requires_user_id(
+        self,
+        mock_iter_topic_attributes_events: MagicMock,
+        client: TestClient,
+    ) -> None:
+        # Act
+        response = client.get(
+            "/events/topicAttributes", params={"keywords": ["python"]}
+        )
+
+        # Assert
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert response.json() == {
+            "detail": "user_id is required unless groupBy is set"
+        }
+        mock_iter_topic_attributes_events.assert_not_called()
+
+    @patch("src.api.routers.events.iter_topic_attributes_aggregates_repository")
+    def test_get_topic_attributes_events_endpoint_group_by(
+        self,
+        mock_iter_topic_attributes_aggregates: MagicMock,
+        client: TestClient,
+    ) -> None:
+        # Arrange
+        aggregates = [
+            {
+                "category": "ORG",
+                "name": name,
+                "count": 2,
+                "weight_sum": 1.5,
+                "weight_avg": 0.75,
+                "weight_max": 1.0,
+            }
+            for name in ("Google", "ITMO")
+        ]
+        mock_iter_topic_attributes_aggregates.return_value = self.build_chunks_iterator(
+            aggregates
+        )
+        cursor = encode_cursor(["ORG", "Apple"])
+
+        # Act
+        response = client.get(
+            "/events/topicAttributes",
+            params={"groupBy": "entities", "limit": 1, "cursor": cursor},
+        )
+
+        # Assert
+        assert response.status_code == status.HTTP_200_OK
+        args, kwargs = mock_iter_topic_attributes_aggregates.call_args
+        assert args == ("entities",)
+        assert kwargs["after"] == ["ORG", "Apple"]
+        assert kwargs["limit"] == 2
+
+        response_data = response.json()
+        assert response_data["items"] == aggregates[:1]
+        assert decode_cursor(response_data["next_cursor"], size=2) == [
+            "ORG",
+            "Google",
+        ]
+
+    @patch("src.api.routers.events.iter_topic_attributes_aggregates_repository")
+    def test_get_topic_attributes_events_endpoint_group_by_invalid_cursor(
+        self,
+        mock_iter_topic_attributes_aggregates: MagicMock,
+        client: TestClient,
+    ) -> None:
+        # Act
+        response = client.get(
+            "/events/topicAttributes",
+            params={"groupBy": "keywords", "cursor": encode_cursor(["ORG", "ITMO"])},
+        )
+
+        # Assert
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert response.json() == {"detail": "Invalid cursor"}
+        mock_iter_topic_attributes_aggregates.assert_not_called()
+
+    @pytest.mark.parametrize(
+        ("target", "params"),
+        [
+            (
+                "src.api.routers.events.iter_topic_attributes_events_repository",
+                {"user_id": "test_user_id"},
+            ),
+            (
+                "src.api.routers.events.iter_topic_attributes_aggregates_repository",
+                {"groupBy": "keywords"},
+            ),
+        ],
+    )
+    def test_get_topic_attributes_events_endpoint_fails_before_streaming(
+        self,
+        app: FastAPI,
+        target: str,
+        params: dict[str, str],
+    ) -> None:
+        # Arrange
+        client = TestClient(app, raise_server_exceptions=False)
+
+        # Act
+        with patch(target, return_value=self.build_failing_chunks_iterator([])):
+            response = client.get("/events/topicAttributes", params=params)
+
+        # Assert
+        # The first chunk is read before any byte of the body is sent
+        assert response.status_code == status.HTTP_500_INTERNAL_SERVER_ERROR
+
+    @patch("src.api.routers.events.iter_topic_attributes_events_repository")
+    def test_get_topic_attributes_events_endpoint_events_fail_while_streaming(
+        self,
+        mock_iter_topic_attributes_events: MagicMock,
+        client: TestClient,
+    ) -> None:
+        # Arrange
+        topic_attributes_events = self.build_topic_attributes_events(2)
+        mock_iter_topic_attributes_events.return_value = (
+            self.build_failing_chunks_iterator(topic_attributes_events)
+        )
+
+        # Act
+        response = client.get(
+            "/events/topicAttributes", params={"user_id": "test_user_id", "limit": 3}
+        )
+
+        # Assert
+        # The page stays well-formed JSON, ending with an error instead of a cursor
+        assert response.status_code == status.HTTP_200_OK
+        response_data = response.json()
+        assert [
+            item["topic_attributes_event_uuid"] for item in response_data["items"]
+        ] == [
+            str(topic_attributes_event["topic_attributes_event_uuid"])
+            for topic_attributes_event in topic_attributes_events
+        ]
+        assert response_data["next_cursor"] is None
+        assert response_data["error"] == "Failed to read the page"
+
+    @patch("src.api.routers.events.iter_topic_attributes_aggregates_repository")
+    def test_get_topic_attributes_events_endpoint_group_by_fails_while_streaming(
+        self,
+        mock_iter_topic_attributes_aggregates: MagicMock,
+        client: TestClient,
+    ) -> None:
+        # Arrange
+        aggregates = [
+            {
+                "name": "python",
+                "count": 2,
+                "weight_sum": 1.5,
+                "weight_avg": 0.75,
+                "weight_max": 1.0,
+            }
+        ]
+        mock_iter_topic_attributes_aggregates.return_value = (
+            self.build_failing_chunks_iterator(aggregates)
+        )
+
+        # Act
+        response = client.get(
+            "/events/topicAttributes", params={"groupBy": "keywords", "limit": 3}
+        )
+
+        # Assert
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json() == {
+            "items": aggregates,
+            "next_cursor": None,
+            "error": "Failed to read the page",
+        }
+
+    def test_get_topic_attributes_events_endpoint_unknown_group_by(
+        self,
+        client: TestClient,
+    ) -> None:
+        # Act
+        response = client.get("/events/topicAttributes", params={"groupBy": "topics"})
+
+        # Assert
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+class TestGetTopicAttributesEventEndpoint:
+    @pytest.fixture
+    def app(self, app: FastAPI) -> FastAPI:
+        app.state.get_clickhouse_connection = MagicMock()
+        app.state.topic_attributes_events_cache = LRUCache[
+            uuid.UUID, TopicAttributesEventDTO
+        ](maxsize=10, name="test_topic_attributes_events")
+        return app
+
+    @patch("src.api.routers.events.get_topic_attributes_event_repository")
+    def test_get_topic_attributes_event_endpoint_caches(
+        self,
+        mock_get_topic_attributes_event: AsyncMock,
+        client: TestClient,
+        app: FastAPI,
+    ) -> None:
+        # Arrange
+        topic_attributes_event = (
+            TestGetTopicAttributesEventsEndpoint.build_topic_attributes_events(1)[0]
+        )
+        topic_attributes_event_uuid = topic_attributes_event[
+            "topic_attributes_event_uuid"
+        ]
+        mock_get_topic_attributes_event.return_value = topic_attributes_event
+
+        # Act
+        first_response = client.get(
+            f"/events/topicAttributes/{topic_attributes_event_uuid}"
+        )
+        second_response = client.get(
+            f"/events/topicAttributes/{topic_attributes_event_uuid}"
+        )
+
+        # Assert
+        assert first_response.status_code == status.HTTP_200_OK
+        assert second_response.json() == first_response.json()
+        assert first_response.json()["topic_attributes_event_uuid"] == str(
+            topic_attributes_event_uuid
+        )
+        assert first_response.json()["sentiments"] == [
+            {"name": "positive", "weight": 0.9}
+        ]
+        mock_get_topic_attributes_event.assert_called_once_with(
+            topic_attributes_event_uuid,
+            get_connection=app.state.get_clickhouse_connection,
+        )
+
+    @patch("src.api.routers.events.get_topic_attributes_event_repository")
+    def test_get_topic_attributes_event_endpoint_not_found(
+        self,
+        mock_get_topic_attributes_event: AsyncMock,
+        client: TestClient,
+        app: FastAPI,
+    ) -> None:
+        # Arrange
+        topic_attributes_event_uuid = uuid.uuid4()
+        mock_get_topic_attributes_event.return_value = None
+
+        # Act
+        response = client.get(f"/events/topicAttributes/{topic_attributes_event_uuid}")
+
+        # Assert
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+        assert topic_attributes_event_uuid not in (
+            app.state.topic_attributes_events_cache
+        )
+
+    def test_get_topic_attributes_event_endpoint_invalid_uuid(
+        self,
+        client: TestClient,
+    ) -> None:
+        # Act
+        response = client.get("/events/topicAttributes/not-a-uuid")
+
+        # Assert
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
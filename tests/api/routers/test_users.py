@@ -1,27 +1,44 @@
+import json
 import typing as tp
+import uuid
+from datetime import UTC, datetime, timedelta
 from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
-from fastapi import FastAPI, Request, status
+from fastapi import APIRouter, FastAPI, Request, status
 from fastapi.testclient import TestClient
 from fastapi_pagination import Page, Params
+from pymongo.errors import DuplicateKeyError
 from starlette.responses import Response
 
 from src.api.routers.users import router
+from src.core.config import DecaySchema
 from src.dtos import AggregatedTopicAttributesDTO, UserCreateDTO, UserGetDTO
+from src.utils.cursors import decode_users_keyset_cursor, encode_users_keyset_cursor
+from src.utils.dates import utcnow
+
+
+def build_settings(
+    half_life_days: float | None = None, users_read_model: bool = False
+) -> MagicMock:
+    settings = MagicMock()
+    settings.mongo.users_read_model = users_read_model
+    settings.mongo.topic_attributes_decay = DecaySchema(half_life_days=half_life_days)
+    return settings
+
+
+@pytest.fixture
+def api_router() -> APIRouter:
+    return router
 
 
 class TestGetUsersWithTopicProfilesEndpoint:
     @pytest.fixture
-    def app(self) -> FastAPI:
-        app = FastAPI()
-        app.include_router(router)
+    def app(self, app: FastAPI) -> FastAPI:
+        app.state.settings = build_settings()
+        app.state.users_total_cache = MagicMock()
         return app
 
-    @pytest.fixture
-    def client(self, app: FastAPI) -> TestClient:
-        return TestClient(app)
-
     @pytest.fixture
     def mock_database(self) -> MagicMock:
         return MagicMock()
@@ -87,6 +104,7 @@ class TestGetUsersWithTopicProfilesEndpoint:
         assert call_kwargs["sentiments"] == []
         assert isinstance(call_kwargs["params"], Params)
         assert call_kwargs["database"] == mock_database
+        assert call_kwargs["total_cache"] == app_with_database.state.users_total_cache
 
     @patch("src.api.routers.users.get_users_with_topic_info_paginated_repository")
     def test_get_users_with_topic_profiles_endpoint_with_filters(
@@ -132,17 +150,152 @@ class TestGetUsersWithTopicProfilesEndpoint:
         assert isinstance(call_kwargs["params"], Params)
         assert call_kwargs["database"] == mock_database
 
+    @patch("src.api.routers.users.get_users_with_topic_info_paginated_repository")
+    def test_get_users_with_topic_profiles_endpoint_decays_weights(
+        self,
+        mock_get_users: AsyncMock,
+        client: TestClient,
+        app_with_database: FastAPI,
+    ) -> None:
+        # Arrange
+        app_with_database.state.settings = build_settings(half_life_days=30)
+        mock_get_users.return_value = Page(items=[], total=0, page=1, size=10)
+
+        # Act
+        response = client.get("/users?keywords=python")
+
+        # Assert
+        assert response.status_code == status.HTTP_200_OK
+        call_kwargs = mock_get_users.call_args.kwargs
+        assert call_kwargs["half_life_days"] == 30
+        [user] = call_kwargs["transformer"](
+            [
+                {
+                    "user_id": "user1",
+                    "username": "User 1",
+                    "aggregated_topic_attributes": {
+                        "user_id": "user1",
+                        "keywords": [
+                            {
+                                "name": "python",
+                                "weight": 0.8,
+                                "updated_at": utcnow() - timedelta(days=30),
+                            }
+                        ],
+                    },
+                }
+            ]
+        )
+        assert user.aggregated_topic_attributes.keywords[0].weight == pytest.approx(
+            0.4, rel=1e-3
+        )
+
+
+class TestGetUsersWithTopicInfoKeysetEndpoint:
+    @pytest.fixture
+    def mock_database(self) -> MagicMock:
+        return MagicMock()
 
-class TestCreateUserEndpoint:
     @pytest.fixture
-    def app(self) -> FastAPI:
-        app = FastAPI()
-        app.include_router(router)
+    def app(self, app: FastAPI, mock_database: MagicMock) -> FastAPI:
+        app.state.settings = build_settings()
+        app.state.mongo_database = mock_database
+        app.state.users_total_cache = MagicMock()
         return app
 
+    @patch("src.api.routers.users.get_users_with_topic_info_keyset_repository")
+    def test_get_users_with_topic_info_keyset_endpoint_first_page(
+        self,
+        mock_get_users: AsyncMock,
+        client: TestClient,
+        mock_database: MagicMock,
+    ) -> None:
+        # Arrange
+        mock_get_users.return_value = (
+            [
+                {
+                    "user_id": f"user{index}",
+                    "username": f"User {index}",
+                    "maxKeywordWeight": 1 - index / 10,
+                    "maxEntityWeight": None,
+                    "maxSentimentWeight": None,
+                }
+                for index in range(3)
+            ],
+            None,
+        )
+
+        # Act
+        response = client.get("/users/keyset?keywords=python&limit=2")
+
+        # Assert
+        assert response.status_code == status.HTTP_200_OK
+        response_data = response.json()
+        assert [user["user_id"] for user in response_data["items"]] == [
+            "user0",
+            "user1",
+        ]
+        assert response_data["total"] is None
+        assert decode_users_keyset_cursor(response_data["next_cursor"]) == (
+            [0.9, None, None],
+            "user1",
+        )
+
+        # Verify one more user than the page is requested, without a total
+        call_kwargs = mock_get_users.call_args.kwargs
+        assert call_kwargs["keywords"] == ["python"]
+        assert call_kwargs["after"] is None
+        assert call_kwargs["limit"] == 3
+        assert call_kwargs["include_total"] is False
+        assert call_kwargs["database"] == mock_database
+
+    @patch("src.api.routers.users.get_users_with_topic_info_keyset_repository")
+    def test_get_users_with_topic_info_keyset_endpoint_last_page(
+        self,
+        mock_get_users: AsyncMock,
+        client: TestClient,
+    ) -> None:
+        # Arrange
+        mock_get_users.return_value = (
+            [{"user_id": "user2", "username": "User 2"}],
+            3,
+        )
+        cursor = encode_users_keyset_cursor([None, None, None], "user1")
+
+        # Act
+        response = client.get(f"/users/keyset?cursor={cursor}&includeTotal=true")
+
+        # Assert
+        assert response.status_code == status.HTTP_200_OK
+        response_data = response.json()
+        assert len(response_data["items"]) == 1
+        assert response_data["next_cursor"] is None
+        assert response_data["total"] == 3
+
+        call_kwargs = mock_get_users.call_args.kwargs
+        assert call_kwargs["after"] == ([None, None, None], "user1")
+        assert call_kwargs["include_total"] is True
+
+    @patch("src.api.routers.users.get_users_with_topic_info_keyset_repository")
+    def test_get_users_with_topic_info_keyset_endpoint_invalid_cursor(
+        self,
+        mock_get_users: AsyncMock,
+        client: TestClient,
+    ) -> None:
+        # Act
+        response = client.get("/users/keyset?cursor=invalid")
+
+        # Assert
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert response.json()["detail"] == "Invalid cursor"
+        mock_get_users.assert_not_called()
+
+
+class TestCreateUserEndpoint:
     @pytest.fixture
-    def client(self, app: FastAPI) -> TestClient:
-        return TestClient(app)
+    def app(self, app: FastAPI) -> FastAPI:
+        app.state.settings = build_settings()
+        return app
 
     @pytest.fixture
     def mock_database(self) -> MagicMock:
@@ -250,9 +403,74 @@ class TestCreateUserEndpoint:
         mock_get_user.assert_called_once_with(
             user_id="existing_user_id",
             database=mock_database,
+            fields=(),
         )
         mock_insert_user.assert_not_called()
 
+    @patch("src.api.routers.users.get_user_with_topic_info_repository")
+    @patch("src.api.routers.users.insert_user_repository")
+    def test_create_user_endpoint_concurrently_created(
+        self,
+        mock_insert_user: AsyncMock,
+        mock_get_user: AsyncMock,
+        client: TestClient,
+        app_with_database: FastAPI,
+    ) -> None:
+        # Arrange
+        mock_get_user.return_value = None
+        mock_insert_user.side_effect = DuplicateKeyError("E11000 duplicate key error")
+
+        # Act
+        response = client.post(
+            "/users",
+            json={"user_id": "existing_user_id", "username": "Existing User"},
+        )
+
+        # Assert
+        assert response.status_code == status.HTTP_409_CONFLICT
+        assert "existing_user_id" in response.json()["detail"]
+
+    @patch("src.api.routers.users.get_user_with_embedded_topic_info_repository")
+    @patch("src.api.routers.users.embed_users_topic_info_repository")
+    @patch("src.api.routers.users.get_user_with_topic_info_repository")
+    @patch("src.api.routers.users.insert_user_repository")
+    def test_create_user_endpoint_users_read_model(
+        self,
+        mock_insert_user: AsyncMock,
+        mock_get_user: AsyncMock,
+        mock_embed_users_topic_info: AsyncMock,
+        mock_get_user_with_embedded_topic_info: AsyncMock,
+        client: TestClient,
+        app_with_database: FastAPI,
+        mock_database: MagicMock,
+    ) -> None:
+        # Arrange
+        app_with_database.state.settings = build_settings(users_read_model=True)
+        mock_get_user.return_value = None
+        mock_get_user_with_embedded_topic_info.return_value = {
+            "user_id": "test_user_id",
+            "username": "Test User",
+        }
+
+        # Act
+        response = client.post(
+            "/users",
+            json={"user_id": "test_user_id", "username": "Test User"},
+        )
+
+        # Assert
+        assert response.status_code == status.HTTP_201_CREATED
+        assert response.json()["user_id"] == "test_user_id"
+
+        # Verify topic info received before the user is embedded in it
+        mock_embed_users_topic_info.assert_called_once_with(
+            ["test_user_id"], database=mock_database
+        )
+        mock_get_user_with_embedded_topic_info.assert_called_once_with(
+            "test_user_id", database=mock_database
+        )
+        mock_get_user.assert_called_once()
+
     def test_create_user_endpoint_validation_error(
         self,
         client: TestClient,
@@ -279,15 +497,10 @@ class TestCreateUserEndpoint:
 
 class TestGetUserByIdEndpoint:
     @pytest.fixture
-    def app(self) -> FastAPI:
-        app = FastAPI()
-        app.include_router(router)
+    def app(self, app: FastAPI) -> FastAPI:
+        app.state.settings = build_settings()
         return app
 
-    @pytest.fixture
-    def client(self, app: FastAPI) -> TestClient:
-        return TestClient(app)
-
     @pytest.fixture
     def mock_database(self) -> MagicMock:
         return MagicMock()
@@ -325,6 +538,7 @@ class TestGetUserByIdEndpoint:
                 "entities": [],
                 "sentiments": [],
                 "updated_at": "2023-01-01T00:00:00",
+                "version": 3,
             },
         }
 
@@ -338,6 +552,8 @@ class TestGetUserByIdEndpoint:
         assert response_data["username"] == "Test User"
         assert "aggregated_topic_attributes" in response_data
         assert "keywords" in response_data["aggregated_topic_attributes"]
+        # Versions only serve concurrent updates
+        assert "version" not in response_data["aggregated_topic_attributes"]
 
         # Verify repository was called with correct parameters
         mock_get_user.assert_called_once_with(
@@ -371,3 +587,413 @@ class TestGetUserByIdEndpoint:
             user_id=user_id,
             database=mock_database,
         )
+
+    @patch("src.api.routers.users.get_user_with_embedded_topic_info_repository")
+    @patch("src.api.routers.users.get_user_with_topic_info_repository")
+    def test_get_user_by_id_endpoint_users_read_model(
+        self,
+        mock_get_user: AsyncMock,
+        mock_get_user_with_embedded_topic_info: AsyncMock,
+        client: TestClient,
+        app_with_database: FastAPI,
+        mock_database: MagicMock,
+    ) -> None:
+        # Arrange
+        app_with_database.state.settings = build_settings(users_read_model=True)
+        mock_get_user_with_embedded_topic_info.return_value = {
+            "user_id": "test_user_id",
+            "username": "Test User",
+            "topic_profile": {"user_id": "test_user_id", "topics": []},
+        }
+
+        # Act
+        response = client.get("/users/test_user_id")
+
+        # Assert
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["topic_profile"]["user_id"] == "test_user_id"
+        mock_get_user_with_embedded_topic_info.assert_called_once_with(
+            "test_user_id", database=mock_database
+        )
+        mock_get_user.assert_not_called()
+
+    @patch("src.api.routers.users.get_user_with_topic_info_repository")
+    def test_get_user_by_id_endpoint_decays_weights(
+        self,
+        mock_get_user: AsyncMock,
+        client: TestClient,
+        app_with_database: FastAPI,
+    ) -> None:
+        # Arrange
+        app_with_database.state.settings = build_settings(half_life_days=30)
+        now = utcnow()
+        mock_get_user.return_value = {
+            "user_id": "test_user_id",
+            "username": "Test User",
+            "aggregated_topic_attributes": {
+                "user_id": "test_user_id",
+                "keywords": [
+                    {
+                        "name": "old",
+                        "weight": 0.8,
+                        "updated_at": now - timedelta(days=60),
+                    },
+                    {"name": "new", "weight": 0.5, "updated_at": now},
+                ],
+            },
+        }
+
+        # Act
+        response = client.get("/users/test_user_id")
+
+        # Assert
+        assert response.status_code == status.HTTP_200_OK
+        keywords = response.json()["aggregated_topic_attributes"]["keywords"]
+        assert [keyword["name"] for keyword in keywords] == ["new", "old"]
+        assert keywords[0]["weight"] == pytest.approx(0.5, rel=1e-3)
+        assert keywords[1]["weight"] == pytest.approx(0.2, rel=1e-3)
+
+
+class TestSubmitTopicProfileForProcessingEndpoint:
+    @pytest.fixture
+    def mock_broker(self) -> AsyncMock:
+        return AsyncMock()
+
+    @pytest.fixture
+    def mock_database(self) -> MagicMock:
+        return MagicMock()
+
+    @pytest.fixture
+    def app(
+        self, app: FastAPI, mock_broker: AsyncMock, mock_database: MagicMock
+    ) -> FastAPI:
+        app.state.settings = MagicMock()
+        app.state.settings.clickhouse.content_events_chunk_size = 2
+        app.state.settings.clickhouse.content_events_chunk_max_bytes = 900000
+        app.state.settings.clickhouse.content_events_writer.max_delay_ms = 1000
+        app.state.settings.clickhouse.content_watermark_lag_ms = 60000
+        app.state.get_clickhouse_connection = MagicMock()
+        app.state.mongo_database = mock_database
+
+        @app.middleware("http")
+        async def add_broker_to_request(
+            request: Request, call_next: tp.Callable[[Request], tp.Awaitable[Response]]
+        ) -> Response:
+            request.state.broker = mock_broker
+            response = await call_next(request)
+            return response
+
+        return app
+
+    @staticmethod
+    def build_content_event(
+        index: int, timestamp: datetime | None = None
+    ) -> dict[str, tp.Any]:
+        return {
+            "content_event_uuid": uuid.uuid4(),
+            "user_id": "test_user_id",
+            "content": f"Content {index}",
+            # Older than the watermark lag unless given
+            "timestamp": utcnow() - timedelta(hours=1)
+            if timestamp is None
+            else timestamp,
+        }
+
+    @staticmethod
+    def build_chunks_iterator(
+        chunks: list[list[dict[str, tp.Any]]],
+    ) -> tp.AsyncGenerator[list[dict[str, tp.Any]]]:
+        async def iter_chunks() -> tp.AsyncGenerator[list[dict[str, tp.Any]]]:
+            for chunk in chunks:
+                yield chunk
+
+        return iter_chunks()
+
+    @patch("src.api.routers.users.upsert_content_watermark_repository")
+    @patch("src.api.routers.users.get_content_watermark_repository")
+    @patch("src.api.routers.users.iter_content_events_repository")
+    def test_submit_topic_profile_for_processing_endpoint_publishes_chunks(
+        self,
+        mock_iter_content_events: MagicMock,
+        mock_get_content_watermark: AsyncMock,
+        mock_upsert_content_watermark: AsyncMock,
+        client: TestClient,
+        app: FastAPI,
+        mock_broker: AsyncMock,
+        mock_database: MagicMock,
+    ) -> None:
+        # Arrange
+        chunks = [
+            [self.build_content_event(0), self.build_content_event(1)],
+            [self.build_content_event(2)],
+        ]
+        mock_iter_content_events.return_value = self.build_chunks_iterator(chunks)
+        mock_get_content_watermark.return_value = None
+
+        # Act
+        response = client.post("/users/test_user_id/topicProfile/submitForProcessing")
+
+        # Assert
+        assert response.status_code == status.HTTP_202_ACCEPTED
+        mock_iter_content_events.assert_called_once_with(
+            "test_user_id",
+            after=None,
+            until=None,
+            chunk_size=2,
+            get_connection=app.state.get_clickhouse_connection,
+        )
+
+        assert mock_broker.publish.call_count == 2
+        messages = [call.args[0] for call in mock_broker.publish.call_args_list]
+        assert all(
+            call.args[1] == "userContent" for call in mock_broker.publish.call_args_list
+        )
+        assert len({message["user_content_event_uuid"] for message in messages}) == 1
+        assert [message["sequence_number"] for message in messages] == [0, 1]
+        assert [message["is_last"] for message in messages] == [False, True]
+        assert [message["is_incremental"] for message in messages] == [False, False]
+        assert [len(message["content_events"]) for message in messages] == [2, 1]
+
+        # The watermark points at the last published content event
+        mock_upsert_content_watermark.assert_called_once()
+        watermark = mock_upsert_content_watermark.call_args.args[0]
+        assert watermark["user_id"] == "test_user_id"
+        assert watermark["ts"] == chunks[-1][-1]["timestamp"]
+        assert watermark["content_event_uuid"] == str(
+            chunks[-1][-1]["content_event_uuid"]
+        )
+        assert mock_upsert_content_watermark.call_args.kwargs["database"] == (
+            mock_database
+        )
+
+    @patch("src.api.routers.users.upsert_content_watermark_repository")
+    @patch("src.api.routers.users.get_content_watermark_repository")
+    @patch("src.api.routers.users.iter_content_events_repository")
+    def test_submit_topic_profile_for_processing_endpoint_large_contents(
+        self,
+        mock_iter_content_events: MagicMock,
+        mock_get_content_watermark: AsyncMock,
+        mock_upsert_content_watermark: AsyncMock,
+        client: TestClient,
+        app: FastAPI,
+        mock_broker: AsyncMock,
+    ) -> None:
+        # Arrange
+        app.state.settings.clickhouse.content_events_chunk_max_bytes = 10000
+        content_events = [self.build_content_event(index) for index in range(2)]
+        for content_event in content_events:
+            content_event["content"] = "é" * 1000
+        mock_iter_content_events.return_value = self.build_chunks_iterator(
+            [content_events]
+        )
+        mock_get_content_watermark.return_value = None
+
+        # Act
+        response = client.post("/users/test_user_id/topicProfile/submitForProcessing")
+
+        # Assert
+        assert response.status_code == status.HTTP_202_ACCEPTED
+        messages = [call.args[0] for call in mock_broker.publish.call_args_list]
+        # Two escaped contents of 6000 bytes each exceed the 10000 bytes budget
+        assert [len(message["content_events"]) for message in messages] == [1, 1]
+        assert [message["is_last"] for message in messages] == [False, True]
+        assert all(
+            len(json.dumps(message, default=str)) <= 10000 for message in messages
+        )
+
+    @patch("src.api.routers.users.upsert_content_watermark_repository")
+    @patch("src.api.routers.users.get_content_watermark_repository")
+    @patch("src.api.routers.users.iter_content_events_repository")
+    def test_submit_topic_profile_for_processing_endpoint_without_content(
+        self,
+        mock_iter_content_events: MagicMock,
+        mock_get_content_watermark: AsyncMock,
+        mock_upsert_content_watermark: AsyncMock,
+        client: TestClient,
+        mock_broker: AsyncMock,
+    ) -> None:
+        # Arrange
+        mock_iter_content_events.return_value = self.build_chunks_iterator([])
+        mock_get_content_watermark.return_value = None
+
+        # Act
+        response = client.post("/users/test_user_id/topicProfile/submitForProcessing")
+
+        # Assert
+        assert response.status_code == status.HTTP_202_ACCEPTED
+        mock_broker.publish.assert_called_once()
+        message = mock_broker.publish.call_args.args[0]
+        assert message["content_events"] == []
+        assert message["sequence_number"] == 0
+        assert message["is_last"] is True
+        mock_upsert_content_watermark.assert_not_called()
+
+    @patch("src.api.routers.users.upsert_content_watermark_repository")
+    @patch("src.api.routers.users.get_content_watermark_repository")
+    @patch("src.api.routers.users.iter_content_events_repository")
+    def test_submit_topic_profile_for_processing_endpoint_incremental(
+        self,
+        mock_iter_content_events: MagicMock,
+        mock_get_content_watermark: AsyncMock,
+        mock_upsert_content_watermark: AsyncMock,
+        client: TestClient,
+        mock_broker: AsyncMock,
+    ) -> None:
+        # Arrange
+        watermark_ts = utcnow()
+        watermark_content_event_uuid = uuid.uuid4()
+        mock_get_content_watermark.return_value = {
+            "user_id": "test_user_id",
+            "ts": watermark_ts,
+            "content_event_uuid": str(watermark_content_event_uuid),
+        }
+        mock_iter_content_events.return_value = self.build_chunks_iterator(
+            [[self.build_content_event(3)]]
+        )
+
+        # Act
+        submitted_at = utcnow()
+        response = client.post("/users/test_user_id/topicProfile/submitForProcessing")
+
+        # Assert
+        assert response.status_code == status.HTTP_202_ACCEPTED
+        assert mock_iter_content_events.call_args.kwargs["after"] == (
+            watermark_ts,
+            watermark_content_event_uuid,
+        )
+        # Content still buffered by the writer or delivered late is left for
+        # the next submission
+        until = mock_iter_content_events.call_args.kwargs["until"]
+        lag = timedelta(milliseconds=61000)
+        assert submitted_at - lag <= until <= utcnow() - lag
+        message = mock_broker.publish.call_args.args[0]
+        assert message["is_incremental"] is True
+        assert len(message["content_events"]) == 1
+        mock_upsert_content_watermark.assert_called_once()
+
+    @patch("src.api.routers.users.upsert_content_watermark_repository")
+    @patch("src.api.routers.users.get_content_watermark_repository")
+    @patch("src.api.routers.users.iter_content_events_repository")
+    def test_submit_topic_profile_for_processing_endpoint_up_to_date(
+        self,
+        mock_iter_content_events: MagicMock,
+        mock_get_content_watermark: AsyncMock,
+        mock_upsert_content_watermark: AsyncMock,
+        client: TestClient,
+        mock_broker: AsyncMock,
+    ) -> None:
+        # Arrange
+        mock_get_content_watermark.return_value = {
+            "user_id": "test_user_id",
+            "ts": utcnow(),
+            "content_event_uuid": str(uuid.uuid4()),
+        }
+        mock_iter_content_events.return_value = self.build_chunks_iterator([])
+
+        # Act
+        response = client.post("/users/test_user_id/topicProfile/submitForProcessing")
+
+        # Assert
+        assert response.status_code == status.HTTP_202_ACCEPTED
+        assert response.json() == {"message": "Topic profile is up to date"}
+        mock_broker.publish.assert_not_called()
+        mock_upsert_content_watermark.assert_not_called()
+
+    @patch("src.api.routers.users.upsert_content_watermark_repository")
+    @patch("src.api.routers.users.get_content_watermark_repository")
+    @patch("src.api.routers.users.iter_content_events_repository")
+    def test_submit_topic_profile_for_processing_endpoint_full(
+        self,
+        mock_iter_content_events: MagicMock,
+        mock_get_content_watermark: AsyncMock,
+        mock_upsert_content_watermark: AsyncMock,
+        client: TestClient,
+        mock_broker: AsyncMock,
+    ) -> None:
+        # Arrange
+        mock_iter_content_events.return_value = self.build_chunks_iterator(
+            [[self.build_content_event(0)]]
+        )
+
+        # Act
+        response = client.post(
+            "/users/test_user_id/topicProfile/submitForProcessing",
+            params={"full": True},
+        )
+
+        # Assert
+        assert response.status_code == status.HTTP_202_ACCEPTED
+        mock_get_content_watermark.assert_not_called()
+        assert mock_iter_content_events.call_args.kwargs["after"] is None
+        assert mock_broker.publish.call_args.args[0]["is_incremental"] is False
+        mock_upsert_content_watermark.assert_called_once()
+
+    @patch("src.api.routers.users.upsert_content_watermark_repository")
+    @patch("src.api.routers.users.get_content_watermark_repository")
+    @patch("src.api.routers.users.iter_content_events_repository")
+    def test_submit_topic_profile_for_processing_endpoint_full_includes_recent(
+        self,
+        mock_iter_content_events: MagicMock,
+        mock_get_content_watermark: AsyncMock,
+        mock_upsert_content_watermark: AsyncMock,
+        client: TestClient,
+        mock_broker: AsyncMock,
+    ) -> None:
+        # Arrange
+        content_events = [
+            self.build_content_event(0),
+            # Newer than the watermark lag, naive as read from ClickHouse
+            self.build_content_event(
+                1, timestamp=datetime.now(UTC).replace(tzinfo=None)
+            ),
+        ]
+        mock_iter_content_events.return_value = self.build_chunks_iterator(
+            [content_events]
+        )
+
+        # Act
+        response = client.post(
+            "/users/test_user_id/topicProfile/submitForProcessing",
+            params={"full": True},
+        )
+
+        # Assert
+        assert response.status_code == status.HTTP_202_ACCEPTED
+        assert mock_iter_content_events.call_args.kwargs["until"] is None
+        message = mock_broker.publish.call_args.args[0]
+        assert len(message["content_events"]) == 2
+
+        # The watermark stops before the recent event, which the next
+        # incremental submission sends again
+        watermark = mock_upsert_content_watermark.call_args.args[0]
+        assert watermark["ts"] == content_events[0]["timestamp"]
+        assert watermark["content_event_uuid"] == str(
+            content_events[0]["content_event_uuid"]
+        )
+
+    @patch("src.api.routers.users.upsert_content_watermark_repository")
+    @patch("src.api.routers.users.get_content_watermark_repository")
+    @patch("src.api.routers.users.iter_content_events_repository")
+    def test_submit_topic_profile_for_processing_endpoint_full_only_recent(
+        self,
+        mock_iter_content_events: MagicMock,
+        mock_get_content_watermark: AsyncMock,
+        mock_upsert_content_watermark: AsyncMock,
+        client: TestClient,
+        mock_broker: AsyncMock,
+    ) -> None:
+        # Arrange
+        mock_iter_content_events.return_value = self.build_chunks_iterator(
+            [[self.build_content_event(0, timestamp=utcnow())]]
+        )
+
+        # Act
+        response = client.post(
+            "/users/test_user_id/topicProfile/submitForProcessing",
+            params={"full": True},
+        )
+
+        # Assert
+        assert response.status_code == status.HTTP_202_ACCEPTED
+        assert len(mock_broker.publish.call_args.args[0]["content_events"]) == 1
+        mock_upsert_content_watermark.assert_not_called()
@@ -0,0 +1,227 @@
+import typing as tp
+from contextlib import asynccontextmanager
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from src.bootstrap.clickhouse import (
+    CLICKHOUSE_INDEXES,
+    CLICKHOUSE_SCHEMA,
+    CONTENT_EVENTS_ENGINE,
+    bootstrap_clickhouse_schema,
+    build_clickhouse_codec_statements,
+    build_clickhouse_index_statements,
+    build_clickhouse_schema_statements,
+    build_migrate_content_events_engine_statements,
+    check_clickhouse_schema,
+    migrate_content_events_engine,
+)
+
+
+def create_mock_connection_factory(
+    cursor: MagicMock,
+) -> tp.Callable[[], tp.AsyncContextManager[MagicMock]]:
+    connection = MagicMock()
+
+    @asynccontextmanager
+    async def mock_cursor_cm() -> tp.AsyncIterator[MagicMock]:
+        yield cursor
+
+    connection.cursor = mock_cursor_cm
+
+    @asynccontextmanager
+    async def mock_get_connection() -> tp.AsyncIterator[MagicMock]:
+        yield connection
+
+    return mock_get_connection
+
+
+class TestBuildClickhouseSchemaStatements:
+    def test_build_clickhouse_schema_statements(self) -> None:
+        statements = build_clickhouse_schema_statements()
+
+        assert statements[: len(CLICKHOUSE_SCHEMA)] == CLICKHOUSE_SCHEMA
+        assert (
+            "ALTER TABLE topic_attributes_events ADD INDEX IF NOT EXISTS "
+            "topic_attributes_event_uuid_bloom_filter "
+            "topic_attributes_event_uuid TYPE bloom_filter(0.01) GRANULARITY 1"
+        ) in statements
+        assert not any("MATERIALIZE INDEX" in statement for statement in statements)
+
+    def test_build_clickhouse_schema_statements_materialize_indexes(self) -> None:
+        statements = build_clickhouse_schema_statements(materialize_indexes=True)
+
+        assert len(
+            [statement for statement in statements if "MATERIALIZE INDEX" in statement]
+        ) == len(CLICKHOUSE_INDEXES)
+        assert (
+            "ALTER TABLE topic_attributes_events "
+            "MATERIALIZE INDEX topic_attributes_event_uuid_bloom_filter"
+        ) in statements
+
+    def test_build_clickhouse_schema_statements_content_events_replacing(
+        self,
+    ) -> None:
+        content_events_statement = next(
+            statement
+            for statement in CLICKHOUSE_SCHEMA
+            if "CREATE TABLE IF NOT EXISTS content_events" in statement
+        )
+
+        assert "ENGINE = ReplacingMergeTree" in content_events_statement
+
+    def test_build_clickhouse_schema_statements_codecs(self) -> None:
+        statements = build_clickhouse_schema_statements()
+
+        assert (
+            "ALTER TABLE content_events MODIFY COLUMN content String CODEC(ZSTD(3))"
+        ) in statements
+        # `ts` is in every sorting key, startup never alters it
+        assert not any("MODIFY COLUMN ts" in statement for statement in statements)
+        assert all(
+            "PARTITION BY toYYYYMM(ts)" in statement
+            and "ORDER BY (user_id, ts," in statement
+            for statement in CLICKHOUSE_SCHEMA
+        )
+
+
+class TestBuildClickhouseCodecStatements:
+    def test_build_clickhouse_codec_statements_differing_codec(self) -> None:
+        statements = build_clickhouse_codec_statements(
+            {("content_events", "content"): ""}
+        )
+
+        assert statements == [
+            "ALTER TABLE content_events MODIFY COLUMN content String CODEC(ZSTD(3))"
+        ]
+
+    def test_build_clickhouse_codec_statements_same_codec(self) -> None:
+        statements = build_clickhouse_codec_statements(
+            {("content_events", "content"): "CODEC(ZSTD(3))"}
+        )
+
+        assert statements == []
+
+
+class TestBootstrapClickhouseSchema:
+    @pytest.mark.asyncio
+    async def test_bootstrap_clickhouse_schema(self) -> None:
+        # Arrange
+        mock_cursor = MagicMock()
+        mock_cursor.execute = AsyncMock()
+        mock_cursor.fetchall = AsyncMock(
+            return_value=[("content_events", "content", "CODEC(ZSTD(3))")]
+        )
+
+        # Act
+        await bootstrap_clickhouse_schema(
+            get_connection=create_mock_connection_factory(mock_cursor),
+        )
+
+        # Assert
+        executed = [call.args[0] for call in mock_cursor.execute.call_args_list]
+        assert executed[: len(CLICKHOUSE_SCHEMA)] == CLICKHOUSE_SCHEMA
+        assert "system.columns" in executed[len(CLICKHOUSE_SCHEMA)]
+        assert mock_cursor.execute.call_args_list[len(CLICKHOUSE_SCHEMA)].args[1] == {
+            "tables": ("content_events",)
+        }
+        assert executed[len(CLICKHOUSE_SCHEMA) + 1 :] == (
+            build_clickhouse_index_statements()
+        )
+
+    @pytest.mark.asyncio
+    async def test_bootstrap_clickhouse_schema_differing_codec(self) -> None:
+        # Arrange
+        mock_cursor = MagicMock()
+        mock_cursor.execute = AsyncMock()
+        mock_cursor.fetchall = AsyncMock(
+            return_value=[("content_events", "content", "")]
+        )
+
+        # Act
+        await bootstrap_clickhouse_schema(
+            get_connection=create_mock_connection_factory(mock_cursor),
+        )
+
+        # Assert
+        executed = [call.args[0] for call in mock_cursor.execute.call_args_list]
+        assert executed[len(CLICKHOUSE_SCHEMA) + 1 :] == [
+            "ALTER TABLE content_events MODIFY COLUMN content String CODEC(ZSTD(3))",
+            *build_clickhouse_index_statements(),
+        ]
+
+
+class TestBuildMigrateContentEventsEngineStatements:
+    def test_build_migrate_content_events_engine_statements(self) -> None:
+        statements = build_migrate_content_events_engine_statements()
+
+        assert "CREATE TABLE IF NOT EXISTS content_events_replacing" in statements[1]
+        assert "ENGINE = ReplacingMergeTree" in statements[1]
+        assert statements[2:4] == [
+            (
+                "INSERT INTO content_events_replacing "
+                "SELECT content_event_uuid, user_id, content, ts FROM content_events"
+            ),
+            "EXCHANGE TABLES content_events AND content_events_replacing",
+        ]
+        assert statements[-1] == "DROP TABLE content_events_replacing"
+
+
+class TestMigrateContentEventsEngine:
+    @pytest.mark.asyncio
+    async def test_migrate_content_events_engine(self) -> None:
+        # Arrange
+        mock_cursor = MagicMock()
+        mock_cursor.execute = AsyncMock()
+        mock_cursor.fetchone = AsyncMock(return_value=("MergeTree",))
+
+        # Act
+        await migrate_content_events_engine(
+            get_connection=create_mock_connection_factory(mock_cursor),
+        )
+
+        # Assert
+        executed = [call.args[0] for call in mock_cursor.execute.call_args_list]
+        assert executed[1:] == build_migrate_content_events_engine_statements()
+
+    @pytest.mark.asyncio
+    async def test_migrate_content_events_engine_already_migrated(self) -> None:
+        # Arrange
+        mock_cursor = MagicMock()
+        mock_cursor.execute = AsyncMock()
+        mock_cursor.fetchone = AsyncMock(return_value=(CONTENT_EVENTS_ENGINE,))
+
+        # Act
+        await migrate_content_events_engine(
+            get_connection=create_mock_connection_factory(mock_cursor),
+        )
+
+        # Assert
+        mock_cursor.execute.assert_awaited_once()
+        assert "system.tables" in mock_cursor.execute.call_args.args[0]
+
+
+class TestCheckClickhouseSchema:
+    @pytest.mark.asyncio
+    async def test_check_clickhouse_schema(self) -> None:
+        mock_cursor = MagicMock()
+        mock_cursor.execute = AsyncMock()
+        mock_cursor.fetchone = AsyncMock(return_value=(CONTENT_EVENTS_ENGINE,))
+
+        await check_clickhouse_schema(
+            get_connection=create_mock_connection_factory(mock_cursor),
+        )
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("row", [("MergeTree",), None])
+    async def test_check_clickhouse_schema_wrong_engine(
+        self, row: tuple[str] | None
+    ) -> None:
+        mock_cursor = MagicMock()
+        mock_cursor.execute = AsyncMock()
+        mock_cursor.fetchone = AsyncMock(return_value=row)
+
+        with pytest.raises(RuntimeError, match="--migrate-content-events-engine"):
+            await check_clickhouse_schema(
+                get_connection=create_mock_connection_factory(mock_cursor),
+            )
@@ -0,0 +1,124 @@
+"""Query plans of the per-user read paths against a real ClickHouse.
+
+Skipped unless `CLICKHOUSE_TEST_DSN` points to a disposable database, e.g.
+`clickhouse://default:@localhost:9000/test`.
+"""
+
+import os
+import typing as tp
+
+import pytest
+from asynch import Pool
+
+from src.bootstrap.clickhouse import bootstrap_clickhouse_schema
+from src.utils.olap import build_get_clickhouse_connection
+
+CLICKHOUSE_TEST_DSN = os.environ.get("CLICKHOUSE_TEST_DSN")
+
+pytestmark = pytest.mark.skipif(
+    not CLICKHOUSE_TEST_DSN,
+    reason="CLICKHOUSE_TEST_DSN is not set",
+)
+
+
+async def explain_indexes(pool: Pool, query: str) -> str:
+    async with pool.connection() as connection, connection.cursor() as cursor:
+        await cursor.execute(f"EXPLAIN indexes = 1 {query}")
+        rows = await cursor.fetchall()
+    return "\n".join(row[0] for row in rows)
+
+
+@pytest.fixture
+async def pool() -> tp.AsyncIterator[Pool]:
+    pool = Pool(dsn=CLICKHOUSE_TEST_DSN)
+    await pool.startup()
+    await bootstrap_clickhouse_schema(
+        get_connection=build_get_clickhouse_connection(pool),
+    )
+    # Index analysis is only reported for tables that have parts
+    async with pool.connection() as connection, connection.cursor() as cursor:
+        await cursor.execute(
+            """
+            INSERT INTO content_events (content_event_uuid, user_id, content, ts)
+            VALUES (generateUUIDv4(), 'test_user_id', 'content', now())
+            """
+        )
+        await cursor.execute(
+            """
+            INSERT INTO topic_attributes_events
+            (topic_attributes_event_uuid, content_event_uuid, user_id,
+             keywords.name, keywords.weight, ts)
+            VALUES
+            (generateUUIDv4(), generateUUIDv4(), 'test_user_id',
+             ['python'], [1.0], now())
+            """
+        )
+    yield pool
+    await pool.shutdown()
+
+
+class TestClickhouseQueryPlans:
+    @pytest.mark.asyncio
+    async def test_content_events_by_user_uses_primary_key(self, pool: Pool) -> None:
+        plan = await explain_indexes(
+            pool,
+            """
+            SELECT content_event_uuid, content, ts
+            FROM content_events
+            WHERE user_id = 'test_user_id'
+                AND ts >= toDateTime('2024-01-01 00:00:00')
+            ORDER BY ts, content_event_uuid
+            """,
+        )
+
+        primary_key = plan.split("PrimaryKey", 1)[1]
+        assert "user_id" in primary_key
+        assert "ts" in primary_key
+        assert "MinMax" in plan or "Partition" in plan
+
+    @pytest.mark.asyncio
+    async def test_topic_attributes_events_by_user_uses_primary_key(
+        self, pool: Pool
+    ) -> None:
+        plan = await explain_indexes(
+            pool,
+            """
+            SELECT topic_attributes_event_uuid
+            FROM topic_attributes_events
+            WHERE user_id = 'test_user_id'
+            ORDER BY ts, topic_attributes_event_uuid
+            """,
+        )
+
+        assert "user_id" in plan.split("PrimaryKey", 1)[1]
+
+    @pytest.mark.asyncio
+    async def test_topic_attributes_events_by_uuid_uses_skip_index(
+        self, pool: Pool
+    ) -> None:
+        plan = await explain_indexes(
+            pool,
+            """
+            SELECT topic_attributes_event_uuid
+            FROM topic_attributes_events
+            WHERE topic_attributes_event_uuid
+                = toUUID('00000000-0000-0000-0000-000000000000')
+            """,
+        )
+
+        assert "topic_attributes_event_uuid_bloom_filter" in plan
+
+    @pytest.mark.asyncio
+    async def test_topic_attributes_events_by_keyword_uses_skip_index(
+        self, pool: Pool
+    ) -> None:
+        plan = await explain_indexes(
+            pool,
+            """
+            SELECT topic_attributes_event_uuid
+            FROM topic_attributes_events
+            WHERE hasAny(keywords.name, ['python'])
+            """,
+        )
+
+        assert "keywords_name_bloom_filter" in plan
@@ -0,0 +1,375 @@
+import typing as tp
+from datetime import UTC, datetime
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import bson
+import pytest
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import ReplaceOne
+from pymongo.errors import OperationFailure
+
+from src.bootstrap.mongo import (
+    MONGO_INDEXES,
+    bootstrap_mongo_schema,
+    check_mongo_schema,
+    check_users_read_model,
+    migrate_aggregated_topic_attributes_storage_format,
+    rebuild_topic_attribute_users,
+)
+from tests.conftest import build_database
+
+
+class TestBootstrapMongoSchema:
+    @pytest.mark.asyncio
+    async def test_bootstrap_mongo_schema(self) -> None:
+        mock_collection = MagicMock()
+        mock_collection.create_index = AsyncMock()
+
+        mock_database = MagicMock(spec=AsyncIOMotorDatabase)
+        mock_database.__getitem__.return_value = mock_collection
+
+        await bootstrap_mongo_schema(database=mock_database)
+
+        mock_database.__getitem__.assert_any_call("aggregated_topic_attributes")
+        mock_collection.create_index.assert_any_call(
+            [("user_id", 1)], name="user_id_unique", unique=True
+        )
+        for collection in ("users", "topic_profiles", "content_watermarks"):
+            mock_database.__getitem__.assert_any_call(collection)
+        mock_collection.create_index.assert_any_call(
+            [("keywords.name", 1)], name="keywords_name"
+        )
+
+    @pytest.mark.asyncio
+    async def test_bootstrap_mongo_schema_duplicate_keys_not_strict(self) -> None:
+        # Arrange
+        async def create_index(
+            keys: list[tuple[str, int]], *, name: str, **options: tp.Any
+        ) -> str:
+            if name == "user_id_unique":
+                raise OperationFailure("E11000 duplicate key error", code=11000)
+            return name
+
+        mock_collection = MagicMock()
+        mock_collection.create_index = AsyncMock(side_effect=create_index)
+        mock_collection.aggregate.return_value.to_list = AsyncMock(
+            return_value=[{"_id": {"user_id": "user_1"}, "count": 2}]
+        )
+        mock_database = MagicMock(spec=AsyncIOMotorDatabase)
+        mock_database.__getitem__.return_value = mock_collection
+
+        # Act
+        await bootstrap_mongo_schema(database=mock_database, strict=False)
+
+        # Assert
+        # Other indexes are still built
+        mock_collection.create_index.assert_any_call(
+            [("keywords.name", 1)], name="keywords_name"
+        )
+        pipeline = mock_collection.aggregate.call_args.args[0]
+        assert pipeline[0]["$group"]["_id"] == {"user_id": "$user_id"}
+
+    @pytest.mark.asyncio
+    async def test_bootstrap_mongo_schema_duplicate_keys_strict(self) -> None:
+        mock_collection = MagicMock()
+        mock_collection.create_index = AsyncMock(
+            side_effect=OperationFailure("E11000 duplicate key error", code=11000)
+        )
+        mock_database = MagicMock(spec=AsyncIOMotorDatabase)
+        mock_database.__getitem__.return_value = mock_collection
+
+        with pytest.raises(OperationFailure):
+            await bootstrap_mongo_schema(database=mock_database)
+
+    @pytest.mark.asyncio
+    async def test_bootstrap_mongo_schema_other_error_not_strict(self) -> None:
+        mock_collection = MagicMock()
+        mock_collection.create_index = AsyncMock(
+            side_effect=OperationFailure("Index build failed", code=67)
+        )
+        mock_database = MagicMock(spec=AsyncIOMotorDatabase)
+        mock_database.__getitem__.return_value = mock_collection
+
+        with pytest.raises(OperationFailure):
+            await bootstrap_mongo_schema(database=mock_database, strict=False)
+
+
+class TestCheckMongoSchema:
+    @staticmethod
+    def build_collections(
+        index_information: dict[str, dict[str, dict[str, tp.Any]]],
+    ) -> dict[str, MagicMock]:
+        collections = {}
+        for collection, _, _ in MONGO_INDEXES:
+            collections[collection] = MagicMock()
+            collections[collection].index_information = AsyncMock(
+                return_value=index_information.get(collection, {})
+            )
+        return collections
+
+    @staticmethod
+    def build_index_information() -> dict[str, dict[str, dict[str, tp.Any]]]:
+        index_information: dict[str, dict[str, dict[str, tp.Any]]] = {}
+        for collection, keys, options in MONGO_INDEXES:
+            index_information.setdefault(
+                collection, {"_id_": {"key": [("_id", 1)], "v": 2}}
+            )[options["name"]] = {
+                # The server reports key orders as floats for some versions
+                "key": [(field, float(order)) for field, order in keys],
+                "v": 2,
+                **({"unique": True} if options.get("unique") else {}),
+            }
+        return index_information
+
+    @pytest.mark.asyncio
+    async def test_check_mongo_schema(self) -> None:
+        await check_mongo_schema(
+            database=build_database(
+                self.build_collections(self.build_index_information())
+            )
+        )
+
+    @pytest.mark.asyncio
+    async def test_check_mongo_schema_missing_unique_index(self) -> None:
+        # Arrange
+        index_information = self.build_index_information()
+        del index_information["aggregated_topic_attributes"]["user_id_unique"]
+
+        # Act & Assert
+        with pytest.raises(
+            RuntimeError, match="aggregated_topic_attributes.user_id_unique"
+        ):
+            await check_mongo_schema(
+                database=build_database(self.build_collections(index_information))
+            )
+
+    @pytest.mark.asyncio
+    async def test_check_mongo_schema_index_not_unique(self) -> None:
+        # Arrange
+        index_information = self.build_index_information()
+        del index_information["users"]["user_id_unique"]["unique"]
+
+        # Act & Assert
+        with pytest.raises(RuntimeError, match="users.user_id_unique"):
+            await check_mongo_schema(
+                database=build_database(self.build_collections(index_information))
+            )
+
+    @pytest.mark.asyncio
+    async def test_check_mongo_schema_empty_database(self) -> None:
+        with pytest.raises(RuntimeError, match="python -m src.bootstrap"):
+            await check_mongo_schema(
+                database=build_database(self.build_collections({}))
+            )
+
+
+class TestMigrateAggregatedTopicAttributesStorageFormat:
+    @staticmethod
+    def build_collection(batches: list[list[dict[str, tp.Any]]]) -> MagicMock:
+        mock_collection = MagicMock()
+        mock_collection.find.return_value.sort.return_value.limit.return_value.to_list = AsyncMock(
+            side_effect=[*batches, []]
+        )
+        mock_collection.bulk_write = AsyncMock(
+            side_effect=[
+                MagicMock(matched_count=len(batch) - index)
+                for index, batch in enumerate(batches)
+            ]
+        )
+        return mock_collection
+
+    @pytest.mark.asyncio
+    async def test_migrate_to_columnar(self) -> None:
+        updated_at = datetime(2023, 1, 1, tzinfo=UTC)
+        batches = [
+            [
+                {
+                    "_id": index,
+                    "user_id": f"user_{index}",
+                    "keywords": [
+                        {"name": "python", "weight": 0.8, "updated_at": updated_at}
+                    ],
+                    "version": 1,
+                }
+                for index in range(batch_index * 2, batch_index * 2 + 2)
+            ]
+            for batch_index in range(2)
+        ]
+        mock_collection = self.build_collection(batches)
+        mock_database = MagicMock(spec=AsyncIOMotorDatabase)
+        mock_database.__getitem__.return_value = mock_collection
+
+        report = await migrate_aggregated_topic_attributes_storage_format(
+            storage_format="columnar",
+            database=mock_database,
+            batch_size=2,
+        )
+
+        assert report["migrated"] == 3
+        assert report["skipped"] == 1
+        assert report["size_before"] == sum(
+            len(bson.encode(document)) for batch in batches for document in batch
+        )
+        assert [call.args[0] for call in mock_collection.find.call_args_list] == [
+            {"keywords": {"$type": "array"}},
+            {"keywords": {"$type": "array"}, "_id": {"$gt": 1}},
+            {"keywords": {"$type": "array"}, "_id": {"$gt": 3}},
+        ]
+        operations = mock_collection.bulk_write.call_args_list[0].args[0]
+        assert operations[0] == ReplaceOne(
+            {"_id": 0, "version": 1},
+            {
+                "_id": 0,
+                "user_id": "user_0",
+                "keywords": {
+                    "name": ["python"],
+                    "weight": [0.8],
+                    "updated_at": [1672531200],
+                },
+                "version": 1,
+            },
+        )
+
+    @pytest.mark.asyncio
+    async def test_migrate_to_subdocuments(self) -> None:
+        mock_collection = self.build_collection(
+            [
+                [
+                    {
+                        "_id": 0,
+                        "user_id": "user_0",
+                        "keywords": {
+                            "name": ["python"],
+                            "weight": [0.8],
+                            "updated_at": [1672531200],
+                        },
+                    }
+                ]
+            ]
+        )
+        mock_database = MagicMock(spec=AsyncIOMotorDatabase)
+        mock_database.__getitem__.return_value = mock_collection
+
+        report = await migrate_aggregated_topic_attributes_storage_format(
+            storage_format="subdocuments",
+            database=mock_database,
+        )
+
+        assert report["migrated"] == 1
+        assert mock_collection.find.call_args_list[0].args[0] == {
+            "keywords": {"$exists": True, "$not": {"$type": "array"}}
+        }
+        [operation] = mock_collection.bulk_write.call_args.args[0]
+        assert operation == ReplaceOne(
+            {"_id": 0, "version": None},
+            {
+                "_id": 0,
+                "user_id": "user_0",
+                "keywords": [
+                    {
+                        "name": "python",
+                        "weight": 0.8,
+                        "updated_at": datetime(2023, 1, 1, tzinfo=UTC),
+                    }
+                ],
+            },
+        )
+
+
+class TestRebuildTopicAttributeUsers:
+    @pytest.mark.asyncio
+    @patch("src.bootstrap.mongo.update_topic_attribute_users_repository")
+    async def test_rebuild_topic_attribute_users(
+        self, mock_update_topic_attribute_users: AsyncMock
+    ) -> None:
+        mock_collection = MagicMock()
+        mock_collection.find.return_value.sort.return_value.limit.return_value.to_list = AsyncMock(
+            side_effect=[
+                [
+                    {
+                        "_id": 0,
+                        "user_id": "user_0",
+                        "keywords": {
+                            "name": ["python"],
+                            "weight": [0.8],
+                            "updated_at": [1672531200],
+                        },
+                        "version": 2,
+                    }
+                ],
+                [],
+            ]
+        )
+        mock_collection.delete_many = AsyncMock()
+        mock_database = MagicMock(spec=AsyncIOMotorDatabase)
+        mock_database.__getitem__.return_value = mock_collection
+
+        users = await rebuild_topic_attribute_users(database=mock_database)
+
+        assert users == 1
+        mock_collection.delete_many.assert_called_once_with(
+            {"user_id": {"$in": ["user_0"]}}
+        )
+        [(old, new)] = mock_update_topic_attribute_users.call_args.args[0]
+        assert old.keywords == []
+        assert new.version == 2
+        assert new.keywords[0].name == "python"
+
+
+class TestCheckUsersReadModel:
+    @pytest.mark.asyncio
+    async def test_check_users_read_model(self) -> None:
+        topic_profile = {"user_id": "user_1", "topics": []}
+        aggregated_topic_attributes = {"user_id": "user_1", "version": 2}
+        mock_users = MagicMock()
+        mock_users.find.return_value.sort.return_value.limit.return_value.to_list = (
+            AsyncMock(
+                side_effect=[
+                    [
+                        {
+                            "_id": 0,
+                            "user_id": "user_0",
+                        },
+                        {
+                            "_id": 1,
+                            "user_id": "user_1",
+                            "topic_profile": topic_profile,
+                            "aggregated_topic_attributes": {
+                                **aggregated_topic_attributes,
+                                "version": 1,
+                            },
+                        },
+                        {
+                            "_id": 2,
+                            "user_id": "user_2",
+                            "topic_profile": {**topic_profile, "user_id": "user_2"},
+                        },
+                    ],
+                    [],
+                ]
+            )
+        )
+        mock_aggregated_topic_attributes = MagicMock()
+        mock_aggregated_topic_attributes.find.return_value.__aiter__.return_value = [
+            aggregated_topic_attributes
+        ]
+        mock_topic_profiles = MagicMock()
+        mock_topic_profiles.find.return_value.__aiter__.return_value = [
+            topic_profile,
+            {**topic_profile, "user_id": "user_2"},
+        ]
+        collections = {
+            "users": mock_users,
+            "aggregated_topic_attributes": mock_aggregated_topic_attributes,
+            "topic_profiles": mock_topic_profiles,
+        }
+        mock_database = MagicMock(spec=AsyncIOMotorDatabase)
+        mock_database.__getitem__.side_effect = collections.__getitem__
+
+        inconsistent_user_ids = await check_users_read_model(database=mock_database)
+
+        # `user_0` has no topic info, `user_1` an outdated version
+        assert inconsistent_user_ids == ["user_1"]
+        mock_topic_profiles.find.assert_called_once_with(
+            {"user_id": {"$in": ["user_0", "user_1", "user_2"]}}, {"_id": 0}
+        )
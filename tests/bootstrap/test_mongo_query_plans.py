@@ -0,0 +1,399 @@
+"""Query plans of the users read paths against a real MongoDB.
+
+Skipped unless `MONGO_TEST_URL` points to a disposable server, e.g.
+`mongodb://localhost:27017`. Every test runs in a scratch database.
+"""
+
+import os
+import typing as tp
+import uuid
+
+import pytest
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
+
+from src.bootstrap.mongo import bootstrap_mongo_schema, check_users_read_model
+from src.dtos import AggregatedTopicAttributesDTO, UserGetDTO
+from src.repositories.aggregated_topic_attributes import (
+    encode_aggregated_topic_attributes_document,
+    set_users_aggregated_topic_attributes_repository,
+)
+from src.repositories.topic_attribute_users import (
+    update_topic_attribute_users_repository,
+)
+from src.repositories.users import (
+    build_get_user_with_topic_info_pipeline,
+    build_get_users_with_topic_info_pipeline,
+    decode_user_with_topic_info,
+    get_user_with_embedded_topic_info_repository,
+    get_user_with_topic_info_repository,
+    get_users_with_topic_info_collection,
+)
+from src.repositories.users_read_model import embed_users_topic_info_repository
+from src.schemas import KeywordTopicProfileSchema
+
+MONGO_TEST_URL = os.environ.get("MONGO_TEST_URL")
+
+pytestmark = pytest.mark.skipif(
+    not MONGO_TEST_URL,
+    reason="MONGO_TEST_URL is not set",
+)
+
+
+def collect_values(plan: tp.Any, key: str) -> list[tp.Any]:
+    if isinstance(plan, dict):
+        return [
+            *([plan[key]] if key in plan else []),
+            *(value for child in plan.values() for value in collect_values(child, key)),
+        ]
+    if isinstance(plan, list):
+        return [value for child in plan for value in collect_values(child, key)]
+    return []
+
+
+async def explain_aggregate(
+    database: AsyncIOMotorDatabase[tp.Any],
+    collection: str,
+    pipeline: list[dict[str, tp.Any]],
+) -> dict[str, tp.Any]:
+    return await database.command(
+        "explain",
+        {"aggregate": collection, "pipeline": pipeline, "cursor": {}},
+        verbosity="queryPlanner",
+    )
+
+
+def assert_uses_indexes(plan: dict[str, tp.Any]) -> None:
+    stages = collect_values(plan, "stage")
+    assert "COLLSCAN" not in stages, plan
+    assert "IXSCAN" in stages or "IDHACK" in stages, plan
+    # `$lookup`s pushed down to the query engine report how they join, any
+    # other strategy than an index lookup scans the foreign collection
+    assert set(collect_values(plan, "strategy")) <= {"IndexedLoopJoin"}, plan
+
+
+@pytest.fixture
+async def database() -> tp.AsyncIterator[AsyncIOMotorDatabase[tp.Any]]:
+    client: AsyncIOMotorClient[tp.Any] = AsyncIOMotorClient(MONGO_TEST_URL)
+    database = client[f"api_gateway_tests_{uuid.uuid4().hex}"]
+    await bootstrap_mongo_schema(database=database)
+
+    aggregated_topic_attributes = AggregatedTopicAttributesDTO(
+        user_id="user_0",
+        keywords=[KeywordTopicProfileSchema(name="python", weight=0.8)],
+    ).model_dump()
+    await database["users"].insert_many(
+        [{"user_id": f"user_{index}", "username": "user"} for index in range(2)]
+    )
+    await database["aggregated_topic_attributes"].insert_many(
+        [
+            aggregated_topic_attributes,
+            encode_aggregated_topic_attributes_document(
+                {**aggregated_topic_attributes, "user_id": "user_1"},
+                storage_format="columnar",
+            ),
+        ]
+    )
+    await database["topic_profiles"].insert_one({"user_id": "user_0", "topics": []})
+    await update_topic_attribute_users_repository(
+        [
+            (
+                AggregatedTopicAttributesDTO(user_id=user_id),
+                AggregatedTopicAttributesDTO.model_validate(
+                    {**aggregated_topic_attributes, "user_id": user_id, "version": 1}
+                ),
+            )
+            for user_id in ("user_0", "user_1")
+        ],
+        database=database,
+    )
+
+    yield database
+    await client.drop_database(database.name)
+    client.close()
+
+
+class TestMongoQueryPlans:
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize(
+        "filters",
+        [
+            {},
+            {"keywords": ["python"]},
+            {"entities": ["python"]},
+            {"sentiments": ["positive"]},
+            {"keywords": ["python"], "entities": ["python"], "half_life_days": 30},
+        ],
+    )
+    @pytest.mark.parametrize("limit", [None, 10])
+    async def test_users_with_topic_info_pipeline_uses_indexes(
+        self,
+        database: AsyncIOMotorDatabase[tp.Any],
+        filters: dict[str, tp.Any],
+        limit: int | None,
+    ) -> None:
+        plan = await explain_aggregate(
+            database,
+            get_users_with_topic_info_collection(**filters),
+            build_get_users_with_topic_info_pipeline(**filters, limit=limit),
+        )
+
+        assert_uses_indexes(plan)
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize(
+        "filters",
+        [{}, {"keywords": ["python"]}, {"keywords": ["python"], "half_life_days": 30}],
+    )
+    async def test_users_with_topic_info_seek_pipeline_uses_indexes(
+        self,
+        database: AsyncIOMotorDatabase[tp.Any],
+        filters: dict[str, tp.Any],
+    ) -> None:
+        plan = await explain_aggregate(
+            database,
+            get_users_with_topic_info_collection(**filters),
+            build_get_users_with_topic_info_pipeline(
+                **filters,
+                limit=10,
+                after=([0.9, None, None], "user_0"),
+                count_total=False,
+            ),
+        )
+
+        assert_uses_indexes(plan)
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("filters", [{}, {"keywords": ["python"]}])
+    async def test_users_with_topic_info_seek_pipeline_results(
+        self,
+        database: AsyncIOMotorDatabase[tp.Any],
+        filters: dict[str, tp.Any],
+    ) -> None:
+        collection = database[get_users_with_topic_info_collection(**filters)]
+        [first_user] = await collection.aggregate(
+            build_get_users_with_topic_info_pipeline(
+                **filters, limit=1, count_total=False
+            )
+        ).to_list(None)
+        after = (
+            [
+                first_user.get("maxKeywordWeight"),
+                first_user.get("maxEntityWeight"),
+                first_user.get("maxSentimentWeight"),
+            ],
+            first_user["user_id"],
+        )
+
+        users = await collection.aggregate(
+            build_get_users_with_topic_info_pipeline(
+                **filters, limit=10, after=after, count_total=False
+            )
+        ).to_list(None)
+
+        assert first_user["user_id"] == "user_0"
+        assert [user["user_id"] for user in users] == ["user_1"]
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize(
+        "pipeline_kwargs",
+        [
+            {"limit": 10},
+            {"limit": 10, "after": ([0.9, None, None], "user_0"), "count_total": False},
+            {"limit": 10, "keywords": ["python", "fastapi"]},
+        ],
+    )
+    async def test_users_with_topic_info_inverted_index_pipeline_uses_indexes(
+        self,
+        database: AsyncIOMotorDatabase[tp.Any],
+        pipeline_kwargs: dict[str, tp.Any],
+    ) -> None:
+        pipeline_kwargs = {"keywords": ["python"], **pipeline_kwargs}
+        plan = await explain_aggregate(
+            database,
+            "topic_attribute_users",
+            build_get_users_with_topic_info_pipeline(
+                **pipeline_kwargs, inverted_index=True
+            ),
+        )
+
+        assert_uses_indexes(plan)
+
+    @pytest.mark.asyncio
+    async def test_users_with_topic_info_inverted_index_pipeline_results(
+        self,
+        database: AsyncIOMotorDatabase[tp.Any],
+    ) -> None:
+        filters: dict[str, tp.Any] = {"keywords": ["python"], "limit": 10}
+
+        [expected] = (
+            await database["aggregated_topic_attributes"]
+            .aggregate(build_get_users_with_topic_info_pipeline(**filters))
+            .to_list(None)
+        )
+        [result] = (
+            await database["topic_attribute_users"]
+            .aggregate(
+                build_get_users_with_topic_info_pipeline(**filters, inverted_index=True)
+            )
+            .to_list(None)
+        )
+
+        assert result["metadata"] == expected["metadata"]
+        assert [
+            (user["user_id"], user["maxKeywordWeight"], user["username"])
+            for user in result["data"]
+        ] == [
+            (user["user_id"], user["maxKeywordWeight"], user["username"])
+            for user in expected["data"]
+        ]
+
+    @pytest.mark.asyncio
+    async def test_topic_attribute_users_removed_item_stays_removed(
+        self,
+        database: AsyncIOMotorDatabase[tp.Any],
+    ) -> None:
+        written = AggregatedTopicAttributesDTO(
+            user_id="user_0",
+            keywords=[KeywordTopicProfileSchema(name="python", weight=0.8)],
+            version=1,
+        )
+        removed = written.model_copy(update={"keywords": [], "version": 3})
+        late = written.model_copy(update={"version": 2})
+
+        await update_topic_attribute_users_repository(
+            [(written, removed)], database=database
+        )
+        # A late write of an older version doesn't recreate the item
+        await update_topic_attribute_users_repository(
+            [(AggregatedTopicAttributesDTO(user_id="user_0"), late)],
+            database=database,
+        )
+
+        document = await database["topic_attribute_users"].find_one(
+            {"user_id": "user_0", "attribute_type": "keywords", "name": "python"}
+        )
+        assert document is not None
+        assert document["removed"] is True
+        assert document["version"] == 3
+        [result] = (
+            await database["topic_attribute_users"]
+            .aggregate(
+                build_get_users_with_topic_info_pipeline(
+                    keywords=["python"], limit=10, inverted_index=True
+                )
+            )
+            .to_list(None)
+        )
+        assert [user["user_id"] for user in result["data"]] == ["user_1"]
+
+    @pytest.mark.asyncio
+    async def test_users_with_topic_info_pipeline_results(
+        self,
+        database: AsyncIOMotorDatabase[tp.Any],
+    ) -> None:
+        await database["aggregated_topic_attributes"].insert_one(
+            {"user_id": "missing_user", "keywords": [{"name": "python", "weight": 1}]}
+        )
+
+        [result] = (
+            await database["aggregated_topic_attributes"]
+            .aggregate(
+                build_get_users_with_topic_info_pipeline(keywords=["python"], limit=10)
+            )
+            .to_list(None)
+        )
+        users = result["data"]
+
+        assert result["metadata"] == [{"total": 2}]
+        assert [user["user_id"] for user in users] == ["user_0", "user_1"]
+        assert users[0]["username"] == "user"
+        assert users[0]["aggregated_topic_attributes"]["user_id"] == "user_0"
+        assert "user" not in users[0]["aggregated_topic_attributes"]
+        assert users[0]["topic_profile"]["user_id"] == "user_0"
+        assert users[1]["maxKeywordWeight"] == 0.8
+
+    @pytest.mark.asyncio
+    async def test_user_with_topic_info_pipeline_uses_indexes(
+        self,
+        database: AsyncIOMotorDatabase[tp.Any],
+    ) -> None:
+        plan = await explain_aggregate(
+            database,
+            "users",
+            build_get_user_with_topic_info_pipeline("user_0"),
+        )
+
+        assert_uses_indexes(plan)
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize(
+        "collection", ["users", "aggregated_topic_attributes", "topic_profiles"]
+    )
+    async def test_user_by_id_uses_index(
+        self,
+        database: AsyncIOMotorDatabase[tp.Any],
+        collection: str,
+    ) -> None:
+        plan = await database[collection].find({"user_id": "user_0"}).explain()
+
+        assert_uses_indexes(plan)
+
+    @pytest.mark.asyncio
+    async def test_user_with_topic_info_results(
+        self,
+        database: AsyncIOMotorDatabase[tp.Any],
+    ) -> None:
+        for user_id in ("user_0", "user_1"):
+            [expected] = (
+                await database["users"]
+                .aggregate(build_get_user_with_topic_info_pipeline(user_id))
+                .to_list(None)
+            )
+            user = await get_user_with_topic_info_repository(
+                user_id=user_id, database=database
+            )
+
+            assert UserGetDTO.model_validate(user) == UserGetDTO.model_validate(
+                decode_user_with_topic_info(expected)
+            )
+
+    @pytest.mark.asyncio
+    async def test_users_read_model_results(
+        self,
+        database: AsyncIOMotorDatabase[tp.Any],
+    ) -> None:
+        await embed_users_topic_info_repository(database=database)
+
+        assert await check_users_read_model(database=database) == []
+        for user_id in ("user_0", "user_1"):
+            # Joined documents also have the `_id`s of their source documents
+            assert UserGetDTO.model_validate(
+                await get_user_with_embedded_topic_info_repository(
+                    user_id, database=database
+                )
+            ) == UserGetDTO.model_validate(
+                await get_user_with_topic_info_repository(
+                    user_id=user_id, database=database
+                )
+            )
+
+    @pytest.mark.asyncio
+    async def test_users_read_model_keeps_newer_copies(
+        self,
+        database: AsyncIOMotorDatabase[tp.Any],
+    ) -> None:
+        aggregated_topic_attributes = AggregatedTopicAttributesDTO(
+            user_id="user_0", version=5
+        ).model_dump()
+        await set_users_aggregated_topic_attributes_repository(
+            [aggregated_topic_attributes], database=database
+        )
+
+        await embed_users_topic_info_repository(["user_0"], database=database)
+        user = await get_user_with_embedded_topic_info_repository(
+            "user_0", database=database
+        )
+
+        assert user is not None
+        assert user["aggregated_topic_attributes"]["version"] == 5
+        assert await check_users_read_model(database=database) == ["user_0", "user_1"]
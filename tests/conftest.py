@@ -0,0 +1,57 @@
+import typing as tp
+import uuid
+from unittest.mock import MagicMock
+
+import pytest
+from fastapi import APIRouter, FastAPI
+from fastapi.testclient import TestClient
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from src.dtos import TopicAttributesEventBrokerDTO
+from src.schemas import (
+    EntityTopicEventSchema,
+    KeywordTopicEventSchema,
+    SentimentTopicEventSchema,
+)
+from src.utils.dates import utcnow
+
+
+def build_database(collections: MagicMock | tp.Mapping[str, MagicMock]) -> MagicMock:
+    # Serves a single collection whatever its name, or collections by name
+    mock_database = MagicMock(spec=AsyncIOMotorDatabase)
+    if isinstance(collections, MagicMock):
+        mock_database.__getitem__.return_value = collections
+    else:
+        mock_database.__getitem__.side_effect = collections.__getitem__
+    return mock_database
+
+
+def build_topic_attributes_event(
+    user_id: str,
+    keyword_weight: float = 0.8,
+) -> TopicAttributesEventBrokerDTO:
+    return TopicAttributesEventBrokerDTO(
+        topic_attributes_event_uuid=uuid.uuid4(),
+        content_event_uuid=uuid.uuid4(),
+        user_id=user_id,
+        keywords=[KeywordTopicEventSchema(name="python", weight=keyword_weight)],
+        entities=[
+            EntityTopicEventSchema(category="language", name="python", weight=0.8)
+        ],
+        sentiments=[SentimentTopicEventSchema(name="positive", weight=0.9)],
+        timestamp=utcnow(),
+    )
+
+
+# Test modules of routers provide `api_router`, test classes extend `app` with
+# the state their endpoints read
+@pytest.fixture
+def app(api_router: APIRouter) -> FastAPI:
+    app = FastAPI()
+    app.include_router(api_router)
+    return app
+
+
+@pytest.fixture
+def client(app: FastAPI) -> TestClient:
+    return TestClient(app)
@@ -0,0 +1,764 @@
+import asyncio
+import typing as tp
+from datetime import UTC, datetime
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError, WriteError
+
+from src.dtos import AggregatedTopicAttributesDTO
+from src.repositories.aggregated_topic_attributes import (
+    AggregatedTopicAttributesWriteBehindCache,
+    build_decoded_weighted_items_expression,
+    bulk_merge_aggregated_topic_attributes_repository,
+    bulk_upsert_versioned_aggregated_topic_attributes_repository,
+    decode_aggregated_topic_attributes_document,
+    encode_aggregated_topic_attributes_document,
+    get_aggregated_topic_attributes_by_user_ids_repository,
+    get_aggregated_topic_attributes_repository,
+    merge_aggregated_topic_attributes_repository,
+    set_users_aggregated_topic_attributes_repository,
+    upsert_versioned_aggregated_topic_attributes_repository,
+)
+from tests.conftest import build_database, build_topic_attributes_event
+
+
+class TestSetUsersAggregatedTopicAttributesRepository:
+    @pytest.mark.asyncio
+    async def test_set_users_aggregated_topic_attributes_repository(self) -> None:
+        # Arrange
+        aggregated_topic_attributes = AggregatedTopicAttributesDTO(
+            user_id="user_1", version=3
+        ).model_dump()
+        mock_collection = MagicMock()
+        mock_collection.bulk_write = AsyncMock()
+        mock_database = MagicMock(spec=AsyncIOMotorDatabase)
+        mock_database.__getitem__.return_value = mock_collection
+
+        # Act
+        await set_users_aggregated_topic_attributes_repository(
+            [aggregated_topic_attributes],
+            database=mock_database,
+            storage_format="columnar",
+        )
+
+        # Assert
+        # Verify a newer embedded version is not overridden
+        mock_database.__getitem__.assert_called_once_with("users")
+        mock_collection.bulk_write.assert_called_once_with(
+            [
+                UpdateOne(
+                    {
+                        "user_id": "user_1",
+                        "aggregated_topic_attributes.version": {"$not": {"$gte": 3}},
+                    },
+                    {
+                        "$set": {
+                            "aggregated_topic_attributes": (
+                                encode_aggregated_topic_attributes_document(
+                                    aggregated_topic_attributes,
+                                    storage_format="columnar",
+                                )
+                            )
+                        }
+                    },
+                )
+            ],
+            ordered=False,
+        )
+
+    @pytest.mark.asyncio
+    async def test_set_users_aggregated_topic_attributes_repository_empty(
+        self,
+    ) -> None:
+        # Arrange
+        mock_database = MagicMock(spec=AsyncIOMotorDatabase)
+
+        # Act
+        await set_users_aggregated_topic_attributes_repository(
+            [], database=mock_database
+        )
+
+        # Assert
+        mock_database.__getitem__.assert_not_called()
+
+
+class TestGetAggregatedTopicAttributesByUserIdsRepository:
+    @pytest.mark.asyncio
+    async def test_get_aggregated_topic_attributes_by_user_ids_repository(
+        self,
+    ) -> None:
+        # Arrange
+        documents = [
+            {"user_id": "user_1", "keywords": []},
+            {"user_id": "user_2", "keywords": []},
+        ]
+
+        class MockCursor:
+            def __aiter__(self) -> "MockCursor":
+                self._documents = iter(documents)
+                return self
+
+            async def __anext__(self) -> dict[str, tp.Any]:
+                try:
+                    return next(self._documents)
+                except StopIteration:
+                    raise StopAsyncIteration
+
+        mock_collection = MagicMock()
+        mock_collection.find.return_value = MockCursor()
+
+        mock_database = MagicMock(spec=AsyncIOMotorDatabase)
+        mock_database.__getitem__.return_value = mock_collection
+
+        # Act
+        result = await get_aggregated_topic_attributes_by_user_ids_repository(
+            ["user_1", "user_2", "user_3"],
+            database=mock_database,
+        )
+
+        # Assert
+        assert result == {
+            "user_1": documents[0],
+            "user_2": documents[1],
+        }
+        mock_database.__getitem__.assert_called_once_with("aggregated_topic_attributes")
+        mock_collection.find.assert_called_once_with(
+            {"user_id": {"$in": ["user_1", "user_2", "user_3"]}}
+        )
+
+
+class TestMergeAggregatedTopicAttributesRepository:
+    @pytest.mark.asyncio
+    async def test_merge_aggregated_topic_attributes_repository(self) -> None:
+        # Arrange
+        pipeline = [{"$set": {"user_id": {"$literal": "test_user_id"}}}]
+
+        mock_collection = MagicMock()
+        mock_collection.update_one = AsyncMock()
+
+        mock_database = MagicMock(spec=AsyncIOMotorDatabase)
+        mock_database.__getitem__.return_value = mock_collection
+
+        # Act
+        await merge_aggregated_topic_attributes_repository(
+            "test_user_id",
+            pipeline,
+            database=mock_database,
+        )
+
+        # Assert
+        mock_database.__getitem__.assert_called_once_with("aggregated_topic_attributes")
+        mock_collection.update_one.assert_called_once_with(
+            {"user_id": "test_user_id"},
+            pipeline,
+            upsert=True,
+        )
+
+
+class TestBulkMergeAggregatedTopicAttributesRepository:
+    @pytest.mark.asyncio
+    async def test_bulk_merge_aggregated_topic_attributes_repository(self) -> None:
+        # Arrange
+        pipelines = [
+            ("user_1", [{"$set": {"user_id": {"$literal": "user_1"}}}]),
+            ("user_1", [{"$set": {"user_id": {"$literal": "user_1"}}}]),
+        ]
+
+        mock_collection = MagicMock()
+        mock_collection.bulk_write = AsyncMock()
+
+        mock_database = MagicMock(spec=AsyncIOMotorDatabase)
+        mock_database.__getitem__.return_value = mock_collection
+
+        # Act
+        await bulk_merge_aggregated_topic_attributes_repository(
+            pipelines,
+            database=mock_database,
+        )
+
+        # Assert
+        mock_collection.bulk_write.assert_called_once_with(
+            [
+                UpdateOne({"user_id": user_id}, pipeline, upsert=True)
+                for user_id, pipeline in pipelines
+            ],
+            ordered=True,
+        )
+
+    @pytest.mark.asyncio
+    async def test_bulk_merge_aggregated_topic_attributes_repository_empty(
+        self,
+    ) -> None:
+        # Arrange
+        mock_database = MagicMock(spec=AsyncIOMotorDatabase)
+
+        # Act
+        await bulk_merge_aggregated_topic_attributes_repository(
+            [],
+            database=mock_database,
+        )
+
+        # Assert
+        mock_database.__getitem__.assert_not_called()
+
+
+SUBDOCUMENTS_DOCUMENT = {
+    "user_id": "test_user_id",
+    "keywords": [
+        {
+            "name": "python",
+            "weight": 0.8,
+            "updated_at": datetime(2023, 1, 1, tzinfo=UTC),
+        },
+        {
+            "name": "fastapi",
+            "weight": 0.5,
+            "updated_at": datetime(2023, 1, 2, tzinfo=UTC),
+        },
+    ],
+    "entities": [
+        {
+            "category": "language",
+            "name": "python",
+            "weight": 0.8,
+            "updated_at": datetime(2023, 1, 1, tzinfo=UTC),
+        }
+    ],
+    "sentiments": [],
+    "updated_at": datetime(2023, 1, 2, tzinfo=UTC),
+    "version": 3,
+}
+
+COLUMNAR_DOCUMENT = {
+    "user_id": "test_user_id",
+    "keywords": {
+        "name": ["python", "fastapi"],
+        "weight": [0.8, 0.5],
+        "updated_at": [1672531200, 1672617600],
+    },
+    "entities": {
+        "category": ["language"],
+        "name": ["python"],
+        "weight": [0.8],
+        "updated_at": [1672531200],
+    },
+    "sentiments": {},
+    "updated_at": datetime(2023, 1, 2, tzinfo=UTC),
+    "version": 3,
+}
+
+
+class TestAggregatedTopicAttributesDocumentCodec:
+    def test_encode_columnar(self) -> None:
+        # Act
+        result = encode_aggregated_topic_attributes_document(
+            SUBDOCUMENTS_DOCUMENT, storage_format="columnar"
+        )
+
+        # Assert
+        assert result == COLUMNAR_DOCUMENT
+
+    def test_encode_columnar_naive_timestamps(self) -> None:
+        # Arrange
+        data = {
+            "user_id": "test_user_id",
+            "keywords": [
+                {"name": "python", "weight": 0.8, "updated_at": datetime(2023, 1, 1)}
+            ],
+        }
+
+        # Act
+        result = encode_aggregated_topic_attributes_document(
+            data, storage_format="columnar"
+        )
+
+        # Assert
+        assert result["keywords"]["updated_at"] == [1672531200]
+
+    def test_encode_subdocuments(self) -> None:
+        # Act
+        result = encode_aggregated_topic_attributes_document(
+            SUBDOCUMENTS_DOCUMENT, storage_format="subdocuments"
+        )
+
+        # Assert
+        assert result == SUBDOCUMENTS_DOCUMENT
+
+    @pytest.mark.parametrize("document", [COLUMNAR_DOCUMENT, SUBDOCUMENTS_DOCUMENT])
+    def test_decode(self, document: dict[str, tp.Any]) -> None:
+        # Act
+        result = decode_aggregated_topic_attributes_document(document)
+
+        # Assert
+        assert result == SUBDOCUMENTS_DOCUMENT
+        assert AggregatedTopicAttributesDTO.model_validate(result).keywords[1].name == (
+            "fastapi"
+        )
+
+    def test_build_decoded_weighted_items_expression(self) -> None:
+        # Act
+        expression = build_decoded_weighted_items_expression(
+            "$keywords", item_fields=("name", "updated_at")
+        )
+
+        # Assert
+        is_columnar, decoded_items, items = expression["$cond"]
+        assert is_columnar == {"$eq": [{"$type": "$keywords"}, "object"]}
+        assert items == "$keywords"
+        assert decoded_items["$map"]["input"] == {
+            "$range": [0, {"$size": {"$ifNull": ["$keywords.name", []]}}]
+        }
+        assert decoded_items["$map"]["in"] == {
+            "name": {"$arrayElemAt": ["$keywords.name", "$$index"]},
+            "updated_at": {
+                "$toDate": {
+                    "$multiply": [
+                        {"$arrayElemAt": ["$keywords.updated_at", "$$index"]},
+                        1000,
+                    ]
+                }
+            },
+        }
+
+    @pytest.mark.asyncio
+    async def test_get_aggregated_topic_attributes_repository_decodes(self) -> None:
+        # Arrange
+        mock_collection = MagicMock()
+        mock_collection.find_one = AsyncMock(return_value=COLUMNAR_DOCUMENT)
+        mock_database = MagicMock(spec=AsyncIOMotorDatabase)
+        mock_database.__getitem__.return_value = mock_collection
+
+        # Act
+        result = await get_aggregated_topic_attributes_repository(
+            "test_user_id", database=mock_database
+        )
+
+        # Assert
+        assert result == SUBDOCUMENTS_DOCUMENT
+
+    @pytest.mark.asyncio
+    async def test_upsert_versioned_encodes(self) -> None:
+        # Arrange
+        mock_collection = MagicMock()
+        mock_collection.update_one = AsyncMock(return_value=MagicMock(matched_count=1))
+        mock_database = MagicMock(spec=AsyncIOMotorDatabase)
+        mock_database.__getitem__.return_value = mock_collection
+
+        # Act
+        await upsert_versioned_aggregated_topic_attributes_repository(
+            {**SUBDOCUMENTS_DOCUMENT, "version": 2},
+            expected_version=2,
+            database=mock_database,
+            storage_format="columnar",
+        )
+
+        # Assert
+        mock_collection.update_one.assert_called_once_with(
+            {"user_id": "test_user_id", "version": 2},
+            {"$set": COLUMNAR_DOCUMENT},
+        )
+
+
+class TestUpsertVersionedAggregatedTopicAttributesRepository:
+    @pytest.mark.asyncio
+    async def test_upsert_versioned_inserts_new_document(self) -> None:
+        # Arrange
+        mock_collection = MagicMock()
+        mock_collection.insert_one = AsyncMock()
+
+        # Act
+        result = await upsert_versioned_aggregated_topic_attributes_repository(
+            {"user_id": "test_user_id", "keywords": []},
+            expected_version=None,
+            database=build_database(mock_collection),
+        )
+
+        # Assert
+        assert result is True
+        mock_collection.insert_one.assert_called_once_with(
+            {"user_id": "test_user_id", "keywords": [], "version": 1}
+        )
+
+    @pytest.mark.asyncio
+    async def test_upsert_versioned_concurrent_insert(self) -> None:
+        # Arrange
+        mock_collection = MagicMock()
+        mock_collection.insert_one = AsyncMock(
+            side_effect=DuplicateKeyError("E11000 duplicate key error")
+        )
+
+        # Act
+        result = await upsert_versioned_aggregated_topic_attributes_repository(
+            {"user_id": "test_user_id"},
+            expected_version=None,
+            database=build_database(mock_collection),
+        )
+
+        # Assert
+        assert result is False
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize(
+        ("expected_version", "version_filter", "matched_count", "expected_result"),
+        [
+            (3, 3, 1, True),
+            (3, 3, 0, False),
+            (0, {"$in": [0, None]}, 1, True),
+        ],
+    )
+    async def test_upsert_versioned_updates_matching_version(
+        self,
+        expected_version: int,
+        version_filter: tp.Any,
+        matched_count: int,
+        expected_result: bool,
+    ) -> None:
+        # Arrange
+        mock_collection = MagicMock()
+        mock_collection.update_one = AsyncMock(
+            return_value=MagicMock(matched_count=matched_count)
+        )
+
+        # Act
+        result = await upsert_versioned_aggregated_topic_attributes_repository(
+            {"user_id": "test_user_id", "version": expected_version},
+            expected_version=expected_version,
+            database=build_database(mock_collection),
+        )
+
+        # Assert
+        assert result is expected_result
+        mock_collection.update_one.assert_called_once_with(
+            {"user_id": "test_user_id", "version": version_filter},
+            {"$set": {"user_id": "test_user_id", "version": expected_version + 1}},
+        )
+
+    @pytest.mark.asyncio
+    async def test_upsert_versioned_missing_user_id(self) -> None:
+        # Act & Assert
+        with pytest.raises(ValueError, match="Missing user_id in data"):
+            await upsert_versioned_aggregated_topic_attributes_repository(
+                {},
+                expected_version=None,
+                database=MagicMock(spec=AsyncIOMotorDatabase),
+            )
+
+
+class TestBulkUpsertVersionedAggregatedTopicAttributesRepository:
+    @pytest.mark.asyncio
+    async def test_bulk_upsert_versioned_success(self) -> None:
+        # Arrange
+        mock_collection = MagicMock()
+        mock_collection.insert_one = AsyncMock()
+        mock_collection.update_one = AsyncMock(return_value=MagicMock(matched_count=1))
+
+        # Act
+        result = await bulk_upsert_versioned_aggregated_topic_attributes_repository(
+            [({"user_id": "user_1"}, None), ({"user_id": "user_2"}, 3)],
+            database=build_database(mock_collection),
+        )
+
+        # Assert
+        assert result == set()
+        mock_collection.insert_one.assert_called_once_with(
+            {"user_id": "user_1", "version": 1}
+        )
+        mock_collection.update_one.assert_called_once_with(
+            {"user_id": "user_2", "version": 3},
+            {"$set": {"user_id": "user_2", "version": 4}},
+        )
+
+    @pytest.mark.asyncio
+    async def test_bulk_upsert_versioned_conflicts(self) -> None:
+        # Arrange
+        mock_collection = MagicMock()
+        mock_collection.insert_one = AsyncMock(
+            side_effect=DuplicateKeyError("E11000 duplicate key error")
+        )
+        mock_collection.update_one = AsyncMock(
+            side_effect=[MagicMock(matched_count=1), MagicMock(matched_count=0)]
+        )
+
+        # Act
+        result = await bulk_upsert_versioned_aggregated_topic_attributes_repository(
+            [
+                ({"user_id": "user_1"}, 1),
+                ({"user_id": "user_2"}, 1),
+                ({"user_id": "user_3"}, None),
+            ],
+            database=build_database(mock_collection),
+        )
+
+        # Assert
+        assert result == {"user_2", "user_3"}
+        # A filtered update that matches nothing never inserts a document
+        for call in mock_collection.update_one.call_args_list:
+            assert "upsert" not in call.kwargs
+
+    @pytest.mark.asyncio
+    async def test_bulk_upsert_versioned_other_write_error(self) -> None:
+        # Arrange
+        mock_collection = MagicMock()
+        mock_collection.update_one = AsyncMock(
+            side_effect=WriteError("Document failed validation", code=121)
+        )
+
+        # Act & Assert
+        with pytest.raises(WriteError):
+            await bulk_upsert_versioned_aggregated_topic_attributes_repository(
+                [({"user_id": "user_1"}, 1)],
+                database=build_database(mock_collection),
+            )
+
+    @pytest.mark.asyncio
+    async def test_bulk_upsert_versioned_empty(self) -> None:
+        # Arrange
+        mock_collection = MagicMock()
+        mock_collection.insert_one = AsyncMock()
+        mock_collection.update_one = AsyncMock()
+
+        # Act
+        result = await bulk_upsert_versioned_aggregated_topic_attributes_repository(
+            [],
+            database=build_database(mock_collection),
+        )
+
+        # Assert
+        assert result == set()
+        mock_collection.insert_one.assert_not_called()
+        mock_collection.update_one.assert_not_called()
+
+
+@patch(
+    "src.repositories.aggregated_topic_attributes.bulk_upsert_versioned_aggregated_topic_attributes_repository",
+    return_value=set(),
+)
+@patch(
+    "src.repositories.aggregated_topic_attributes.get_aggregated_topic_attributes_by_user_ids_repository",
+    return_value={},
+)
+class TestAggregatedTopicAttributesWriteBehindCache:
+    @staticmethod
+    def build_cache(**kwargs: tp.Any) -> AggregatedTopicAttributesWriteBehindCache:
+        return AggregatedTopicAttributesWriteBehindCache(
+            database=MagicMock(spec=AsyncIOMotorDatabase),
+            base_delay_ms=0,
+            max_delay_ms=0,
+            **{"flush_interval_ms": 60000, **kwargs},
+        )
+
+    @pytest.mark.asyncio
+    async def test_flush_coalesces_events_per_user(
+        self,
+        mock_get_by_user_ids: AsyncMock,
+        mock_bulk_upsert_versioned: AsyncMock,
+    ) -> None:
+        # Arrange
+        mock_get_by_user_ids.return_value = {
+            "user_1": AggregatedTopicAttributesDTO(
+                user_id="user_1", version=4
+            ).model_dump()
+        }
+        cache = self.build_cache()
+
+        # Act
+        await cache.apply(
+            [
+                build_topic_attributes_event("user_1"),
+                build_topic_attributes_event("user_2"),
+            ]
+        )
+        await cache.apply([build_topic_attributes_event("user_1")])
+        await cache.flush()
+
+        # Assert
+        mock_get_by_user_ids.assert_called_once()
+        mock_bulk_upsert_versioned.assert_called_once()
+        written = mock_bulk_upsert_versioned.call_args.args[0]
+        assert {data["user_id"]: version for data, version in written} == {
+            "user_1": 4,
+            "user_2": None,
+        }
+        assert all(data["keywords"][0]["name"] == "python" for data, _ in written)
+        assert cache.dirty_user_ids == set()
+
+    @pytest.mark.asyncio
+    async def test_flush_tracks_versions_locally(
+        self,
+        mock_get_by_user_ids: AsyncMock,
+        mock_bulk_upsert_versioned: AsyncMock,
+    ) -> None:
+        # Arrange
+        cache = self.build_cache()
+        await cache.apply([build_topic_attributes_event("user_1")])
+        await cache.flush()
+
+        # Act
+        await cache.flush()
+        await cache.apply([build_topic_attributes_event("user_1")])
+        await cache.flush()
+
+        # Assert
+        mock_get_by_user_ids.assert_called_once()
+        assert [
+            call.args[0][0][1] for call in mock_bulk_upsert_versioned.call_args_list
+        ] == [None, 1]
+
+    @pytest.mark.asyncio
+    async def test_flush_replays_pending_events_on_conflict(
+        self,
+        mock_get_by_user_ids: AsyncMock,
+        mock_bulk_upsert_versioned: AsyncMock,
+    ) -> None:
+        # Arrange
+        mock_get_by_user_ids.side_effect = [
+            {},
+            {
+                "user_1": AggregatedTopicAttributesDTO(
+                    user_id="user_1", version=1
+                ).model_dump()
+            },
+        ]
+        mock_bulk_upsert_versioned.side_effect = [{"user_1"}, set()]
+        cache = self.build_cache()
+        await cache.apply([build_topic_attributes_event("user_1")])
+
+        # Act
+        await cache.flush()
+
+        # Assert
+        assert [
+            [(data["user_id"], version) for data, version in call.args[0]]
+            for call in mock_bulk_upsert_versioned.call_args_list
+        ] == [[("user_1", None)], [("user_1", 1)]]
+        assert cache.dirty_user_ids == set()
+
+    @pytest.mark.asyncio
+    async def test_flush_retries_exhausted(
+        self,
+        mock_get_by_user_ids: AsyncMock,
+        mock_bulk_upsert_versioned: AsyncMock,
+    ) -> None:
+        # Arrange
+        mock_bulk_upsert_versioned.return_value = {"user_1"}
+        cache = self.build_cache(max_attempts=3)
+        await cache.apply([build_topic_attributes_event("user_1")])
+
+        # Act & Assert
+        with pytest.raises(RuntimeError, match="user_1"):
+            await cache.flush()
+
+        assert mock_bulk_upsert_versioned.call_count == 3
+        assert cache.dirty_user_ids == {"user_1"}
+
+    @pytest.mark.asyncio
+    async def test_apply_evicts_least_recently_used_users(
+        self,
+        mock_get_by_user_ids: AsyncMock,
+        mock_bulk_upsert_versioned: AsyncMock,
+    ) -> None:
+        # Arrange
+        cache = self.build_cache(maxsize=2)
+
+        # Act
+        for user_id in ("user_1", "user_2", "user_3"):
+            await cache.apply([build_topic_attributes_event(user_id)])
+
+        # Assert
+        assert len(cache) == 2
+        mock_bulk_upsert_versioned.assert_called_once()
+        assert cache.dirty_user_ids == set()
+
+    @pytest.mark.asyncio
+    async def test_delayed_flush(
+        self,
+        mock_get_by_user_ids: AsyncMock,
+        mock_bulk_upsert_versioned: AsyncMock,
+    ) -> None:
+        # Arrange
+        cache = self.build_cache(flush_interval_ms=10)
+
+        # Act
+        await cache.apply([build_topic_attributes_event("user_1")])
+        await asyncio.sleep(0.05)
+
+        # Assert
+        mock_bulk_upsert_versioned.assert_called_once()
+        assert cache.dirty_user_ids == set()
+
+    @pytest.mark.asyncio
+    @patch(
+        "src.repositories.aggregated_topic_attributes.update_topic_attribute_users_repository"
+    )
+    async def test_flush_updates_inverted_index(
+        self,
+        mock_update_topic_attribute_users: AsyncMock,
+        mock_get_by_user_ids: AsyncMock,
+        mock_bulk_upsert_versioned: AsyncMock,
+    ) -> None:
+        # Arrange
+        cache = self.build_cache(inverted_index=True)
+        await cache.apply([build_topic_attributes_event("user_1")])
+        await cache.flush()
+
+        # Act
+        await cache.apply([build_topic_attributes_event("user_1")])
+        await cache.flush()
+
+        # Assert
+        # Verify each flush is indexed against the previously written document
+        [first_call, second_call] = mock_update_topic_attribute_users.call_args_list
+        [(first_old, first_new)] = first_call.args[0]
+        [(second_old, second_new)] = second_call.args[0]
+        assert (first_old.keywords, first_new.version) == ([], 1)
+        assert second_old is first_new
+        assert second_new.version == 2
+        assert second_new.keywords[0] != first_new.keywords[0]
+
+    @pytest.mark.asyncio
+    @patch(
+        "src.repositories.aggregated_topic_attributes.set_users_aggregated_topic_attributes_repository"
+    )
+    async def test_flush_updates_users_read_model(
+        self,
+        mock_set_users_aggregated_topic_attributes: AsyncMock,
+        mock_get_by_user_ids: AsyncMock,
+        mock_bulk_upsert_versioned: AsyncMock,
+    ) -> None:
+        # Arrange
+        mock_bulk_upsert_versioned.return_value = {"user_2"}
+        cache = self.build_cache(users_read_model=True, max_attempts=1)
+        await cache.apply(
+            [
+                build_topic_attributes_event("user_1"),
+                build_topic_attributes_event("user_2"),
+            ]
+        )
+
+        # Act
+        with pytest.raises(RuntimeError):
+            await cache.flush()
+
+        # Assert
+        # Verify only written documents are embedded, with their written version
+        [written] = mock_set_users_aggregated_topic_attributes.call_args.args[0]
+        assert (written["user_id"], written["version"]) == ("user_1", 1)
+
+    @pytest.mark.asyncio
+    async def test_close_flushes_dirty_users(
+        self,
+        mock_get_by_user_ids: AsyncMock,
+        mock_bulk_upsert_versioned: AsyncMock,
+    ) -> None:
+        # Arrange
+        cache = self.build_cache()
+        await cache.apply([build_topic_attributes_event("user_1")])
+
+        # Act
+        await cache.close()
+
+        # Assert
+        mock_bulk_upsert_versioned.assert_called_once()
@@ -0,0 +1,121 @@
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from motor.motor_asyncio import AsyncIOMotorDatabase
+from pymongo.errors import DuplicateKeyError
+
+from src.repositories.content_watermarks import (
+    get_content_watermark_repository,
+    upsert_content_watermark_repository,
+)
+
+
+class TestGetContentWatermarkRepository:
+    @pytest.mark.asyncio
+    async def test_get_content_watermark_repository_exists(self) -> None:
+        # Arrange
+        expected_watermark = {
+            "user_id": "test_user_id",
+            "ts": "2023-01-01T00:00:00",
+            "content_event_uuid": "6d3b0a4e-5a43-4c8e-9d5f-4a1d9c1f2e3b",
+        }
+
+        mock_collection = MagicMock()
+        mock_collection.find_one = AsyncMock(return_value=expected_watermark)
+
+        mock_database = MagicMock(spec=AsyncIOMotorDatabase)
+        mock_database.__getitem__.return_value = mock_collection
+
+        # Act
+        result = await get_content_watermark_repository(
+            "test_user_id",
+            database=mock_database,
+        )
+
+        # Assert
+        assert result == expected_watermark
+        mock_database.__getitem__.assert_called_once_with("content_watermarks")
+        mock_collection.find_one.assert_called_once_with({"user_id": "test_user_id"})
+
+    @pytest.mark.asyncio
+    async def test_get_content_watermark_repository_not_exists(self) -> None:
+        # Arrange
+        mock_collection = MagicMock()
+        mock_collection.find_one = AsyncMock(return_value=None)
+
+        mock_database = MagicMock(spec=AsyncIOMotorDatabase)
+        mock_database.__getitem__.return_value = mock_collection
+
+        # Act
+        result = await get_content_watermark_repository(
+            "test_user_id",
+            database=mock_database,
+        )
+
+        # Assert
+        assert result is None
+
+
+class TestUpsertContentWatermarkRepository:
+    @pytest.mark.asyncio
+    async def test_upsert_content_watermark_repository_success(self) -> None:
+        # Arrange
+        data = {
+            "user_id": "test_user_id",
+            "ts": "2023-01-01T00:00:00",
+            "content_event_uuid": "6d3b0a4e-5a43-4c8e-9d5f-4a1d9c1f2e3b",
+        }
+
+        mock_collection = MagicMock()
+        mock_collection.update_one = AsyncMock()
+
+        mock_database = MagicMock(spec=AsyncIOMotorDatabase)
+        mock_database.__getitem__.return_value = mock_collection
+
+        # Act
+        result = await upsert_content_watermark_repository(
+            data,
+            database=mock_database,
+        )
+
+        # Assert
+        assert result is True
+        mock_database.__getitem__.assert_called_once_with("content_watermarks")
+        mock_collection.update_one.assert_called_once_with(
+            {"user_id": "test_user_id", "ts": {"$lte": "2023-01-01T00:00:00"}},
+            {"$set": data},
+            upsert=True,
+        )
+
+    @pytest.mark.asyncio
+    async def test_upsert_content_watermark_repository_later_watermark(self) -> None:
+        # Arrange
+        mock_collection = MagicMock()
+        # A later watermark doesn't match, so the upsert conflicts with it
+        mock_collection.update_one = AsyncMock(
+            side_effect=DuplicateKeyError("E11000 duplicate key error")
+        )
+
+        mock_database = MagicMock(spec=AsyncIOMotorDatabase)
+        mock_database.__getitem__.return_value = mock_collection
+
+        # Act
+        result = await upsert_content_watermark_repository(
+            {"user_id": "test_user_id", "ts": "2023-01-01T00:00:00"},
+            database=mock_database,
+        )
+
+        # Assert
+        assert result is False
+
+    @pytest.mark.asyncio
+    async def test_upsert_content_watermark_repository_missing_user_id(self) -> None:
+        # Arrange
+        mock_database = MagicMock(spec=AsyncIOMotorDatabase)
+
+        # Act & Assert
+        with pytest.raises(ValueError, match="Missing user_id in data"):
+            await upsert_content_watermark_repository(
+                {"ts": "2023-01-01T00:00:00"},
+                database=mock_database,
+            )
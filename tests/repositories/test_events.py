@@ -1,13 +1,29 @@
+import asyncio
 import typing as tp
 import uuid
 from contextlib import asynccontextmanager
-from unittest.mock import AsyncMock, MagicMock
+from unittest.mock import AsyncMock, MagicMock, create_autospec, patch
 
 import pytest
+from asynch.proto.connection import Connection as ProtoConnection
 
+from src.dtos import TopicAttributesEventBrokerDTO
 from src.repositories.events import (
-    insert_content_event_repository,
+    ContentEventRow,
+    ContentEventsBatchWriter,
+    get_topic_attributes_event_repository,
+    insert_content_events_repository,
     insert_topic_attributes_event_repository,
+    insert_topic_attributes_events_columnar_repository,
+    insert_topic_attributes_events_repository,
+    iter_content_events_repository,
+    iter_topic_attributes_aggregates_repository,
+    iter_topic_attributes_events_repository,
+)
+from src.schemas import (
+    EntityTopicEventSchema,
+    KeywordTopicEventSchema,
+    SentimentTopicEventSchema,
 )
 from src.utils.dates import utcnow
 
@@ -24,13 +40,13 @@ def create_mock_connection_factory(
     return mock_get_connection
 
 
-class TestInsertContentEventRepository:
+class TestInsertContentEventsRepository:
     @pytest.mark.asyncio
-    async def test_insert_content_event_repository_success(self) -> None:
-        content_event_uuid = uuid.uuid4()
-        user_id = "test_user_id"
-        content = "Test content"
-        ts = utcnow()
+    async def test_insert_content_events_repository_sends_one_insert(self) -> None:
+        rows = [
+            (uuid.uuid4(), "user_1", "First content", utcnow()),
+            (uuid.uuid4(), "user_2", "Second content", utcnow()),
+        ]
 
         mock_cursor = AsyncMock()
         mock_connection = MagicMock()
@@ -43,11 +59,8 @@ class TestInsertContentEventRepository:
 
         mock_get_connection = create_mock_connection_factory(connection=mock_connection)
 
-        await insert_content_event_repository(
-            content_event_uuid=content_event_uuid,
-            user_id=user_id,
-            content=content,
-            ts=ts,
+        await insert_content_events_repository(
+            rows,
             get_connection=mock_get_connection,
         )
 
@@ -55,35 +68,223 @@ class TestInsertContentEventRepository:
 
         sql, params = mock_cursor.execute.call_args.args
         assert "INSERT INTO content_events" in sql
-        assert "(content_event_uuid, user_id, content, ts)" in sql
-        assert "VALUES" in sql
+        assert params == [
+            (str(content_event_uuid), user_id, content, str(ts))
+            for content_event_uuid, user_id, content, ts in rows
+        ]
 
-        assert len(params) == 1
-        row = params[0]
-        assert row[0] == str(content_event_uuid)
-        assert row[1] == user_id
-        assert row[2] == content
-        assert row[3] == str(ts)
 
+class TestContentEventsBatchWriter:
     @pytest.mark.asyncio
-    async def test_insert_content_event_repository_connection_error(self) -> None:
-        content_event_uuid = uuid.uuid4()
-        user_id = "test_user_id"
-        content = "Test content"
-        ts = utcnow()
+    @patch("src.repositories.events.insert_content_events_repository")
+    async def test_content_events_batch_writer_flushes_on_max_rows(
+        self, mock_insert_content_events: AsyncMock
+    ) -> None:
+        mock_get_connection = MagicMock()
+        writer = ContentEventsBatchWriter(
+            get_connection=mock_get_connection,
+            max_rows=2,
+            max_delay_ms=60_000,
+        )
+        first_row = (uuid.uuid4(), "user_1", "First content", utcnow())
+        second_row = (uuid.uuid4(), "user_1", "Second content", utcnow())
 
-        mock_get_connection = create_mock_connection_factory(
-            error=Exception("Connection error")
+        await writer.append(*first_row)
+        mock_insert_content_events.assert_not_called()
+
+        await writer.append(*second_row)
+
+        mock_insert_content_events.assert_called_once_with(
+            [first_row, second_row],
+            get_connection=mock_get_connection,
         )
+        assert len(writer) == 0
 
-        with pytest.raises(Exception, match="Connection error"):
-            await insert_content_event_repository(
-                content_event_uuid=content_event_uuid,
-                user_id=user_id,
-                content=content,
-                ts=ts,
-                get_connection=mock_get_connection,
-            )
+    @pytest.mark.asyncio
+    @patch("src.repositories.events.insert_content_events_repository")
+    async def test_content_events_batch_writer_flushes_after_max_delay(
+        self, mock_insert_content_events: AsyncMock
+    ) -> None:
+        writer = ContentEventsBatchWriter(
+            get_connection=MagicMock(),
+            max_rows=100,
+            max_delay_ms=10,
+        )
+
+        await writer.append(uuid.uuid4(), "user_1", "Content", utcnow())
+        mock_insert_content_events.assert_not_called()
+
+        await asyncio.sleep(0.05)
+
+        mock_insert_content_events.assert_called_once()
+        assert len(writer) == 0
+
+    @pytest.mark.asyncio
+    @patch("src.repositories.events.insert_content_events_repository")
+    async def test_content_events_batch_writer_close_flushes_pending_rows(
+        self, mock_insert_content_events: AsyncMock
+    ) -> None:
+        writer = ContentEventsBatchWriter(
+            get_connection=MagicMock(),
+            max_rows=100,
+            max_delay_ms=60_000,
+        )
+
+        await writer.append(uuid.uuid4(), "user_1", "Content", utcnow())
+        await writer.close()
+
+        mock_insert_content_events.assert_called_once()
+        assert len(writer) == 0
+
+    @pytest.mark.asyncio
+    @patch("src.repositories.events.insert_content_events_repository")
+    async def test_content_events_batch_writer_keeps_rows_on_error(
+        self, mock_insert_content_events: AsyncMock
+    ) -> None:
+        mock_insert_content_events.side_effect = Exception("Database error")
+        writer = ContentEventsBatchWriter(
+            get_connection=MagicMock(),
+            max_rows=1,
+            max_delay_ms=60_000,
+        )
+
+        await writer.append(uuid.uuid4(), "user_1", "Content", utcnow())
+
+        assert len(writer) == 1
+        with pytest.raises(Exception, match="Database error"):
+            await writer.close()
+
+    @pytest.mark.asyncio
+    @patch("src.repositories.events.insert_content_events_repository")
+    async def test_content_events_batch_writer_retries_failed_flush(
+        self, mock_insert_content_events: AsyncMock
+    ) -> None:
+        # Arrange
+        mock_insert_content_events.side_effect = [Exception("Database error"), None]
+        writer = ContentEventsBatchWriter(
+            get_connection=MagicMock(),
+            max_rows=100,
+            max_delay_ms=10,
+        )
+
+        # Act
+        await writer.append(uuid.uuid4(), "user_1", "Content", utcnow())
+        await asyncio.sleep(0.1)
+
+        # Assert
+        assert mock_insert_content_events.call_count == 2
+        assert len(writer) == 0
+
+    @pytest.mark.asyncio
+    @patch("src.repositories.events.insert_content_events_repository")
+    async def test_content_events_batch_writer_waits_for_retry_after_error(
+        self, mock_insert_content_events: AsyncMock
+    ) -> None:
+        mock_insert_content_events.side_effect = Exception("Database error")
+        writer = ContentEventsBatchWriter(
+            get_connection=MagicMock(),
+            max_rows=1,
+            max_delay_ms=60_000,
+        )
+
+        for _ in range(3):
+            await writer.append(uuid.uuid4(), "user_1", "Content", utcnow())
+
+        mock_insert_content_events.assert_called_once()
+        assert len(writer) == 3
+        with pytest.raises(Exception, match="Database error"):
+            await writer.close()
+
+    @pytest.mark.asyncio
+    @patch("src.repositories.events.insert_content_events_repository")
+    async def test_content_events_batch_writer_waits_for_space_when_full(
+        self, mock_insert_content_events: AsyncMock
+    ) -> None:
+        mock_insert_content_events.side_effect = [
+            Exception("Database error"),
+            None,
+            None,
+            None,
+        ]
+        writer = ContentEventsBatchWriter(
+            get_connection=MagicMock(),
+            max_rows=1,
+            max_delay_ms=50,
+            max_buffered_rows=2,
+        )
+        await writer.append(uuid.uuid4(), "user_1", "Content", utcnow())
+        await writer.append(uuid.uuid4(), "user_1", "Content", utcnow())
+
+        # Blocked until the retry, 100 ms after the failed flush, frees space
+        append = asyncio.create_task(
+            writer.append(uuid.uuid4(), "user_1", "Content", utcnow())
+        )
+        await asyncio.sleep(0.01)
+        assert not append.done()
+        assert len(writer) == 2
+
+        await asyncio.wait_for(append, timeout=1)
+
+        # The two buffered rows are retried, then the third one is flushed
+        assert [
+            len(call.args[0]) for call in mock_insert_content_events.call_args_list
+        ] == [1, 1, 1, 1]
+        assert len(writer) == 0
+
+    @pytest.mark.asyncio
+    @patch("src.repositories.events.insert_content_events_repository")
+    async def test_content_events_batch_writer_flushes_in_chunks_of_max_rows(
+        self, mock_insert_content_events: AsyncMock
+    ) -> None:
+        writer = ContentEventsBatchWriter(
+            get_connection=MagicMock(),
+            max_rows=2,
+            max_delay_ms=60_000,
+        )
+        writer._rows = [(uuid.uuid4(), "user_1", "Content", utcnow()) for _ in range(5)]
+
+        await writer.flush()
+
+        assert [
+            len(call.args[0]) for call in mock_insert_content_events.call_args_list
+        ] == [2, 2, 1]
+        assert len(writer) == 0
+
+    @pytest.mark.asyncio
+    @patch("src.repositories.events.insert_content_events_repository")
+    async def test_content_events_batch_writer_calls_on_flush_once_written(
+        self, mock_insert_content_events: AsyncMock
+    ) -> None:
+        # Arrange
+        mock_insert_content_events.side_effect = [Exception("Database error"), None]
+        flushed: list[ContentEventRow] = []
+        writer = ContentEventsBatchWriter(
+            get_connection=MagicMock(),
+            max_rows=100,
+            max_delay_ms=60_000,
+            on_flush=flushed.extend,
+        )
+        row = (uuid.uuid4(), "user_1", "Content", utcnow())
+        await writer.append(*row)
+
+        # Act
+        with pytest.raises(Exception, match="Database error"):
+            await writer.flush()
+        flushed_after_failure = list(flushed)
+        await writer.close()
+
+        # Assert
+        assert flushed_after_failure == []
+        assert flushed == [row]
+
+    @pytest.mark.asyncio
+    async def test_content_events_batch_writer_close_without_rows(self) -> None:
+        mock_get_connection = MagicMock()
+        writer = ContentEventsBatchWriter(get_connection=mock_get_connection)
+
+        await writer.close()
+
+        mock_get_connection.assert_not_called()
 
 
 class TestInsertTopicEventRepository:
@@ -188,3 +389,419 @@ class TestInsertTopicEventRepository:
                 ts=ts,
                 get_connection=mock_get_connection,
             )
+
+
+class TestInsertTopicAttributesEventsRepository:
+    @pytest.mark.asyncio
+    async def test_insert_topic_attributes_events_repository_sends_one_insert(
+        self,
+    ) -> None:
+        rows = [
+            (
+                uuid.uuid4(),
+                uuid.uuid4(),
+                f"user_{index}",
+                ["positive"],
+                [0.9],
+                ["python"],
+                [0.8],
+                ["language"],
+                ["python"],
+                [0.8],
+                utcnow(),
+            )
+            for index in range(3)
+        ]
+
+        mock_cursor = AsyncMock()
+        mock_connection = MagicMock()
+
+        @asynccontextmanager
+        async def mock_cursor_cm() -> tp.AsyncIterator[AsyncMock]:
+            yield mock_cursor
+
+        mock_connection.cursor = mock_cursor_cm
+
+        mock_get_connection = create_mock_connection_factory(connection=mock_connection)
+
+        await insert_topic_attributes_events_repository(
+            rows,
+            get_connection=mock_get_connection,
+        )
+
+        mock_cursor.execute.assert_called_once()
+
+        sql, params = mock_cursor.execute.call_args.args
+        assert "INSERT INTO topic_attributes_events" in sql
+        assert len(params) == 3
+        for row, param in zip(rows, params):
+            assert param == (str(row[0]), str(row[1]), *row[2:10], str(row[10]))
+
+
+class TestInsertTopicAttributesEventsColumnarRepository:
+    @pytest.mark.asyncio
+    async def test_insert_topic_attributes_events_columnar_repository_success(
+        self,
+    ) -> None:
+        events = [
+            TopicAttributesEventBrokerDTO(
+                topic_attributes_event_uuid=uuid.uuid4(),
+                content_event_uuid=uuid.uuid4(),
+                user_id="user_1",
+                keywords=[
+                    KeywordTopicEventSchema(name="python", weight=0.8),
+                    KeywordTopicEventSchema(name="fastapi", weight=0.7),
+                ],
+                entities=[
+                    EntityTopicEventSchema(
+                        category="language", name="python", weight=0.6
+                    )
+                ],
+                sentiments=[SentimentTopicEventSchema(name="positive", weight=0.9)],
+                timestamp=utcnow(),
+            ),
+            TopicAttributesEventBrokerDTO(
+                topic_attributes_event_uuid=uuid.uuid4(),
+                content_event_uuid=uuid.uuid4(),
+                user_id="user_2",
+                keywords=[],
+                entities=[],
+                sentiments=[],
+                timestamp=utcnow(),
+            ),
+        ]
+
+        mock_connection = MagicMock()
+        mock_connection._connection = create_autospec(ProtoConnection, instance=True)
+        mock_connection._connection.execute.return_value = 2
+
+        mock_get_connection = create_mock_connection_factory(connection=mock_connection)
+
+        await insert_topic_attributes_events_columnar_repository(
+            events,
+            get_connection=mock_get_connection,
+        )
+
+        mock_connection._connection.execute.assert_called_once()
+        sql, columns = mock_connection._connection.execute.call_args.args
+        assert "INSERT INTO topic_attributes_events" in sql
+        assert mock_connection._connection.execute.call_args.kwargs == {
+            "columnar": True
+        }
+        assert columns == [
+            [event.topic_attributes_event_uuid for event in events],
+            [event.content_event_uuid for event in events],
+            ["user_1", "user_2"],
+            [["positive"], []],
+            [[0.9], []],
+            [["python", "fastapi"], []],
+            [[0.8, 0.7], []],
+            [["language"], []],
+            [["python"], []],
+            [[0.6], []],
+            [event.timestamp for event in events],
+        ]
+
+    @pytest.mark.asyncio
+    async def test_insert_topic_attributes_events_columnar_repository_empty(
+        self,
+    ) -> None:
+        mock_get_connection = MagicMock()
+
+        await insert_topic_attributes_events_columnar_repository(
+            [],
+            get_connection=mock_get_connection,
+        )
+
+        mock_get_connection.assert_not_called()
+
+
+class TestIterContentEventsRepository:
+    @pytest.mark.asyncio
+    async def test_iter_content_events_repository_yields_chunks(self) -> None:
+        chunks = [
+            [
+                {"content_event_uuid": uuid.uuid4()},
+                {"content_event_uuid": uuid.uuid4()},
+            ],
+            [{"content_event_uuid": uuid.uuid4()}],
+            [],
+        ]
+
+        mock_cursor = MagicMock()
+        mock_cursor.execute = AsyncMock()
+        mock_cursor.fetchmany = AsyncMock(side_effect=chunks)
+        mock_connection = MagicMock()
+
+        @asynccontextmanager
+        async def mock_cursor_cm(cursor_cls: tp.Any) -> tp.AsyncIterator[MagicMock]:
+            yield mock_cursor
+
+        mock_connection.cursor = mock_cursor_cm
+
+        mock_get_connection = create_mock_connection_factory(connection=mock_connection)
+
+        result = [
+            chunk
+            async for chunk in iter_content_events_repository(
+                "test_user_id",
+                chunk_size=2,
+                get_connection=mock_get_connection,
+            )
+        ]
+
+        assert result == chunks[:2]
+        mock_cursor.set_stream_results.assert_called_once_with(True, 2)
+
+        sql, params = mock_cursor.execute.call_args.args
+        assert "FROM content_events" in sql
+        assert "ts AS timestamp" in sql
+        assert params == {"user_id": "test_user_id"}
+        assert mock_cursor.fetchmany.call_count == 3
+
+    @pytest.mark.asyncio
+    async def test_iter_content_events_repository_after_watermark(self) -> None:
+        after_ts = utcnow()
+        after_content_event_uuid = uuid.uuid4()
+
+        mock_cursor = MagicMock()
+        mock_cursor.execute = AsyncMock()
+        mock_cursor.fetchmany = AsyncMock(return_value=[])
+        mock_connection = MagicMock()
+
+        @asynccontextmanager
+        async def mock_cursor_cm(cursor_cls: tp.Any) -> tp.AsyncIterator[MagicMock]:
+            yield mock_cursor
+
+        mock_connection.cursor = mock_cursor_cm
+
+        mock_get_connection = create_mock_connection_factory(connection=mock_connection)
+
+        result = [
+            chunk
+            async for chunk in iter_content_events_repository(
+                "test_user_id",
+                after=(after_ts, after_content_event_uuid),
+                chunk_size=2,
+                get_connection=mock_get_connection,
+            )
+        ]
+
+        assert result == []
+        sql, params = mock_cursor.execute.call_args.args
+        assert "(ts, content_event_uuid) >" in sql
+        assert params == {
+            "user_id": "test_user_id",
+            "after_ts": after_ts,
+            "after_content_event_uuid": str(after_content_event_uuid),
+        }
+
+    @pytest.mark.asyncio
+    async def test_iter_content_events_repository_page(self) -> None:
+        since = utcnow()
+        until = utcnow()
+
+        mock_cursor = MagicMock()
+        mock_cursor.execute = AsyncMock()
+        mock_cursor.fetchmany = AsyncMock(return_value=[])
+        mock_connection = MagicMock()
+
+        @asynccontextmanager
+        async def mock_cursor_cm(cursor_cls: tp.Any) -> tp.AsyncIterator[MagicMock]:
+            yield mock_cursor
+
+        mock_connection.cursor = mock_cursor_cm
+
+        mock_get_connection = create_mock_connection_factory(connection=mock_connection)
+
+        result = [
+            chunk
+            async for chunk in iter_content_events_repository(
+                "test_user_id",
+                columns=["content", "timestamp"],
+                since=since,
+                until=until,
+                limit=11,
+                chunk_size=2,
+                get_connection=mock_get_connection,
+            )
+        ]
+
+        assert result == []
+        sql, params = mock_cursor.execute.call_args.args
+        assert "SELECT content, ts AS timestamp" in sql
+        assert "FROM content_events FINAL" in sql
+        assert "ts >= toDateTime(%(since)s)" in sql
+        assert "ts < toDateTime(%(until)s)" in sql
+        assert "LIMIT 11" in sql
+        assert params == {"user_id": "test_user_id", "since": since, "until": until}
+
+    @pytest.mark.asyncio
+    async def test_iter_content_events_repository_unknown_columns(self) -> None:
+        mock_get_connection = create_mock_connection_factory()
+
+        with pytest.raises(ValueError, match="Unknown columns: secret"):
+            async for _ in iter_content_events_repository(
+                "test_user_id",
+                columns=["content", "secret"],
+                chunk_size=2,
+                get_connection=mock_get_connection,
+            ):
+                pass
+
+
+def create_mock_dict_cursor_connection(
+    rows: list[list[dict[str, tp.Any]]],
+) -> tuple[MagicMock, MagicMock]:
+    mock_cursor = MagicMock()
+    mock_cursor.execute = AsyncMock()
+    mock_cursor.fetchmany = AsyncMock(side_effect=[*rows, []])
+    mock_connection = MagicMock()
+
+    @asynccontextmanager
+    async def mock_cursor_cm(cursor_cls: tp.Any) -> tp.AsyncIterator[MagicMock]:
+        yield mock_cursor
+
+    mock_connection.cursor = mock_cursor_cm
+    return mock_connection, mock_cursor
+
+
+class TestIterTopicAttributesEventsRepository:
+    @pytest.mark.asyncio
+    async def test_iter_topic_attributes_events_repository_filters(self) -> None:
+        after_ts = utcnow()
+        after_topic_attributes_event_uuid = uuid.uuid4()
+        rows = [{"topic_attributes_event_uuid": uuid.uuid4()}]
+        mock_connection, mock_cursor = create_mock_dict_cursor_connection([rows])
+
+        result = [
+            chunk
+            async for chunk in iter_topic_attributes_events_repository(
+                user_id="test_user_id",
+                keywords=["python"],
+                sentiments=["positive", "neutral"],
+                after=(after_ts, after_topic_attributes_event_uuid),
+                limit=11,
+                chunk_size=5,
+                get_connection=create_mock_connection_factory(mock_connection),
+            )
+        ]
+
+        assert result == [rows]
+        mock_cursor.set_stream_results.assert_called_once_with(True, 5)
+        sql, params = mock_cursor.execute.call_args.args
+        assert "hasAny(keywords.name, %(keywords)s)" in sql
+        assert "hasAny(sentiments.name, %(sentiments)s)" in sql
+        assert "entities.name, %(entities)s" not in sql
+        assert "(ts, topic_attributes_event_uuid) >" in sql
+        assert "ORDER BY ts, topic_attributes_event_uuid" in sql
+        assert "LIMIT 11" in sql
+        assert params == {
+            "user_id": "test_user_id",
+            "keywords": ["python"],
+            "sentiments": ["positive", "neutral"],
+            "after_ts": after_ts,
+            "after_topic_attributes_event_uuid": str(after_topic_attributes_event_uuid),
+        }
+
+    @pytest.mark.asyncio
+    async def test_iter_topic_attributes_events_repository_user_only(self) -> None:
+        mock_connection, mock_cursor = create_mock_dict_cursor_connection([])
+
+        result = [
+            chunk
+            async for chunk in iter_topic_attributes_events_repository(
+                user_id="test_user_id",
+                chunk_size=5,
+                get_connection=create_mock_connection_factory(mock_connection),
+            )
+        ]
+
+        assert result == []
+        sql, params = mock_cursor.execute.call_args.args
+        assert "WHERE user_id = %(user_id)s" in sql
+        assert "LIMIT" not in sql
+        assert params == {"user_id": "test_user_id"}
+
+
+class TestIterTopicAttributesAggregatesRepository:
+    @pytest.mark.asyncio
+    async def test_iter_topic_attributes_aggregates_repository_entities(
+        self,
+    ) -> None:
+        rows = [{"category": "ORG", "name": "ITMO", "count": 2}]
+        mock_connection, mock_cursor = create_mock_dict_cursor_connection([rows])
+
+        result = [
+            chunk
+            async for chunk in iter_topic_attributes_aggregates_repository(
+                "entities",
+                user_id="test_user_id",
+                after=["ORG", "Google"],
+                limit=3,
+                chunk_size=5,
+                get_connection=create_mock_connection_factory(mock_connection),
+            )
+        ]
+
+        assert result == [rows]
+        sql, params = mock_cursor.execute.call_args.args
+        assert (
+            "ARRAY JOIN entities.category AS category, entities.name AS name, "
+            "entities.weight AS weight"
+        ) in sql
+        assert "(category, name) > (%(after_category)s, %(after_name)s)" in sql
+        assert "GROUP BY category, name" in sql
+        assert "sum(weight) AS weight_sum" in sql
+        assert params == {
+            "user_id": "test_user_id",
+            "after_category": "ORG",
+            "after_name": "Google",
+        }
+
+    @pytest.mark.asyncio
+    async def test_iter_topic_attributes_aggregates_repository_unknown_group_by(
+        self,
+    ) -> None:
+        with pytest.raises(ValueError, match="Unknown group_by: topics"):
+            async for _ in iter_topic_attributes_aggregates_repository(
+                "topics",
+                chunk_size=5,
+                get_connection=create_mock_connection_factory(),
+            ):
+                pass
+
+    @pytest.mark.asyncio
+    async def test_iter_topic_attributes_aggregates_repository_cursor_mismatch(
+        self,
+    ) -> None:
+        with pytest.raises(ValueError, match="Cursor does not match group_by"):
+            async for _ in iter_topic_attributes_aggregates_repository(
+                "keywords",
+                after=["ORG", "Google"],
+                chunk_size=5,
+                get_connection=create_mock_connection_factory(),
+            ):
+                pass
+
+
+class TestGetTopicAttributesEventRepository:
+    @pytest.mark.asyncio
+    async def test_get_topic_attributes_event_repository(self) -> None:
+        topic_attributes_event_uuid = uuid.uuid4()
+        row = {"topic_attributes_event_uuid": topic_attributes_event_uuid}
+        mock_connection, mock_cursor = create_mock_dict_cursor_connection([])
+        mock_cursor.fetchone = AsyncMock(return_value=row)
+
+        result = await get_topic_attributes_event_repository(
+            topic_attributes_event_uuid,
+            get_connection=create_mock_connection_factory(mock_connection),
+        )
+
+        assert result == row
+        sql, params = mock_cursor.execute.call_args.args
+        assert "toUUID(%(topic_attributes_event_uuid)s)" in sql
+        assert "LIMIT 1" in sql
+        assert params == {
+            "topic_attributes_event_uuid": str(topic_attributes_event_uuid)
+        }
@@ -0,0 +1,141 @@
+from datetime import UTC, datetime
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from pymongo import UpdateOne
+
+from src.dtos import AggregatedTopicAttributesDTO
+from src.repositories.topic_attribute_users import (
+    update_topic_attribute_users_repository,
+)
+from src.schemas import EntityTopicProfileSchema, KeywordTopicProfileSchema
+from tests.conftest import build_database
+
+
+class TestUpdateTopicAttributeUsersRepository:
+    @pytest.mark.asyncio
+    async def test_update_topic_attribute_users_repository(self) -> None:
+        # Arrange
+        updated_at = datetime(2023, 1, 1, tzinfo=UTC)
+        old = AggregatedTopicAttributesDTO(
+            user_id="user_1",
+            keywords=[
+                KeywordTopicProfileSchema(
+                    name="fastapi", weight=0.5, updated_at=updated_at
+                ),
+                KeywordTopicProfileSchema(
+                    name="django", weight=0.1, updated_at=updated_at
+                ),
+            ],
+            version=3,
+        )
+        new = old.model_copy(
+            update={
+                "keywords": [
+                    old.keywords[0],
+                    KeywordTopicProfileSchema(
+                        name="python", weight=0.8, updated_at=updated_at
+                    ),
+                ],
+                "entities": [
+                    EntityTopicProfileSchema(
+                        category="language",
+                        name="python",
+                        weight=0.6,
+                        updated_at=updated_at,
+                    )
+                ],
+                "version": 4,
+            }
+        )
+        mock_collection = MagicMock()
+        mock_collection.bulk_write = AsyncMock()
+
+        # Act
+        await update_topic_attribute_users_repository(
+            [(old, new)],
+            database=build_database(mock_collection),
+        )
+
+        # Assert
+        # Verify only the added and evicted items are written
+        mock_collection.bulk_write.assert_called_once()
+        operations = mock_collection.bulk_write.call_args.args[0]
+        assert mock_collection.bulk_write.call_args.kwargs == {"ordered": False}
+        assert len(operations) == 3
+
+        def guarded(name: str, value: object) -> dict[str, object]:
+            return {
+                "$cond": [
+                    {"$lt": ["$version", 4]},
+                    {"$literal": value},
+                    f"${name}",
+                ]
+            }
+
+        assert operations[0] == UpdateOne(
+            {"attribute_type": "keywords", "name": "python", "user_id": "user_1"},
+            [
+                {
+                    "$set": {
+                        "weight": guarded("weight", 0.8),
+                        "updated_at": guarded("updated_at", updated_at),
+                        "removed": guarded("removed", False),
+                        "version": guarded("version", 4),
+                    }
+                }
+            ],
+            upsert=True,
+        )
+        # Verify entities are keyed by category and name
+        assert operations[1] == UpdateOne(
+            {
+                "attribute_type": "entities",
+                "category": "language",
+                "name": "python",
+                "user_id": "user_1",
+            },
+            [
+                {
+                    "$set": {
+                        "weight": guarded("weight", 0.6),
+                        "updated_at": guarded("updated_at", updated_at),
+                        "removed": guarded("removed", False),
+                        "version": guarded("version", 4),
+                    }
+                }
+            ],
+            upsert=True,
+        )
+        # Verify removed items are kept as versioned tombstones
+        assert operations[2] == UpdateOne(
+            {"attribute_type": "keywords", "name": "django", "user_id": "user_1"},
+            [
+                {
+                    "$set": {
+                        "removed": guarded("removed", True),
+                        "version": guarded("version", 4),
+                    }
+                }
+            ],
+            upsert=True,
+        )
+
+    @pytest.mark.asyncio
+    async def test_update_topic_attribute_users_repository_unchanged(self) -> None:
+        # Arrange
+        aggregated_topic_attributes = AggregatedTopicAttributesDTO(
+            user_id="user_1",
+            keywords=[KeywordTopicProfileSchema(name="python", weight=0.8)],
+        )
+        mock_collection = MagicMock()
+        mock_collection.bulk_write = AsyncMock()
+
+        # Act
+        await update_topic_attribute_users_repository(
+            [(aggregated_topic_attributes, aggregated_topic_attributes)],
+            database=build_database(mock_collection),
+        )
+
+        # Assert
+        mock_collection.bulk_write.assert_not_called()
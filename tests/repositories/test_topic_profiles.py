@@ -1,12 +1,22 @@
+import os
+import typing as tp
+import uuid
+from datetime import UTC, datetime, timedelta
 from unittest.mock import AsyncMock, MagicMock
 
 import pytest
-from motor.motor_asyncio import AsyncIOMotorDatabase
+from motor.motor_asyncio import AsyncIOMotorClient, AsyncIOMotorDatabase
 
 from src.repositories.aggregated_topic_attributes import (
     get_aggregated_topic_attributes_repository,
-    upsert_aggregated_topic_attributes_repository,
 )
+from src.repositories.topic_profiles import (
+    set_users_topic_profile_repository,
+    upsert_topic_profile_repository,
+)
+from src.utils.dates import utcnow
+
+MONGO_TEST_URL = os.environ.get("MONGO_TEST_URL")
 
 
 class TestGetTopicProfileRepository:
@@ -144,13 +154,13 @@ class TestUpsertTopicProfileRepository:
         mock_database.__getitem__.return_value = mock_collection
 
         # Act
-        await upsert_aggregated_topic_attributes_repository(
+        await upsert_topic_profile_repository(
             data=profile_data,
             database=mock_database,
         )
 
         # Assert
-        mock_database.__getitem__.assert_called_once_with("aggregated_topic_attributes")
+        mock_database.__getitem__.assert_called_once_with("topic_profiles")
         mock_collection.update_one.assert_called_once_with(
             {"user_id": profile_data["user_id"]},
             {"$set": profile_data},
@@ -174,7 +184,7 @@ class TestUpsertTopicProfileRepository:
 
         # Act & Assert
         with pytest.raises(ValueError, match="Missing user_id in data"):
-            await upsert_aggregated_topic_attributes_repository(
+            await upsert_topic_profile_repository(
                 data=profile_data,
                 database=mock_database,
             )
@@ -203,14 +213,96 @@ class TestUpsertTopicProfileRepository:
 
         # Act & Assert
         with pytest.raises(Exception, match="Database error"):
-            await upsert_aggregated_topic_attributes_repository(
+            await upsert_topic_profile_repository(
                 data=profile_data,
                 database=mock_database,
             )
 
-        mock_database.__getitem__.assert_called_once_with("aggregated_topic_attributes")
+        mock_database.__getitem__.assert_called_once_with("topic_profiles")
         mock_collection.update_one.assert_called_once_with(
             {"user_id": profile_data["user_id"]},
             {"$set": profile_data},
             upsert=True,
         )
+
+
+class TestSetUsersTopicProfileRepository:
+    @pytest.mark.asyncio
+    async def test_set_users_topic_profile_repository(self) -> None:
+        # Arrange
+        updated_at = utcnow()
+        topic_profile = {"user_id": "user_1", "topics": [], "updated_at": updated_at}
+        mock_collection = MagicMock()
+        mock_collection.update_one = AsyncMock()
+        mock_database = MagicMock(spec=AsyncIOMotorDatabase)
+        mock_database.__getitem__.return_value = mock_collection
+
+        # Act
+        await set_users_topic_profile_repository(topic_profile, database=mock_database)
+
+        # Assert
+        mock_database.__getitem__.assert_called_once_with("users")
+        # Only replaces an older profile, or sets the first one
+        mock_collection.update_one.assert_called_once_with(
+            {
+                "user_id": "user_1",
+                "$or": [
+                    {"topic_profile.updated_at": {"$lt": updated_at}},
+                    {"topic_profile": {"$exists": False}},
+                ],
+            },
+            {"$set": {"topic_profile": topic_profile}},
+        )
+
+    @pytest.mark.asyncio
+    async def test_set_users_topic_profile_repository_missing_updated_at(
+        self,
+    ) -> None:
+        # Arrange
+        mock_database = MagicMock(spec=AsyncIOMotorDatabase)
+
+        # Act & Assert
+        with pytest.raises(ValueError, match="Missing updated_at in data"):
+            await set_users_topic_profile_repository(
+                {"user_id": "user_1", "topics": []}, database=mock_database
+            )
+
+        mock_database.__getitem__.assert_not_called()
+
+
+@pytest.mark.skipif(not MONGO_TEST_URL, reason="MONGO_TEST_URL is not set")
+class TestSetUsersTopicProfileRepositoryOutOfOrder:
+    @pytest.fixture
+    async def database(self) -> tp.AsyncIterator[AsyncIOMotorDatabase[tp.Any]]:
+        client: AsyncIOMotorClient[tp.Any] = AsyncIOMotorClient(MONGO_TEST_URL)
+        database = client[f"api_gateway_tests_{uuid.uuid4().hex}"]
+        yield database
+        await client.drop_database(database.name)
+        client.close()
+
+    @pytest.mark.asyncio
+    async def test_set_users_topic_profile_repository_out_of_order(
+        self, database: AsyncIOMotorDatabase[tp.Any]
+    ) -> None:
+        # Arrange
+        # MongoDB stores datetimes with millisecond precision
+        older_updated_at = datetime(2024, 1, 1, 12, tzinfo=UTC)
+        newer_updated_at = older_updated_at + timedelta(minutes=1)
+        await database["users"].insert_one({"user_id": "user_1"})
+
+        # Act
+        await set_users_topic_profile_repository(
+            {"user_id": "user_1", "topics": [], "updated_at": newer_updated_at},
+            database=database,
+        )
+        await set_users_topic_profile_repository(
+            {"user_id": "user_1", "topics": [], "updated_at": older_updated_at},
+            database=database,
+        )
+
+        # Assert
+        user = await database["users"].find_one({"user_id": "user_1"})
+        assert user is not None
+        assert user["topic_profile"]["updated_at"] == newer_updated_at.replace(
+            tzinfo=None
+        )
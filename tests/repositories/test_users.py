@@ -1,3 +1,5 @@
+import typing as tp
+from datetime import UTC, datetime
 from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
@@ -7,42 +9,45 @@ from motor.motor_asyncio import AsyncIOMotorDatabase
 from src.repositories.users import (
     build_get_user_with_topic_info_pipeline,
     build_get_users_with_topic_info_pipeline,
+    build_seek_expression,
     get_user_repository,
+    get_user_with_embedded_topic_info_repository,
     get_user_with_topic_info_repository,
+    get_users_with_topic_info_collection,
+    get_users_with_topic_info_keyset_repository,
     get_users_with_topic_info_paginated_repository,
+    get_users_with_topic_info_total_cache_key,
     insert_user_repository,
 )
+from src.utils.caches import TTLCache
+from tests.conftest import build_database
 
 
 class TestBuildGetUsersWithTopicProfilesPipeline:
     def test_build_get_users_with_topic_profiles_pipeline_no_filters(self) -> None:
         # Act
-        pipeline = build_get_users_with_topic_info_pipeline()
+        pipeline = build_get_users_with_topic_info_pipeline(offset=20, limit=10)
 
         # Assert
         assert isinstance(pipeline, list)
-        assert len(pipeline) >= 3  # At least lookup, unwind, and sort stages
 
-        # Verify lookup stage
-        lookup_stage = next((stage for stage in pipeline if "$lookup" in stage), None)
-        assert lookup_stage is not None
-        assert lookup_stage["$lookup"]["from"] == "aggregated_topic_attributes"
-        assert lookup_stage["$lookup"]["localField"] == "user_id"
-        assert lookup_stage["$lookup"]["foreignField"] == "user_id"
-
-        # Verify unwind stage
-        unwind_stage = next((stage for stage in pipeline if "$unwind" in stage), None)
-        assert unwind_stage is not None
-        assert unwind_stage["$unwind"]["path"] == "$aggregated_topic_attributes"
-        assert unwind_stage["$unwind"]["preserveNullAndEmptyArrays"] is True
+        # Verify users are listed in the order of the `user_id` index
+        assert pipeline[0] == {"$sort": {"user_id": 1}}
+        assert not any("$match" in stage for stage in pipeline)
 
-        # Verify sort stage
-        sort_stage = next((stage for stage in pipeline if "$sort" in stage), None)
-        assert sort_stage is not None
+        facet = pipeline[-1]["$facet"]
+        assert facet["metadata"] == [{"$count": "total"}]
 
-        # Verify no match stage when no filters
-        match_stage = next((stage for stage in pipeline if "$match" in stage), None)
-        assert match_stage is None
+        # Verify the page is taken before the joins and nothing is scored
+        page = facet["data"]
+        assert page[:2] == [{"$skip": 20}, {"$limit": 10}]
+        assert not any("$addFields" in stage for stage in page)
+        assert page[2]["$lookup"]["from"] == "aggregated_topic_attributes"
+        assert page[2]["$lookup"]["localField"] == "user_id"
+        assert page[2]["$lookup"]["foreignField"] == "user_id"
+        assert page[3]["$unwind"]["path"] == "$aggregated_topic_attributes"
+        assert page[3]["$unwind"]["preserveNullAndEmptyArrays"] is True
+        assert page[4]["$lookup"]["from"] == "topic_profiles"
 
     def test_build_get_users_with_topic_profiles_pipeline_with_filters(self) -> None:
         # Arrange
@@ -55,56 +60,315 @@ class TestBuildGetUsersWithTopicProfilesPipeline:
             keywords=keywords,
             entities=entities,
             sentiments=sentiments,
+            limit=10,
         )
 
         # Assert
         assert isinstance(pipeline, list)
 
-        # Verify match stage with filters
-        match_stage = next((stage for stage in pipeline if "$match" in stage), None)
-        assert match_stage is not None
-        assert (
-            match_stage["$match"]["aggregated_topic_attributes.keywords.name"]["$in"]
-            == keywords
+        # Verify the pipeline starts by matching topic attributes with filters
+        assert pipeline[0] == {
+            "$match": {
+                "keywords.name": {"$in": keywords},
+                "entities.name": {"$in": entities},
+                "sentiments.name": {"$in": sentiments},
+            }
+        }
+
+        # Verify topic attributes of missing users are dropped before counting
+        assert pipeline[1]["$lookup"]["from"] == "users"
+        assert pipeline[1]["$lookup"]["pipeline"] == [
+            {"$project": {"_id": 0, "user_id": 1}}
+        ]
+        assert pipeline[2] == {"$match": {"user": {"$ne": []}}}
+
+        # Verify users are scored and sorted before the page is taken
+        page = pipeline[-1]["$facet"]["data"]
+        assert "maxKeywordWeight" in page[0]["$addFields"]
+        assert "maxEntityWeight" in page[0]["$addFields"]
+        assert "maxSentimentWeight" in page[0]["$addFields"]
+        assert list(page[1]["$sort"]) == [
+            "maxKeywordWeight",
+            "maxEntityWeight",
+            "maxSentimentWeight",
+            "aggregated_topic_attributes.user_id",
+        ]
+        assert page[2] == {"$limit": 10}
+
+        # Verify only the users of the page are joined
+        assert page[3]["$lookup"]["from"] == "users"
+        assert page[3]["$lookup"]["localField"] == (
+            "aggregated_topic_attributes.user_id"
+        )
+        assert page[5]["$replaceWith"]["$mergeObjects"][0] == "$user"
+        assert page[7]["$lookup"]["from"] == "topic_profiles"
+
+    def test_build_get_users_with_topic_profiles_pipeline_with_half_life(
+        self,
+    ) -> None:
+        # Act
+        pipeline = build_get_users_with_topic_info_pipeline(
+            keywords=["python"],
+            half_life_days=30,
+        )
+
+        # Assert
+        add_fields_stage = pipeline[-1]["$facet"]["data"][0]
+        max_keyword_weight = add_fields_stage["$addFields"]["maxKeywordWeight"]
+        weight_expression = max_keyword_weight["$max"]["$map"]["in"]
+        assert weight_expression["$multiply"][0] == "$$t.weight"
+
+    def test_build_get_users_with_topic_profiles_pipeline_seek_no_filters(
+        self,
+    ) -> None:
+        # Act
+        pipeline = build_get_users_with_topic_info_pipeline(
+            limit=10, after=([None, None, None], "user1"), count_total=False
+        )
+
+        # Assert
+        # Verify the seek starts past the previous pages in the index
+        assert pipeline[:3] == [
+            {"$sort": {"user_id": 1}},
+            {"$match": {"user_id": {"$gt": "user1"}}},
+            {"$limit": 10},
+        ]
+        assert not any("$facet" in stage for stage in pipeline)
+        assert not any("$skip" in stage for stage in pipeline)
+
+    def test_build_get_users_with_topic_profiles_pipeline_seek_counts_all(
+        self,
+    ) -> None:
+        # Act
+        pipeline = build_get_users_with_topic_info_pipeline(
+            limit=10, after=([None, None, None], "user1")
+        )
+
+        # Assert
+        # Verify the users of the previous pages are still counted
+        assert pipeline[0] == {"$sort": {"user_id": 1}}
+        facet = pipeline[-1]["$facet"]
+        assert facet["metadata"] == [{"$count": "total"}]
+        assert facet["data"][0] == {"$match": {"user_id": {"$gt": "user1"}}}
+
+    def test_build_get_users_with_topic_profiles_pipeline_seek_with_filters(
+        self,
+    ) -> None:
+        # Act
+        pipeline = build_get_users_with_topic_info_pipeline(
+            keywords=["python"],
+            limit=10,
+            after=([0.5, None, None], "user1"),
+            count_total=False,
         )
-        assert (
-            match_stage["$match"]["aggregated_topic_attributes.entities.name"]["$in"]
-            == entities
+
+        # Assert
+        # Verify users are scored, then sought past the cursor and sorted
+        assert pipeline[0]["$match"] == {"keywords.name": {"$in": ["python"]}}
+        assert "$addFields" in pipeline[4]
+        assert pipeline[5] == {
+            "$match": {
+                "$expr": build_seek_expression(
+                    [
+                        "$maxKeywordWeight",
+                        "$maxEntityWeight",
+                        "$maxSentimentWeight",
+                    ],
+                    "$aggregated_topic_attributes.user_id",
+                    ([0.5, None, None], "user1"),
+                )
+            }
+        }
+        assert "$sort" in pipeline[6]
+        assert pipeline[7] == {"$limit": 10}
+        assert not any("$facet" in stage for stage in pipeline)
+
+    def test_build_get_users_with_topic_profiles_pipeline_inverted_index(
+        self,
+    ) -> None:
+        # Act
+        pipeline = build_get_users_with_topic_info_pipeline(
+            keywords=["python"], limit=10, inverted_index=True
         )
-        assert (
-            match_stage["$match"]["aggregated_topic_attributes.sentiments.name"]["$in"]
-            == sentiments
+
+        # Assert
+        # Verify users are read in the order of the weight index
+        assert pipeline[:2] == [
+            {
+                "$match": {
+                    "attribute_type": "keywords",
+                    "name": {"$in": ["python"]},
+                    "removed": False,
+                }
+            },
+            {"$sort": {"weight": -1, "user_id": 1}},
+        ]
+        assert pipeline[2]["$lookup"]["from"] == "users"
+        assert pipeline[3] == {"$match": {"user": {"$ne": []}}}
+        assert pipeline[4]["$project"]["aggregated_topic_attributes"] == {
+            "user_id": "$user_id"
+        }
+        assert pipeline[4]["$project"]["maxKeywordWeight"] == "$weight"
+        assert pipeline[4]["$project"]["maxEntityWeight"] == {"$literal": None}
+
+        # Verify the documents are looked up for the page only
+        page = pipeline[-1]["$facet"]["data"]
+        assert page[0] == {"$limit": 10}
+        assert page[1]["$lookup"]["from"] == "aggregated_topic_attributes"
+        assert page[1]["$lookup"]["localField"] == (
+            "aggregated_topic_attributes.user_id"
         )
+        assert page[3]["$lookup"]["from"] == "users"
+        assert page[-2]["$lookup"]["from"] == "topic_profiles"
 
-        # Verify addFields stage with max weight calculations
-        add_fields_stage = next(
-            (stage for stage in pipeline if "$addFields" in stage), None
+    def test_build_get_users_with_topic_profiles_pipeline_inverted_index_groups(
+        self,
+    ) -> None:
+        # Act
+        pipeline = build_get_users_with_topic_info_pipeline(
+            keywords=["python", "fastapi"],
+            limit=10,
+            after=([0.5, None, None], "user1"),
+            count_total=False,
+            inverted_index=True,
+        )
+
+        # Assert
+        # Verify users holding several of the names are listed once
+        assert pipeline[1] == {
+            "$group": {"_id": "$user_id", "weight": {"$max": "$weight"}}
+        }
+        assert pipeline[3] == {
+            "$match": {
+                "$or": [
+                    {"weight": {"$lt": 0.5}},
+                    {"weight": 0.5, "user_id": {"$gt": "user1"}},
+                ]
+            }
+        }
+        assert pipeline[4] == {"$sort": {"weight": -1, "user_id": 1}}
+        assert not any("$facet" in stage for stage in pipeline)
+
+    @pytest.mark.parametrize(
+        "filters",
+        [
+            {"keywords": ["python"], "entities": ["person"]},
+            {"keywords": ["python"], "half_life_days": 30},
+            {},
+        ],
+    )
+    def test_build_get_users_with_topic_profiles_pipeline_inverted_index_unused(
+        self, filters: dict[str, tp.Any]
+    ) -> None:
+        # Act
+        pipeline = build_get_users_with_topic_info_pipeline(
+            **filters, inverted_index=True
         )
-        assert add_fields_stage is not None
-        assert "maxKeywordWeight" in add_fields_stage["$addFields"]
-        assert "maxEntityWeight" in add_fields_stage["$addFields"]
-        assert "maxSentimentWeight" in add_fields_stage["$addFields"]
+
+        # Assert
+        assert pipeline == build_get_users_with_topic_info_pipeline(**filters)
+
+
+def evaluate_expression(expression: tp.Any, document: dict[str, tp.Any]) -> tp.Any:
+    # Evaluates the subset of aggregation expressions the seek is built of,
+    # `None` is ordered before numbers like in MongoDB
+    if isinstance(expression, str) and expression.startswith("$"):
+        return document[expression[1:]]
+    if not isinstance(expression, dict):
+        return expression
+
+    [(operator, operands)] = expression.items()
+    values = [evaluate_expression(operand, document) for operand in operands]
+    if operator == "$or":
+        return any(values)
+    if operator == "$and":
+        return all(values)
+
+    left, right = ((value is not None, value or 0) for value in values)
+    return {"$lt": left < right, "$gt": left > right, "$eq": left == right}[operator]
+
+
+class TestBuildSeekExpression:
+    def test_build_seek_expression_matches_users_sorted_after(self) -> None:
+        # Arrange
+        # Sorted like the users listing, weights descending then `user_id`
+        documents: list[dict[str, tp.Any]] = [
+            {"k": 0.9, "e": None, "user_id": "user3"},
+            {"k": 0.5, "e": 0.7, "user_id": "user2"},
+            {"k": 0.5, "e": 0.7, "user_id": "user4"},
+            {"k": 0.5, "e": None, "user_id": "user1"},
+            {"k": None, "e": 0.9, "user_id": "user0"},
+            {"k": None, "e": None, "user_id": "user5"},
+        ]
+
+        for index, after in enumerate(documents):
+            # Act
+            expression = build_seek_expression(
+                ["$k", "$e"], "$user_id", ([after["k"], after["e"]], after["user_id"])
+            )
+
+            # Assert
+            assert [
+                document
+                for document in documents
+                if evaluate_expression(expression, document)
+            ] == documents[index + 1 :]
+
+
+class TestGetUsersWithTopicInfoCollection:
+    @pytest.mark.parametrize(
+        ("filters", "expected_collection"),
+        [
+            ({}, "users"),
+            ({"half_life_days": 30}, "users"),
+            ({"keywords": ["python"]}, "aggregated_topic_attributes"),
+            ({"sentiments": ["positive"]}, "aggregated_topic_attributes"),
+            (
+                {"sentiments": ["positive"], "inverted_index": True},
+                "topic_attribute_users",
+            ),
+            (
+                {"keywords": ["python"], "half_life_days": 30, "inverted_index": True},
+                "aggregated_topic_attributes",
+            ),
+            ({"inverted_index": True}, "users"),
+        ],
+    )
+    def test_get_users_with_topic_info_collection(
+        self, filters: dict[str, tp.Any], expected_collection: str
+    ) -> None:
+        assert get_users_with_topic_info_collection(**filters) == expected_collection
 
 
 class TestGetUsersWithTopicProfilesPaginatedRepository:
+    @staticmethod
+    def build_collection(result: dict[str, tp.Any]) -> MagicMock:
+        mock_collection = MagicMock()
+        mock_collection.aggregate.return_value.to_list = AsyncMock(
+            return_value=[result]
+        )
+        return mock_collection
+
     @pytest.mark.asyncio
-    @patch("src.repositories.users.apaginate_aggregate")
+    @patch("src.repositories.users.build_get_users_with_topic_info_pipeline")
     async def test_get_users_with_topic_profiles_paginated_repository(
-        self, mock_apaginate_aggregate: AsyncMock
+        self, mock_build_pipeline: MagicMock
     ) -> None:
         # Arrange
-        mock_database = MagicMock(spec=AsyncIOMotorDatabase)
-        mock_database.__getitem__.return_value = MagicMock()
-        mock_params = Params(page=1, size=10)
-        mock_transformer = AsyncMock()
-
-        expected_result = {"items": [], "total": 0, "page": 1, "size": 10}
-        mock_apaginate_aggregate.return_value = expected_result
+        mock_database = build_database(
+            self.build_collection(
+                {
+                    "metadata": [{"total": 12}],
+                    "data": [{"user_id": "user1", "username": "User 1"}],
+                }
+            )
+        )
+        mock_transformer = MagicMock(return_value=["transformed"])
 
         # Act
         result = await get_users_with_topic_info_paginated_repository(
             database=mock_database,
-            params=mock_params,
+            params=Params(page=2, size=10),
             transformer=mock_transformer,
             keywords=["python"],
             entities=["person"],
@@ -112,15 +376,200 @@ class TestGetUsersWithTopicProfilesPaginatedRepository:
         )
 
         # Assert
-        assert result == expected_result
-        mock_apaginate_aggregate.assert_called_once()
+        assert result.items == ["transformed"]
+        assert result.total == 12
+        assert result.page == 2
+        assert result.size == 10
+        mock_database.__getitem__.assert_called_with("aggregated_topic_attributes")
+        mock_build_pipeline.assert_called_once_with(
+            keywords=["python"],
+            entities=["person"],
+            sentiments=["positive"],
+            offset=10,
+            limit=10,
+            after=None,
+            count_total=True,
+        )
+        mock_transformer.assert_called_once_with(
+            [{"user_id": "user1", "username": "User 1"}]
+        )
+
+    @pytest.mark.asyncio
+    async def test_get_users_with_topic_profiles_paginated_repository_caches_total(
+        self,
+    ) -> None:
+        # Arrange
+        mock_database = build_database(
+            self.build_collection(
+                {"metadata": [{"total": 12}], "data": [{"user_id": "user1"}]}
+            )
+        )
+        total_cache: TTLCache[tp.Any, int] = TTLCache(
+            maxsize=10, ttl_ms=60000, name="test_users_total"
+        )
+
+        # Act
+        await get_users_with_topic_info_paginated_repository(
+            database=mock_database,
+            params=Params(page=1, size=10),
+            total_cache=total_cache,
+            keywords=["python", "fastapi"],
+        )
+        mock_collection = mock_database.__getitem__.return_value
+        mock_collection.aggregate.return_value.to_list = AsyncMock(
+            return_value=[{"user_id": "user11"}]
+        )
+        result = await get_users_with_topic_info_paginated_repository(
+            database=mock_database,
+            params=Params(page=2, size=10),
+            total_cache=total_cache,
+            keywords=["fastapi", "python"],
+        )
+
+        # Assert
+        # Verify the second page is not counted again, whatever the filters order
+        assert result.items == [{"user_id": "user11"}]
+        assert result.total == 12
+        [pipeline] = mock_collection.aggregate.call_args.args
+        assert not any("$facet" in stage for stage in pipeline)
+        assert {"$skip": 10} in pipeline
 
-        # Verify apaginate_aggregate was called with correct parameters
-        call_args = mock_apaginate_aggregate.call_args
-        assert call_args[0][0] == mock_database["users"]
-        assert isinstance(call_args[0][1], list)  # pipeline
-        assert call_args[0][2] == mock_params
-        assert call_args[1]["transformer"] == mock_transformer
+    @pytest.mark.asyncio
+    async def test_get_users_with_topic_profiles_paginated_repository_empty(
+        self,
+    ) -> None:
+        # Arrange
+        mock_database = build_database(
+            self.build_collection({"metadata": [], "data": []})
+        )
+
+        # Act
+        result = await get_users_with_topic_info_paginated_repository(
+            database=mock_database,
+            params=Params(page=1, size=10),
+        )
+
+        # Assert
+        assert result.items == []
+        assert result.total == 0
+        mock_database.__getitem__.assert_called_with("users")
+
+    @pytest.mark.asyncio
+    async def test_get_users_with_topic_profiles_paginated_repository_decodes_items(
+        self,
+    ) -> None:
+        # Arrange
+        mock_database = build_database(
+            self.build_collection(
+                {
+                    "metadata": [{"total": 2}],
+                    "data": [
+                        {
+                            "user_id": "user1",
+                            "aggregated_topic_attributes": {
+                                "user_id": "user1",
+                                "keywords": {
+                                    "name": ["python"],
+                                    "weight": [0.8],
+                                    "updated_at": [1672531200],
+                                },
+                            },
+                        },
+                        {"user_id": "user2"},
+                    ],
+                }
+            )
+        )
+        mock_transformer = MagicMock(return_value=["transformed"])
+
+        # Act
+        await get_users_with_topic_info_paginated_repository(
+            database=mock_database,
+            params=Params(page=1, size=10),
+            transformer=mock_transformer,
+        )
+
+        # Assert
+        [decoded_items] = mock_transformer.call_args.args
+        assert decoded_items[0]["aggregated_topic_attributes"]["keywords"] == [
+            {
+                "name": "python",
+                "weight": 0.8,
+                "updated_at": datetime(2023, 1, 1, tzinfo=UTC),
+            }
+        ]
+        assert decoded_items[1] == {"user_id": "user2"}
+
+
+class TestGetUsersWithTopicInfoKeysetRepository:
+    @staticmethod
+    def build_collection(result: list[dict[str, tp.Any]]) -> MagicMock:
+        mock_collection = MagicMock()
+        mock_collection.aggregate.return_value.to_list = AsyncMock(return_value=result)
+        return mock_collection
+
+    @pytest.mark.asyncio
+    @patch("src.repositories.users.build_get_users_with_topic_info_pipeline")
+    async def test_get_users_with_topic_info_keyset_repository(
+        self, mock_build_pipeline: MagicMock
+    ) -> None:
+        # Arrange
+        mock_database = build_database(self.build_collection([{"user_id": "user2"}]))
+        after = ([0.5, None, None], "user1")
+
+        # Act
+        users, total = await get_users_with_topic_info_keyset_repository(
+            database=mock_database,
+            limit=11,
+            after=after,
+            keywords=["python"],
+        )
+
+        # Assert
+        assert users == [{"user_id": "user2"}]
+        assert total is None
+        mock_database.__getitem__.assert_called_with("aggregated_topic_attributes")
+        mock_build_pipeline.assert_called_once_with(
+            keywords=["python"],
+            offset=0,
+            limit=11,
+            after=after,
+            count_total=False,
+        )
+        mock_collection = mock_database.__getitem__.return_value
+        mock_collection.aggregate.return_value.to_list.assert_awaited_once_with(11)
+
+    @pytest.mark.asyncio
+    async def test_get_users_with_topic_info_keyset_repository_include_total(
+        self,
+    ) -> None:
+        # Arrange
+        mock_database = build_database(
+            self.build_collection(
+                [{"metadata": [{"total": 12}], "data": [{"user_id": "user1"}]}]
+            )
+        )
+
+        # Act
+        users, total = await get_users_with_topic_info_keyset_repository(
+            database=mock_database,
+            limit=11,
+            include_total=True,
+        )
+
+        # Assert
+        assert users == [{"user_id": "user1"}]
+        assert total == 12
+        mock_database.__getitem__.assert_called_with("users")
+
+
+class TestGetUsersWithTopicInfoTotalCacheKey:
+    def test_get_users_with_topic_info_total_cache_key(self) -> None:
+        assert get_users_with_topic_info_total_cache_key(
+            keywords=["python", "fastapi", "python"],
+            sentiments=["positive"],
+            half_life_days=30,
+        ) == (("fastapi", "python"), (), ("positive",))
 
 
 class TestBuildGetUserWithTopicProfilePipeline:
@@ -155,67 +604,166 @@ class TestBuildGetUserWithTopicProfilePipeline:
 
 
 class TestGetUserWithTopicProfileRepository:
+    @staticmethod
+    def build_collections(
+        documents: dict[str, dict[str, tp.Any] | None],
+    ) -> dict[str, MagicMock]:
+        collections = {}
+        for name, document in documents.items():
+            collections[name] = MagicMock()
+            collections[name].find_one = AsyncMock(return_value=document)
+        return collections
+
     @pytest.mark.asyncio
     async def test_get_user_with_topic_profile_repository_user_exists(self) -> None:
         # Arrange
         user_id = "test_user_id"
-        expected_user = {
+        aggregated_topic_attributes = {
             "user_id": user_id,
-            "username": "Test User",
-            "aggregated_topic_attributes": {
-                "user_id": user_id,
-                "keywords": [],
-                "entities": [],
-                "sentiments": [],
-            },
+            "keywords": [],
+            "entities": [],
+            "sentiments": [],
         }
+        mock_database = build_database(
+            self.build_collections(
+                {
+                    "users": {"user_id": user_id, "username": "Test User"},
+                    "aggregated_topic_attributes": aggregated_topic_attributes,
+                    "topic_profiles": None,
+                }
+            )
+        )
 
-        mock_aggregate = AsyncMock()
-        mock_aggregate.to_list.return_value = [expected_user]
+        # Act
+        result = await get_user_with_topic_info_repository(
+            user_id=user_id,
+            database=mock_database,
+        )
 
-        mock_collection = MagicMock()
-        mock_collection.aggregate.return_value = mock_aggregate
+        # Assert
+        assert result == {
+            "user_id": user_id,
+            "username": "Test User",
+            "aggregated_topic_attributes": aggregated_topic_attributes,
+        }
+        # Verify each document is read by `user_id`, without embedded copies
+        mock_database["users"].find_one.assert_called_once_with(
+            {"user_id": user_id},
+            {"aggregated_topic_attributes": 0, "topic_profile": 0},
+        )
+        for name in ("aggregated_topic_attributes", "topic_profiles"):
+            mock_database[name].find_one.assert_called_once_with(
+                {"user_id": user_id}, {"_id": 0}
+            )
 
-        mock_database = MagicMock(spec=AsyncIOMotorDatabase)
-        mock_database.__getitem__.return_value = mock_collection
+    @pytest.mark.asyncio
+    async def test_get_user_with_topic_profile_repository_user_not_exists(self) -> None:
+        # Arrange
+        mock_database = build_database(
+            self.build_collections(
+                {
+                    "users": None,
+                    "aggregated_topic_attributes": None,
+                    "topic_profiles": None,
+                }
+            )
+        )
 
         # Act
         result = await get_user_with_topic_info_repository(
-            user_id=user_id,
+            user_id="non_existent_user_id",
             database=mock_database,
         )
 
         # Assert
-        assert result == expected_user
-        mock_database.__getitem__.assert_called_once_with("users")
-        mock_collection.aggregate.assert_called_once()
-        mock_aggregate.to_list.assert_called_once_with(1)
+        assert result is None
 
     @pytest.mark.asyncio
-    async def test_get_user_with_topic_profile_repository_user_not_exists(self) -> None:
+    async def test_get_user_with_topic_profile_repository_fields(self) -> None:
         # Arrange
-        user_id = "non_existent_user_id"
+        topic_profile = {"user_id": "test_user_id", "topics": []}
+        mock_database = build_database(
+            self.build_collections(
+                {
+                    "users": {"user_id": "test_user_id", "username": "Test User"},
+                    "topic_profiles": topic_profile,
+                }
+            )
+        )
 
-        mock_aggregate = AsyncMock()
-        mock_aggregate.to_list.return_value = []
+        # Act
+        result = await get_user_with_topic_info_repository(
+            user_id="test_user_id",
+            database=mock_database,
+            fields=["topic_profile"],
+        )
 
+        # Assert
+        # Verify aggregated topic attributes are not read
+        assert result == {
+            "user_id": "test_user_id",
+            "username": "Test User",
+            "topic_profile": topic_profile,
+        }
+
+
+class TestGetUserWithEmbeddedTopicInfoRepository:
+    @pytest.mark.asyncio
+    async def test_get_user_with_embedded_topic_info_repository(self) -> None:
+        # Arrange
         mock_collection = MagicMock()
-        mock_collection.aggregate.return_value = mock_aggregate
+        mock_collection.find_one = AsyncMock(
+            return_value={
+                "user_id": "user_1",
+                "username": "User 1",
+                "aggregated_topic_attributes": {
+                    "user_id": "user_1",
+                    "keywords": {
+                        "name": ["python"],
+                        "weight": [0.8],
+                        "updated_at": [1672531200],
+                    },
+                },
+            }
+        )
+        mock_database = MagicMock(spec=AsyncIOMotorDatabase)
+        mock_database.__getitem__.return_value = mock_collection
+
+        # Act
+        result = await get_user_with_embedded_topic_info_repository(
+            "user_1", database=mock_database
+        )
+
+        # Assert
+        # Verify the embedded document is decoded like a joined one
+        assert result is not None
+        assert result["aggregated_topic_attributes"]["keywords"] == [
+            {
+                "name": "python",
+                "weight": 0.8,
+                "updated_at": datetime(2023, 1, 1, tzinfo=UTC),
+            }
+        ]
+        mock_database.__getitem__.assert_called_once_with("users")
+        mock_collection.find_one.assert_called_once_with({"user_id": "user_1"})
 
+    @pytest.mark.asyncio
+    async def test_get_user_with_embedded_topic_info_repository_not_exists(
+        self,
+    ) -> None:
+        # Arrange
+        mock_collection = MagicMock()
+        mock_collection.find_one = AsyncMock(return_value=None)
         mock_database = MagicMock(spec=AsyncIOMotorDatabase)
         mock_database.__getitem__.return_value = mock_collection
 
         # Act
-        result = await get_user_with_topic_info_repository(
-            user_id=user_id,
-            database=mock_database,
+        result = await get_user_with_embedded_topic_info_repository(
+            "user_1", database=mock_database
         )
 
         # Assert
         assert result is None
-        mock_database.__getitem__.assert_called_once_with("users")
-        mock_collection.aggregate.assert_called_once()
-        mock_aggregate.to_list.assert_called_once_with(1)
 
 
 class TestGetUserRepository:
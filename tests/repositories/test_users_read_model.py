@@ -0,0 +1,76 @@
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from motor.motor_asyncio import AsyncIOMotorDatabase
+
+from src.repositories.users_read_model import (
+    build_embed_users_topic_info_pipeline,
+    embed_users_topic_info_repository,
+)
+
+
+class TestBuildEmbedUsersTopicInfoPipeline:
+    def test_build_embed_users_topic_info_pipeline(self) -> None:
+        # Act
+        pipeline = build_embed_users_topic_info_pipeline(["user_1"])
+
+        # Assert
+        assert pipeline[0] == {"$match": {"user_id": {"$in": ["user_1"]}}}
+        assert [
+            stage["$lookup"]["from"] for stage in pipeline if "$lookup" in stage
+        ] == [
+            "aggregated_topic_attributes",
+            "topic_profiles",
+        ]
+        assert pipeline[-2] == {
+            "$unset": ["aggregated_topic_attributes._id", "topic_profile._id"]
+        }
+
+        # Verify users are updated in place, keeping newer embedded copies
+        merge = pipeline[-1]["$merge"]
+        assert (merge["into"], merge["on"], merge["whenNotMatched"]) == (
+            "users",
+            "user_id",
+            "discard",
+        )
+        assert merge["whenMatched"][0]["$set"]["aggregated_topic_attributes"] == {
+            "$cond": [
+                {
+                    "$lte": [
+                        "$aggregated_topic_attributes.version",
+                        "$$new.aggregated_topic_attributes.version",
+                    ]
+                },
+                "$$new.aggregated_topic_attributes",
+                "$aggregated_topic_attributes",
+            ]
+        }
+        assert merge["whenMatched"][0]["$set"]["topic_profile"]["$cond"][0] == {
+            "$lte": ["$topic_profile.updated_at", "$$new.topic_profile.updated_at"]
+        }
+
+    def test_build_embed_users_topic_info_pipeline_every_user(self) -> None:
+        # Act
+        pipeline = build_embed_users_topic_info_pipeline()
+
+        # Assert
+        assert "$lookup" in pipeline[0]
+
+
+class TestEmbedUsersTopicInfoRepository:
+    @pytest.mark.asyncio
+    async def test_embed_users_topic_info_repository(self) -> None:
+        # Arrange
+        mock_collection = MagicMock()
+        mock_collection.aggregate.return_value.to_list = AsyncMock(return_value=[])
+        mock_database = MagicMock(spec=AsyncIOMotorDatabase)
+        mock_database.__getitem__.return_value = mock_collection
+
+        # Act
+        await embed_users_topic_info_repository(["user_1"], database=mock_database)
+
+        # Assert
+        mock_database.__getitem__.assert_called_once_with("users")
+        mock_collection.aggregate.assert_called_once_with(
+            build_embed_users_topic_info_pipeline(["user_1"])
+        )
@@ -2,19 +2,42 @@ import uuid
 from unittest.mock import AsyncMock, patch
 
 import pytest
+from aiokafka import TopicPartition
+from faststream import context
+from faststream.kafka import TestKafkaBroker
+from faststream.kafka.fastapi import KafkaRouter
+from faststream.kafka.message import FakeConsumer
 from starlette.datastructures import State
 
 from src.dtos import ContentEventBrokerDTO
-from src.streaming.routers.content import transmit_content_event_to_olap_handler
+from src.streaming.routers.content import (
+    build_batch_router,
+    mark_content_events_seen,
+    transmit_content_event_to_olap_handler,
+    transmit_content_events_batch_to_olap_handler,
+)
+from src.utils.caches import LRUCache
 from src.utils.dates import utcnow
+from src.utils.metrics import get_counter
+from tests.streaming.routers.test_streaming_router import build_kafka_settings
+
+
+def build_content_events_seen() -> LRUCache[uuid.UUID, bool]:
+    return LRUCache(maxsize=100, name="test_content_events_seen")
+
+
+def build_content_event(user_id: str = "test_user_id") -> ContentEventBrokerDTO:
+    return ContentEventBrokerDTO(
+        content_event_uuid=uuid.uuid4(),
+        user_id=user_id,
+        content="Test content",
+        timestamp=utcnow(),
+    )
 
 
 class TestTransmitContentEventToOlapHandler:
     @pytest.mark.asyncio
-    @patch("src.streaming.routers.content.insert_content_event_repository")
-    async def test_transmit_content_event_to_olap_handler_success(
-        self, mock_insert_content_event: AsyncMock
-    ) -> None:
+    async def test_transmit_content_event_to_olap_handler_success(self) -> None:
         # Arrange
         content_event_uuid = uuid.uuid4()
         user_id = "test_user_id"
@@ -28,9 +51,10 @@ class TestTransmitContentEventToOlapHandler:
             timestamp=timestamp,
         )
 
-        mock_get_clickhouse_connection = AsyncMock()
+        mock_content_events_writer = AsyncMock()
         state = State()
-        state.get_clickhouse_connection = mock_get_clickhouse_connection
+        state.content_events_writer = mock_content_events_writer
+        state.content_events_seen = build_content_events_seen()
 
         # Act
         await transmit_content_event_to_olap_handler(
@@ -39,19 +63,17 @@ class TestTransmitContentEventToOlapHandler:
         )
 
         # Assert
-        mock_insert_content_event.assert_called_once_with(
+        mock_content_events_writer.append.assert_called_once_with(
             content_event_uuid=content_event_uuid,
             user_id=user_id,
             content=content,
             ts=timestamp,
-            get_connection=mock_get_clickhouse_connection,
         )
+        # Marked by the writer once the event is written
+        assert content_event_uuid not in state.content_events_seen
 
     @pytest.mark.asyncio
-    @patch("src.streaming.routers.content.insert_content_event_repository")
-    async def test_transmit_content_event_to_olap_handler_error(
-        self, mock_insert_content_event: AsyncMock
-    ) -> None:
+    async def test_transmit_content_event_to_olap_handler_error(self) -> None:
         # Arrange
         content_event = ContentEventBrokerDTO(
             content_event_uuid=uuid.uuid4(),
@@ -60,17 +82,210 @@ class TestTransmitContentEventToOlapHandler:
             timestamp=utcnow(),
         )
 
+        mock_content_events_writer = AsyncMock()
+        mock_content_events_writer.append.side_effect = Exception("Database error")
+        state = State()
+        state.content_events_writer = mock_content_events_writer
+        state.content_events_seen = build_content_events_seen()
+
+        # Act & Assert
+        with pytest.raises(Exception, match="Database error"):
+            await transmit_content_event_to_olap_handler(
+                content_event,
+                state=state,
+            )
+
+        mock_content_events_writer.append.assert_called_once()
+
+
+class TestTransmitContentEventsBatchToOlapHandler:
+    @pytest.mark.asyncio
+    @patch("src.streaming.routers.content.insert_content_events_repository")
+    async def test_transmit_content_events_batch_to_olap_handler_success(
+        self, mock_insert_content_events: AsyncMock
+    ) -> None:
+        # Arrange
+        content_events = [
+            ContentEventBrokerDTO(
+                content_event_uuid=uuid.uuid4(),
+                user_id=f"user_{index}",
+                content=f"Content {index}",
+                timestamp=utcnow(),
+            )
+            for index in range(3)
+        ]
+
         mock_get_clickhouse_connection = AsyncMock()
         state = State()
         state.get_clickhouse_connection = mock_get_clickhouse_connection
+        state.content_events_seen = build_content_events_seen()
+
+        # Act
+        await transmit_content_events_batch_to_olap_handler(
+            content_events,
+            state=state,
+        )
+
+        # Assert
+        mock_insert_content_events.assert_called_once_with(
+            [
+                (
+                    content_event.content_event_uuid,
+                    content_event.user_id,
+                    content_event.content,
+                    content_event.timestamp,
+                )
+                for content_event in content_events
+            ],
+            get_connection=mock_get_clickhouse_connection,
+        )
 
-        mock_insert_content_event.side_effect = Exception("Database error")
+    @pytest.mark.asyncio
+    @patch("src.streaming.routers.content.insert_content_events_repository")
+    async def test_transmit_content_events_batch_to_olap_handler_error(
+        self, mock_insert_content_events: AsyncMock
+    ) -> None:
+        # Arrange
+        content_events = [
+            ContentEventBrokerDTO(
+                content_event_uuid=uuid.uuid4(),
+                user_id="test_user_id",
+                content="Test content",
+                timestamp=utcnow(),
+            )
+        ]
+
+        state = State()
+        state.get_clickhouse_connection = AsyncMock()
+        state.content_events_seen = build_content_events_seen()
+
+        mock_insert_content_events.side_effect = Exception("Database error")
 
         # Act & Assert
         with pytest.raises(Exception, match="Database error"):
-            await transmit_content_event_to_olap_handler(
-                content_event,
+            await transmit_content_events_batch_to_olap_handler(
+                content_events,
                 state=state,
             )
 
-        mock_insert_content_event.assert_called_once()
+        # A failed batch must still be written when it is redelivered
+        assert content_events[0].content_event_uuid not in state.content_events_seen
+
+    @pytest.mark.asyncio
+    @patch.object(FakeConsumer, "commit")
+    @patch.object(FakeConsumer, "seek")
+    @patch("src.streaming.routers.content.insert_content_events_repository")
+    async def test_transmit_content_events_batch_to_olap_handler_failed_batch(
+        self,
+        mock_insert_content_events: AsyncMock,
+        mock_seek: AsyncMock,
+        mock_commit: AsyncMock,
+    ) -> None:
+        # Arrange
+        content_events = [build_content_event(), build_content_event()]
+
+        router = KafkaRouter()
+        router.include_router(build_batch_router(build_kafka_settings(True)))
+
+        state = State()
+        state.get_clickhouse_connection = AsyncMock()
+        state.content_events_seen = build_content_events_seen()
+
+        mock_insert_content_events.side_effect = RuntimeError("Database error")
+
+        # Act & Assert
+        with context.scope("state", state):
+            async with TestKafkaBroker(router.broker) as broker:
+                with pytest.raises(RuntimeError, match="Database error"):
+                    await broker.publish_batch(
+                        *(
+                            content_event.model_dump(mode="json")
+                            for content_event in content_events
+                        ),
+                        topic="contentEvent",
+                    )
+
+        # The batch isn't committed and is consumed again from its first record
+        mock_insert_content_events.assert_called_once()
+        mock_commit.assert_not_called()
+        mock_seek.assert_called_once_with(
+            partition=TopicPartition("contentEvent", 0), offset=0
+        )
+        assert all(
+            content_event.content_event_uuid not in state.content_events_seen
+            for content_event in content_events
+        )
+
+
+class TestContentEventsDeduplication:
+    @pytest.mark.asyncio
+    async def test_transmit_content_event_to_olap_handler_drops_redelivery(
+        self,
+    ) -> None:
+        # Arrange
+        content_event = build_content_event()
+        mock_content_events_writer = AsyncMock()
+        state = State()
+        state.content_events_writer = mock_content_events_writer
+        state.content_events_seen = build_content_events_seen()
+        duplicates = get_counter("content_events.duplicates").value
+
+        # Act
+        await transmit_content_event_to_olap_handler(content_event, state=state)
+        mark_content_events_seen(
+            [content_event.content_event_uuid], seen=state.content_events_seen
+        )
+        await transmit_content_event_to_olap_handler(content_event, state=state)
+
+        # Assert
+        mock_content_events_writer.append.assert_called_once()
+        assert get_counter("content_events.duplicates").value == duplicates + 1
+
+    @pytest.mark.asyncio
+    @patch("src.streaming.routers.content.insert_content_events_repository")
+    async def test_transmit_content_events_batch_to_olap_handler_drops_duplicates(
+        self, mock_insert_content_events: AsyncMock
+    ) -> None:
+        # Arrange
+        seen_content_event = build_content_event()
+        content_event = build_content_event()
+        state = State()
+        state.get_clickhouse_connection = AsyncMock()
+        state.content_events_seen = build_content_events_seen()
+        state.content_events_seen.set(seen_content_event.content_event_uuid, True)
+        received = get_counter("content_events.received").value
+        duplicates = get_counter("content_events.duplicates").value
+
+        # Act
+        await transmit_content_events_batch_to_olap_handler(
+            [seen_content_event, content_event, content_event],
+            state=state,
+        )
+
+        # Assert
+        rows = mock_insert_content_events.call_args.args[0]
+        assert [row[0] for row in rows] == [content_event.content_event_uuid]
+        assert content_event.content_event_uuid in state.content_events_seen
+        assert get_counter("content_events.received").value == received + 3
+        assert get_counter("content_events.duplicates").value == duplicates + 2
+
+    @pytest.mark.asyncio
+    @patch("src.streaming.routers.content.insert_content_events_repository")
+    async def test_transmit_content_events_batch_to_olap_handler_all_duplicates(
+        self, mock_insert_content_events: AsyncMock
+    ) -> None:
+        # Arrange
+        content_event = build_content_event()
+        state = State()
+        state.get_clickhouse_connection = AsyncMock()
+        state.content_events_seen = build_content_events_seen()
+        state.content_events_seen.set(content_event.content_event_uuid, True)
+
+        # Act
+        await transmit_content_events_batch_to_olap_handler(
+            [content_event],
+            state=state,
+        )
+
+        # Assert
+        mock_insert_content_events.assert_not_called()
@@ -0,0 +1,107 @@
+import uuid
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from starlette.datastructures import State
+
+from src.dtos import TopicProfileEventBrokerDTO
+from src.schemas import TopicTopicProfileEventSchema
+from src.streaming.routers.topic_profile import (
+    transmit_topic_profile_event_to_olap_handler,
+)
+from src.utils.dates import utcnow
+
+
+def build_topic_profile_event(
+    user_id: str, timestamp: datetime | None = None
+) -> TopicProfileEventBrokerDTO:
+    return TopicProfileEventBrokerDTO(
+        topic_profile_event_uuid=uuid.uuid4(),
+        user_content_event_uuid=uuid.uuid4(),
+        user_id=user_id,
+        topics=[TopicTopicProfileEventSchema(confidence=0.9)],
+        timestamp=utcnow() if timestamp is None else timestamp,
+    )
+
+
+@patch("src.streaming.routers.topic_profile.set_users_topic_profile_repository")
+@patch("src.streaming.routers.topic_profile.upsert_topic_profile_repository")
+class TestTransmitTopicProfileEventToOlapHandler:
+    @pytest.mark.asyncio
+    async def test_transmit_topic_profile_event_to_olap_handler(
+        self,
+        mock_upsert_topic_profile: AsyncMock,
+        mock_set_users_topic_profile: AsyncMock,
+    ) -> None:
+        # Arrange
+        state = State()
+        state.mongo_database = MagicMock()
+        state.settings = MagicMock()
+        state.settings.mongo.users_read_model = False
+
+        # Act
+        await transmit_topic_profile_event_to_olap_handler(
+            build_topic_profile_event("user_1"), state=state
+        )
+
+        # Assert
+        mock_upsert_topic_profile.assert_called_once()
+        topic_profile = mock_upsert_topic_profile.call_args.args[0]
+        assert topic_profile["user_id"] == "user_1"
+        assert topic_profile["topics"][0]["confidence"] == 0.9
+        mock_set_users_topic_profile.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_transmit_topic_profile_event_to_olap_handler_users_read_model(
+        self,
+        mock_upsert_topic_profile: AsyncMock,
+        mock_set_users_topic_profile: AsyncMock,
+    ) -> None:
+        # Arrange
+        state = State()
+        state.mongo_database = MagicMock()
+        state.settings = MagicMock()
+        state.settings.mongo.users_read_model = True
+
+        # Act
+        await transmit_topic_profile_event_to_olap_handler(
+            build_topic_profile_event("user_1"), state=state
+        )
+
+        # Assert
+        # Verify the same profile is embedded in the user
+        mock_set_users_topic_profile.assert_called_once_with(
+            mock_upsert_topic_profile.call_args.args[0],
+            database=state.mongo_database,
+        )
+
+    @pytest.mark.asyncio
+    async def test_transmit_topic_profile_event_to_olap_handler_out_of_order(
+        self,
+        mock_upsert_topic_profile: AsyncMock,
+        mock_set_users_topic_profile: AsyncMock,
+    ) -> None:
+        # Arrange
+        state = State()
+        state.mongo_database = MagicMock()
+        state.settings = MagicMock()
+        state.settings.mongo.users_read_model = True
+        newer_event = build_topic_profile_event("user_1")
+        older_event = build_topic_profile_event(
+            "user_1", timestamp=newer_event.timestamp - timedelta(minutes=1)
+        )
+
+        # Act
+        for topic_profile_event in (newer_event, older_event):
+            await transmit_topic_profile_event_to_olap_handler(
+                topic_profile_event, state=state
+            )
+
+        # Assert
+        # Profiles carry when they were produced, so the late older one is
+        # rejected by the `updated_at` guard of the embedded profile
+        assert [
+            call.args[0]["updated_at"]
+            for call in mock_set_users_topic_profile.call_args_list
+        ] == [newer_event.timestamp, older_event.timestamp]
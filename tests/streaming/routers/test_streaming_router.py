@@ -0,0 +1,75 @@
+from faststream.kafka.subscriber.asyncapi import AsyncAPIBatchSubscriber
+
+from src.core.config import KafkaSchema
+from src.streaming.middlewares import SeekBackBatchMiddleware
+from src.streaming.routers import build_streaming_router
+
+
+def build_kafka_settings(batch_enabled: bool) -> KafkaSchema:
+    return KafkaSchema.model_validate(
+        {
+            "connection": {"scheme": "kafka", "host": "localhost", "port": 9092},
+            "batch": {"enabled": batch_enabled, "max_records": 100},
+        }
+    )
+
+
+class TestBuildStreamingRouter:
+    def test_build_streaming_router_single_mode(self) -> None:
+        router = build_streaming_router(build_kafka_settings(batch_enabled=False))
+
+        call_names = {
+            call.call_name
+            for subscriber in router._subscribers.values()
+            for call in subscriber.calls
+        }
+
+        assert call_names == {
+            "transmit_topic_profile_event_to_olap_handler",
+            "transmit_content_event_to_olap_handler",
+            "transmit_topic_event_to_oltp_handler",
+            "transmit_topic_attributes_event_to_olap_handler",
+        }
+
+    def test_build_streaming_router_batch_mode(self) -> None:
+        router = build_streaming_router(build_kafka_settings(batch_enabled=True))
+
+        batch_subscribers = {
+            call.call_name: subscriber
+            for subscriber in router._subscribers.values()
+            for call in subscriber.calls
+            if call.call_name != "transmit_topic_profile_event_to_olap_handler"
+        }
+
+        assert set(batch_subscribers) == {
+            "transmit_content_events_batch_to_olap_handler",
+            "transmit_topic_events_batch_to_oltp_handler",
+            "transmit_topic_attributes_events_batch_to_olap_handler",
+        }
+        for subscriber in batch_subscribers.values():
+            assert isinstance(subscriber, AsyncAPIBatchSubscriber)
+            assert subscriber.batch_timeout_ms == 1000
+            assert subscriber.max_records == 100
+            assert subscriber.group_id is not None
+            # A failed batch is consumed again instead of being skipped
+            assert subscriber._retry is True
+            assert SeekBackBatchMiddleware in subscriber._broker_middlewares
+
+    def test_build_streaming_router_same_group_ids_in_both_modes(self) -> None:
+        def build_group_ids(batch_enabled: bool) -> list[tuple[str, str | None]]:
+            router = build_streaming_router(
+                build_kafka_settings(batch_enabled=batch_enabled)
+            )
+            return sorted(
+                (topic, subscriber.group_id)
+                for subscriber in router._subscribers.values()
+                for topic in subscriber.topics
+            )
+
+        group_ids = build_group_ids(batch_enabled=False)
+
+        # Switching modes resumes from the offsets committed by the other one
+        assert group_ids == build_group_ids(batch_enabled=True)
+        assert ("contentEvent", "api-gateway-content") in group_ids
+        assert ("topicAttributes", "api-gateway-oltp") in group_ids
+        assert ("topicAttributes", "A") in group_ids
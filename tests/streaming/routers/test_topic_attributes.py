@@ -4,6 +4,7 @@ from unittest.mock import AsyncMock, MagicMock, patch
 import pytest
 from starlette.datastructures import State
 
+from src.core.config import DecaySchema, RetrySchema, WriteBehindSchema
 from src.dtos import AggregatedTopicAttributesDTO, TopicAttributesEventBrokerDTO
 from src.schemas import (
     EntityTopicEventSchema,
@@ -12,9 +13,35 @@ from src.schemas import (
 )
 from src.streaming.routers.topic_attributes import (
     transmit_topic_attributes_event_to_olap_handler,
+    transmit_topic_attributes_events_batch_to_olap_handler,
     transmit_topic_event_to_oltp_handler,
+    transmit_topic_events_batch_to_oltp_handler,
 )
 from src.utils.dates import utcnow
+from src.utils.metrics import get_counter
+from tests.conftest import build_topic_attributes_event
+
+
+def build_settings(
+    topic_attributes_merge_engine: str = "python",
+    write_behind: bool = False,
+    topic_attributes_storage_format: str = "subdocuments",
+    inverted_index: bool = False,
+    users_read_model: bool = False,
+) -> MagicMock:
+    settings = MagicMock()
+    settings.mongo.topic_attributes_inverted_index = inverted_index
+    settings.mongo.users_read_model = users_read_model
+    settings.mongo.topic_attributes_merge_engine = topic_attributes_merge_engine
+    settings.mongo.topic_attributes_storage_format = topic_attributes_storage_format
+    settings.mongo.topic_attributes_write_behind = WriteBehindSchema(
+        enabled=write_behind
+    )
+    settings.mongo.topic_attributes_decay = DecaySchema()
+    settings.mongo.topic_attributes_retry = RetrySchema(
+        max_attempts=3, base_delay_ms=0, max_delay_ms=0
+    )
+    return settings
 
 
 class TestTransmitTopicEventToOltpHandler:
@@ -23,7 +50,8 @@ class TestTransmitTopicEventToOltpHandler:
         "src.streaming.routers.topic_attributes.get_aggregated_topic_attributes_repository"
     )
     @patch(
-        "src.streaming.routers.topic_attributes.upsert_aggregated_topic_attributes_repository"
+        "src.streaming.routers.topic_attributes.upsert_versioned_aggregated_topic_attributes_repository",
+        return_value=True,
     )
     @patch(
         "src.streaming.routers.topic_attributes.update_aggregated_topic_attributes_dto_based_on_topic_attributes_event_schema"
@@ -95,6 +123,7 @@ class TestTransmitTopicEventToOltpHandler:
         mock_database = MagicMock()
         state = State()
         state.mongo_database = mock_database
+        state.settings = build_settings()
 
         # Act
         await transmit_topic_event_to_oltp_handler(
@@ -124,13 +153,22 @@ class TestTransmitTopicEventToOltpHandler:
             mock_upsert_aggregated_topic_attributes.call_args.kwargs["database"]
             == mock_database
         )
+        assert (
+            mock_upsert_aggregated_topic_attributes.call_args.kwargs["expected_version"]
+            == 0
+        )
+        assert (
+            mock_upsert_aggregated_topic_attributes.call_args.kwargs["storage_format"]
+            == "subdocuments"
+        )
 
     @pytest.mark.asyncio
     @patch(
         "src.streaming.routers.topic_attributes.get_aggregated_topic_attributes_repository"
     )
     @patch(
-        "src.streaming.routers.topic_attributes.upsert_aggregated_topic_attributes_repository"
+        "src.streaming.routers.topic_attributes.upsert_versioned_aggregated_topic_attributes_repository",
+        return_value=True,
     )
     @patch(
         "src.streaming.routers.topic_attributes.update_aggregated_topic_attributes_dto_based_on_topic_attributes_event_schema"
@@ -186,6 +224,7 @@ class TestTransmitTopicEventToOltpHandler:
         mock_database = MagicMock()
         state = State()
         state.mongo_database = mock_database
+        state.settings = build_settings()
 
         # Act
         await transmit_topic_event_to_oltp_handler(
@@ -221,6 +260,10 @@ class TestTransmitTopicEventToOltpHandler:
             mock_upsert_aggregated_topic_attributes.call_args.kwargs["database"]
             == mock_database
         )
+        assert (
+            mock_upsert_aggregated_topic_attributes.call_args.kwargs["expected_version"]
+            is None
+        )
 
 
 class TestTransmitTopicEventToOlapHandler:
@@ -337,3 +380,474 @@ class TestTransmitTopicEventToOlapHandler:
 
         # Verify insert_topic_event_repository was called
         mock_insert_topic_attributes_event.assert_called_once()
+
+
+class TestTransmitTopicEventsBatchToOltpHandler:
+    @pytest.mark.asyncio
+    @patch(
+        "src.streaming.routers.topic_attributes.get_aggregated_topic_attributes_by_user_ids_repository"
+    )
+    @patch(
+        "src.streaming.routers.topic_attributes.bulk_upsert_versioned_aggregated_topic_attributes_repository",
+        return_value=set(),
+    )
+    async def test_transmit_topic_events_batch_to_oltp_handler_success(
+        self,
+        mock_bulk_upsert_versioned_aggregated_topic_attributes: AsyncMock,
+        mock_get_aggregated_topic_attributes_by_user_ids: AsyncMock,
+    ) -> None:
+        # Arrange
+        topic_events = [
+            build_topic_attributes_event("user_1", keyword_weight=0.5),
+            build_topic_attributes_event("user_2"),
+            build_topic_attributes_event("user_1", keyword_weight=1.0),
+        ]
+
+        mock_get_aggregated_topic_attributes_by_user_ids.return_value = {
+            "user_2": AggregatedTopicAttributesDTO(
+                user_id="user_2",
+                keywords=[{"name": "python", "weight": 0.3}],
+                version=4,
+            ).model_dump(),
+        }
+
+        mock_database = MagicMock()
+        state = State()
+        state.mongo_database = mock_database
+        state.settings = build_settings()
+
+        # Act
+        await transmit_topic_events_batch_to_oltp_handler(
+            topic_events,
+            state=state,
+        )
+
+        # Assert
+        mock_get_aggregated_topic_attributes_by_user_ids.assert_called_once_with(
+            {"user_1", "user_2"},
+            database=mock_database,
+        )
+        # Events of the same user are folded in order, all users are written by
+        # one bulk write
+        mock_bulk_upsert_versioned_aggregated_topic_attributes.assert_called_once()
+        call = mock_bulk_upsert_versioned_aggregated_topic_attributes.call_args
+        written = {item["user_id"]: (item, version) for item, version in call.args[0]}
+        assert len(written) == 2
+        assert written["user_1"][0]["keywords"][0]["weight"] == 0.6
+        assert written["user_1"][1] is None
+        assert written["user_2"][0]["keywords"][0]["weight"] == 0.4
+        assert written["user_2"][1] == 4
+        assert call.kwargs["database"] == mock_database
+
+    @pytest.mark.asyncio
+    @patch(
+        "src.streaming.routers.topic_attributes.get_aggregated_topic_attributes_by_user_ids_repository"
+    )
+    @patch(
+        "src.streaming.routers.topic_attributes.bulk_upsert_versioned_aggregated_topic_attributes_repository"
+    )
+    async def test_transmit_topic_events_batch_to_oltp_handler_retries_conflicts(
+        self,
+        mock_bulk_upsert_versioned_aggregated_topic_attributes: AsyncMock,
+        mock_get_aggregated_topic_attributes_by_user_ids: AsyncMock,
+    ) -> None:
+        # Arrange
+        topic_events = [
+            build_topic_attributes_event("user_1"),
+            build_topic_attributes_event("user_2"),
+        ]
+        concurrent_user_2 = AggregatedTopicAttributesDTO(
+            user_id="user_2", version=1
+        ).model_dump()
+        mock_get_aggregated_topic_attributes_by_user_ids.side_effect = [
+            {},
+            {"user_2": concurrent_user_2},
+        ]
+        # `user_2` has been inserted concurrently after the first read
+        mock_bulk_upsert_versioned_aggregated_topic_attributes.side_effect = [
+            {"user_2"},
+            set(),
+        ]
+        state = State()
+        state.mongo_database = MagicMock()
+        state.settings = build_settings()
+        conflicts = get_counter("aggregated_topic_attributes.conflicts").value
+
+        # Act
+        await transmit_topic_events_batch_to_oltp_handler(topic_events, state=state)
+
+        # Assert
+        assert mock_get_aggregated_topic_attributes_by_user_ids.call_args_list[1].args[
+            0
+        ] == {"user_2"}
+        retried = mock_bulk_upsert_versioned_aggregated_topic_attributes.call_args_list[
+            1
+        ].args[0]
+        assert [(item["user_id"], version) for item, version in retried] == [
+            ("user_2", 1)
+        ]
+        assert get_counter("aggregated_topic_attributes.conflicts").value == (
+            conflicts + 1
+        )
+
+    @pytest.mark.asyncio
+    @patch(
+        "src.streaming.routers.topic_attributes.set_users_aggregated_topic_attributes_repository"
+    )
+    @patch(
+        "src.streaming.routers.topic_attributes.update_topic_attribute_users_repository"
+    )
+    @patch(
+        "src.streaming.routers.topic_attributes.get_aggregated_topic_attributes_by_user_ids_repository",
+        return_value={},
+    )
+    @patch(
+        "src.streaming.routers.topic_attributes.bulk_upsert_versioned_aggregated_topic_attributes_repository",
+        return_value={"user_2"},
+    )
+    async def test_transmit_topic_events_batch_to_oltp_handler_propagates_written(
+        self,
+        mock_bulk_upsert_versioned_aggregated_topic_attributes: AsyncMock,
+        mock_get_aggregated_topic_attributes_by_user_ids: AsyncMock,
+        mock_update_topic_attribute_users: AsyncMock,
+        mock_set_users_aggregated_topic_attributes: AsyncMock,
+    ) -> None:
+        # Arrange
+        state = State()
+        state.mongo_database = MagicMock()
+        state.settings = build_settings(inverted_index=True, users_read_model=True)
+
+        # Act
+        with pytest.raises(RuntimeError, match="user_2"):
+            await transmit_topic_events_batch_to_oltp_handler(
+                [
+                    build_topic_attributes_event("user_1"),
+                    build_topic_attributes_event("user_2"),
+                ],
+                state=state,
+            )
+
+        # Assert
+        (written_changes,) = mock_update_topic_attribute_users.call_args_list[0].args
+        assert [(old.user_id, new.version) for old, new in written_changes] == [
+            ("user_1", 1)
+        ]
+        read_model = mock_set_users_aggregated_topic_attributes.call_args_list[0]
+        assert [item["user_id"] for item in read_model.args[0]] == ["user_1"]
+        # Retries of the conflicted user don't propagate anything
+        assert mock_update_topic_attribute_users.call_count == 1
+
+
+class TestTransmitTopicAttributesEventsBatchToOlapHandler:
+    @pytest.mark.asyncio
+    @patch(
+        "src.streaming.routers.topic_attributes.insert_topic_attributes_events_columnar_repository"
+    )
+    async def test_transmit_topic_attributes_events_batch_to_olap_handler_success(
+        self,
+        mock_insert_topic_attributes_events_columnar: AsyncMock,
+    ) -> None:
+        # Arrange
+        topic_events = [
+            build_topic_attributes_event("user_1"),
+            build_topic_attributes_event("user_2"),
+        ]
+
+        mock_get_clickhouse_connection = AsyncMock()
+        state = State()
+        state.get_clickhouse_connection = mock_get_clickhouse_connection
+
+        # Act
+        await transmit_topic_attributes_events_batch_to_olap_handler(
+            topic_events,
+            state=state,
+        )
+
+        # Assert
+        mock_insert_topic_attributes_events_columnar.assert_called_once_with(
+            topic_events,
+            get_connection=mock_get_clickhouse_connection,
+        )
+
+
+class TestTopicAttributesPipelineMergeEngine:
+    @pytest.mark.asyncio
+    @patch(
+        "src.streaming.routers.topic_attributes.get_aggregated_topic_attributes_repository"
+    )
+    @patch(
+        "src.streaming.routers.topic_attributes.merge_aggregated_topic_attributes_repository"
+    )
+    async def test_transmit_topic_event_to_oltp_handler_pipeline(
+        self,
+        mock_merge_aggregated_topic_attributes: AsyncMock,
+        mock_get_aggregated_topic_attributes: AsyncMock,
+    ) -> None:
+        # Arrange
+        topic_event = build_topic_attributes_event("test_user_id")
+        mock_database = MagicMock()
+        state = State()
+        state.mongo_database = mock_database
+        state.settings = build_settings("pipeline")
+
+        # Act
+        await transmit_topic_event_to_oltp_handler(topic_event, state=state)
+
+        # Assert
+        mock_get_aggregated_topic_attributes.assert_not_called()
+        mock_merge_aggregated_topic_attributes.assert_called_once()
+        user_id, pipeline = mock_merge_aggregated_topic_attributes.call_args.args
+        assert user_id == "test_user_id"
+        assert list(pipeline[0]["$set"]) == [
+            "user_id",
+            "keywords",
+            "entities",
+            "sentiments",
+            "updated_at",
+            "version",
+        ]
+        assert (
+            mock_merge_aggregated_topic_attributes.call_args.kwargs["database"]
+            == mock_database
+        )
+
+    @pytest.mark.asyncio
+    @patch(
+        "src.streaming.routers.topic_attributes.get_aggregated_topic_attributes_by_user_ids_repository"
+    )
+    @patch(
+        "src.streaming.routers.topic_attributes.bulk_merge_aggregated_topic_attributes_repository"
+    )
+    async def test_transmit_topic_events_batch_to_oltp_handler_pipeline(
+        self,
+        mock_bulk_merge_aggregated_topic_attributes: AsyncMock,
+        mock_get_aggregated_topic_attributes_by_user_ids: AsyncMock,
+    ) -> None:
+        # Arrange
+        topic_events = [
+            build_topic_attributes_event("user_1"),
+            build_topic_attributes_event("user_2"),
+            build_topic_attributes_event("user_1"),
+        ]
+        state = State()
+        state.mongo_database = MagicMock()
+        state.settings = build_settings("pipeline")
+
+        # Act
+        await transmit_topic_events_batch_to_oltp_handler(topic_events, state=state)
+
+        # Assert
+        mock_get_aggregated_topic_attributes_by_user_ids.assert_not_called()
+        pipelines = mock_bulk_merge_aggregated_topic_attributes.call_args.args[0]
+        assert [user_id for user_id, _ in pipelines] == ["user_1", "user_2", "user_1"]
+
+
+class TestTopicAttributesOptimisticConcurrency:
+    @pytest.mark.asyncio
+    @patch(
+        "src.streaming.routers.topic_attributes.get_aggregated_topic_attributes_repository"
+    )
+    @patch(
+        "src.streaming.routers.topic_attributes.upsert_versioned_aggregated_topic_attributes_repository"
+    )
+    async def test_transmit_topic_event_to_oltp_handler_retries_conflict(
+        self,
+        mock_upsert_versioned_aggregated_topic_attributes: AsyncMock,
+        mock_get_aggregated_topic_attributes: AsyncMock,
+    ) -> None:
+        # Arrange
+        topic_event = build_topic_attributes_event("test_user_id")
+        mock_get_aggregated_topic_attributes.side_effect = [
+            AggregatedTopicAttributesDTO(
+                user_id="test_user_id", version=1
+            ).model_dump(),
+            AggregatedTopicAttributesDTO(
+                user_id="test_user_id", version=2
+            ).model_dump(),
+        ]
+        mock_upsert_versioned_aggregated_topic_attributes.side_effect = [False, True]
+        state = State()
+        state.mongo_database = MagicMock()
+        state.settings = build_settings()
+
+        # Act
+        await transmit_topic_event_to_oltp_handler(topic_event, state=state)
+
+        # Assert
+        assert [
+            call.kwargs["expected_version"]
+            for call in mock_upsert_versioned_aggregated_topic_attributes.call_args_list
+        ] == [1, 2]
+
+    @pytest.mark.asyncio
+    @patch(
+        "src.streaming.routers.topic_attributes.get_aggregated_topic_attributes_repository",
+        return_value=None,
+    )
+    @patch(
+        "src.streaming.routers.topic_attributes.upsert_versioned_aggregated_topic_attributes_repository",
+        return_value=False,
+    )
+    async def test_transmit_topic_event_to_oltp_handler_retries_exhausted(
+        self,
+        mock_upsert_versioned_aggregated_topic_attributes: AsyncMock,
+        mock_get_aggregated_topic_attributes: AsyncMock,
+    ) -> None:
+        # Arrange
+        topic_event = build_topic_attributes_event("test_user_id")
+        state = State()
+        state.mongo_database = MagicMock()
+        state.settings = build_settings()
+
+        # Act & Assert
+        with pytest.raises(RuntimeError, match="test_user_id"):
+            await transmit_topic_event_to_oltp_handler(topic_event, state=state)
+
+        assert mock_upsert_versioned_aggregated_topic_attributes.call_count == 3
+
+    @pytest.mark.asyncio
+    @patch(
+        "src.streaming.routers.topic_attributes.update_topic_attribute_users_repository"
+    )
+    @patch(
+        "src.streaming.routers.topic_attributes.get_aggregated_topic_attributes_repository"
+    )
+    @patch(
+        "src.streaming.routers.topic_attributes.upsert_versioned_aggregated_topic_attributes_repository"
+    )
+    async def test_transmit_topic_event_to_oltp_handler_updates_inverted_index(
+        self,
+        mock_upsert_versioned_aggregated_topic_attributes: AsyncMock,
+        mock_get_aggregated_topic_attributes: AsyncMock,
+        mock_update_topic_attribute_users: AsyncMock,
+    ) -> None:
+        # Arrange
+        topic_event = build_topic_attributes_event("test_user_id")
+        mock_get_aggregated_topic_attributes.side_effect = [
+            AggregatedTopicAttributesDTO(
+                user_id="test_user_id", version=1
+            ).model_dump(),
+            AggregatedTopicAttributesDTO(
+                user_id="test_user_id", version=2
+            ).model_dump(),
+        ]
+        mock_upsert_versioned_aggregated_topic_attributes.side_effect = [False, True]
+        state = State()
+        state.mongo_database = MagicMock()
+        state.settings = build_settings(inverted_index=True)
+
+        # Act
+        await transmit_topic_event_to_oltp_handler(topic_event, state=state)
+
+        # Assert
+        # Verify only the written merge is indexed, with the written version
+        mock_update_topic_attribute_users.assert_called_once()
+        [(old, new)] = mock_update_topic_attribute_users.call_args.args[0]
+        assert old.version == 2
+        assert new.version == 3
+        assert [keyword.name for keyword in new.keywords] == ["python"]
+
+    @pytest.mark.asyncio
+    @patch(
+        "src.streaming.routers.topic_attributes.set_users_aggregated_topic_attributes_repository"
+    )
+    @patch(
+        "src.streaming.routers.topic_attributes.get_aggregated_topic_attributes_repository"
+    )
+    @patch(
+        "src.streaming.routers.topic_attributes.upsert_versioned_aggregated_topic_attributes_repository"
+    )
+    async def test_transmit_topic_event_to_oltp_handler_updates_users_read_model(
+        self,
+        mock_upsert_versioned_aggregated_topic_attributes: AsyncMock,
+        mock_get_aggregated_topic_attributes: AsyncMock,
+        mock_set_users_aggregated_topic_attributes: AsyncMock,
+    ) -> None:
+        # Arrange
+        topic_event = build_topic_attributes_event("test_user_id")
+        mock_get_aggregated_topic_attributes.return_value = (
+            AggregatedTopicAttributesDTO(user_id="test_user_id", version=1).model_dump()
+        )
+        mock_upsert_versioned_aggregated_topic_attributes.return_value = True
+        state = State()
+        state.mongo_database = MagicMock()
+        state.settings = build_settings(
+            users_read_model=True, topic_attributes_storage_format="columnar"
+        )
+
+        # Act
+        await transmit_topic_event_to_oltp_handler(topic_event, state=state)
+
+        # Assert
+        mock_set_users_aggregated_topic_attributes.assert_called_once()
+        [written] = mock_set_users_aggregated_topic_attributes.call_args.args[0]
+        assert written["version"] == 2
+        assert [keyword["name"] for keyword in written["keywords"]] == ["python"]
+        assert mock_set_users_aggregated_topic_attributes.call_args.kwargs == {
+            "database": state.mongo_database,
+            "storage_format": "columnar",
+        }
+
+
+class TestTopicAttributesWriteBehind:
+    @pytest.mark.asyncio
+    @patch(
+        "src.streaming.routers.topic_attributes.upsert_versioned_aggregated_topic_attributes_repository"
+    )
+    async def test_transmit_topic_event_to_oltp_handler_write_behind(
+        self,
+        mock_upsert_versioned_aggregated_topic_attributes: AsyncMock,
+    ) -> None:
+        # Arrange
+        topic_event = build_topic_attributes_event("test_user_id")
+        state = State()
+        state.aggregated_topic_attributes_cache = AsyncMock()
+        state.settings = build_settings(write_behind=True)
+
+        calls: list[str] = []
+        state.aggregated_topic_attributes_cache.apply.side_effect = lambda *_: (
+            calls.append("apply")
+        )
+        state.aggregated_topic_attributes_cache.flush.side_effect = lambda *_: (
+            calls.append("flush")
+        )
+
+        # Act
+        await transmit_topic_event_to_oltp_handler(topic_event, state=state)
+
+        # Assert
+        state.aggregated_topic_attributes_cache.apply.assert_called_once_with(
+            [topic_event]
+        )
+        # Written before the offset is auto-committed
+        assert calls == ["apply", "flush"]
+        mock_upsert_versioned_aggregated_topic_attributes.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_transmit_topic_events_batch_to_oltp_handler_write_behind(
+        self,
+    ) -> None:
+        # Arrange
+        topic_events = [
+            build_topic_attributes_event("user_1"),
+            build_topic_attributes_event("user_2"),
+        ]
+        calls: list[str] = []
+        state = State()
+        state.aggregated_topic_attributes_cache = AsyncMock()
+        state.aggregated_topic_attributes_cache.apply.side_effect = lambda *_: (
+            calls.append("apply")
+        )
+        state.aggregated_topic_attributes_cache.flush.side_effect = lambda *_: (
+            calls.append("flush")
+        )
+        state.settings = build_settings(write_behind=True)
+
+        # Act
+        await transmit_topic_events_batch_to_oltp_handler(topic_events, state=state)
+
+        # Assert
+        state.aggregated_topic_attributes_cache.apply.assert_called_once_with(
+            topic_events
+        )
+        assert calls == ["apply", "flush"]
@@ -0,0 +1,97 @@
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from aiokafka import ConsumerRecord, TopicPartition
+from faststream.kafka.message import KafkaMessage
+
+from src.streaming.middlewares import SeekBackBatchMiddleware, seek_back_batch
+
+
+def build_record(partition: int, offset: int) -> ConsumerRecord[bytes, bytes]:
+    return ConsumerRecord(
+        topic="contentEvent",
+        partition=partition,
+        offset=offset,
+        timestamp=0,
+        timestamp_type=0,
+        key=None,
+        value=b"{}",
+        checksum=None,
+        serialized_key_size=0,
+        serialized_value_size=2,
+        headers=[],
+    )
+
+
+def build_message(*records: ConsumerRecord[bytes, bytes]) -> MagicMock:
+    mock_message = MagicMock(spec=KafkaMessage)
+    mock_message.raw_message = records
+    mock_message.consumer = MagicMock()
+    return mock_message
+
+
+class TestSeekBackBatch:
+    def test_seek_back_batch_every_partition(self) -> None:
+        # Arrange
+        mock_message = build_message(
+            build_record(partition=1, offset=7),
+            build_record(partition=0, offset=3),
+            build_record(partition=1, offset=8),
+            build_record(partition=0, offset=4),
+        )
+
+        # Act
+        seek_back_batch(mock_message)
+
+        # Assert
+        assert mock_message.consumer.seek.call_count == 2
+        mock_message.consumer.seek.assert_any_call(
+            partition=TopicPartition("contentEvent", 0), offset=3
+        )
+        mock_message.consumer.seek.assert_any_call(
+            partition=TopicPartition("contentEvent", 1), offset=7
+        )
+
+    def test_seek_back_batch_single_record(self) -> None:
+        # Arrange
+        mock_message = build_message()
+        mock_message.raw_message = build_record(partition=2, offset=5)
+
+        # Act
+        seek_back_batch(mock_message)
+
+        # Assert
+        mock_message.consumer.seek.assert_called_once_with(
+            partition=TopicPartition("contentEvent", 2), offset=5
+        )
+
+
+class TestSeekBackBatchMiddleware:
+    @pytest.mark.asyncio
+    async def test_consume_scope_failed_batch(self) -> None:
+        # Arrange
+        mock_message = build_message(
+            build_record(partition=0, offset=3), build_record(partition=0, offset=4)
+        )
+        call_next = AsyncMock(side_effect=RuntimeError("Database error"))
+
+        # Act & Assert
+        with pytest.raises(RuntimeError, match="Database error"):
+            await SeekBackBatchMiddleware().consume_scope(call_next, mock_message)
+
+        mock_message.consumer.seek.assert_called_once_with(
+            partition=TopicPartition("contentEvent", 0), offset=3
+        )
+
+    @pytest.mark.asyncio
+    async def test_consume_scope_written_batch(self) -> None:
+        # Arrange
+        mock_message = build_message(build_record(partition=0, offset=3))
+        call_next = AsyncMock(return_value=None)
+
+        # Act
+        await SeekBackBatchMiddleware().consume_scope(call_next, mock_message)
+
+        # Assert
+        call_next.assert_called_once_with(mock_message)
+        mock_message.consumer.seek.assert_not_called()
@@ -1,5 +1,8 @@
+import random
+import typing as tp
 import uuid
-from datetime import datetime, timezone
+from datetime import UTC, datetime, timedelta
+from operator import attrgetter
 from unittest.mock import MagicMock, patch
 
 import pytest
@@ -15,6 +18,10 @@ from src.schemas import (
 )
 from src.utils.aggregated_topic_attributes import (
     build_key_from_item_fields,
+    decay_aggregated_topic_attributes_dto,
+    diff_aggregated_topic_attributes_dto,
+    fold_weighted_item_lists,
+    fold_weighted_item_schemas,
     merge_entities,
     merge_entities_schemas,
     merge_keywords,
@@ -22,13 +29,17 @@ from src.utils.aggregated_topic_attributes import (
     merge_sentiment,
     merge_sentiment_schemas,
     merge_weighted_item_lists,
+    merge_weighted_item_schemas,
+    merge_weighted_item_schemas_vectorized,
+    prune_aggregated_topic_attributes_dto,
     update_aggregated_topic_attributes_dto_based_on_topic_attributes_event_schema,
+    update_aggregated_topic_attributes_dto_based_on_topic_attributes_events,
 )
 
 
 @pytest.fixture
 def mock_time() -> datetime:
-    return datetime(2023, 1, 1, tzinfo=timezone.utc)
+    return datetime(2023, 1, 1, tzinfo=UTC)
 
 
 class TestBuildKeyFromItemFields:
@@ -109,7 +120,7 @@ class TestMergeWeightedItemLists:
 
     @patch("src.utils.aggregated_topic_attributes.utcnow")
     def test_existing_items_only(self, mock_utcnow: MagicMock) -> None:
-        mock_time = datetime(2023, 1, 1, tzinfo=timezone.utc)
+        mock_time = datetime(2023, 1, 1, tzinfo=UTC)
         mock_utcnow.return_value = mock_time
 
         existing_items = [
@@ -117,13 +128,13 @@ class TestMergeWeightedItemLists:
                 "id": 1,
                 "name": "item1",
                 "weight": 0.8,
-                "timestamp": datetime(2022, 1, 1, tzinfo=timezone.utc),
+                "timestamp": datetime(2022, 1, 1, tzinfo=UTC),
             },
             {
                 "id": 2,
                 "name": "item2",
                 "weight": 0.5,
-                "timestamp": datetime(2022, 1, 1, tzinfo=timezone.utc),
+                "timestamp": datetime(2022, 1, 1, tzinfo=UTC),
             },
         ]
 
@@ -141,12 +152,12 @@ class TestMergeWeightedItemLists:
         assert result[0]["id"] == 1
         assert result[0]["name"] == "item1"
         assert result[0]["weight"] == 0.8
-        assert result[0]["timestamp"] == datetime(2022, 1, 1, tzinfo=timezone.utc)
+        assert result[0]["timestamp"] == datetime(2022, 1, 1, tzinfo=UTC)
 
         assert result[1]["id"] == 2
         assert result[1]["name"] == "item2"
         assert result[1]["weight"] == 0.5
-        assert result[1]["timestamp"] == datetime(2022, 1, 1, tzinfo=timezone.utc)
+        assert result[1]["timestamp"] == datetime(2022, 1, 1, tzinfo=UTC)
 
     @patch("src.utils.aggregated_topic_attributes.utcnow")
     def test_merge_with_existing_items(
@@ -159,13 +170,13 @@ class TestMergeWeightedItemLists:
                 "id": 1,
                 "name": "item1",
                 "weight": 0.8,
-                "timestamp": datetime(2022, 1, 1, tzinfo=timezone.utc),
+                "timestamp": datetime(2022, 1, 1, tzinfo=UTC),
             },
             {
                 "id": 2,
                 "name": "item2",
                 "weight": 0.5,
-                "timestamp": datetime(2022, 1, 1, tzinfo=timezone.utc),
+                "timestamp": datetime(2022, 1, 1, tzinfo=UTC),
             },
         ]
 
@@ -199,7 +210,7 @@ class TestMergeWeightedItemLists:
         assert result[2]["id"] == 2
         assert result[2]["name"] == "item2"
         assert result[2]["weight"] == 0.5
-        assert result[2]["timestamp"] == datetime(2022, 1, 1, tzinfo=timezone.utc)
+        assert result[2]["timestamp"] == datetime(2022, 1, 1, tzinfo=UTC)
 
     @patch("src.utils.aggregated_topic_attributes.utcnow")
     def test_merge_with_additional_fields(
@@ -212,7 +223,7 @@ class TestMergeWeightedItemLists:
                 "id": 1,
                 "name": "item1",
                 "weight": 0.8,
-                "timestamp": datetime(2022, 1, 1, tzinfo=timezone.utc),
+                "timestamp": datetime(2022, 1, 1, tzinfo=UTC),
             },
         ]
 
@@ -270,13 +281,13 @@ class TestMergeWeightedItemLists:
                 "type": "A",
                 "id": 1,
                 "weight": 0.8,
-                "timestamp": datetime(2022, 1, 1, tzinfo=timezone.utc),
+                "timestamp": datetime(2022, 1, 1, tzinfo=UTC),
             },
             {
                 "type": "B",
                 "id": 1,
                 "weight": 0.5,
-                "timestamp": datetime(2022, 1, 1, tzinfo=timezone.utc),
+                "timestamp": datetime(2022, 1, 1, tzinfo=UTC),
             },
         ]
 
@@ -310,7 +321,7 @@ class TestMergeWeightedItemLists:
         assert result[2]["type"] == "B"
         assert result[2]["id"] == 1
         assert result[2]["weight"] == 0.5
-        assert result[2]["timestamp"] == datetime(2022, 1, 1, tzinfo=timezone.utc)
+        assert result[2]["timestamp"] == datetime(2022, 1, 1, tzinfo=UTC)
 
 
 class TestMergeKeywords:
@@ -346,12 +357,12 @@ class TestMergeKeywords:
             {
                 "name": "keyword1",
                 "weight": 0.8,
-                "updated_at": datetime(2022, 1, 1, tzinfo=timezone.utc),
+                "updated_at": datetime(2022, 1, 1, tzinfo=UTC),
             },
             {
                 "name": "keyword2",
                 "weight": 0.5,
-                "updated_at": datetime(2022, 1, 1, tzinfo=timezone.utc),
+                "updated_at": datetime(2022, 1, 1, tzinfo=UTC),
             },
         ]
 
@@ -373,7 +384,7 @@ class TestMergeKeywords:
 
         assert result[2]["name"] == "keyword2"
         assert result[2]["weight"] == 0.5
-        assert result[2]["updated_at"] == datetime(2022, 1, 1, tzinfo=timezone.utc)
+        assert result[2]["updated_at"] == datetime(2022, 1, 1, tzinfo=UTC)
 
     def test_merge_keywords_empty_lists(self) -> None:
         result = merge_keywords([], [])
@@ -414,13 +425,13 @@ class TestMergeEntities:
                 "category": "person",
                 "name": "entity1",
                 "weight": 0.8,
-                "updated_at": datetime(2022, 1, 1, tzinfo=timezone.utc),
+                "updated_at": datetime(2022, 1, 1, tzinfo=UTC),
             },
             {
                 "category": "location",
                 "name": "entity2",
                 "weight": 0.5,
-                "updated_at": datetime(2022, 1, 1, tzinfo=timezone.utc),
+                "updated_at": datetime(2022, 1, 1, tzinfo=UTC),
             },
         ]
 
@@ -445,7 +456,7 @@ class TestMergeEntities:
         assert result[2]["category"] == "location"
         assert result[2]["name"] == "entity2"
         assert result[2]["weight"] == 0.5
-        assert result[2]["updated_at"] == datetime(2022, 1, 1, tzinfo=timezone.utc)
+        assert result[2]["updated_at"] == datetime(2022, 1, 1, tzinfo=UTC)
 
     def test_merge_entities_empty_lists(self) -> None:
         result = merge_entities([], [])
@@ -485,12 +496,12 @@ class TestMergeSentiment:
             {
                 "name": "positive",
                 "weight": 0.8,
-                "updated_at": datetime(2022, 1, 1, tzinfo=timezone.utc),
+                "updated_at": datetime(2022, 1, 1, tzinfo=UTC),
             },
             {
                 "name": "negative",
                 "weight": 0.5,
-                "updated_at": datetime(2022, 1, 1, tzinfo=timezone.utc),
+                "updated_at": datetime(2022, 1, 1, tzinfo=UTC),
             },
         ]
 
@@ -512,7 +523,7 @@ class TestMergeSentiment:
 
         assert result[2]["name"] == "negative"
         assert result[2]["weight"] == 0.5
-        assert result[2]["updated_at"] == datetime(2022, 1, 1, tzinfo=timezone.utc)
+        assert result[2]["updated_at"] == datetime(2022, 1, 1, tzinfo=UTC)
 
     def test_merge_sentiment_empty_lists(self) -> None:
         result = merge_sentiment([], [])
@@ -520,47 +531,39 @@ class TestMergeSentiment:
 
 
 class TestMergeKeywordsSchemas:
-    @patch("src.utils.aggregated_topic_attributes.merge_keywords")
-    def test_merge_keywords_schemas_calls_merge_keywords_with_correct_params(
-        self, mock_merge_keywords: MagicMock
+    @patch("src.utils.aggregated_topic_attributes.utcnow")
+    def test_merge_keywords_schemas_matches_merge_keywords(
+        self, mock_utcnow: MagicMock, mock_time: datetime
     ) -> None:
+        mock_utcnow.return_value = mock_time
         existing_keywords = [
-            KeywordTopicProfileSchema(name="keyword1", weight=0.8),
-            KeywordTopicProfileSchema(name="keyword2", weight=0.5),
+            KeywordTopicProfileSchema(
+                name="keyword1",
+                weight=0.8,
+                updated_at=datetime(2022, 1, 1, tzinfo=UTC),
+            ),
+            KeywordTopicProfileSchema(
+                name="keyword2",
+                weight=0.5,
+                updated_at=datetime(2022, 1, 1, tzinfo=UTC),
+            ),
         ]
         incoming_keywords = [
             KeywordTopicEventSchema(name="keyword1", weight=0.9),
             KeywordTopicEventSchema(name="keyword3", weight=0.7),
         ]
-        mock_result = [
-            {
-                "name": "keyword1",
-                "weight": 0.82,
-                "updated_at": datetime(2023, 1, 1, tzinfo=timezone.utc),
-            },
-            {
-                "name": "keyword3",
-                "weight": 0.7,
-                "updated_at": datetime(2023, 1, 1, tzinfo=timezone.utc),
-            },
-        ]
-        mock_merge_keywords.return_value = mock_result
 
         result = merge_keywords_schemas(existing_keywords, incoming_keywords)
 
-        mock_merge_keywords.assert_called_once_with(
-            [kw.model_dump() for kw in existing_keywords],
-            [kw.model_dump() for kw in incoming_keywords],
-        )
-        assert len(result) == 2
-        assert isinstance(result[0], KeywordTopicProfileSchema)
-        assert result[0].name == "keyword1"
-        assert result[0].weight == 0.82
-        assert result[0].updated_at == datetime(2023, 1, 1, tzinfo=timezone.utc)
-        assert isinstance(result[1], KeywordTopicProfileSchema)
-        assert result[1].name == "keyword3"
-        assert result[1].weight == 0.7
-        assert result[1].updated_at == datetime(2023, 1, 1, tzinfo=timezone.utc)
+        assert result == [
+            KeywordTopicProfileSchema.model_validate(item)
+            for item in merge_keywords(
+                [kw.model_dump() for kw in existing_keywords],
+                [kw.model_dump() for kw in incoming_keywords],
+            )
+        ]
+        # Items untouched by the event are not copied
+        assert result[-1] is existing_keywords[1]
 
     def test_merge_keywords_schemas_empty_lists(self) -> None:
         result = merge_keywords_schemas([], [])
@@ -576,12 +579,12 @@ class TestMergeKeywordsSchemas:
             KeywordTopicProfileSchema(
                 name="keyword1",
                 weight=0.8,
-                updated_at=datetime(2022, 1, 1, tzinfo=timezone.utc),
+                updated_at=datetime(2022, 1, 1, tzinfo=UTC),
             ),
             KeywordTopicProfileSchema(
                 name="keyword2",
                 weight=0.5,
-                updated_at=datetime(2022, 1, 1, tzinfo=timezone.utc),
+                updated_at=datetime(2022, 1, 1, tzinfo=UTC),
             ),
         ]
 
@@ -603,55 +606,45 @@ class TestMergeKeywordsSchemas:
 
         assert result[2].name == "keyword2"
         assert result[2].weight == 0.5
-        assert result[2].updated_at == datetime(2022, 1, 1, tzinfo=timezone.utc)
+        assert result[2].updated_at == datetime(2022, 1, 1, tzinfo=UTC)
 
 
 class TestMergeEntitiesSchemas:
-    @patch("src.utils.aggregated_topic_attributes.merge_entities")
-    def test_merge_entities_schemas_calls_merge_entities_with_correct_params(
-        self, mock_merge_entities: MagicMock
+    @patch("src.utils.aggregated_topic_attributes.utcnow")
+    def test_merge_entities_schemas_matches_merge_entities(
+        self, mock_utcnow: MagicMock, mock_time: datetime
     ) -> None:
+        mock_utcnow.return_value = mock_time
         existing_entities = [
-            EntityTopicProfileSchema(category="person", name="entity1", weight=0.8),
-            EntityTopicProfileSchema(category="location", name="entity2", weight=0.5),
+            EntityTopicProfileSchema(
+                category="person",
+                name="entity1",
+                weight=0.8,
+                updated_at=datetime(2022, 1, 1, tzinfo=UTC),
+            ),
+            EntityTopicProfileSchema(
+                category="location",
+                name="entity2",
+                weight=0.5,
+                updated_at=datetime(2022, 1, 1, tzinfo=UTC),
+            ),
         ]
         incoming_entities = [
             EntityTopicEventSchema(category="person", name="entity1", weight=0.9),
             EntityTopicEventSchema(category="organization", name="entity3", weight=0.7),
         ]
-        mock_result = [
-            {
-                "category": "person",
-                "name": "entity1",
-                "weight": 0.82,
-                "updated_at": datetime(2023, 1, 1, tzinfo=timezone.utc),
-            },
-            {
-                "category": "organization",
-                "name": "entity3",
-                "weight": 0.7,
-                "updated_at": datetime(2023, 1, 1, tzinfo=timezone.utc),
-            },
-        ]
-        mock_merge_entities.return_value = mock_result
 
         result = merge_entities_schemas(existing_entities, incoming_entities)
 
-        mock_merge_entities.assert_called_once_with(
-            [et.model_dump() for et in existing_entities],
-            [et.model_dump() for et in incoming_entities],
-        )
-        assert len(result) == 2
-        assert isinstance(result[0], EntityTopicProfileSchema)
-        assert result[0].category == "person"
-        assert result[0].name == "entity1"
-        assert result[0].weight == 0.82
-        assert result[0].updated_at == datetime(2023, 1, 1, tzinfo=timezone.utc)
-        assert isinstance(result[1], EntityTopicProfileSchema)
-        assert result[1].category == "organization"
-        assert result[1].name == "entity3"
-        assert result[1].weight == 0.7
-        assert result[1].updated_at == datetime(2023, 1, 1, tzinfo=timezone.utc)
+        assert result == [
+            EntityTopicProfileSchema.model_validate(item)
+            for item in merge_entities(
+                [et.model_dump() for et in existing_entities],
+                [et.model_dump() for et in incoming_entities],
+            )
+        ]
+        # Items untouched by the event are not copied
+        assert result[-1] is existing_entities[1]
 
     def test_merge_entities_schemas_empty_lists(self) -> None:
         result = merge_entities_schemas([], [])
@@ -668,13 +661,13 @@ class TestMergeEntitiesSchemas:
                 category="person",
                 name="entity1",
                 weight=0.8,
-                updated_at=datetime(2022, 1, 1, tzinfo=timezone.utc),
+                updated_at=datetime(2022, 1, 1, tzinfo=UTC),
             ),
             EntityTopicProfileSchema(
                 category="location",
                 name="entity2",
                 weight=0.5,
-                updated_at=datetime(2022, 1, 1, tzinfo=timezone.utc),
+                updated_at=datetime(2022, 1, 1, tzinfo=UTC),
             ),
         ]
 
@@ -699,51 +692,43 @@ class TestMergeEntitiesSchemas:
         assert result[2].category == "location"
         assert result[2].name == "entity2"
         assert result[2].weight == 0.5
-        assert result[2].updated_at == datetime(2022, 1, 1, tzinfo=timezone.utc)
+        assert result[2].updated_at == datetime(2022, 1, 1, tzinfo=UTC)
 
 
 class TestMergeSentimentSchemas:
-    @patch("src.utils.aggregated_topic_attributes.merge_sentiment")
-    def test_merge_sentiment_schemas_calls_merge_sentiment_with_correct_params(
-        self, mock_merge_sentiment: MagicMock
+    @patch("src.utils.aggregated_topic_attributes.utcnow")
+    def test_merge_sentiment_schemas_matches_merge_sentiment(
+        self, mock_utcnow: MagicMock, mock_time: datetime
     ) -> None:
+        mock_utcnow.return_value = mock_time
         existing_sentiment = [
-            SentimentTopicProfileSchema(name="positive", weight=0.8),
-            SentimentTopicProfileSchema(name="negative", weight=0.5),
+            SentimentTopicProfileSchema(
+                name="positive",
+                weight=0.8,
+                updated_at=datetime(2022, 1, 1, tzinfo=UTC),
+            ),
+            SentimentTopicProfileSchema(
+                name="negative",
+                weight=0.5,
+                updated_at=datetime(2022, 1, 1, tzinfo=UTC),
+            ),
         ]
         incoming_sentiment = [
             SentimentTopicEventSchema(name="positive", weight=0.9),
             SentimentTopicEventSchema(name="neutral", weight=0.7),
         ]
-        mock_result = [
-            {
-                "name": "positive",
-                "weight": 0.82,
-                "updated_at": datetime(2023, 1, 1, tzinfo=timezone.utc),
-            },
-            {
-                "name": "neutral",
-                "weight": 0.7,
-                "updated_at": datetime(2023, 1, 1, tzinfo=timezone.utc),
-            },
-        ]
-        mock_merge_sentiment.return_value = mock_result
 
         result = merge_sentiment_schemas(existing_sentiment, incoming_sentiment)
 
-        mock_merge_sentiment.assert_called_once_with(
-            [st.model_dump() for st in existing_sentiment],
-            [st.model_dump() for st in incoming_sentiment],
-        )
-        assert len(result) == 2
-        assert isinstance(result[0], SentimentTopicProfileSchema)
-        assert result[0].name == "positive"
-        assert result[0].weight == 0.82
-        assert result[0].updated_at == datetime(2023, 1, 1, tzinfo=timezone.utc)
-        assert isinstance(result[1], SentimentTopicProfileSchema)
-        assert result[1].name == "neutral"
-        assert result[1].weight == 0.7
-        assert result[1].updated_at == datetime(2023, 1, 1, tzinfo=timezone.utc)
+        assert result == [
+            SentimentTopicProfileSchema.model_validate(item)
+            for item in merge_sentiment(
+                [st.model_dump() for st in existing_sentiment],
+                [st.model_dump() for st in incoming_sentiment],
+            )
+        ]
+        # Items untouched by the event are not copied
+        assert result[-1] is existing_sentiment[1]
 
     def test_merge_sentiment_schemas_empty_lists(self) -> None:
         result = merge_sentiment_schemas([], [])
@@ -759,12 +744,12 @@ class TestMergeSentimentSchemas:
             SentimentTopicProfileSchema(
                 name="positive",
                 weight=0.8,
-                updated_at=datetime(2022, 1, 1, tzinfo=timezone.utc),
+                updated_at=datetime(2022, 1, 1, tzinfo=UTC),
             ),
             SentimentTopicProfileSchema(
                 name="negative",
                 weight=0.5,
-                updated_at=datetime(2022, 1, 1, tzinfo=timezone.utc),
+                updated_at=datetime(2022, 1, 1, tzinfo=UTC),
             ),
         ]
 
@@ -786,7 +771,7 @@ class TestMergeSentimentSchemas:
 
         assert result[2].name == "negative"
         assert result[2].weight == 0.5
-        assert result[2].updated_at == datetime(2022, 1, 1, tzinfo=timezone.utc)
+        assert result[2].updated_at == datetime(2022, 1, 1, tzinfo=UTC)
 
 
 class TestUpdateAggregatedTopicAttributesDtoBasedOnTopicAttributesEventSchema:
@@ -802,12 +787,12 @@ class TestUpdateAggregatedTopicAttributesDtoBasedOnTopicAttributesEventSchema:
                 KeywordTopicProfileSchema(
                     name="keyword1",
                     weight=0.8,
-                    updated_at=datetime(2022, 1, 1, tzinfo=timezone.utc),
+                    updated_at=datetime(2022, 1, 1, tzinfo=UTC),
                 ),
                 KeywordTopicProfileSchema(
                     name="keyword2",
                     weight=0.5,
-                    updated_at=datetime(2022, 1, 1, tzinfo=timezone.utc),
+                    updated_at=datetime(2022, 1, 1, tzinfo=UTC),
                 ),
             ],
             entities=[
@@ -815,28 +800,28 @@ class TestUpdateAggregatedTopicAttributesDtoBasedOnTopicAttributesEventSchema:
                     category="person",
                     name="entity1",
                     weight=0.8,
-                    updated_at=datetime(2022, 1, 1, tzinfo=timezone.utc),
+                    updated_at=datetime(2022, 1, 1, tzinfo=UTC),
                 ),
                 EntityTopicProfileSchema(
                     category="location",
                     name="entity2",
                     weight=0.5,
-                    updated_at=datetime(2022, 1, 1, tzinfo=timezone.utc),
+                    updated_at=datetime(2022, 1, 1, tzinfo=UTC),
                 ),
             ],
             sentiments=[
                 SentimentTopicProfileSchema(
                     name="positive",
                     weight=0.8,
-                    updated_at=datetime(2022, 1, 1, tzinfo=timezone.utc),
+                    updated_at=datetime(2022, 1, 1, tzinfo=UTC),
                 ),
                 SentimentTopicProfileSchema(
                     name="negative",
                     weight=0.5,
-                    updated_at=datetime(2022, 1, 1, tzinfo=timezone.utc),
+                    updated_at=datetime(2022, 1, 1, tzinfo=UTC),
                 ),
             ],
-            updated_at=datetime(2022, 1, 1, tzinfo=timezone.utc),
+            updated_at=datetime(2022, 1, 1, tzinfo=UTC),
         )
 
         incoming_topic_event = TopicAttributesEventBrokerDTO(
@@ -854,7 +839,7 @@ class TestUpdateAggregatedTopicAttributesDtoBasedOnTopicAttributesEventSchema:
                 ),
             ],
             sentiments=[SentimentTopicEventSchema(name="positive", weight=0.9)],
-            timestamp=datetime(2023, 1, 1, tzinfo=timezone.utc),
+            timestamp=datetime(2023, 1, 1, tzinfo=UTC),
         )
 
         # Call the function
@@ -876,9 +861,7 @@ class TestUpdateAggregatedTopicAttributesDtoBasedOnTopicAttributesEventSchema:
         assert result.keywords[1].updated_at == mock_time
         assert result.keywords[2].name == "keyword2"
         assert result.keywords[2].weight == 0.5
-        assert result.keywords[2].updated_at == datetime(
-            2022, 1, 1, tzinfo=timezone.utc
-        )
+        assert result.keywords[2].updated_at == datetime(2022, 1, 1, tzinfo=UTC)
 
         # Verify entities
         assert len(result.entities) == 3
@@ -893,9 +876,7 @@ class TestUpdateAggregatedTopicAttributesDtoBasedOnTopicAttributesEventSchema:
         assert result.entities[2].category == "location"
         assert result.entities[2].name == "entity2"
         assert result.entities[2].weight == 0.5
-        assert result.entities[2].updated_at == datetime(
-            2022, 1, 1, tzinfo=timezone.utc
-        )
+        assert result.entities[2].updated_at == datetime(2022, 1, 1, tzinfo=UTC)
 
         # Verify sentiments
         assert len(result.sentiments) == 2
@@ -904,9 +885,7 @@ class TestUpdateAggregatedTopicAttributesDtoBasedOnTopicAttributesEventSchema:
         assert result.sentiments[0].updated_at == mock_time
         assert result.sentiments[1].name == "negative"
         assert result.sentiments[1].weight == 0.5
-        assert result.sentiments[1].updated_at == datetime(
-            2022, 1, 1, tzinfo=timezone.utc
-        )
+        assert result.sentiments[1].updated_at == datetime(2022, 1, 1, tzinfo=UTC)
 
     @patch("src.utils.aggregated_topic_attributes.utcnow")
     def test_update_aggregated_topic_attributes_dto_based_on_topic_attributes_event_schema_empty_profile(
@@ -933,7 +912,7 @@ class TestUpdateAggregatedTopicAttributesDtoBasedOnTopicAttributesEventSchema:
                 ),
             ],
             sentiments=[SentimentTopicEventSchema(name="positive", weight=0.9)],
-            timestamp=datetime(2023, 1, 1, tzinfo=timezone.utc),
+            timestamp=datetime(2023, 1, 1, tzinfo=UTC),
         )
 
         # Call the function
@@ -970,3 +949,528 @@ class TestUpdateAggregatedTopicAttributesDtoBasedOnTopicAttributesEventSchema:
         assert result.sentiments[0].name == "positive"
         assert result.sentiments[0].weight == 0.9
         assert result.sentiments[0].updated_at == mock_time
+
+
+def build_random_topic_attributes_event(
+    rng: random.Random,
+) -> TopicAttributesEventBrokerDTO:
+    # Small name pools so that items collide, and enough of them to evict
+    return TopicAttributesEventBrokerDTO(
+        topic_attributes_event_uuid=uuid.uuid4(),
+        content_event_uuid=uuid.uuid4(),
+        user_id="user123",
+        keywords=[
+            KeywordTopicEventSchema(
+                name=f"keyword{rng.randrange(80)}", weight=round(rng.random(), 2)
+            )
+            for _ in range(rng.randrange(12))
+        ],
+        entities=[
+            EntityTopicEventSchema(
+                category=rng.choice(["person", "organization"]),
+                name=f"entity{rng.randrange(40)}",
+                weight=round(rng.random(), 2),
+            )
+            for _ in range(rng.randrange(6))
+        ],
+        sentiments=[
+            SentimentTopicEventSchema(
+                name=rng.choice(["positive", "negative", "neutral"]),
+                weight=round(rng.random(), 2),
+            )
+            for _ in range(rng.randrange(3))
+        ],
+        timestamp=datetime(2023, 1, 1, tzinfo=UTC),
+    )
+
+
+class TestFoldWeightedItemLists:
+    @patch("src.utils.aggregated_topic_attributes.utcnow")
+    def test_matches_sequential_merges(
+        self, mock_utcnow: MagicMock, mock_time: datetime
+    ) -> None:
+        mock_utcnow.return_value = mock_time
+        rng = random.Random(0)
+        options: dict[str, tp.Any] = {
+            "key_fields": ["id"],
+            "weight_field": "weight",
+            "timestamp_field": "timestamp",
+            "limit": 5,
+            "alpha": 0.8,
+        }
+        existing_items = [
+            {"id": i, "weight": 0.1 * i, "timestamp": mock_time} for i in range(5)
+        ]
+        incoming_item_lists = [
+            [
+                {"id": rng.randrange(10), "weight": round(rng.random(), 2)}
+                for _ in range(rng.randrange(4))
+            ]
+            for _ in range(200)
+        ]
+
+        expected = existing_items
+        for incoming_items in incoming_item_lists:
+            expected = merge_weighted_item_lists(expected, incoming_items, **options)
+
+        result = fold_weighted_item_lists(
+            existing_items, incoming_item_lists, **options
+        )
+
+        assert result == expected
+
+    @patch("src.utils.aggregated_topic_attributes.utcnow")
+    def test_does_not_mutate_inputs(
+        self, mock_utcnow: MagicMock, mock_time: datetime
+    ) -> None:
+        mock_utcnow.return_value = mock_time
+        existing_items = [{"id": 1, "weight": 0.5}]
+        incoming_items = [{"id": 1, "weight": 1.0}]
+
+        result = fold_weighted_item_lists(
+            existing_items,
+            [incoming_items, incoming_items],
+            key_fields=["id"],
+            weight_field="weight",
+            timestamp_field="timestamp",
+            limit=10,
+            alpha=0.5,
+        )
+
+        assert result == [{"id": 1, "weight": 0.88, "timestamp": mock_time}]
+        assert existing_items == [{"id": 1, "weight": 0.5}]
+        assert incoming_items == [{"id": 1, "weight": 1.0}]
+
+    def test_no_incoming_lists(self) -> None:
+        existing_items = [{"id": 1, "weight": 0.5}, {"id": 2, "weight": 0.9}]
+
+        result = fold_weighted_item_lists(
+            existing_items,
+            [],
+            key_fields=["id"],
+            weight_field="weight",
+            timestamp_field="timestamp",
+            limit=1,
+            alpha=0.8,
+        )
+
+        assert result == existing_items
+
+
+class TestFoldWeightedItemSchemas:
+    @patch("src.utils.aggregated_topic_attributes.utcnow")
+    def test_matches_dict_merges(
+        self, mock_utcnow: MagicMock, mock_time: datetime
+    ) -> None:
+        mock_utcnow.return_value = mock_time
+        rng = random.Random(0)
+        options: dict[str, tp.Any] = {
+            "key_fields": ("category", "name"),
+            "weight_field": "weight",
+            "timestamp_field": "updated_at",
+            "limit": 10,
+            "alpha": 0.8,
+        }
+        existing_entities = [
+            EntityTopicProfileSchema(
+                category="person",
+                name=f"entity{i}",
+                weight=0.1 * i,
+                updated_at=datetime(2022, 1, 1, tzinfo=UTC),
+            )
+            for i in range(10)
+        ]
+        incoming_entity_lists = [
+            build_random_topic_attributes_event(rng).entities for _ in range(200)
+        ]
+
+        expected = [et.model_dump() for et in existing_entities]
+        for incoming_entities in incoming_entity_lists:
+            expected = merge_weighted_item_lists(
+                expected, [et.model_dump() for et in incoming_entities], **options
+            )
+
+        result = fold_weighted_item_schemas(
+            existing_entities,
+            incoming_entity_lists,
+            profile_schema=EntityTopicProfileSchema,
+            **options,
+        )
+
+        assert [et.model_dump() for et in result] == expected
+        assert all(isinstance(et, EntityTopicProfileSchema) for et in result)
+
+
+class TestMergeWeightedItemSchemasVectorized:
+    @staticmethod
+    def build_options(mock_time: datetime) -> dict[str, tp.Any]:
+        return {
+            "profile_schema": KeywordTopicProfileSchema,
+            "build_key": attrgetter("name"),
+            "weight_field": "weight",
+            "timestamp_field": "updated_at",
+            "limit": 50,
+            "alpha": 0.8,
+            "new_timestamp_value": mock_time,
+        }
+
+    @pytest.mark.parametrize("incoming_count", [0, 1, 10, 50, 200])
+    def test_matches_python_merge(
+        self, mock_time: datetime, incoming_count: int
+    ) -> None:
+        pytest.importorskip("numpy")
+        rng = random.Random(incoming_count)
+        # Weights with one decimal, so that many of them tie
+        existing_keywords = [
+            KeywordTopicProfileSchema(
+                name=f"keyword{i}",
+                weight=round(rng.random(), 1),
+                updated_at=datetime(2022, 1, 1, tzinfo=UTC),
+            )
+            for i in range(50)
+        ]
+        incoming_keywords = [
+            KeywordTopicEventSchema(name=f"keyword{i}", weight=round(rng.random(), 1))
+            for i in rng.sample(range(300), incoming_count)
+        ]
+        options = self.build_options(mock_time)
+
+        result = merge_weighted_item_schemas_vectorized(
+            existing_keywords, incoming_keywords, **options
+        )
+
+        assert result == merge_weighted_item_schemas(
+            existing_keywords, incoming_keywords, **options
+        )
+
+    def test_duplicate_keys(self, mock_time: datetime) -> None:
+        pytest.importorskip("numpy")
+        incoming_keywords = [
+            KeywordTopicEventSchema(name="keyword1", weight=0.5),
+            KeywordTopicEventSchema(name="keyword1", weight=0.7),
+        ]
+
+        result = merge_weighted_item_schemas_vectorized(
+            [], incoming_keywords, **self.build_options(mock_time)
+        )
+
+        assert result is None
+
+    @patch("src.utils.aggregated_topic_attributes.VECTORIZED_MERGE_MIN_ITEMS", 0)
+    @patch("src.utils.aggregated_topic_attributes.utcnow")
+    def test_fold_without_numpy(
+        self, mock_utcnow: MagicMock, mock_time: datetime
+    ) -> None:
+        mock_utcnow.return_value = mock_time
+        rng = random.Random(0)
+        incoming_keyword_lists = [
+            build_random_topic_attributes_event(rng).keywords for _ in range(100)
+        ]
+        options: dict[str, tp.Any] = {
+            "profile_schema": KeywordTopicProfileSchema,
+            "key_fields": ("name",),
+            "weight_field": "weight",
+            "timestamp_field": "updated_at",
+            "limit": 50,
+            "alpha": 0.8,
+        }
+
+        with patch("src.utils.aggregated_topic_attributes.HAS_NUMPY", False):
+            expected = fold_weighted_item_schemas([], incoming_keyword_lists, **options)
+        result = fold_weighted_item_schemas([], incoming_keyword_lists, **options)
+
+        assert result == expected
+
+    @pytest.mark.parametrize(
+        ("incoming_count", "is_vectorized"), [(29, False), (30, True)]
+    )
+    @patch("src.utils.aggregated_topic_attributes.utcnow")
+    def test_fold_vectorized_from_min_items(
+        self,
+        mock_utcnow: MagicMock,
+        mock_time: datetime,
+        incoming_count: int,
+        is_vectorized: bool,
+    ) -> None:
+        pytest.importorskip("numpy")
+        mock_utcnow.return_value = mock_time
+        existing_keywords = [
+            KeywordTopicProfileSchema(name=f"keyword{i}", weight=0.5) for i in range(50)
+        ]
+        incoming_keywords = [
+            KeywordTopicEventSchema(name=f"new_keyword{i}", weight=0.5)
+            for i in range(incoming_count)
+        ]
+        options: dict[str, tp.Any] = {
+            "profile_schema": KeywordTopicProfileSchema,
+            "key_fields": ("name",),
+            "weight_field": "weight",
+            "timestamp_field": "updated_at",
+            "limit": 50,
+            "alpha": 0.8,
+        }
+
+        with patch(
+            "src.utils.aggregated_topic_attributes.merge_weighted_item_schemas_vectorized",
+            wraps=merge_weighted_item_schemas_vectorized,
+        ) as mock_merge_vectorized:
+            fold_weighted_item_schemas(
+                existing_keywords, [incoming_keywords], **options
+            )
+
+        # Verify 50 old and 30 incoming items reach `VECTORIZED_MERGE_MIN_ITEMS`
+        assert mock_merge_vectorized.called is is_vectorized
+
+
+class TestUpdateAggregatedTopicAttributesDtoBasedOnTopicAttributesEvents:
+    @pytest.mark.parametrize("events_count", [1, 2, 10, 100])
+    @patch("src.utils.aggregated_topic_attributes.utcnow")
+    def test_matches_sequential_updates(
+        self, mock_utcnow: MagicMock, mock_time: datetime, events_count: int
+    ) -> None:
+        mock_utcnow.return_value = mock_time
+        rng = random.Random(events_count)
+        existing_topic_profile = AggregatedTopicAttributesDTO(
+            user_id="user123",
+            keywords=[
+                KeywordTopicProfileSchema(
+                    name=f"keyword{i}",
+                    weight=0.5,
+                    updated_at=datetime(2022, 1, 1, tzinfo=UTC),
+                )
+                for i in range(50)
+            ],
+            version=3,
+        )
+        incoming_topic_events = [
+            build_random_topic_attributes_event(rng) for _ in range(events_count)
+        ]
+
+        expected = existing_topic_profile
+        for incoming_topic_event in incoming_topic_events:
+            expected = update_aggregated_topic_attributes_dto_based_on_topic_attributes_event_schema(
+                expected, incoming_topic_event
+            )
+
+        result = (
+            update_aggregated_topic_attributes_dto_based_on_topic_attributes_events(
+                existing_topic_profile, incoming_topic_events
+            )
+        )
+
+        assert result == expected
+        assert len(existing_topic_profile.keywords) == 50
+
+    def test_no_events(self) -> None:
+        existing_topic_profile = AggregatedTopicAttributesDTO(
+            user_id="user123",
+            keywords=[KeywordTopicProfileSchema(name="keyword1", weight=0.5)],
+        )
+
+        result = (
+            update_aggregated_topic_attributes_dto_based_on_topic_attributes_events(
+                existing_topic_profile, []
+            )
+        )
+
+        assert result == existing_topic_profile
+        assert result is not existing_topic_profile
+
+    @patch("src.utils.aggregated_topic_attributes.utcnow")
+    def test_prunes_decayed_items_with_half_life(
+        self, mock_utcnow: MagicMock, mock_time: datetime
+    ) -> None:
+        mock_utcnow.return_value = mock_time
+        existing_topic_profile = AggregatedTopicAttributesDTO(
+            user_id="user123",
+            keywords=[
+                KeywordTopicProfileSchema(
+                    name="fresh", weight=0.5, updated_at=mock_time
+                ),
+                KeywordTopicProfileSchema(
+                    name="stale",
+                    weight=0.5,
+                    updated_at=mock_time - timedelta(days=300),
+                ),
+            ],
+        )
+        incoming_topic_event = TopicAttributesEventBrokerDTO(
+            topic_attributes_event_uuid=uuid.uuid4(),
+            content_event_uuid=uuid.uuid4(),
+            user_id="user123",
+            keywords=[KeywordTopicEventSchema(name="new", weight=0.9)],
+            entities=[],
+            sentiments=[],
+            timestamp=mock_time,
+        )
+
+        result = (
+            update_aggregated_topic_attributes_dto_based_on_topic_attributes_events(
+                existing_topic_profile,
+                [incoming_topic_event],
+                half_life_days=30,
+                prune_weight=0.01,
+            )
+        )
+
+        assert [kw.name for kw in result.keywords] == ["new", "fresh"]
+        assert result.keywords[1].weight == 0.5
+
+
+class TestDecayAggregatedTopicAttributesDto:
+    def test_decay_aggregated_topic_attributes_dto(self, mock_time: datetime) -> None:
+        aggregated_topic_attributes = AggregatedTopicAttributesDTO(
+            user_id="user123",
+            keywords=[
+                KeywordTopicProfileSchema(
+                    name="old",
+                    weight=0.8,
+                    updated_at=mock_time - timedelta(days=20),
+                ),
+                KeywordTopicProfileSchema(name="new", weight=0.5, updated_at=mock_time),
+            ],
+            sentiments=[
+                SentimentTopicProfileSchema(
+                    name="positive",
+                    weight=0.6,
+                    updated_at=mock_time - timedelta(days=10),
+                )
+            ],
+        )
+
+        result = decay_aggregated_topic_attributes_dto(
+            aggregated_topic_attributes, half_life_days=10, now=mock_time
+        )
+
+        assert [kw.name for kw in result.keywords] == ["new", "old"]
+        assert [kw.weight for kw in result.keywords] == pytest.approx([0.5, 0.2])
+        assert result.sentiments[0].weight == pytest.approx(0.3)
+        assert aggregated_topic_attributes.keywords[0].weight == 0.8
+
+    def test_decay_aggregated_topic_attributes_dto_naive_timestamps(
+        self, mock_time: datetime
+    ) -> None:
+        aggregated_topic_attributes = AggregatedTopicAttributesDTO(
+            user_id="user123",
+            keywords=[
+                KeywordTopicProfileSchema(
+                    name="old",
+                    weight=0.8,
+                    updated_at=(mock_time - timedelta(days=10)).replace(tzinfo=None),
+                )
+            ],
+        )
+
+        result = decay_aggregated_topic_attributes_dto(
+            aggregated_topic_attributes, half_life_days=10, now=mock_time
+        )
+
+        assert result.keywords[0].weight == pytest.approx(0.4)
+
+
+class TestPruneAggregatedTopicAttributesDto:
+    def test_prune_aggregated_topic_attributes_dto(self, mock_time: datetime) -> None:
+        aggregated_topic_attributes = AggregatedTopicAttributesDTO(
+            user_id="user123",
+            entities=[
+                EntityTopicProfileSchema(
+                    category="ORG",
+                    name="kept",
+                    weight=0.8,
+                    updated_at=mock_time - timedelta(days=10),
+                ),
+                EntityTopicProfileSchema(
+                    category="ORG",
+                    name="pruned",
+                    weight=0.8,
+                    updated_at=mock_time - timedelta(days=30),
+                ),
+            ],
+        )
+
+        result = prune_aggregated_topic_attributes_dto(
+            aggregated_topic_attributes,
+            half_life_days=10,
+            min_weight=0.2,
+            now=mock_time,
+        )
+
+        assert [et.name for et in result.entities] == ["kept"]
+        assert result.entities[0].weight == 0.8
+
+
+class TestDiffAggregatedTopicAttributesDto:
+    def test_diff_aggregated_topic_attributes_dto(self) -> None:
+        # Arrange
+        updated_at = datetime(2023, 1, 1, tzinfo=UTC)
+        kept = KeywordTopicProfileSchema(
+            name="fastapi", weight=0.5, updated_at=updated_at
+        )
+        old = AggregatedTopicAttributesDTO(
+            user_id="user",
+            keywords=[
+                kept,
+                KeywordTopicProfileSchema(
+                    name="python", weight=0.5, updated_at=updated_at
+                ),
+                KeywordTopicProfileSchema(
+                    name="django", weight=0.1, updated_at=updated_at
+                ),
+            ],
+            entities=[
+                EntityTopicProfileSchema(
+                    category="language",
+                    name="python",
+                    weight=0.5,
+                    updated_at=updated_at,
+                )
+            ],
+        )
+        new = AggregatedTopicAttributesDTO(
+            user_id="user",
+            keywords=[
+                KeywordTopicProfileSchema(name="python", weight=0.7),
+                kept.model_copy(),
+                KeywordTopicProfileSchema(name="flask", weight=0.3),
+            ],
+            entities=[
+                EntityTopicProfileSchema(
+                    category="snake", name="python", weight=0.5, updated_at=updated_at
+                )
+            ],
+        )
+
+        # Act
+        changed_items, removed_items = diff_aggregated_topic_attributes_dto(old, new)
+
+        # Assert
+        assert [
+            (field, item.model_dump()["name"]) for field, item in changed_items
+        ] == [
+            ("keywords", "python"),
+            ("keywords", "flask"),
+            ("entities", "python"),
+        ]
+        # Verify entities are keyed by category and name
+        assert [
+            (field, item.model_dump()["name"]) for field, item in removed_items
+        ] == [
+            ("keywords", "django"),
+            ("entities", "python"),
+        ]
+        assert removed_items[1][1] == old.entities[0]
+
+    def test_diff_aggregated_topic_attributes_dto_unchanged(self) -> None:
+        # Arrange
+        aggregated_topic_attributes = AggregatedTopicAttributesDTO(
+            user_id="user",
+            keywords=[KeywordTopicProfileSchema(name="python", weight=0.5)],
+        )
+
+        # Act
+        result = diff_aggregated_topic_attributes_dto(
+            aggregated_topic_attributes, aggregated_topic_attributes.model_copy()
+        )
+
+        # Assert
+        assert result == ([], [])
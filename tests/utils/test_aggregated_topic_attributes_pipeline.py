@@ -0,0 +1,158 @@
+import os
+import random
+import typing as tp
+import uuid
+from datetime import UTC, datetime
+from unittest.mock import patch
+
+import pytest
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from src.dtos import AggregatedTopicAttributesDTO, TopicAttributesEventBrokerDTO
+from src.schemas import (
+    EntityTopicEventSchema,
+    KeywordTopicEventSchema,
+    SentimentTopicEventSchema,
+)
+from src.utils.aggregated_topic_attributes import (
+    build_update_aggregated_topic_attributes_pipeline,
+    update_aggregated_topic_attributes_dto_based_on_topic_attributes_event_schema,
+)
+
+MONGO_TEST_URL = os.environ.get("MONGO_TEST_URL")
+
+# MongoDB stores datetimes with millisecond precision
+NEW_TIMESTAMP_VALUE = datetime(2023, 1, 1, 12, 0, 0, tzinfo=UTC)
+
+
+def build_topic_attributes_event(
+    rng: random.Random, user_id: str = "test_user_id"
+) -> TopicAttributesEventBrokerDTO:
+    names = [f"name_{index}" for index in range(80)]
+    return TopicAttributesEventBrokerDTO(
+        topic_attributes_event_uuid=uuid.uuid4(),
+        content_event_uuid=uuid.uuid4(),
+        user_id=user_id,
+        keywords=[
+            KeywordTopicEventSchema(name=name, weight=round(rng.random(), 4))
+            for name in rng.sample(names, rng.randrange(0, 30))
+        ],
+        entities=[
+            EntityTopicEventSchema(
+                category=rng.choice(["ORG", "PER"]),
+                name=name,
+                weight=round(rng.random(), 4),
+            )
+            for name in rng.sample(names, rng.randrange(0, 30))
+        ],
+        sentiments=[
+            SentimentTopicEventSchema(name=name, weight=round(rng.random(), 4))
+            for name in rng.sample(["positive", "neutral", "negative"], 2)
+        ],
+        timestamp=NEW_TIMESTAMP_VALUE,
+    )
+
+
+class TestBuildUpdateAggregatedTopicAttributesPipeline:
+    def test_build_update_aggregated_topic_attributes_pipeline(self) -> None:
+        event = build_topic_attributes_event(random.Random(0))
+
+        pipeline = build_update_aggregated_topic_attributes_pipeline(
+            event,
+            new_timestamp_value=NEW_TIMESTAMP_VALUE,
+        )
+
+        assert len(pipeline) == 1
+        update = pipeline[0]["$set"]
+        assert update["user_id"] == {"$literal": "test_user_id"}
+        assert update["updated_at"] == NEW_TIMESTAMP_VALUE
+
+        keywords = update["keywords"]["$let"]
+        assert keywords["vars"] == {"existing_items": {"$ifNull": ["$keywords", []]}}
+        sliced = keywords["in"]["$map"]["input"]["$slice"]
+        assert sliced[1] == 50
+        assert sliced[0]["$sortArray"]["sortBy"] == {"weight": -1, "_position": 1}
+        merged_items = sliced[0]["$sortArray"]["input"]["$concatArrays"][0]
+        assert len(merged_items) == len(event.keywords)
+
+    def test_build_update_aggregated_topic_attributes_pipeline_entities_key(
+        self,
+    ) -> None:
+        event = build_topic_attributes_event(random.Random(1))
+
+        pipeline = build_update_aggregated_topic_attributes_pipeline(event)
+
+        entities = pipeline[0]["$set"]["entities"]["$let"]["in"]
+        sort_input = entities["$map"]["input"]["$slice"][0]["$sortArray"]["input"]
+        old_items = sort_input["$concatArrays"][1]["$filter"]
+        assert old_items["cond"]["$not"]["$in"][0] == [
+            "$$item.category",
+            "$$item.name",
+        ]
+
+    def test_build_update_aggregated_topic_attributes_pipeline_prunes_with_half_life(
+        self,
+    ) -> None:
+        event = build_topic_attributes_event(random.Random(2))
+
+        pipeline = build_update_aggregated_topic_attributes_pipeline(
+            event,
+            new_timestamp_value=NEW_TIMESTAMP_VALUE,
+            half_life_days=30,
+            prune_weight=0.01,
+        )
+
+        existing_items = pipeline[0]["$set"]["keywords"]["$let"]["vars"][
+            "existing_items"
+        ]["$ifNull"][0]["$filter"]
+        assert existing_items["input"] == {"$ifNull": ["$keywords", []]}
+        decayed_weight, min_weight = existing_items["cond"]["$gte"]
+        assert min_weight == 0.01
+        assert decayed_weight["$multiply"][0] == "$$item.weight"
+
+
+@pytest.mark.skipif(not MONGO_TEST_URL, reason="MONGO_TEST_URL is not set")
+class TestUpdateAggregatedTopicAttributesPipelineParity:
+    @pytest.fixture
+    async def collection(self) -> tp.AsyncIterator[tp.Any]:
+        client: AsyncIOMotorClient[tp.Any] = AsyncIOMotorClient(MONGO_TEST_URL)
+        collection = client["api_gateway_tests"][f"parity_{uuid.uuid4().hex}"]
+        yield collection
+        await collection.drop()
+        client.close()
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("seed", range(20))
+    async def test_pipeline_matches_python_merge(
+        self, collection: tp.Any, seed: int
+    ) -> None:
+        rng = random.Random(seed)
+        expected = AggregatedTopicAttributesDTO(user_id="test_user_id")
+
+        for _ in range(5):
+            event = build_topic_attributes_event(rng)
+
+            with patch(
+                "src.utils.aggregated_topic_attributes.utcnow",
+                return_value=NEW_TIMESTAMP_VALUE,
+            ):
+                expected = update_aggregated_topic_attributes_dto_based_on_topic_attributes_event_schema(
+                    expected, event
+                )
+            await collection.update_one(
+                {"user_id": "test_user_id"},
+                build_update_aggregated_topic_attributes_pipeline(
+                    event,
+                    new_timestamp_value=NEW_TIMESTAMP_VALUE,
+                ),
+                upsert=True,
+            )
+
+        document = await collection.find_one({"user_id": "test_user_id"})
+        assert document.pop("version") == 5
+        document["updated_at"] = document["updated_at"].replace(tzinfo=UTC)
+        for attribute in ("keywords", "entities", "sentiments"):
+            for item in document[attribute]:
+                item["updated_at"] = item["updated_at"].replace(tzinfo=UTC)
+
+        assert AggregatedTopicAttributesDTO.model_validate(document) == expected
@@ -0,0 +1,73 @@
+from unittest.mock import patch
+
+from src.utils.caches import LRUCache, TTLCache
+from src.utils.metrics import get_counter
+
+
+class TestLRUCache:
+    def test_lru_cache_get_missing(self) -> None:
+        cache: LRUCache[str, int] = LRUCache(maxsize=2, name="test_missing")
+
+        assert cache.get("a") is None
+        assert get_counter("test_missing.cache_misses").value == 1
+
+    def test_lru_cache_evicts_least_recently_used(self) -> None:
+        cache: LRUCache[str, int] = LRUCache(maxsize=2, name="test_evicts")
+        cache.set("a", 1)
+        cache.set("b", 2)
+
+        assert cache.get("a") == 1
+        cache.set("c", 3)
+
+        assert "a" in cache
+        assert "b" not in cache
+        assert "c" in cache
+        assert len(cache) == 2
+        assert get_counter("test_evicts.cache_hits").value == 1
+
+    def test_lru_cache_disabled(self) -> None:
+        cache: LRUCache[str, int] = LRUCache(maxsize=0, name="test_disabled")
+        cache.set("a", 1)
+
+        assert len(cache) == 0
+
+
+class TestTTLCache:
+    def test_ttl_cache_expires_entries(self) -> None:
+        cache: TTLCache[str, int] = TTLCache(
+            maxsize=2, ttl_ms=1000, name="test_ttl_expires"
+        )
+
+        with patch("src.utils.caches.time.monotonic", return_value=10.0):
+            cache.set("a", 1)
+        with patch("src.utils.caches.time.monotonic", return_value=10.5):
+            assert cache.get("a") == 1
+            assert "a" in cache
+        with patch("src.utils.caches.time.monotonic", return_value=11.0):
+            assert cache.get("a") is None
+            assert "a" not in cache
+
+        assert len(cache) == 0
+        assert get_counter("test_ttl_expires.cache_hits").value == 1
+        assert get_counter("test_ttl_expires.cache_misses").value == 1
+
+    def test_ttl_cache_evicts_oldest(self) -> None:
+        cache: TTLCache[str, int] = TTLCache(
+            maxsize=2, ttl_ms=1000, name="test_ttl_evicts"
+        )
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.set("a", 3)
+        cache.set("c", 4)
+
+        assert cache.get("a") == 3
+        assert "b" not in cache
+        assert cache.get("c") == 4
+
+    def test_ttl_cache_disabled(self) -> None:
+        cache: TTLCache[str, int] = TTLCache(
+            maxsize=2, ttl_ms=0, name="test_ttl_disabled"
+        )
+        cache.set("a", 1)
+
+        assert len(cache) == 0
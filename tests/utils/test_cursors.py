@@ -0,0 +1,62 @@
+import uuid
+from datetime import UTC, datetime
+
+import pytest
+
+from src.utils.cursors import (
+    decode_cursor,
+    decode_keyset_cursor,
+    decode_users_keyset_cursor,
+    encode_cursor,
+    encode_keyset_cursor,
+    encode_users_keyset_cursor,
+)
+
+
+class TestKeysetCursor:
+    def test_keyset_cursor_round_trip(self) -> None:
+        ts = datetime(2023, 1, 1, 12, 30, tzinfo=UTC)
+        content_event_uuid = uuid.uuid4()
+
+        cursor = encode_keyset_cursor(ts, content_event_uuid)
+
+        assert "=" not in cursor
+        assert decode_keyset_cursor(cursor) == (ts, content_event_uuid)
+
+    @pytest.mark.parametrize(
+        "cursor",
+        ["", "not a cursor", "W10", "WyJmb28iLCAiYmFyIl0"],
+    )
+    def test_decode_keyset_cursor_invalid(self, cursor: str) -> None:
+        with pytest.raises(ValueError, match="Invalid cursor"):
+            decode_keyset_cursor(cursor)
+
+
+class TestCursor:
+    def test_cursor_round_trip(self) -> None:
+        cursor = encode_cursor(["category", "name"])
+
+        assert decode_cursor(cursor, size=2) == ["category", "name"]
+
+    def test_decode_cursor_wrong_size(self) -> None:
+        cursor = encode_cursor(["name"])
+
+        with pytest.raises(ValueError, match="Invalid cursor"):
+            decode_cursor(cursor, size=2)
+
+
+class TestUsersKeysetCursor:
+    def test_users_keyset_cursor_round_trip(self) -> None:
+        weights = [0.1 + 0.2, None, 1e-300]
+
+        cursor = encode_users_keyset_cursor(weights, "user1")
+
+        assert decode_users_keyset_cursor(cursor) == (weights, "user1")
+
+    @pytest.mark.parametrize(
+        "values",
+        [["0.5", "", "user1"], ["weight", "", "", "user1"], ["nan", "", "", "user1"]],
+    )
+    def test_decode_users_keyset_cursor_invalid(self, values: list[str]) -> None:
+        with pytest.raises(ValueError, match="Invalid cursor"):
+            decode_users_keyset_cursor(encode_cursor(values))
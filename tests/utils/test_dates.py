@@ -1,7 +1,7 @@
-from datetime import datetime, timezone
+from datetime import UTC, datetime, timedelta, timezone
 from unittest.mock import MagicMock, patch
 
-from src.utils.dates import utcnow
+from src.utils.dates import as_utc, utcnow
 
 
 class TestUtcnow:
@@ -27,3 +27,13 @@ class TestUtcnow:
 
         mock_datetime.now.assert_called_once_with(timezone.utc)
         assert result == mock_now
+
+
+class TestAsUtc:
+    def test_as_utc_naive(self) -> None:
+        assert as_utc(datetime(2024, 1, 1, 12)) == datetime(2024, 1, 1, 12, tzinfo=UTC)
+
+    def test_as_utc_aware(self) -> None:
+        value = datetime(2024, 1, 1, 12, tzinfo=timezone(timedelta(hours=2)))
+
+        assert as_utc(value) is value
@@ -3,7 +3,7 @@ from dataclasses import dataclass
 
 import pytest
 
-from src.utils.manipulations import split_attributes_from_items
+from src.utils.manipulations import iter_chunks_by_size, split_attributes_from_items
 
 
 @dataclass
@@ -61,3 +61,53 @@ class TestSplitAttributesFromItems:
 
         with pytest.raises(AttributeError):
             split_attributes_from_items(items, "non_existent_attribute")
+
+
+class TestIterChunksBySize:
+    @staticmethod
+    async def iter_chunks(
+        chunks: list[list[str]],
+    ) -> tp.AsyncGenerator[list[str]]:
+        for chunk in chunks:
+            yield chunk
+
+    @pytest.mark.asyncio
+    async def test_iter_chunks_by_size_cuts_before_max_bytes(self) -> None:
+        chunks = iter_chunks_by_size(
+            self.iter_chunks([["aaaa", "bb"], ["cccc", "d"]]),
+            max_items=10,
+            max_bytes=6,
+            size_of=len,
+        )
+
+        assert [chunk async for chunk in chunks] == [["aaaa", "bb"], ["cccc", "d"]]
+
+    @pytest.mark.asyncio
+    async def test_iter_chunks_by_size_cuts_at_max_items(self) -> None:
+        chunks = iter_chunks_by_size(
+            self.iter_chunks([["a", "b", "c"], ["d"]]),
+            max_items=2,
+            max_bytes=100,
+            size_of=len,
+        )
+
+        assert [chunk async for chunk in chunks] == [["a", "b"], ["c", "d"]]
+
+    @pytest.mark.asyncio
+    async def test_iter_chunks_by_size_oversized_item(self) -> None:
+        chunks = iter_chunks_by_size(
+            self.iter_chunks([["a", "bbbbbbbb", "c"]]),
+            max_items=10,
+            max_bytes=4,
+            size_of=len,
+        )
+
+        assert [chunk async for chunk in chunks] == [["a"], ["bbbbbbbb"], ["c"]]
+
+    @pytest.mark.asyncio
+    async def test_iter_chunks_by_size_empty(self) -> None:
+        chunks = iter_chunks_by_size(
+            self.iter_chunks([]), max_items=10, max_bytes=4, size_of=len
+        )
+
+        assert [chunk async for chunk in chunks] == []
@@ -0,0 +1,49 @@
+from src.utils.metrics import (
+    Counter,
+    Summary,
+    collect_metrics,
+    get_counter,
+    get_summary,
+)
+
+
+class TestCounter:
+    def test_counter_inc(self) -> None:
+        counter = Counter()
+
+        counter.inc()
+        counter.inc(3)
+
+        assert counter.value == 4
+
+
+class TestSummary:
+    def test_summary_observe(self) -> None:
+        summary = Summary()
+
+        summary.observe(2.0)
+        summary.observe(4.0)
+
+        assert summary.count == 2
+        assert summary.total == 6.0
+        assert summary.mean == 3.0
+        assert summary.max == 4.0
+        assert summary.last == 4.0
+
+    def test_summary_mean_without_observations(self) -> None:
+        assert Summary().mean == 0.0
+
+
+class TestCollectMetrics:
+    def test_collect_metrics_returns_registered_metrics(self) -> None:
+        get_counter("test_metrics.counter").inc(2)
+        get_summary("test_metrics.summary").observe(5.0)
+
+        metrics = collect_metrics()
+
+        assert get_counter("test_metrics.counter") is get_counter(
+            "test_metrics.counter"
+        )
+        assert metrics["counters"]["test_metrics.counter"] == 2
+        assert metrics["summaries"]["test_metrics.summary"]["count"] == 1
+        assert metrics["summaries"]["test_metrics.summary"]["max"] == 5.0
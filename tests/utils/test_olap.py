@@ -1,10 +1,13 @@
-from unittest.mock import AsyncMock, MagicMock
+import inspect
+from unittest.mock import AsyncMock, MagicMock, create_autospec
 
 import pytest
 from asynch import Connection, Pool
+from asynch.proto.connection import Connection as ProtoConnection
 
 from src.utils.olap import (
     build_get_clickhouse_connection,
+    execute_columnar_insert,
     get_clickhouse_connection_from_pool,
 )
 
@@ -48,3 +51,62 @@ class TestBuildGetClickhouseConnection:
                 pass
 
         mock_pool.connection.assert_called_once()
+
+
+class TestExecuteColumnarInsert:
+    @pytest.mark.asyncio
+    async def test_execute_columnar_insert(self) -> None:
+        mock_connection = MagicMock(spec=Connection)
+        mock_connection._connection = create_autospec(ProtoConnection, instance=True)
+        mock_connection._connection.execute.return_value = 2
+
+        result = await execute_columnar_insert(
+            mock_connection,
+            "INSERT INTO table (a, b) VALUES",
+            ([1, 2], ["x", "y"]),
+        )
+
+        assert result == 2
+        mock_connection._connection.execute.assert_called_once_with(
+            "INSERT INTO table (a, b) VALUES",
+            [[1, 2], ["x", "y"]],
+            columnar=True,
+        )
+
+    @pytest.mark.asyncio
+    async def test_execute_columnar_insert_falls_back_to_rows(self) -> None:
+        # Arrange
+        mock_connection = MagicMock(spec=Connection)
+        # A protocol connection without the columnar mode
+        mock_connection._connection = MagicMock(spec=["execute"])
+        mock_cursor = AsyncMock()
+        mock_cursor.execute.return_value = 2
+        mock_connection.cursor.return_value.__aenter__.return_value = mock_cursor
+
+        # Act
+        result = await execute_columnar_insert(
+            mock_connection,
+            "INSERT INTO table (a, b) VALUES",
+            ([1, 2], ["x", "y"]),
+        )
+
+        # Assert
+        assert result == 2
+        mock_cursor.execute.assert_called_once_with(
+            "INSERT INTO table (a, b) VALUES",
+            [(1, "x"), (2, "y")],
+        )
+        mock_connection._connection.execute.assert_not_called()
+
+    def test_execute_columnar_insert_matches_installed_asynch(self) -> None:
+        # Verify the private protocol connection it relies on is still there,
+        # inserts would otherwise silently fall back to rows
+        connection = Connection(host="localhost")
+
+        assert isinstance(connection._connection, ProtoConnection)
+        assert (
+            "columnar" in inspect.signature(connection._connection.execute).parameters
+        )
+        parameters = inspect.signature(ProtoConnection.execute).parameters
+        assert inspect.iscoroutinefunction(ProtoConnection.execute)
+        assert {"query", "args", "columnar"} <= set(parameters)
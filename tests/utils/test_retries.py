@@ -0,0 +1,47 @@
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from src.utils.retries import retry_with_backoff
+
+
+class TestRetryWithBackoff:
+    @pytest.mark.asyncio
+    async def test_retry_with_backoff_succeeds_first(self) -> None:
+        operation = AsyncMock(return_value=True)
+
+        result = await retry_with_backoff(
+            operation, max_attempts=3, base_delay_ms=10, max_delay_ms=100
+        )
+
+        assert result is True
+        operation.assert_called_once()
+
+    @pytest.mark.asyncio
+    @patch("src.utils.retries.asyncio.sleep")
+    async def test_retry_with_backoff_retries(self, mock_sleep: AsyncMock) -> None:
+        operation = AsyncMock(side_effect=[False, False, True])
+
+        result = await retry_with_backoff(
+            operation, max_attempts=3, base_delay_ms=10, max_delay_ms=15
+        )
+
+        assert result is True
+        assert operation.call_count == 3
+        delays = [call.args[0] for call in mock_sleep.call_args_list]
+        assert len(delays) == 2
+        assert 0 <= delays[0] <= 0.01
+        assert 0 <= delays[1] <= 0.015
+
+    @pytest.mark.asyncio
+    @patch("src.utils.retries.asyncio.sleep")
+    async def test_retry_with_backoff_exhausted(self, mock_sleep: AsyncMock) -> None:
+        operation = AsyncMock(return_value=False)
+
+        result = await retry_with_backoff(
+            operation, max_attempts=3, base_delay_ms=10, max_delay_ms=100
+        )
+
+        assert result is False
+        assert operation.call_count == 3
+        assert mock_sleep.call_count == 2
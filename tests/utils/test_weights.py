@@ -1,4 +1,6 @@
-from src.utils.weights import recalculate_weight
+import pytest
+
+from src.utils.weights import decay_weight, recalculate_weight
 
 
 class TestRecalculateWeight:
@@ -40,3 +42,20 @@ class TestRecalculateWeight:
 
         result = recalculate_weight(1, 1)
         assert result == 1
+
+
+class TestDecayWeight:
+    def test_decay_weight_halves_every_half_life(self) -> None:
+        result = decay_weight(0.8, age_seconds=20, half_life_seconds=10)
+
+        assert result == pytest.approx(0.2)
+
+    def test_decay_weight_without_age(self) -> None:
+        result = decay_weight(0.8, age_seconds=0, half_life_seconds=10)
+
+        assert result == 0.8
+
+    def test_decay_weight_ignores_future_timestamps(self) -> None:
+        result = decay_weight(0.8, age_seconds=-10, half_life_seconds=10)
+
+        assert result == 0.8